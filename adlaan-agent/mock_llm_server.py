@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Mock OpenAI-compatible LLM server for local performance and load testing.
+Serves /v1/chat/completions (streaming and non-streaming) with configurable
+time-to-first-token, tokens/sec and error-rate profiles, and can record real
+responses to cassettes keyed by prompt hash and replay them without network.
+
+Point the agents at it with OPENAI_BASE_URL=http://localhost:8010/v1.
+"""
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import uvicorn
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass, field, asdict, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, List, AsyncGenerator
+
+import httpx
+
+
+# Named latency/error profiles; individual fields can be overridden
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "instant": {"ttft_seconds": 0.0, "tokens_per_second": 0.0, "error_rate": 0.0},
+    "fast": {"ttft_seconds": 0.2, "tokens_per_second": 150.0, "error_rate": 0.0},
+    "realistic": {"ttft_seconds": 0.8, "tokens_per_second": 40.0, "error_rate": 0.0},
+    "slow": {"ttft_seconds": 2.0, "tokens_per_second": 15.0, "error_rate": 0.0},
+    "flaky": {"ttft_seconds": 0.8, "tokens_per_second": 40.0, "error_rate": 0.1},
+}
+
+# Marker used by the generator's single-pass mode
+DOCUMENT_MARKER = "=== DOCUMENT ==="
+
+CLAUSES = [
+    "The parties agree to perform their obligations under this Agreement in good faith.",
+    "Each party shall keep the terms of this Agreement and all Confidential Information strictly confidential.",
+    "This Agreement may be terminated by either party upon thirty (30) days' written notice to the other party.",
+    "Neither party shall be liable for any failure to perform caused by circumstances beyond its reasonable control.",
+    "Any amendment to this Agreement shall be made in writing and signed by both parties.",
+    "All notices under this Agreement shall be delivered in writing to the addresses stated above.",
+    "This Agreement constitutes the entire agreement between the parties regarding its subject matter.",
+    "This Agreement shall be governed by and construed in accordance with the laws of the Hashemite Kingdom of Jordan.",
+]
+
+
+@dataclass
+class MockLLMConfig:
+    """Mock server configuration."""
+    profile: str = "realistic"
+    ttft_seconds: float = 0.8
+    tokens_per_second: float = 40.0  # 0 means no pacing
+    error_rate: float = 0.0
+    error_statuses: List[int] = field(default_factory=lambda: [429, 500, 503])
+    ttft_jitter: float = 0.2  # +/- fraction applied to time-to-first-token
+    response_tokens: int = 400  # Length of synthetic documents
+    mode: str = "synthetic"  # synthetic, record or replay
+    cassette_dir: str = "cassettes"
+    replay_strict: bool = False  # Fail instead of synthesizing on cassette misses
+    upstream_url: str = "https://api.openai.com/v1"
+    upstream_api_key: Optional[str] = None
+    seed: Optional[int] = None
+    
+    @classmethod
+    def from_profile(cls, profile: str, **overrides: Any) -> "MockLLMConfig":
+        """Build a configuration from a named profile plus overrides."""
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown profile {profile!r}; choose from {', '.join(PROFILES)}")
+        return cls(profile=profile, **{**PROFILES[profile], **overrides})
+    
+    @classmethod
+    def from_env(cls) -> "MockLLMConfig":
+        """Build a configuration from MOCK_LLM_* environment variables."""
+        overrides: Dict[str, Any] = {}
+        for config_field in fields(cls):
+            value = os.getenv(f"MOCK_LLM_{config_field.name.upper()}")
+            if value is None or config_field.name == "profile":
+                continue
+            if config_field.name == "error_statuses":
+                overrides[config_field.name] = [int(status) for status in value.split(",")]
+            elif config_field.name in ("ttft_seconds", "tokens_per_second", "error_rate", "ttft_jitter"):
+                overrides[config_field.name] = float(value)
+            elif config_field.name in ("response_tokens", "seed"):
+                overrides[config_field.name] = int(value)
+            elif config_field.name == "replay_strict":
+                overrides[config_field.name] = value.lower() in ("1", "true", "yes")
+            else:
+                overrides[config_field.name] = value
+        
+        overrides.setdefault("upstream_api_key", os.getenv("OPENAI_API_KEY"))
+        return cls.from_profile(os.getenv("MOCK_LLM_PROFILE", "realistic"), **overrides)
+
+
+def prompt_hash(messages: List[Dict[str, Any]]) -> str:
+    """Hash a conversation's roles and contents; the cassette key."""
+    normalized = [{"role": message.get("role"), "content": message.get("content")} for message in messages]
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def split_tokens(text: str) -> List[str]:
+    """Split text into word-sized streaming tokens."""
+    return re.findall(r"\s*\S+|\s+", text)
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count for usage reporting."""
+    return len(text) // 4 + 1
+
+
+def synthesize_response(messages: List[Dict[str, Any]], max_tokens: int, response_tokens: int, key: str) -> str:
+    """Build a deterministic, plausible response for the generator's prompts."""
+    rng = random.Random(key)
+    prompt = str(messages[-1].get("content", "")) if messages else ""
+    target_words = max(20, min(max_tokens, response_tokens) * 3 // 4)
+    
+    def clauses(count_words: int) -> str:
+        sentences, words = [], 0
+        while words < count_words:
+            sentence = rng.choice(CLAUSES)
+            sentences.append(sentence)
+            words += len(sentence.split())
+        return " ".join(sentences)
+    
+    if "JSON structure" in prompt:
+        headings = ["Definitions", "Scope", "Obligations", "Payment", "Confidentiality", "Termination", "Governing Law"]
+        return json.dumps({
+            "requirements": ["Identification of the parties", "Clear obligations", "Governing law clause"],
+            "analysis": {
+                "essential_elements": ["Parties", "Term", "Signatures"],
+                "specific_clauses": ["Confidentiality", "Termination"],
+                "compliance_requirements": ["Written form"],
+                "risk_considerations": ["Ambiguous obligations"]
+            },
+            "outline": [{"heading": heading, "summary": f"{heading} provisions"} for heading in headings],
+            "definitions": {"Agreement": "this agreement and its schedules", "Party": "a signatory to the Agreement"}
+        })
+    
+    if DOCUMENT_MARKER in prompt:
+        header = json.dumps({"requirements": ["Identification of the parties", "Governing law clause"]})
+        return f"{header}\n{DOCUMENT_MARKER}\nAGREEMENT\n\n{clauses(target_words)}"
+    
+    if "Write section" in prompt or "draft of section" in prompt:
+        return clauses(min(target_words, 120))
+    
+    paragraphs = [f"{number}. {clauses(target_words // 6)}" for number in range(1, 7)]
+    return "AGREEMENT\n\n" + "\n\n".join(paragraphs)
+
+
+class MockLLMServer:
+    """State and behaviour behind the mock endpoints."""
+    
+    def __init__(self, config: MockLLMConfig, upstream_client: Optional[httpx.AsyncClient] = None):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.upstream_client = upstream_client
+        self.stats = {"requests": 0, "errors": 0, "replay_hits": 0, "replay_misses": 0, "recorded": 0}
+    
+    @property
+    def cassette_dir(self) -> Path:
+        return Path(self.config.cassette_dir)
+    
+    def _cassette_path(self, key: str) -> Path:
+        return self.cassette_dir / f"{key}.json"
+    
+    def _load_cassette(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._cassette_path(key)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+    
+    def _save_cassette(self, key: str, body: Dict[str, Any], content: str, usage: Dict[str, Any]) -> None:
+        self.cassette_dir.mkdir(parents=True, exist_ok=True)
+        cassette = {
+            "key": key,
+            "model": body.get("model"),
+            "messages": body.get("messages", []),
+            "content": content,
+            "usage": usage,
+            "recorded_at": datetime.utcnow().isoformat()
+        }
+        self._cassette_path(key).write_text(json.dumps(cassette, indent=2, ensure_ascii=False), encoding="utf-8")
+        self.stats["recorded"] += 1
+    
+    async def _record(self, key: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Forward a request upstream, save the response and return it as a cassette."""
+        client = self.upstream_client or httpx.AsyncClient(timeout=120)
+        try:
+            response = await client.post(
+                f"{self.config.upstream_url.rstrip('/')}/chat/completions",
+                json={**body, "stream": False},
+                headers={"Authorization": f"Bearer {self.config.upstream_api_key or ''}"}
+            )
+            response.raise_for_status()
+            payload = response.json()
+        finally:
+            if client is not self.upstream_client:
+                await client.aclose()
+        
+        content = payload["choices"][0]["message"]["content"] or ""
+        usage = payload.get("usage", {})
+        self._save_cassette(key, body, content, usage)
+        return {"content": content, "usage": usage}
+    
+    async def resolve_content(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Produce the response content for a request according to the mode."""
+        messages = body.get("messages", [])
+        key = prompt_hash(messages)
+        
+        if self.config.mode == "record":
+            cassette = self._load_cassette(key) or await self._record(key, body)
+            return {"key": key, "content": cassette["content"], "usage": cassette.get("usage")}
+        
+        if self.config.mode == "replay":
+            cassette = self._load_cassette(key)
+            if cassette is not None:
+                self.stats["replay_hits"] += 1
+                return {"key": key, "content": cassette["content"], "usage": cassette.get("usage")}
+            self.stats["replay_misses"] += 1
+            if self.config.replay_strict:
+                raise LookupError(f"No cassette recorded for prompt {key}")
+        
+        max_tokens = body.get("max_tokens") or body.get("max_completion_tokens") or 4000
+        content = synthesize_response(messages, max_tokens, self.config.response_tokens, key)
+        return {"key": key, "content": content, "usage": None}
+    
+    def should_fail(self) -> Optional[int]:
+        """Draw an error status according to the error rate."""
+        if self.config.error_rate > 0 and self.rng.random() < self.config.error_rate:
+            return self.rng.choice(self.config.error_statuses)
+        return None
+    
+    def ttft(self) -> float:
+        """Time to first token, with jitter."""
+        jitter = self.config.ttft_jitter
+        return max(0.0, self.config.ttft_seconds * self.rng.uniform(1 - jitter, 1 + jitter))
+    
+    def token_delay(self) -> float:
+        """Delay between streamed tokens."""
+        if self.config.tokens_per_second <= 0:
+            return 0.0
+        return 1.0 / self.config.tokens_per_second
+
+
+def _usage(messages: List[Dict[str, Any]], content: str, recorded: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    """Usage block for a response, preferring recorded figures."""
+    if recorded:
+        return recorded
+    prompt_tokens = sum(estimate_tokens(str(message.get("content", ""))) for message in messages)
+    completion_tokens = len(split_tokens(content))
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+
+def _error_response(status_code: int, message: str) -> JSONResponse:
+    """OpenAI-style error body."""
+    error_type = "rate_limit_error" if status_code == 429 else "server_error"
+    headers = {"Retry-After": "1"} if status_code == 429 else None
+    return JSONResponse(
+        {"error": {"message": message, "type": error_type, "code": status_code}},
+        status_code=status_code,
+        headers=headers
+    )
+
+
+def create_app(config: Optional[MockLLMConfig] = None, upstream_client: Optional[httpx.AsyncClient] = None) -> FastAPI:
+    """Create the mock server application."""
+    server = MockLLMServer(config or MockLLMConfig.from_env(), upstream_client)
+    app = FastAPI(title="Mock LLM Service", version="1.0.0")
+    app.state.server = server
+    
+    @app.get("/health")
+    async def health():
+        """Health check endpoint."""
+        return {"status": "healthy", "service": "mock-llm", "profile": server.config.profile}
+    
+    @app.get("/v1/models")
+    async def list_models():
+        """List the models the mock answers for."""
+        return {"object": "list", "data": [{"id": "mock-gpt", "object": "model", "owned_by": "mock"}]}
+    
+    @app.get("/admin/config")
+    async def get_config():
+        """Current configuration and counters."""
+        return {"config": asdict(server.config), "stats": server.stats}
+    
+    @app.put("/admin/config")
+    async def update_config(request: Request):
+        """Switch profile or override fields at runtime."""
+        updates = await request.json()
+        profile = updates.pop("profile", None)
+        if profile:
+            base = MockLLMConfig.from_profile(profile)
+            for name in ("ttft_seconds", "tokens_per_second", "error_rate"):
+                setattr(server.config, name, getattr(base, name))
+            server.config.profile = profile
+        for name, value in updates.items():
+            if hasattr(server.config, name):
+                setattr(server.config, name, value)
+        return {"config": asdict(server.config)}
+    
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        """OpenAI-compatible chat completions."""
+        body = await request.json()
+        server.stats["requests"] += 1
+        
+        status_code = server.should_fail()
+        if status_code is not None:
+            server.stats["errors"] += 1
+            await asyncio.sleep(server.ttft() / 4)
+            return _error_response(status_code, f"Mock upstream error ({server.config.profile} profile)")
+        
+        try:
+            resolved = await server.resolve_content(body)
+        except LookupError as e:
+            return JSONResponse({"error": {"message": str(e), "type": "invalid_request_error"}}, status_code=404)
+        except httpx.HTTPError as e:
+            return _error_response(502, f"Recording failed: {e}")
+        
+        messages = body.get("messages", [])
+        content = resolved["content"]
+        usage = _usage(messages, content, resolved["usage"])
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        model = body.get("model", "mock-gpt")
+        
+        if not body.get("stream"):
+            tokens = split_tokens(content)
+            await asyncio.sleep(server.ttft() + server.token_delay() * max(len(tokens) - 1, 0))
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            })
+        
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+        
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+        
+        async def event_stream() -> AsyncGenerator[str, None]:
+            await asyncio.sleep(server.ttft())
+            yield chunk({"role": "assistant", "content": ""})
+            delay = server.token_delay()
+            for index, token in enumerate(split_tokens(content)):
+                if index and delay:
+                    await asyncio.sleep(delay)
+                yield chunk({"content": token})
+            yield chunk({}, finish_reason="stop")
+            if include_usage:
+                usage_payload = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [],
+                    "usage": usage
+                }
+                yield f"data: {json.dumps(usage_payload)}\n\n"
+            yield "data: [DONE]\n\n"
+        
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+    
+    return app
+
+
+app = create_app()
+
+if __name__ == "__main__":
+    port = int(os.getenv("MOCK_LLM_PORT", "8010"))
+    config = app.state.server.config
+    print(f"🚀 Starting Mock LLM Service on port {port}")
+    print(f"🎛️  Profile: {config.profile} (TTFT {config.ttft_seconds}s, {config.tokens_per_second} tok/s, error rate {config.error_rate})")
+    print(f"📼 Mode: {config.mode} (cassettes in {config.cassette_dir})")
+    print(f"📡 Point agents at it with OPENAI_BASE_URL=http://localhost:{port}/v1")
+    
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=port,
+        log_level="info"
+    )
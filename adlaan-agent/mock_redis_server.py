@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+"""
+Mock Redis server for local testing of the Redis Streams task queue.
+Speaks RESP2 over TCP, so the real redis client talks to it unchanged, and
+implements the commands the task queue and duplicate detection use:
+XADD, XGROUP CREATE, XREADGROUP (with BLOCK), XACK, XDEL, XLEN, XRANGE,
+XPENDING, XCLAIM, XAUTOCLAIM, SADD, SREM, SMEMBERS, SMISMEMBER, SET (NX, EX, PX),
+GET, EXPIRE and DEL.
+Data lives in memory; restarting the server empties it.
+
+Run several agent replicas against it with TASK_QUEUE_BACKEND=redis and
+REDIS_URL=redis://localhost:6390/0.
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, List, Tuple
+
+StreamId = Tuple[int, int]
+
+
+class RespError(Exception):
+    """Error reply sent to the client."""
+
+
+class SimpleString(str):
+    """Status reply such as OK."""
+
+
+def parse_id(value: str, default_seq: int = 0) -> StreamId:
+    """Parse a stream id; a missing sequence takes default_seq."""
+    if value == "-":
+        return (0, 0)
+    if value == "+":
+        return (2 ** 64, 2 ** 64)
+    ms, _, seq = value.partition("-")
+    try:
+        return (int(ms), int(seq) if seq else default_seq)
+    except ValueError:
+        raise RespError("ERR Invalid stream ID specified as stream command argument")
+
+
+def format_id(stream_id: StreamId) -> str:
+    """Format a stream id."""
+    return f"{stream_id[0]}-{stream_id[1]}"
+
+
+@dataclass
+class PendingEntry:
+    """A delivered, unacknowledged entry."""
+    consumer: str
+    delivered_at: float
+    deliveries: int = 1
+
+
+@dataclass
+class ConsumerGroup:
+    """Consumer group state for one stream."""
+    last_delivered: StreamId = (0, 0)
+    pending: Dict[StreamId, PendingEntry] = field(default_factory=dict)
+
+
+@dataclass
+class Stream:
+    """A stream's entries and groups."""
+    entries: Dict[StreamId, List[str]] = field(default_factory=dict)
+    last_id: StreamId = (0, 0)
+    groups: Dict[str, ConsumerGroup] = field(default_factory=dict)
+    
+    def after(self, start: StreamId, count: Optional[int] = None) -> List[Tuple[StreamId, List[str]]]:
+        """Entries with ids greater than start, in order."""
+        selected = [(entry_id, values) for entry_id, values in sorted(self.entries.items()) if entry_id > start]
+        return selected[:count] if count else selected
+
+
+class MockRedisServer:
+    """In-memory data and command handlers."""
+    
+    def __init__(self):
+        self.streams: Dict[str, Stream] = {}
+        self.sets: Dict[str, set] = {}
+        self.strings: Dict[str, Tuple[str, Optional[float]]] = {}
+        self._changed = asyncio.Condition()
+    
+    def _now_ms(self) -> int:
+        """Current time in milliseconds."""
+        return int(time.time() * 1000)
+    
+    def _stream(self, key: str, create: bool = False) -> Optional[Stream]:
+        """Look up a stream, optionally creating it."""
+        if key not in self.streams and create:
+            self.streams[key] = Stream()
+        return self.streams.get(key)
+    
+    def _group(self, key: str, name: str) -> Tuple[Stream, ConsumerGroup]:
+        """Look up a consumer group, failing like Redis when it is missing."""
+        stream = self.streams.get(key)
+        if stream is None or name not in stream.groups:
+            raise RespError(f"NOGROUP No such key '{key}' or consumer group '{name}'")
+        return stream, stream.groups[name]
+    
+    async def execute(self, args: List[str]) -> Any:
+        """Dispatch one command."""
+        if not args:
+            raise RespError("ERR empty command")
+        name = args[0].upper()
+        handler = getattr(self, f"cmd_{name.lower()}", None)
+        if handler is None:
+            raise RespError(f"ERR unknown command '{args[0]}'")
+        result = handler(*args[1:])
+        if asyncio.iscoroutine(result):
+            result = await result
+        return result
+    
+    def cmd_ping(self, *args: str) -> Any:
+        """PING [message]"""
+        return args[0] if args else SimpleString("PONG")
+    
+    def cmd_client(self, *args: str) -> Any:
+        """CLIENT SETINFO and friends are accepted and ignored."""
+        return SimpleString("OK")
+    
+    def cmd_select(self, db: str) -> Any:
+        """SELECT is accepted; there is one keyspace."""
+        return SimpleString("OK")
+    
+    def cmd_flushall(self, *args: str) -> Any:
+        """FLUSHALL"""
+        self.streams.clear()
+        self.sets.clear()
+        self.strings.clear()
+        return SimpleString("OK")
+    
+    def cmd_del(self, *keys: str) -> int:
+        """DEL key [key ...]"""
+        removed = 0
+        for key in keys:
+            found = [store.pop(key, None) is not None for store in (self.streams, self.sets, self.strings)]
+            removed += int(any(found))
+        return removed
+    
+    def cmd_expire(self, key: str, seconds: str, *args: str) -> int:
+        """EXPIRE key seconds; only string keys actually expire here."""
+        if self._string(key) is not None:
+            self.strings[key] = (self.strings[key][0], time.monotonic() + int(seconds))
+            return 1
+        return int(key in self.streams or key in self.sets)
+    
+    def _string(self, key: str) -> Optional[str]:
+        """A string value unless it has expired."""
+        entry = self.strings.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            del self.strings[key]
+            return None
+        return entry[0]
+    
+    def cmd_get(self, key: str) -> Optional[str]:
+        """GET key"""
+        return self._string(key)
+    
+    def cmd_set(self, key: str, value: str, *args: str) -> Any:
+        """SET key value [NX | XX] [EX seconds | PX milliseconds]"""
+        options = [arg.upper() for arg in args]
+        exists = self._string(key) is not None
+        if ("NX" in options and exists) or ("XX" in options and not exists):
+            return None
+        expires_at = None
+        for unit, scale in (("EX", 1.0), ("PX", 0.001)):
+            if unit in options:
+                expires_at = time.monotonic() + int(args[options.index(unit) + 1]) * scale
+        self.strings[key] = (value, expires_at)
+        return SimpleString("OK")
+    
+    def cmd_sadd(self, key: str, *members: str) -> int:
+        """SADD key member [member ...]"""
+        values = self.sets.setdefault(key, set())
+        added = len(set(members) - values)
+        values.update(members)
+        return added
+    
+    def cmd_srem(self, key: str, *members: str) -> int:
+        """SREM key member [member ...]"""
+        values = self.sets.get(key, set())
+        removed = len(values & set(members))
+        values.difference_update(members)
+        return removed
+    
+    def cmd_smembers(self, key: str) -> List[str]:
+        """SMEMBERS key"""
+        return sorted(self.sets.get(key, set()))
+    
+    def cmd_smismember(self, key: str, *members: str) -> List[int]:
+        """SMISMEMBER key member [member ...]"""
+        values = self.sets.get(key, set())
+        return [int(member in values) for member in members]
+    
+    async def cmd_xadd(self, key: str, *args: str) -> str:
+        """XADD key [NOMKSTREAM] [MAXLEN ...] id field value [field value ...]"""
+        args = list(args)
+        if args and args[0].upper() == "NOMKSTREAM":
+            args.pop(0)
+        maxlen = None
+        if args and args[0].upper() == "MAXLEN":
+            args.pop(0)
+            if args[0] in ("~", "="):
+                args.pop(0)
+            maxlen = int(args.pop(0))
+        requested, values = args[0], args[1:]
+        if not values or len(values) % 2:
+            raise RespError("ERR wrong number of arguments for 'xadd' command")
+        
+        stream = self._stream(key, create=True)
+        if requested == "*":
+            ms = max(self._now_ms(), stream.last_id[0])
+            entry_id = (ms, stream.last_id[1] + 1 if ms == stream.last_id[0] else 0)
+        else:
+            entry_id = parse_id(requested)
+            if entry_id <= stream.last_id:
+                raise RespError("ERR The ID specified in XADD is equal or smaller than the target stream top item")
+        stream.entries[entry_id] = values
+        stream.last_id = entry_id
+        if maxlen is not None:
+            for old_id in sorted(stream.entries)[:-maxlen or None]:
+                del stream.entries[old_id]
+        
+        async with self._changed:
+            self._changed.notify_all()
+        return format_id(entry_id)
+    
+    def cmd_xlen(self, key: str) -> int:
+        """XLEN key"""
+        stream = self.streams.get(key)
+        return len(stream.entries) if stream else 0
+    
+    def cmd_xdel(self, key: str, *ids: str) -> int:
+        """XDEL key id [id ...]"""
+        stream = self.streams.get(key)
+        if stream is None:
+            return 0
+        return sum(stream.entries.pop(parse_id(entry_id), None) is not None for entry_id in ids)
+    
+    def cmd_xrange(self, key: str, start: str, end: str, *args: str) -> List[Any]:
+        """XRANGE key start end [COUNT count]"""
+        stream = self.streams.get(key)
+        if stream is None:
+            return []
+        low, high = parse_id(start), parse_id(end, default_seq=2 ** 64)
+        count = int(args[1]) if len(args) == 2 and args[0].upper() == "COUNT" else None
+        selected = [[format_id(entry_id), values] for entry_id, values in sorted(stream.entries.items()) if low <= entry_id <= high]
+        return selected[:count] if count else selected
+    
+    def cmd_xgroup(self, subcommand: str, key: str, group: str, *args: str) -> Any:
+        """XGROUP CREATE key group id [MKSTREAM] | XGROUP DESTROY key group"""
+        subcommand = subcommand.upper()
+        if subcommand == "DESTROY":
+            stream = self.streams.get(key)
+            return int(bool(stream and stream.groups.pop(group, None)))
+        if subcommand != "CREATE":
+            raise RespError(f"ERR unknown XGROUP subcommand '{subcommand}'")
+        
+        stream = self._stream(key, create="MKSTREAM" in (arg.upper() for arg in args[1:]))
+        if stream is None:
+            raise RespError("ERR The XGROUP subcommand requires the key to exist")
+        if group in stream.groups:
+            raise RespError("BUSYGROUP Consumer Group name already exists")
+        start = stream.last_id if args[0] == "$" else parse_id(args[0])
+        stream.groups[group] = ConsumerGroup(last_delivered=start)
+        return SimpleString("OK")
+    
+    def _deliver_new(self, key: str, group_name: str, consumer: str, count: Optional[int]) -> List[Any]:
+        """Hand new entries to a consumer and add them to the pending list."""
+        stream, group = self._group(key, group_name)
+        entries = stream.after(group.last_delivered, count)
+        now = time.monotonic()
+        for entry_id, _ in entries:
+            group.pending[entry_id] = PendingEntry(consumer=consumer, delivered_at=now)
+            group.last_delivered = entry_id
+        return [[format_id(entry_id), values] for entry_id, values in entries]
+    
+    def _history(self, key: str, group_name: str, consumer: str, start: StreamId, count: Optional[int]) -> List[Any]:
+        """Entries already pending for this consumer after start."""
+        stream, group = self._group(key, group_name)
+        owned = sorted(entry_id for entry_id, entry in group.pending.items() if entry.consumer == consumer and entry_id > start)
+        owned = owned[:count] if count else owned
+        return [[format_id(entry_id), stream.entries.get(entry_id)] for entry_id in owned]
+    
+    async def cmd_xreadgroup(self, *args: str) -> Any:
+        """XREADGROUP GROUP group consumer [COUNT n] [BLOCK ms] [NOACK] STREAMS key [key ...] id [id ...]"""
+        args = list(args)
+        if args[0].upper() != "GROUP":
+            raise RespError("ERR syntax error")
+        group, consumer = args[1], args[2]
+        index, count, block = 3, None, None
+        while args[index].upper() != "STREAMS":
+            option = args[index].upper()
+            if option == "COUNT":
+                count = int(args[index + 1])
+                index += 2
+            elif option == "BLOCK":
+                block = int(args[index + 1])
+                index += 2
+            else:
+                index += 1
+        rest = args[index + 1:]
+        half = len(rest) // 2
+        keys, ids = rest[:half], rest[half:]
+        
+        def read() -> List[Any]:
+            reply = []
+            for key, requested in zip(keys, ids):
+                if requested == ">":
+                    entries = self._deliver_new(key, group, consumer, count)
+                else:
+                    entries = self._history(key, group, consumer, parse_id(requested), count)
+                if entries or requested != ">":
+                    reply.append([key, entries])
+            return reply
+        
+        reply = read()
+        if reply or block is None or ">" not in ids:
+            return reply or None
+        
+        deadline = None if block == 0 else time.monotonic() + block / 1000
+        async with self._changed:
+            while True:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    return None
+                reply = read()
+                if reply:
+                    return reply
+    
+    def cmd_xack(self, key: str, group_name: str, *ids: str) -> int:
+        """XACK key group id [id ...]"""
+        stream = self.streams.get(key)
+        if stream is None or group_name not in stream.groups:
+            return 0
+        pending = stream.groups[group_name].pending
+        return sum(pending.pop(parse_id(entry_id), None) is not None for entry_id in ids)
+    
+    def cmd_xpending(self, key: str, group_name: str, *args: str) -> Any:
+        """XPENDING key group [[IDLE ms] start end count [consumer]]"""
+        stream, group = self._group(key, group_name)
+        if not args:
+            if not group.pending:
+                return [0, None, None, None]
+            ids = sorted(group.pending)
+            consumers: Dict[str, int] = {}
+            for entry in group.pending.values():
+                consumers[entry.consumer] = consumers.get(entry.consumer, 0) + 1
+            return [len(ids), format_id(ids[0]), format_id(ids[-1]), [[name, str(n)] for name, n in consumers.items()]]
+        
+        args = list(args)
+        min_idle = 0
+        if args[0].upper() == "IDLE":
+            min_idle = int(args[1])
+            args = args[2:]
+        low, high, count = parse_id(args[0]), parse_id(args[1], default_seq=2 ** 64), int(args[2])
+        consumer = args[3] if len(args) > 3 else None
+        now = time.monotonic()
+        reply = []
+        for entry_id in sorted(group.pending):
+            entry = group.pending[entry_id]
+            idle = int((now - entry.delivered_at) * 1000)
+            if low <= entry_id <= high and idle >= min_idle and consumer in (None, entry.consumer):
+                reply.append([format_id(entry_id), entry.consumer, idle, entry.deliveries])
+        return reply[:count]
+    
+    def _claim(self, group: ConsumerGroup, entry_id: StreamId, consumer: str, justid: bool) -> None:
+        """Move a pending entry to consumer; a real claim counts as a delivery."""
+        entry = group.pending[entry_id]
+        entry.consumer = consumer
+        entry.delivered_at = time.monotonic()
+        if not justid:
+            entry.deliveries += 1
+    
+    def cmd_xclaim(self, key: str, group_name: str, consumer: str, min_idle: str, *args: str) -> List[Any]:
+        """XCLAIM key group consumer min-idle-time id [id ...] [JUSTID]"""
+        stream, group = self._group(key, group_name)
+        ids = [arg for arg in args if arg[0].isdigit()]
+        justid = any(arg.upper() == "JUSTID" for arg in args)
+        now = time.monotonic()
+        reply = []
+        for raw_id in ids:
+            entry_id = parse_id(raw_id)
+            entry = group.pending.get(entry_id)
+            if entry is None or (now - entry.delivered_at) * 1000 < int(min_idle):
+                continue
+            self._claim(group, entry_id, consumer, justid)
+            reply.append(raw_id if justid else [raw_id, stream.entries.get(entry_id)])
+        return reply
+    
+    def cmd_xautoclaim(self, key: str, group_name: str, consumer: str, min_idle: str, start: str, *args: str) -> List[Any]:
+        """XAUTOCLAIM key group consumer min-idle-time start [COUNT count] [JUSTID]"""
+        stream, group = self._group(key, group_name)
+        count, justid = 100, False
+        index = 0
+        while index < len(args):
+            if args[index].upper() == "COUNT":
+                count = int(args[index + 1])
+                index += 2
+            else:
+                justid = justid or args[index].upper() == "JUSTID"
+                index += 1
+        
+        now = time.monotonic()
+        begin = parse_id(start)
+        claimed, deleted = [], []
+        next_start = "0-0"
+        for entry_id in sorted(group.pending):
+            if entry_id < begin:
+                continue
+            if len(claimed) + len(deleted) >= count:
+                next_start = format_id(entry_id)
+                break
+            entry = group.pending[entry_id]
+            if (now - entry.delivered_at) * 1000 < int(min_idle):
+                continue
+            if entry_id not in stream.entries:
+                del group.pending[entry_id]
+                deleted.append(format_id(entry_id))
+                continue
+            self._claim(group, entry_id, consumer, justid)
+            claimed.append(format_id(entry_id) if justid else [format_id(entry_id), stream.entries[entry_id]])
+        return [next_start, claimed, deleted]
+
+
+def encode(value: Any) -> bytes:
+    """Encode a reply in RESP2."""
+    if isinstance(value, RespError):
+        return f"-{value}\r\n".encode()
+    if isinstance(value, SimpleString):
+        return f"+{value}\r\n".encode()
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, bool):
+        return f":{int(value)}\r\n".encode()
+    if isinstance(value, int):
+        return f":{value}\r\n".encode()
+    if isinstance(value, (list, tuple)):
+        return f"*{len(value)}\r\n".encode() + b"".join(encode(item) for item in value)
+    data = str(value).encode()
+    return f"${len(data)}\r\n".encode() + data + b"\r\n"
+
+
+async def read_command(reader: asyncio.StreamReader) -> Optional[List[str]]:
+    """Read one RESP array of bulk strings, or an inline command."""
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.decode().split()
+    
+    args = []
+    for _ in range(int(line[1:])):
+        header = await reader.readline()
+        length = int(header[1:])
+        data = await reader.readexactly(length + 2)
+        args.append(data[:-2].decode())
+    return args
+
+
+def create_server(server: Optional[MockRedisServer] = None, host: str = "127.0.0.1", port: int = 0):
+    """Create (but do not start) the TCP server; port 0 picks a free port."""
+    server = server or MockRedisServer()
+    
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                args = await read_command(reader)
+                if args is None:
+                    break
+                try:
+                    reply = await server.execute(args)
+                except RespError as e:
+                    reply = e
+                writer.write(encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    
+    return asyncio.start_server(handle, host, port)
+
+
+async def main() -> None:
+    """Serve until interrupted."""
+    port = int(os.getenv("MOCK_REDIS_PORT", "6390"))
+    tcp_server = await create_server(host="0.0.0.0", port=port)
+    print(f"Mock Redis listening on redis://localhost:{port}/0")
+    async with tcp_server:
+        await tcp_server.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,32 +1,60 @@
 """
 Agent module initialization.
 Self-contained agent architecture with individual agent directories.
+Agent packages are imported on first access, so a process that defers or
+never uses an agent does not pay for importing it.
 """
-from .legal_document_generator import LegalDocumentGeneratorAgent
-from .document_analyzer import DocumentAnalyzerAgent
-from .document_classifier import DocumentClassifierAgent
-from .legal_research_agent import LegalResearchAgent
-from .contract_reviewer import ContractReviewerAgent
-
-# Import BaseAgent from the base_agent directory
-from .base_agent.base_agent import BaseAgent
-
-# Agent registry for easy access
-AVAILABLE_AGENTS = {
-    "legal_document_generator": LegalDocumentGeneratorAgent,
-    "document_analyzer": DocumentAnalyzerAgent,
-    "document_classifier": DocumentClassifierAgent,
-    "legal_research": LegalResearchAgent,
-    "contract_reviewer": ContractReviewerAgent
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .legal_document_generator import LegalDocumentGeneratorAgent
+    from .document_analyzer import DocumentAnalyzerAgent
+    from .document_classifier import DocumentClassifierAgent
+    from .legal_research_agent import LegalResearchAgent
+    from .contract_reviewer import ContractReviewerAgent
+    from .base_agent.base_agent import BaseAgent
+
+# Agent type -> (package, class name)
+AGENT_MODULES = {
+    "legal_document_generator": ("legal_document_generator", "LegalDocumentGeneratorAgent"),
+    "document_analyzer": ("document_analyzer", "DocumentAnalyzerAgent"),
+    "document_classifier": ("document_classifier", "DocumentClassifierAgent"),
+    "legal_research": ("legal_research_agent", "LegalResearchAgent"),
+    "contract_reviewer": ("contract_reviewer", "ContractReviewerAgent")
 }
 
 
+def load_agent_class(agent_type: str):
+    """Import and return the agent class for an agent type."""
+    if agent_type not in AGENT_MODULES:
+        raise ValueError(f"Unknown agent type: {agent_type}")
+    
+    package, class_name = AGENT_MODULES[agent_type]
+    module = importlib.import_module(f"{__name__}.{package}")
+    return getattr(module, class_name)
+
+
 def get_agent(agent_type: str, **kwargs):
     """Get agent instance by type."""
-    if agent_type not in AVAILABLE_AGENTS:
-        raise ValueError(f"Unknown agent type: {agent_type}")
+    return load_agent_class(agent_type)(**kwargs)
+
+
+def __getattr__(name: str):
+    """Import agent classes and the agent registry on first access."""
+    if name == "BaseAgent":
+        from .base_agent.base_agent import BaseAgent
+        return BaseAgent
+    
+    # Agent registry for easy access
+    if name == "AVAILABLE_AGENTS":
+        return {agent_type: load_agent_class(agent_type) for agent_type in AGENT_MODULES}
+    
+    for agent_type, (_, class_name) in AGENT_MODULES.items():
+        if class_name == name:
+            return load_agent_class(agent_type)
     
-    return AVAILABLE_AGENTS[agent_type](**kwargs)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 __all__ = [
@@ -37,12 +65,14 @@ __all__ = [
     "LegalDocumentGeneratorAgent",
     "DocumentAnalyzerAgent",
     "DocumentClassifierAgent",
-    "LegalResearchAgent", 
+    "LegalResearchAgent",
     "ContractReviewerAgent",
     
     # Functions
     "get_agent",
+    "load_agent_class",
     
     # Registries
-    "AVAILABLE_AGENTS"
-]
\ No newline at end of file
+    "AVAILABLE_AGENTS",
+    "AGENT_MODULES"
+]
@@ -2,9 +2,11 @@
 Agents module initialization.
 Contains only BaseAgent - individual agents are now self-contained.
 """
-from .base_agent import BaseAgent, AgentState
+from .base_agent import BaseAgent, AgentState, AgentGraphState, merge_state
 
 __all__ = [
     "BaseAgent",
-    "AgentState"
+    "AgentState",
+    "AgentGraphState",
+    "merge_state"
 ]
\ No newline at end of file
@@ -2,9 +2,12 @@
 Base agent classes and infrastructure.
 """
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List, AsyncGenerator
+from typing import Dict, Any, Optional, List, AsyncGenerator, Annotated, Callable
 from datetime import datetime
+import functools
+import inspect
 import json
+import time
 import uuid
 
 try:
@@ -12,6 +15,7 @@ try:
     from langchain.schema import HumanMessage, SystemMessage
     from langgraph.graph import StateGraph, END
     from langgraph.checkpoint.memory import MemorySaver
+    from src.services.checkpointer import get_checkpointer
     LANGCHAIN_AVAILABLE = True
 except ImportError:
     # Mock classes for when LangChain is not available
@@ -19,11 +23,17 @@ except ImportError:
         def __init__(self, **kwargs):
             self.kwargs = kwargs
             
-        async def ainvoke(self, messages):
+        async def ainvoke(self, messages, **kwargs):
             # Mock response
             class MockResponse:
                 content = '{"requirements": ["Basic legal structure"], "analysis": {"status": "mock"}}'
             return MockResponse()
+        
+        async def astream(self, messages, **kwargs):
+            # Mock streaming response
+            class MockChunk:
+                content = '{"requirements": ["Basic legal structure"], "analysis": {"status": "mock"}}'
+            yield MockChunk()
     
     class HumanMessage:
         def __init__(self, content):
@@ -45,9 +55,15 @@ except ImportError:
         def add_edge(self, from_node, to_node):
             self.edges.append((from_node, to_node))
             
+        def add_conditional_edges(self, source, path, path_map=None):
+            self.edges.append((source, path))
+            
         def set_entry_point(self, node):
             self.entry_point = node
             
+        def set_conditional_entry_point(self, path, path_map=None):
+            self.entry_point = path
+            
         def compile(self, **kwargs):
             return MockGraph(self.nodes, self.edges, self.entry_point)
     
@@ -65,9 +81,9 @@ except ImportError:
                     current_state = await node_func(current_state)
             return current_state
             
-        async def astream(self, state, config=None):
+        async def astream(self, state, config=None, **kwargs):
             # Mock streaming
-            yield {"node": "processing", "state": state}
+            yield "values", state
     
     class MemorySaver:
         pass
@@ -76,7 +92,9 @@ except ImportError:
     LANGCHAIN_AVAILABLE = False
 
 from src.services.base import AsyncService
-from src.core.exceptions import AgentError, OpenAIError
+from src.services.event_channel import get_event_channel
+from src.services.llm_gateway import get_llm_gateway
+from src.core.exceptions import AgentError
 from src.schemas import AgentType, TaskStatus
 from src.utils.agent_helpers import (
     safe_json_parse,
@@ -85,6 +103,9 @@ from src.utils.agent_helpers import (
     create_task_metadata,
     format_legal_prompt
 )
+from src.utils.json_stream import JSONStreamExtractor
+from src.core.metrics import track_node
+from src.services.progress import get_progress_tracker
 
 
 class AgentState(Dict[str, Any]):
@@ -92,6 +113,56 @@ class AgentState(Dict[str, Any]):
     pass
 
 
+def merge_state(current: Optional[Dict[str, Any]], update: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge a node's returned keys into the workflow state."""
+    merged = dict(current or {})
+    merged.update(update or {})
+    return merged
+
+
+# Graph schema: a single state channel reduced with merge_state, so nodes may
+# return either the full state or only the keys they changed.
+AgentGraphState = Annotated[AgentState, merge_state]
+
+
+class InstrumentedStateGraph(StateGraph):
+    """StateGraph that records latency, in-flight and error metrics for every node it registers."""
+    
+    def __init__(self, state_schema: Any, agent_name: str):
+        super().__init__(state_schema)
+        self.agent_name = agent_name
+    
+    def add_node(self, node: str, action: Callable = None, weight: float = 1.0, progress_group: Optional[str] = None, **kwargs):
+        """
+        Register a node, wrapping its action with metrics and progress reporting.
+        
+        ``weight`` is the node's share of task progress; nodes that are
+        alternatives to one another share a ``progress_group``.
+        """
+        if action is not None:
+            action = self._instrument(node, action)
+        get_progress_tracker().plan(self.agent_name).add(node, weight, progress_group)
+        return super().add_node(node, action, **kwargs)
+    
+    def _instrument(self, node: str, action: Callable) -> Callable:
+        """Wrap a node action so each run is timed and counted towards its task's progress."""
+        agent_name = self.agent_name
+        tracker = get_progress_tracker()
+        
+        @functools.wraps(action)
+        async def instrumented(state):
+            task_id = state.get("task_id") if isinstance(state, dict) else None
+            tracker.node_started(task_id, node)
+            with track_node(agent_name, node):
+                result = action(state)
+                if inspect.isawaitable(result):
+                    result = await result
+            tracker.node_completed(task_id, node)
+            return result
+        
+        return instrumented
+
+
 class BaseAgent(AsyncService[Dict[str, Any]], ABC):
     """Base class for all AI agents."""
     
@@ -100,7 +171,7 @@ class BaseAgent(AsyncService[Dict[str, Any]], ABC):
         self.agent_type = agent_type
         self.llm = None
         self.graph = None
-        self.checkpointer = MemorySaver()
+        self.checkpointer = get_checkpointer() if LANGCHAIN_AVAILABLE else MemorySaver()
         
     async def initialize(self) -> None:
         """Initialize the agent."""
@@ -110,12 +181,8 @@ class BaseAgent(AsyncService[Dict[str, Any]], ABC):
             if not LANGCHAIN_AVAILABLE:
                 self.logger.warning("LangChain not available, using mock implementation")
             
-            self.llm = ChatOpenAI(
-                model=self.settings.openai_model,
-                temperature=self.settings.openai_temperature,
-                max_tokens=self.settings.openai_max_tokens,
-                api_key=self.settings.openai_api_key
-            )
+            # All agents share one rate-limited client through the LLM gateway
+            self.llm = get_llm_gateway().client_for(self.agent_type.value)
             
             # Build the workflow graph
             self.graph = await self._build_graph()
@@ -127,15 +194,12 @@ class BaseAgent(AsyncService[Dict[str, Any]], ABC):
             raise AgentError(f"Agent initialization failed: {str(e)}")
     
     async def _perform_health_check(self) -> None:
-        """Check agent health."""
+        """Check agent health without calling the LLM; provider health comes from the gateway."""
         if not self.llm:
             raise AgentError("LLM not initialized")
         
-        # Test a simple LLM call
-        try:
-            await self.llm.ainvoke([HumanMessage(content="Test")])
-        except Exception as e:
-            raise OpenAIError(f"LLM health check failed: {str(e)}")
+        if not self.graph:
+            raise AgentError("Workflow graph not initialized")
     
     async def _get_health_details(self) -> Dict[str, Any]:
         """Get agent health details."""
@@ -146,6 +210,84 @@ class BaseAgent(AsyncService[Dict[str, Any]], ABC):
             "llm_initialized": self.llm is not None
         }
     
+    def _create_workflow(self) -> StateGraph:
+        """Create an empty, instrumented workflow graph over the shared agent state schema."""
+        return InstrumentedStateGraph(AgentGraphState, self.agent_type.value)
+    
+    async def _stream_llm(
+        self,
+        state: AgentState,
+        messages: List[Any],
+        stage: str,
+        section: Optional[int] = None,
+        stop_when: Optional[Callable[[str], bool]] = None,
+        **kwargs
+    ) -> str:
+        """
+        Stream a completion, publishing token deltas on the task's event channel.
+        
+        ``section`` tags events from concurrently drafted sections so clients
+        can keep their deltas apart. ``stop_when`` is called with each delta;
+        once it returns True the stream is closed and the upstream call cancelled.
+        """
+        channel = get_event_channel()
+        channel_id = state.get("task_id")
+        tags = {"stage": stage} if section is None else {"stage": stage, "section": section}
+        parts = []
+        stopped_early = False
+        
+        channel.publish(channel_id, {"type": "stage_started", **tags})
+        
+        stream = self.llm.astream(messages, **kwargs)
+        try:
+            async for chunk in stream:
+                delta = chunk.content
+                if not delta:
+                    continue
+                parts.append(delta)
+                channel.publish(channel_id, {"type": "token", **tags, "delta": delta})
+                if stop_when is not None and stop_when(delta):
+                    stopped_early = True
+                    break
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        
+        content = "".join(parts)
+        event = {"type": "stage_completed", **tags, "characters": len(content)}
+        if stopped_early:
+            event["stopped_early"] = True
+        channel.publish(channel_id, event)
+        
+        return content
+    
+    async def _stream_json(
+        self,
+        state: AgentState,
+        messages: List[Any],
+        stage: str,
+        fallback: Dict[str, Any],
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Stream a structured completion and stop as soon as its JSON object closes.
+        
+        Falls back to ``safe_json_parse`` on the full text when no balanced
+        object was found.
+        """
+        extractor = JSONStreamExtractor()
+        content = await self._stream_llm(
+            state,
+            messages,
+            stage,
+            stop_when=lambda delta: extractor.feed(delta) is not None,
+            **kwargs
+        )
+        if extractor.done:
+            return extractor.value
+        return safe_json_parse(content, fallback)
+    
     @abstractmethod
     async def _build_graph(self) -> StateGraph:
         """Build the LangGraph workflow. Must be implemented by subclasses."""
@@ -161,58 +303,124 @@ class BaseAgent(AsyncService[Dict[str, Any]], ABC):
         """Extract output from the final state. Must be implemented by subclasses."""
         pass
     
-    async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Process input data through the agent workflow."""
+    async def process(self, input_data: Dict[str, Any], task_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Process input data through the agent workflow.
+        
+        ``task_id`` identifies the run; streaming events are published on the
+        event channel under this ID. A random ID is used when omitted. If an
+        earlier run of the same task was interrupted, it resumes from the
+        last checkpoint and ``input_data`` is ignored.
+        """
         self.ensure_healthy()
         
+        thread_id = task_id or str(uuid.uuid4())
+        thread_config = {"configurable": {"thread_id": thread_id}}
+        
         try:
-            # Prepare input
-            initial_state = await self._prepare_input(input_data)
-            initial_state["task_id"] = str(uuid.uuid4())
-            initial_state["started_at"] = datetime.utcnow().isoformat()
-            
-            # Run the workflow
-            thread_config = {"configurable": {"thread_id": initial_state["task_id"]}}
-            final_state = await self.graph.ainvoke(initial_state, config=thread_config)
+            if await self._has_unfinished_run(thread_config):
+                # Resume after the last completed node instead of re-running finished stages
+                self.logger.info(f"Resuming task {thread_id} from its last checkpoint")
+                final_state = await self.graph.ainvoke(None, config=thread_config)
+            else:
+                # Prepare input
+                initial_state = await self._prepare_input(input_data)
+                initial_state["task_id"] = thread_id
+                initial_state["started_at"] = datetime.utcnow().isoformat()
+                
+                # Run the workflow
+                final_state = await self.graph.ainvoke(initial_state, config=thread_config)
             
             # Extract output
             result = await self._extract_output(final_state)
-            result["task_id"] = initial_state["task_id"]
+            result["task_id"] = thread_id
             result["completed_at"] = datetime.utcnow().isoformat()
             
+            await self._release_checkpoints(thread_id)
             return result
             
         except Exception as e:
             self.logger.error(f"Agent processing failed: {e}")
+            await self._release_checkpoints(thread_id)
             raise AgentError(f"Agent processing failed: {str(e)}")
     
-    async def stream_process(self, input_data: Dict[str, Any]) -> AsyncGenerator[Dict[str, Any], None]:
-        """Process input data with streaming updates."""
+    async def _has_unfinished_run(self, thread_config: Dict[str, Any]) -> bool:
+        """Whether the thread has a checkpoint with nodes still to run."""
+        if not LANGCHAIN_AVAILABLE:
+            return False
+        snapshot = await self.graph.aget_state(thread_config)
+        return bool(snapshot.next)
+    
+    async def _release_checkpoints(self, thread_id: str) -> None:
+        """Drop a finished run's checkpoints; only interrupted runs keep theirs for resuming."""
+        if LANGCHAIN_AVAILABLE:
+            await self.checkpointer.adelete_thread(thread_id)
+    
+    async def stream_process(
+        self,
+        input_data: Dict[str, Any],
+        task_id: Optional[str] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Process input data with streaming updates.
+        
+        The workflow runs once. Yields ``node_started`` and ``node_completed``
+        (or ``node_failed``) events carrying the node name, its duration and
+        the state keys it changed, then a ``complete`` event built from the
+        final state observed during the same run.
+        """
         self.ensure_healthy()
         
+        thread_id = task_id or str(uuid.uuid4())
+        thread_config = {"configurable": {"thread_id": thread_id}}
+        
         try:
             # Prepare input
             initial_state = await self._prepare_input(input_data)
-            initial_state["task_id"] = str(uuid.uuid4())
+            initial_state["task_id"] = thread_id
             initial_state["started_at"] = datetime.utcnow().isoformat()
             
-            # Stream the workflow
-            thread_config = {"configurable": {"thread_id": initial_state["task_id"]}}
+            # Stream the workflow, tracking node tasks and the state after each step
+            final_state = initial_state
+            started: Dict[str, float] = {}
             
-            async for chunk in self.graph.astream(initial_state, config=thread_config):
-                # Yield progress updates
-                yield {
-                    "type": "progress",
-                    "data": chunk,
+            async for mode, chunk in self.graph.astream(
+                initial_state,
+                config=thread_config,
+                stream_mode=["tasks", "values"]
+            ):
+                if mode == "values":
+                    # Nodes update state in place; keep a snapshot to diff their output against
+                    final_state = dict(chunk)
+                    continue
+                
+                if "result" not in chunk:
+                    started[chunk["id"]] = time.perf_counter()
+                    yield {
+                        "type": "node_started",
+                        "node": chunk["name"],
+                        "timestamp": datetime.utcnow().isoformat()
+                    }
+                    continue
+                
+                duration = time.perf_counter() - started.pop(chunk["id"], time.perf_counter())
+                event = {
+                    "type": "node_failed" if chunk["error"] else "node_completed",
+                    "node": chunk["name"],
+                    "duration_ms": round(duration * 1000, 2),
                     "timestamp": datetime.utcnow().isoformat()
                 }
+                if chunk["error"]:
+                    event["error"] = str(chunk["error"])
+                else:
+                    event["output"] = self._node_output(final_state, chunk["result"])
+                yield event
             
-            # Get final state
-            final_state = await self.graph.ainvoke(initial_state, config=thread_config)
             result = await self._extract_output(final_state)
-            result["task_id"] = initial_state["task_id"]
+            result["task_id"] = thread_id
             result["completed_at"] = datetime.utcnow().isoformat()
             
+            await self._release_checkpoints(thread_id)
             yield {
                 "type": "complete",
                 "data": result,
@@ -221,8 +429,19 @@ class BaseAgent(AsyncService[Dict[str, Any]], ABC):
             
         except Exception as e:
             self.logger.error(f"Agent streaming failed: {e}")
+            # A failed run must not be resumed by the next process() with this task ID
+            await self._release_checkpoints(thread_id)
             yield {
                 "type": "error",
                 "error": str(e),
                 "timestamp": datetime.utcnow().isoformat()
-            }
\ No newline at end of file
+            }
+    
+    @staticmethod
+    def _node_output(state: Dict[str, Any], writes: List[Any]) -> Dict[str, Any]:
+        """State keys a node changed, from its channel writes and the state before it ran."""
+        output = {}
+        for _, value in writes:
+            if isinstance(value, dict):
+                output.update(value)
+        return {key: value for key, value in output.items() if state.get(key) != value}
@@ -2,11 +2,12 @@
 Contract Reviewer Agent for comprehensive contract analysis and review.
 """
 from typing import Dict, Any, List
-from langgraph.graph import StateGraph, END
+from langgraph.graph import StateGraph, START, END
 from langchain.schema import HumanMessage, SystemMessage
 
 from ..base_agent.base_agent import BaseAgent, AgentState
 from src.schemas import AgentType
+from src.utils.executors import run_cpu_bound
 from .tools import (
     DocumentValidationTool,
     RiskAssessmentTool,
@@ -18,6 +19,9 @@ from .nodes import (
     PlanningNode
 )
 
+# Independent analyses of the contract text, run as parallel branches
+REVIEW_BRANCHES = ["validate_structure", "assess_risks", "check_compliance", "analyze_terms"]
+
 
 class ContractReviewerAgent(BaseAgent):
     """Agent for comprehensive contract review and analysis."""
@@ -27,7 +31,7 @@ class ContractReviewerAgent(BaseAgent):
     
     async def _build_graph(self) -> StateGraph:
         """Build the contract review workflow."""
-        workflow = StateGraph(AgentState)
+        workflow = self._create_workflow()
         
         # Add nodes
         workflow.add_node("validate_structure", self._validate_structure)
@@ -37,12 +41,10 @@ class ContractReviewerAgent(BaseAgent):
         workflow.add_node("generate_recommendations", self._generate_recommendations)
         workflow.add_node("create_review_report", self._create_review_report)
         
-        # Add edges
-        workflow.set_entry_point("validate_structure")
-        workflow.add_edge("validate_structure", "assess_risks")
-        workflow.add_edge("assess_risks", "check_compliance")
-        workflow.add_edge("check_compliance", "analyze_terms")
-        workflow.add_edge("analyze_terms", "generate_recommendations")
+        # Fan out to the independent analyses and join before recommendations
+        for branch in REVIEW_BRANCHES:
+            workflow.add_edge(START, branch)
+        workflow.add_edge(REVIEW_BRANCHES, "generate_recommendations")
         workflow.add_edge("generate_recommendations", "create_review_report")
         workflow.add_edge("create_review_report", END)
         
@@ -72,7 +74,7 @@ class ContractReviewerAgent(BaseAgent):
             "recommendations": final_state.get("recommendations", [])
         }
     
-    async def _validate_structure(self, state: AgentState) -> AgentState:
+    async def _validate_structure(self, state: AgentState) -> Dict[str, Any]:
         """Validate contract structure."""
         self.logger.info("Validating contract structure")
         
@@ -85,19 +87,17 @@ class ContractReviewerAgent(BaseAgent):
                 state["contract_type"]
             )
             
-            state["structure_validation"] = validation_result
+            return {"structure_validation": validation_result}
             
         except Exception as e:
             self.logger.error(f"Structure validation failed: {e}")
-            state["structure_validation"] = {
+            return {"structure_validation": {
                 "valid": False,
                 "error": str(e),
                 "issues": ["Validation failed"]
-            }
-        
-        return state
+            }}
     
-    async def _assess_risks(self, state: AgentState) -> AgentState:
+    async def _assess_risks(self, state: AgentState) -> Dict[str, Any]:
         """Assess contract risks."""
         self.logger.info("Assessing contract risks")
         
@@ -110,19 +110,17 @@ class ContractReviewerAgent(BaseAgent):
                 {"contract_type": state["contract_type"]}
             )
             
-            state["risk_assessment"] = risk_result
+            return {"risk_assessment": risk_result}
             
         except Exception as e:
             self.logger.error(f"Risk assessment failed: {e}")
-            state["risk_assessment"] = {
+            return {"risk_assessment": {
                 "total_risks": 0,
                 "risk_level": "unknown",
                 "error": str(e)
-            }
-        
-        return state
+            }}
     
-    async def _check_compliance(self, state: AgentState) -> AgentState:
+    async def _check_compliance(self, state: AgentState) -> Dict[str, Any]:
         """Check contract compliance."""
         self.logger.info("Checking contract compliance")
         
@@ -135,25 +133,25 @@ class ContractReviewerAgent(BaseAgent):
                 state["contract_type"]
             )
             
-            state["compliance_check"] = compliance_result
+            return {"compliance_check": compliance_result}
             
         except Exception as e:
             self.logger.error(f"Compliance check failed: {e}")
-            state["compliance_check"] = {
+            return {"compliance_check": {
                 "status": "unknown",
                 "error": str(e)
-            }
-        
-        return state
+            }}
     
-    async def _analyze_terms(self, state: AgentState) -> AgentState:
+    async def _analyze_terms(self, state: AgentState) -> Dict[str, Any]:
         """Analyze contract terms and conditions."""
         self.logger.info("Analyzing contract terms")
         
-        content = state["contract_content"]
-        
-        # Extract and analyze key terms
-        terms_analysis = {
+        terms_analysis = await run_cpu_bound(self._analyze_terms_sync, state["contract_content"])
+        return {"terms_analysis": terms_analysis}
+    
+    def _analyze_terms_sync(self, content: str) -> Dict[str, Any]:
+        """Extract and analyze key terms; runs off the event loop for large contracts."""
+        return {
             "key_clauses": self._extract_key_clauses(content),
             "termination_terms": self._analyze_termination(content),
             "payment_terms": self._analyze_payment_terms(content),
@@ -163,9 +161,6 @@ class ContractReviewerAgent(BaseAgent):
             "intellectual_property": self._analyze_ip_clauses(content),
             "confidentiality": self._analyze_confidentiality(content)
         }
-        
-        state["terms_analysis"] = terms_analysis
-        return state
     
     async def _generate_recommendations(self, state: AgentState) -> AgentState:
         """Generate review recommendations."""
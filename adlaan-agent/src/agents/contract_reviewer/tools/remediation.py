@@ -5,6 +5,7 @@ import re
 from typing import Dict, Any, List, Tuple
 from datetime import datetime
 from src.core.logging import get_logger
+from src.core.metrics import track_tool
 
 logger = get_logger(__name__)
 
@@ -16,6 +17,7 @@ class ContractRemediationTool:
         self.jurisdiction = jurisdiction
         self.logger = logger
     
+    @track_tool("remediate_contract")
     async def remediate_contract(self, content: str, risk_analysis: Dict[str, Any]) -> Dict[str, Any]:
         """Automatically remediate identified risks in a contract."""
         self.logger.info("Starting contract remediation process")
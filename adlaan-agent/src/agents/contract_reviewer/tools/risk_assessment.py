@@ -5,6 +5,8 @@ from typing import Dict, Any, List
 import re
 from datetime import datetime
 from src.core.logging import get_logger
+from src.core.metrics import track_tool
+from src.utils.executors import run_cpu_bound
 
 logger = get_logger(__name__)
 
@@ -15,8 +17,13 @@ class RiskAssessmentTool:
     def __init__(self):
         self.logger = logger
     
+    @track_tool("assess_legal_risks")
     async def assess_legal_risks(self, content: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Assess legal risks in document content."""
+        return await run_cpu_bound(self._assess_legal_risks, content, context)
+    
+    def _assess_legal_risks(self, content: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Risk pattern scan; runs where the executor strategy places it."""
         self.logger.info("Assessing legal risks")
         
         risks = []
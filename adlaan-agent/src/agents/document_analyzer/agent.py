@@ -25,7 +25,7 @@ class DocumentAnalyzerAgent(BaseAgent):
     
     async def _build_graph(self) -> StateGraph:
         """Build the document analysis workflow."""
-        workflow = StateGraph(AgentState)
+        workflow = self._create_workflow()
         
         # Add nodes
         workflow.add_node("parse_document", self._parse_document)
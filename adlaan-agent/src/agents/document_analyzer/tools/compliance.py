@@ -5,6 +5,8 @@ from typing import Dict, Any, List
 import re
 from datetime import datetime
 from src.core.logging import get_logger
+from src.core.metrics import track_tool
+from src.utils.executors import run_cpu_bound
 
 logger = get_logger(__name__)
 
@@ -16,8 +18,13 @@ class ComplianceTool:
         self.jurisdiction = jurisdiction
         self.logger = logger
     
+    @track_tool("check_compliance")
     async def check_compliance(self, content: str, document_type: str) -> Dict[str, Any]:
         """Check document compliance with legal requirements."""
+        return await run_cpu_bound(self._check_compliance, content, document_type)
+    
+    def _check_compliance(self, content: str, document_type: str) -> Dict[str, Any]:
+        """Compliance rule checks; runs where the executor strategy places it."""
         self.logger.info(f"Checking compliance for {document_type} in {self.jurisdiction}")
         
         compliance_checks = []
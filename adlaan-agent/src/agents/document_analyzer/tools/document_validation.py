@@ -3,6 +3,8 @@ Document Validation Tool for AI agents.
 """
 from typing import Dict, Any, List
 from src.core.logging import get_logger
+from src.core.metrics import track_tool
+from src.utils.executors import run_cpu_bound
 
 logger = get_logger(__name__)
 
@@ -13,8 +15,13 @@ class DocumentValidationTool:
     def __init__(self):
         self.logger = logger
     
+    @track_tool("validate_legal_structure")
     async def validate_legal_structure(self, content: str, document_type: str) -> Dict[str, Any]:
         """Validate the legal structure of a document."""
+        return await run_cpu_bound(self._validate_legal_structure, content, document_type)
+    
+    def _validate_legal_structure(self, content: str, document_type: str) -> Dict[str, Any]:
+        """Validation rules; runs where the executor strategy places it."""
         self.logger.info(f"Validating legal structure for {document_type}")
         
         validation_result = {
@@ -8,6 +8,7 @@ from langchain.schema import HumanMessage, SystemMessage
 from ..base_agent.base_agent import BaseAgent, AgentState
 from src.schemas import AgentType
 from src.utils.agent_helpers import safe_json_parse
+from src.utils.executors import run_cpu_bound
 from .tools import (
     DocumentValidationTool,
     ComplianceTool
@@ -25,7 +26,7 @@ class DocumentClassifierAgent(BaseAgent):
     
     async def _build_graph(self) -> StateGraph:
         """Build the document classification workflow."""
-        workflow = StateGraph(AgentState)
+        workflow = self._create_workflow()
         
         # Add nodes
         workflow.add_node("extract_features", self._extract_features)
@@ -66,11 +67,19 @@ class DocumentClassifierAgent(BaseAgent):
         """Extract features from the document."""
         self.logger.info("Extracting document features")
         
-        content = state["document_content"]
-        title = state["document_title"]
+        features = await run_cpu_bound(
+            DocumentClassifierAgent._compute_features,
+            state["document_content"],
+            state["document_title"]
+        )
         
-        # Simple feature extraction
-        features = {
+        state["features"] = features
+        return state
+    
+    @staticmethod
+    def _compute_features(content: str, title: str) -> Dict[str, Any]:
+        """Simple feature extraction; static so it can run in a pool worker."""
+        return {
             "length": len(content),
             "word_count": len(content.split()),
             "has_title": bool(title),
@@ -81,11 +90,8 @@ class DocumentClassifierAgent(BaseAgent):
             "contains_signatures": "signature" in content.lower(),
             "contains_dates": any(word in content.lower() for word in ["date", "year", "month"]),
             "contains_monetary": any(symbol in content for symbol in ["$", "USD", "JOD", "payment"]),
-            "legal_language_density": self._calculate_legal_density(content)
+            "legal_language_density": DocumentClassifierAgent._calculate_legal_density(content)
         }
-        
-        state["features"] = features
-        return state
     
     async def _classify_document(self, state: AgentState) -> AgentState:
         """Classify the document type."""
@@ -204,7 +210,8 @@ class DocumentClassifierAgent(BaseAgent):
         state["final_result"] = final_result
         return state
     
-    def _calculate_legal_density(self, content: str) -> float:
+    @staticmethod
+    def _calculate_legal_density(content: str) -> float:
         """Calculate the density of legal language in the document."""
         legal_terms = [
             "whereas", "therefore", "hereby", "herein", "hereafter", "heretofore",
@@ -1,26 +1,34 @@
 """
 Legal Document Generator Agent for generating legal documents.
 """
-from typing import Dict, Any
-import json
+import asyncio
+import re
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 from langgraph.graph import StateGraph, END
 from langchain.schema import HumanMessage, SystemMessage
 
 from ..base_agent.base_agent import BaseAgent, AgentState
-from src.schemas import AgentType
+from src.schemas import AgentType, GenerationMode, ReviewPolicy
+from src.core.exceptions import ValidationError
 from src.utils.agent_helpers import (
     safe_json_parse,
     clean_document_content,
     validate_document_structure,
-    create_task_metadata,
-    format_legal_prompt
+    create_task_metadata
+)
+from src.utils.prompt_builder import (
+    PromptBuilder,
+    PromptBudgetExceeded,
+    compact_json,
+    count_tokens
 )
 from .tools import (
     DocumentFormattingTool,
     LegalResearchTool,
     DocumentValidationTool
 )
+from .template_engine import get_template_engine
 from .nodes import (
     ThinkingNode,
     PlanningNode,
@@ -28,28 +36,57 @@ from .nodes import (
 )
 
 
+# Review policy used when a request does not choose one
+DEFAULT_REVIEW_POLICIES = {
+    GenerationMode.STANDARD: ReviewPolicy.ALWAYS,
+    GenerationMode.FAST: ReviewPolicy.ON_VALIDATION_FAILURE,
+    GenerationMode.SECTIONED: ReviewPolicy.ALWAYS,
+    GenerationMode.TEMPLATE: ReviewPolicy.NEVER
+}
+
+# Separates the requirements header from the document in single-pass output
+DOCUMENT_MARKER = "=== DOCUMENT ==="
+
+
 class LegalDocumentGeneratorAgent(BaseAgent):
     """Agent for generating legal documents."""
     
     def __init__(self):
         super().__init__(AgentType.LEGAL_DOCUMENT_GENERATOR)
+        self.template_engine = get_template_engine()
     
     async def _build_graph(self) -> StateGraph:
         """Build the document generation workflow."""
-        workflow = StateGraph(AgentState)
+        workflow = self._create_workflow()
         
-        # Add nodes
-        workflow.add_node("analyze_requirements", self._analyze_requirements)
+        # Add nodes; progress weights follow the LLM calls and a task takes one generation path
+        workflow.add_node("analyze_requirements", self._analyze_requirements, weight=2)
         workflow.add_node("research_legal_context", self._research_legal_context)
-        workflow.add_node("generate_draft", self._generate_draft)
-        workflow.add_node("review_and_refine", self._review_and_refine)
+        workflow.add_node("generate_draft", self._generate_draft, weight=6, progress_group="generate")
+        workflow.add_node("review_and_refine", self._review_and_refine, weight=4)
         workflow.add_node("finalize_document", self._finalize_document)
+        workflow.add_node("generate_single_pass", self._generate_single_pass, weight=6, progress_group="generate")
+        workflow.add_node("render_template", self._render_template, progress_group="generate")
+        workflow.add_node("draft_sections", self._draft_sections, weight=6, progress_group="generate")
         
         # Add edges
-        workflow.set_entry_point("analyze_requirements")
+        workflow.set_conditional_entry_point(self._route_entry, {
+            GenerationMode.STANDARD.value: "analyze_requirements",
+            GenerationMode.FAST.value: "research_legal_context",
+            GenerationMode.SECTIONED.value: "analyze_requirements",
+            GenerationMode.TEMPLATE.value: "render_template"
+        })
         workflow.add_edge("analyze_requirements", "research_legal_context")
-        workflow.add_edge("research_legal_context", "generate_draft")
-        workflow.add_edge("generate_draft", "review_and_refine")
+        workflow.add_conditional_edges("research_legal_context", self._route_entry, {
+            GenerationMode.STANDARD.value: "generate_draft",
+            GenerationMode.FAST.value: "generate_single_pass",
+            GenerationMode.SECTIONED.value: "draft_sections"
+        })
+        review_routes = {"review": "review_and_refine", "finalize": "finalize_document"}
+        workflow.add_conditional_edges("generate_draft", self._route_review, review_routes)
+        workflow.add_conditional_edges("generate_single_pass", self._route_review, review_routes)
+        workflow.add_conditional_edges("render_template", self._route_review, review_routes)
+        workflow.add_conditional_edges("draft_sections", self._route_section_review, review_routes)
         workflow.add_edge("review_and_refine", "finalize_document")
         workflow.add_edge("finalize_document", END)
         
@@ -57,12 +94,52 @@ class LegalDocumentGeneratorAgent(BaseAgent):
     
     async def _prepare_input(self, input_data: Dict[str, Any]) -> AgentState:
         """Prepare input for document generation."""
+        parameters = input_data.get("parameters", {})
+        jurisdiction = input_data.get("jurisdiction", "jordan")
+        language = input_data.get("language", "en")
+        
+        try:
+            generation_mode = GenerationMode(
+                input_data.get("generation_mode") or self.settings.default_generation_mode
+            )
+        except ValueError as e:
+            raise ValidationError(f"Invalid generation options: {e}")
+        
+        # Fully specified standard documents are rendered from templates
+        if generation_mode in (GenerationMode.AUTO, GenerationMode.TEMPLATE):
+            document_type = input_data.get("document_type")
+            if self.template_engine.match(document_type, jurisdiction, language, parameters):
+                generation_mode = GenerationMode.TEMPLATE
+            elif generation_mode == GenerationMode.TEMPLATE:
+                template = self.template_engine.find(document_type, jurisdiction, language)
+                raise ValidationError(
+                    "Template generation is not possible for this request",
+                    details={
+                        "template_found": template is not None,
+                        "missing_parameters": template.missing(parameters) if template else []
+                    }
+                )
+            else:
+                generation_mode = GenerationMode.STANDARD
+        
+        try:
+            review_policy = ReviewPolicy(
+                input_data.get("review") or DEFAULT_REVIEW_POLICIES[generation_mode]
+            )
+        except ValueError as e:
+            raise ValidationError(f"Invalid generation options: {e}")
+        
         return AgentState({
             "document_type": input_data.get("document_type"),
             "title": input_data.get("title"),
-            "parameters": input_data.get("parameters", {}),
-            "jurisdiction": input_data.get("jurisdiction", "jordan"),
+            "parameters": parameters,
+            "jurisdiction": jurisdiction,
+            "language": language,
+            "generation_mode": generation_mode.value,
+            "review_policy": review_policy.value,
             "requirements": [],
+            "outline": [],
+            "definitions": {},
             "legal_context": {},
             "draft_content": "",
             "reviewed_content": "",
@@ -86,6 +163,30 @@ class LegalDocumentGeneratorAgent(BaseAgent):
             }
         }
     
+    def _route_entry(self, state: AgentState) -> str:
+        """Route by generation mode."""
+        return state.get("generation_mode", GenerationMode.STANDARD.value)
+    
+    def _needs_review(self, policy: str, content: str) -> bool:
+        """Apply a review policy to a draft or a drafted section."""
+        if policy == ReviewPolicy.NEVER.value:
+            return False
+        if policy == ReviewPolicy.ON_VALIDATION_FAILURE.value:
+            validation = validate_document_structure(clean_document_content(content))
+            if validation["valid"]:
+                return False
+            self.logger.info(f"Draft failed local validation, reviewing: {validation['issues']}")
+        return True
+    
+    def _route_review(self, state: AgentState) -> str:
+        """Decide whether the draft needs an LLM review pass."""
+        policy = state.get("review_policy", ReviewPolicy.ALWAYS.value)
+        return "review" if self._needs_review(policy, state["draft_content"]) else "finalize"
+    
+    def _route_section_review(self, state: AgentState) -> str:
+        """Sections are reviewed as they are drafted; only a whole-document fallback is reviewed here."""
+        return "finalize" if state.get("sections") else self._route_review(state)
+    
     async def _analyze_requirements(self, state: AgentState) -> AgentState:
         """Analyze document requirements."""
         self.logger.info("Analyzing document requirements")
@@ -97,40 +198,53 @@ class LegalDocumentGeneratorAgent(BaseAgent):
             "jurisdiction": state['jurisdiction']
         }
         
-        prompt = format_legal_prompt(
-            f"Analyze the requirements for generating a {state['document_type']} document",
-            context,
-            "json"
-        )
-        
-        prompt += """
-        
-        Provide a detailed analysis with this exact JSON structure:
-        {
-            "requirements": ["requirement1", "requirement2", ...],
-            "analysis": {
-                "essential_elements": ["element1", "element2"],
-                "specific_clauses": ["clause1", "clause2"],
-                "compliance_requirements": ["req1", "req2"],
-                "risk_considerations": ["risk1", "risk2"]
-            }
-        }
-        """
+        system_prompt = "You are a legal document analysis expert."
+        sectioned = state.get("generation_mode") == GenerationMode.SECTIONED.value
         
         try:
-            response = await self.llm.ainvoke([
-                SystemMessage(content="You are a legal document analysis expert."),
-                HumanMessage(content=prompt)
-            ])
+            builder = PromptBuilder("analyze_outline" if sectioned else "analyze_requirements")
+            builder.reserve(count_tokens(system_prompt))
+            builder.add_text(
+                "task",
+                f"Task: Analyze the requirements for generating a {state['document_type']} document",
+                truncatable=False
+            )
+            builder.add_json("context", context, priority=1)
+            builder.add_text(
+                "output_format",
+                'Provide a detailed analysis with this exact JSON structure: '
+                '{"requirements":["requirement1",...],"analysis":{"essential_elements":[...],'
+                '"specific_clauses":[...],"compliance_requirements":[...],"risk_considerations":[...]}}',
+                truncatable=False
+            )
+            if sectioned:
+                builder.add_text(
+                    "outline_format",
+                    'Also include "outline":[{"heading":"...","summary":"..."},...] listing every '
+                    'section of the document in order, and "definitions":{"Term":"meaning",...} '
+                    'with the defined terms all sections must use consistently.',
+                    truncatable=False
+                )
             
-            # Parse response safely
-            analysis = safe_json_parse(response.content, {
-                "requirements": ["Basic legal structure", "Standard clauses"],
-                "analysis": {"status": "fallback_used"}
-            })
+            # Stop streaming as soon as the analysis object closes
+            analysis = await self._stream_json(
+                state,
+                [SystemMessage(content=system_prompt), HumanMessage(content=builder.build())],
+                builder.stage,
+                {
+                    "requirements": ["Basic legal structure", "Standard clauses"],
+                    "analysis": {"status": "fallback_used"}
+                },
+                max_tokens=builder.max_output_tokens
+            )
             
             state["requirements"] = analysis.get("requirements", [])
             state["analysis"] = analysis.get("analysis", {})
+            state["outline"] = [
+                section for section in analysis.get("outline", [])
+                if isinstance(section, dict) and section.get("heading")
+            ]
+            state["definitions"] = analysis.get("definitions", {})
             
         except Exception as e:
             self.logger.error(f"Requirements analysis failed: {e}")
@@ -157,61 +271,277 @@ class LegalDocumentGeneratorAgent(BaseAgent):
         """Generate document draft."""
         self.logger.info("Generating document draft")
         
-        prompt = f"""
-        Generate a comprehensive {state['document_type']} document.
+        system_prompt = "You are an expert legal document drafter."
         
-        Requirements: {json.dumps(state['requirements'])}
-        Parameters: {json.dumps(state['parameters'])}
-        Legal Context: {json.dumps(state['legal_context'])}
+        try:
+            builder = PromptBuilder("generate_draft").reserve(count_tokens(system_prompt))
+            builder.add_text(
+                "task",
+                f"Generate a comprehensive {state['document_type']} document.",
+                truncatable=False
+            )
+            builder.add_text("parameters", f"Parameters: {compact_json(state['parameters'])}", truncatable=False)
+            builder.add_json("requirements", {"requirements": state["requirements"]}, priority=1, min_tokens=50)
+            builder.add_json("legal_context", {"legal_context": state["legal_context"]}, priority=2)
+            builder.add_text("instructions", f"""Create a professional, legally sound document with:
+1. Proper legal structure
+2. All required clauses
+3. Clear terms and conditions
+4. Compliance with {state['jurisdiction']} law
+
+Output the complete document text.""", truncatable=False)
+            
+            state["draft_content"] = await self._stream_llm(state, [
+                SystemMessage(content=system_prompt),
+                HumanMessage(content=builder.build())
+            ], stage="generate_draft", max_tokens=builder.max_output_tokens)
+            
+        except Exception as e:
+            self.logger.error(f"Draft generation failed: {e}")
+            state["draft_content"] = f"Draft generation failed: {str(e)}"
         
-        Create a professional, legally sound document with:
-        1. Proper legal structure
-        2. All required clauses
-        3. Clear terms and conditions
-        4. Compliance with {state['jurisdiction']} law
+        return state
+    
+    async def _render_template(self, state: AgentState) -> AgentState:
+        """Render the document from its precompiled template without an LLM call."""
+        self.logger.info("Rendering document from template")
         
-        Output the complete document text.
-        """
+        template = self.template_engine.find(state["document_type"], state["jurisdiction"], state["language"])
+        state["draft_content"] = self.template_engine.render(
+            template,
+            state["parameters"],
+            title=state["title"],
+            jurisdiction=state["jurisdiction"]
+        )
+        state["metadata"] = {"template": "/".join(template.key)}
+        
+        return state
+    
+    async def _generate_single_pass(self, state: AgentState) -> AgentState:
+        """Analyze requirements and draft the document in one LLM call."""
+        self.logger.info("Generating document in a single pass")
+        
+        system_prompt = "You are an expert legal document drafter."
         
         try:
-            response = await self.llm.ainvoke([
-                SystemMessage(content="You are an expert legal document drafter."),
-                HumanMessage(content=prompt)
-            ])
+            builder = PromptBuilder("generate_single_pass").reserve(count_tokens(system_prompt))
+            builder.add_text(
+                "task",
+                f"Generate a comprehensive {state['document_type']} document titled {state['title']!r}.",
+                truncatable=False
+            )
+            builder.add_text("parameters", f"Parameters: {compact_json(state['parameters'])}", truncatable=False)
+            builder.add_json("legal_context", {"legal_context": state["legal_context"]}, priority=1)
+            builder.add_text("instructions", f"""First identify the document's legal requirements, then draft it with proper legal structure, all required clauses, clear terms and conditions, and compliance with {state['jurisdiction']} law.
+
+Respond in exactly this format:
+{{"requirements":["requirement1","requirement2",...]}}
+{DOCUMENT_MARKER}
+<the complete document text>""", truncatable=False)
+            
+            output = await self._stream_llm(state, [
+                SystemMessage(content=system_prompt),
+                HumanMessage(content=builder.build())
+            ], stage="generate_single_pass", max_tokens=builder.max_output_tokens)
             
-            state["draft_content"] = response.content
+            header, marker, document = output.partition(DOCUMENT_MARKER)
+            if not marker:
+                # The model skipped the header; treat everything as the document
+                header, document = "", output
+            
+            analysis = safe_json_parse(header, {"requirements": []})
+            state["requirements"] = analysis.get("requirements", [])
+            state["draft_content"] = document.strip()
             
         except Exception as e:
-            self.logger.error(f"Draft generation failed: {e}")
+            self.logger.error(f"Single-pass generation failed: {e}")
             state["draft_content"] = f"Draft generation failed: {str(e)}"
         
         return state
     
-    async def _review_and_refine(self, state: AgentState) -> AgentState:
-        """Review and refine the document."""
-        self.logger.info("Reviewing and refining document")
+    async def _draft_sections(self, state: AgentState) -> AgentState:
+        """
+        Draft the outline's sections concurrently and stitch them in order.
         
-        prompt = f"""
-        Review and refine this legal document draft:
+        Each section goes to its reviewer as soon as its draft completes, so
+        reviewing early sections overlaps drafting of later ones.
+        """
+        outline = state.get("outline", [])
+        if len(outline) < 2:
+            self.logger.info("No section outline available, drafting the document in one pass")
+            return await self._generate_draft(state)
         
-        {state['draft_content']}
+        self.logger.info(f"Drafting {len(outline)} sections concurrently")
+        shared_context = self._shared_section_context(state)
         
-        Check for:
-        1. Legal accuracy
-        2. Completeness
-        3. Clarity
-        4. Compliance
+        # The LLM gateway caps how many of these run at once
+        sections = await asyncio.gather(*(
+            self._draft_and_review_section(state, shared_context, index, section)
+            for index, section in enumerate(outline, 1)
+        ))
         
-        Provide the refined version.
-        """
+        state["sections"] = sections
+        state["draft_content"] = self._stitch_sections(state["title"], sections, "content")
+        if any(section["reviewed"] for section in sections):
+            state["reviewed_content"] = self._stitch_sections(state["title"], sections, "reviewed_content")
+        
+        return state
+    
+    async def _draft_and_review_section(
+        self,
+        state: AgentState,
+        shared_context: str,
+        index: int,
+        section: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Draft one section, then review it if the review policy asks for it."""
+        drafted = await self._draft_section(state, shared_context, index, section)
+        drafted["reviewed_content"] = drafted["content"]
+        drafted["reviewed"] = False
+        
+        policy = state.get("review_policy", ReviewPolicy.ALWAYS.value)
+        if drafted["failed"] or not self._needs_review(policy, drafted["content"]):
+            return drafted
+        
+        reviewed = await self._review_section(state, shared_context, drafted)
+        if reviewed:
+            drafted["reviewed_content"] = reviewed
+            drafted["reviewed"] = True
+        
+        return drafted
+    
+    def _shared_section_context(self, state: AgentState) -> str:
+        """Context sent with every section so the drafts stay consistent."""
+        definitions = "\n".join(
+            f'- "{term}": {meaning}' for term, meaning in state.get("definitions", {}).items()
+        ) or "- None"
+        outline = "\n".join(
+            f"{index}. {section['heading']}" for index, section in enumerate(state["outline"], 1)
+        )
+        
+        return f"""You are drafting one section of a {state['document_type']} titled {state['title']!r}, governed by {state['jurisdiction']} law.
+
+Parameters: {compact_json(state['parameters'])}
+
+DEFINITIONS (use these terms exactly as defined; do not redefine them):
+{definitions}
+
+DOCUMENT OUTLINE:
+{outline}"""
+    
+    async def _draft_section(
+        self,
+        state: AgentState,
+        shared_context: str,
+        index: int,
+        section: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Draft a single section of the outline."""
+        system_prompt = "You are an expert legal document drafter."
+        heading = section["heading"]
+        
+        try:
+            # The shared context comes first so every section request has the same prefix
+            builder = PromptBuilder("draft_section").reserve(count_tokens(system_prompt))
+            builder.add_text("shared_context", shared_context, truncatable=False)
+            builder.add_json("legal_context", {"legal_context": state["legal_context"]}, priority=1)
+            builder.add_text(
+                "section",
+                f"Write section {index}: {heading}. {section.get('summary', '')}\n"
+                "Output only the body text of this section, without its heading or any other section.",
+                truncatable=False
+            )
+            
+            content = await self._stream_llm(state, [
+                SystemMessage(content=system_prompt),
+                HumanMessage(content=builder.build())
+            ], stage="generate_draft", section=index, max_tokens=builder.max_output_tokens)
+            
+        except Exception as e:
+            self.logger.error(f"Drafting section {index} ({heading}) failed: {e}")
+            return {
+                "index": index,
+                "heading": heading,
+                "content": f"[Section drafting failed: {str(e)}]",
+                "failed": True
+            }
+        
+        return {"index": index, "heading": heading, "content": content.strip(), "failed": False}
+    
+    async def _review_section(self, state: AgentState, shared_context: str, section: Dict[str, Any]) -> Optional[str]:
+        """Review one drafted section; returns None to keep the draft."""
+        system_prompt = "You are a legal document reviewer and editor."
+        index = section["index"]
+        
+        try:
+            builder = PromptBuilder("review_section").reserve(count_tokens(system_prompt))
+            builder.add_text("shared_context", shared_context, truncatable=False)
+            builder.add_text(
+                "task",
+                f"Review and refine the draft of section {index}: {section['heading']}. "
+                "Check legal accuracy, completeness, clarity, compliance and consistent use of the definitions. "
+                "Output only the refined body text of this section.",
+                truncatable=False
+            )
+            builder.add_text("draft", section["content"], truncatable=False)
+            
+            reviewed = await self._stream_llm(state, [
+                SystemMessage(content=system_prompt),
+                HumanMessage(content=builder.build())
+            ], stage="review_and_refine", section=index, max_tokens=builder.max_output_tokens)
+            return reviewed.strip() or None
+            
+        except PromptBudgetExceeded as e:
+            self.logger.warning(f"Skipping review of section {index}, it does not fit the review budget: {e}")
+        except Exception as e:
+            self.logger.error(f"Reviewing section {index} failed: {e}")
+        
+        return None
+    
+    def _stitch_sections(self, title: str, sections: List[Dict[str, Any]], field: str) -> str:
+        """Join sections in outline order under numbered headings."""
+        parts = [title.upper()] if title else []
+        for section in sorted(sections, key=lambda section: section["index"]):
+            heading = re.sub(r"^\s*(section\s+)?\d+[.):]?\s*", "", section["heading"], flags=re.IGNORECASE)
+            parts.append(f"{section['index']}. {heading.upper()}\n{section[field]}")
+        return "\n\n".join(parts)
+    
+    async def _review_and_refine(self, state: AgentState) -> AgentState:
+        """Review and refine the document."""
+        self.logger.info("Reviewing and refining document")
+        
+        system_prompt = "You are a legal document reviewer and editor."
         
         try:
-            response = await self.llm.ainvoke([
-                SystemMessage(content="You are a legal document reviewer and editor."),
+            # The draft is never truncated: reviewing part of it would drop the rest
+            builder = PromptBuilder("review_and_refine").reserve(count_tokens(system_prompt))
+            builder.add_text("task", "Review and refine this legal document draft:", truncatable=False)
+            builder.add_text("draft", state["draft_content"], truncatable=False)
+            builder.add_text("instructions", """Check for:
+1. Legal accuracy
+2. Completeness
+3. Clarity
+4. Compliance
+
+Provide the refined version.""", truncatable=False)
+            prompt = builder.build()
+            
+            # The refined document must fit in the output allowance as well
+            if count_tokens(state["draft_content"]) > builder.max_output_tokens:
+                raise PromptBudgetExceeded(
+                    "review_and_refine",
+                    count_tokens(state["draft_content"]),
+                    builder.max_output_tokens
+                )
+            
+            state["reviewed_content"] = await self._stream_llm(state, [
+                SystemMessage(content=system_prompt),
                 HumanMessage(content=prompt)
-            ])
+            ], stage="review_and_refine", max_tokens=builder.max_output_tokens)
             
-            state["reviewed_content"] = response.content
+        except PromptBudgetExceeded as e:
+            self.logger.warning(f"Skipping review, draft does not fit the review budget: {e}")
+            state["reviewed_content"] = state["draft_content"]
             
         except Exception as e:
             self.logger.error(f"Document review failed: {e}")
@@ -223,8 +553,11 @@ class LegalDocumentGeneratorAgent(BaseAgent):
         """Finalize the document."""
         self.logger.info("Finalizing document")
         
-        # Clean and validate the document content
-        cleaned_content = clean_document_content(state["reviewed_content"])
+        # Clean and validate the document content; unreviewed drafts are used as-is
+        reviewed = bool(state.get("reviewed_content"))
+        cleaned_content = clean_document_content(
+            state["reviewed_content"] if reviewed else state["draft_content"]
+        )
         validation_result = validate_document_structure(cleaned_content)
         
         state["final_document"] = cleaned_content
@@ -233,7 +566,10 @@ class LegalDocumentGeneratorAgent(BaseAgent):
             document_type=state["document_type"],
             jurisdiction=state["jurisdiction"],
             validation=validation_result,
-            word_count=len(cleaned_content.split()) if cleaned_content else 0
+            word_count=len(cleaned_content.split()) if cleaned_content else 0,
+            generation_mode=state.get("generation_mode"),
+            reviewed=reviewed,
+            **state.get("metadata", {})
         )
         
         # Log validation results
@@ -5,6 +5,7 @@ from typing import Dict, Any
 from datetime import datetime
 from src.core.logging import get_logger
 from ..tools import DocumentFormattingTool
+from ..template_engine import get_template_engine
 from src.utils.agent_helpers import validate_document_structure
 
 logger = get_logger(__name__)
@@ -52,59 +53,22 @@ class DocumentGeneratorNode:
         return state
     
     async def _generate_content(self, requirements: Dict[str, Any], research: Dict[str, Any], document_type: str) -> str:
-        """Generate document content based on requirements and research."""
-        # Create structured content based on document type
-        content_templates = {
-            "contract": self._generate_contract_content,
-            "agreement": self._generate_agreement_content,
-            "legal_notice": self._generate_legal_notice_content,
-            "memorandum": self._generate_memorandum_content
-        }
+        """Generate document content from the precompiled templates."""
+        engine = get_template_engine()
+        jurisdiction = requirements.get("jurisdiction", "jordan")
+        template = engine.find(document_type, jurisdiction) or engine.find("contract", jurisdiction)
         
-        generator = content_templates.get(document_type, self._generate_contract_content)
-        return await generator(requirements, research)
-    
-    async def _generate_contract_content(self, requirements: Dict[str, Any], research: Dict[str, Any]) -> str:
-        """Generate contract content."""
         parties = requirements.get("parties", ["Party A", "Party B"])
         terms = requirements.get("terms", {})
+        parameters = {
+            "party_a": parties[0],
+            "party_b": parties[1],
+            "purpose": terms.get("purpose", "General agreement between parties"),
+            "party_a_obligations": terms.get("party1_obligations", "Fulfill contractual obligations"),
+            "party_b_obligations": terms.get("party2_obligations", "Fulfill contractual obligations"),
+            **terms,
+            **requirements.get("parameters", {})
+        }
         
-        content = f"""
-CONTRACT AGREEMENT
-
-This Contract Agreement is entered into between {parties[0]} and {parties[1]}.
-
-TERMS AND CONDITIONS:
-
-1. Purpose: {terms.get('purpose', 'General agreement between parties')}
-
-2. Duration: {terms.get('duration', 'To be determined')}
-
-3. Obligations:
-   - {parties[0]}: {terms.get('party1_obligations', 'Fulfill contractual obligations')}
-   - {parties[1]}: {terms.get('party2_obligations', 'Fulfill contractual obligations')}
-
-4. Payment Terms: {terms.get('payment_terms', 'As agreed between parties')}
-
-5. Termination: {terms.get('termination', 'Either party may terminate with written notice')}
-
-6. Governing Law: This contract shall be governed by the laws of {requirements.get('jurisdiction', 'Jordan')}.
-
-7. Signatures:
-   {parties[0]}: _____________________ Date: _______
-   {parties[1]}: _____________________ Date: _______
-"""
-        
-        return content.strip()
-    
-    async def _generate_agreement_content(self, requirements: Dict[str, Any], research: Dict[str, Any]) -> str:
-        """Generate agreement content."""
-        return "AGREEMENT\n\nThis agreement outlines the terms between the parties..."
-    
-    async def _generate_legal_notice_content(self, requirements: Dict[str, Any], research: Dict[str, Any]) -> str:
-        """Generate legal notice content."""
-        return "LEGAL NOTICE\n\nThis notice serves to inform..."
-    
-    async def _generate_memorandum_content(self, requirements: Dict[str, Any], research: Dict[str, Any]) -> str:
-        """Generate memorandum content."""
-        return "MEMORANDUM\n\nTo: Recipient\nFrom: Sender\nSubject: Legal Matter..."
\ No newline at end of file
+        # Fields the requirements do not cover are left as [placeholders]
+        return engine.render(template, parameters, fill_missing=True, jurisdiction=jurisdiction)
@@ -0,0 +1,146 @@
+"""
+Template engine for standard legal documents.
+Jinja2 templates are compiled once at startup and looked up by
+(document_type, jurisdiction, language), so fully specified requests render
+in milliseconds without an LLM call.
+"""
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, Template
+
+from src.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Templates live in <document_type>/<jurisdiction>.<language>.j2
+TEMPLATES_DIR = Path(__file__).parent / "document_templates"
+
+# Jurisdiction used when no jurisdiction-specific template exists
+DEFAULT_JURISDICTION = "default"
+
+# Alternative document type names accepted by the API
+DOCUMENT_TYPE_ALIASES = {
+    "non_disclosure_agreement": "nda",
+    "notice": "legal_notice",
+    "memo": "memorandum",
+    "employment_agreement": "employment_contract",
+}
+
+# Templates declare required parameters in a leading comment: {# required: a, b #}
+REQUIRED_PATTERN = re.compile(r"\{#-?\s*required:\s*(.*?)\s*-?#\}", re.DOTALL)
+
+TemplateKey = Tuple[str, str, str]
+
+
+def normalize_document_type(document_type: Optional[str]) -> str:
+    """Normalize a document type name and resolve aliases."""
+    normalized = (document_type or "").strip().lower().replace("-", "_").replace(" ", "_")
+    return DOCUMENT_TYPE_ALIASES.get(normalized, normalized)
+
+
+@dataclass
+class CompiledTemplate:
+    """A compiled document template and the parameters it needs."""
+    key: TemplateKey
+    template: Template
+    required: List[str] = field(default_factory=list)
+    
+    def missing(self, parameters: Dict[str, Any]) -> List[str]:
+        """Required parameters that are absent or empty."""
+        return [name for name in self.required if parameters.get(name) in (None, "", [], {})]
+
+
+class TemplateEngine:
+    """Precompiled document templates keyed by (document_type, jurisdiction, language)."""
+    
+    def __init__(self, templates_dir: Path = TEMPLATES_DIR):
+        self.templates_dir = Path(templates_dir)
+        self.environment = Environment(
+            loader=FileSystemLoader(str(self.templates_dir)),
+            undefined=StrictUndefined,
+            trim_blocks=True,
+            lstrip_blocks=True,
+            keep_trailing_newline=False,
+            auto_reload=False
+        )
+        self._templates: Dict[TemplateKey, CompiledTemplate] = {}
+        self._compile_all()
+    
+    def _compile_all(self) -> None:
+        """Compile every template file up front."""
+        for path in sorted(self.templates_dir.glob("*/*.j2")):
+            jurisdiction, _, language = path.stem.partition(".")
+            key = (path.parent.name, jurisdiction, language or "en")
+            
+            source = path.read_text(encoding="utf-8")
+            match = REQUIRED_PATTERN.search(source)
+            required = [name.strip() for name in match.group(1).split(",") if name.strip()] if match else []
+            
+            template = self.environment.get_template(path.relative_to(self.templates_dir).as_posix())
+            self._templates[key] = CompiledTemplate(key=key, template=template, required=required)
+        
+        logger.info(f"Compiled {len(self._templates)} document templates")
+    
+    @property
+    def keys(self) -> List[TemplateKey]:
+        """Keys of all compiled templates."""
+        return list(self._templates)
+    
+    def find(self, document_type: str, jurisdiction: str = DEFAULT_JURISDICTION, language: str = "en") -> Optional[CompiledTemplate]:
+        """Find the most specific template, falling back to the default jurisdiction."""
+        document_type = normalize_document_type(document_type)
+        jurisdiction = (jurisdiction or DEFAULT_JURISDICTION).lower()
+        language = (language or "en").lower()
+        
+        return (
+            self._templates.get((document_type, jurisdiction, language))
+            or self._templates.get((document_type, DEFAULT_JURISDICTION, language))
+        )
+    
+    def match(self, document_type: str, jurisdiction: str, language: str, parameters: Dict[str, Any]) -> Optional[CompiledTemplate]:
+        """Find a template that the parameters fully specify."""
+        compiled = self.find(document_type, jurisdiction, language)
+        if compiled is None or compiled.missing(parameters):
+            return None
+        return compiled
+    
+    def render(
+        self,
+        compiled: CompiledTemplate,
+        parameters: Dict[str, Any],
+        fill_missing: bool = False,
+        **context: Any
+    ) -> str:
+        """
+        Render a compiled template.
+        
+        With ``fill_missing``, absent required parameters render as
+        ``[name]`` placeholders instead of raising. Context values such as
+        the request's title and jurisdiction take precedence over parameters
+        of the same name.
+        """
+        values = {
+            "date": date.today().isoformat(),
+            **parameters,
+            **{name: value for name, value in context.items() if value is not None}
+        }
+        if fill_missing:
+            for name in compiled.missing(values):
+                values[name] = f"[{name}]"
+        return compiled.template.render(**values).strip()
+
+
+# Global engine instance
+_template_engine: Optional[TemplateEngine] = None
+
+
+def get_template_engine() -> TemplateEngine:
+    """Get the process-wide template engine."""
+    global _template_engine
+    if _template_engine is None:
+        _template_engine = TemplateEngine()
+    return _template_engine
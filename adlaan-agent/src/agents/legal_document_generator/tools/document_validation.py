@@ -3,6 +3,7 @@ Document Validation Tool for AI agents.
 """
 from typing import Dict, Any, List
 from src.core.logging import get_logger
+from src.core.metrics import track_tool
 
 logger = get_logger(__name__)
 
@@ -13,6 +14,7 @@ class DocumentValidationTool:
     def __init__(self):
         self.logger = logger
     
+    @track_tool("validate_legal_structure")
     async def validate_legal_structure(self, content: str, document_type: str) -> Dict[str, Any]:
         """Validate the legal structure of a document."""
         self.logger.info(f"Validating legal structure for {document_type}")
@@ -4,6 +4,7 @@ Document Formatting Tool for AI agents.
 from typing import Dict, Any
 import re
 from src.core.logging import get_logger
+from src.core.metrics import track_tool
 from src.utils.agent_helpers import clean_document_content
 
 logger = get_logger(__name__)
@@ -15,6 +16,7 @@ class DocumentFormattingTool:
     def __init__(self):
         self.logger = logger
     
+    @track_tool("format_document")
     async def format_document(self, content: str, format_type: str = "professional") -> Dict[str, Any]:
         """Format document according to professional standards."""
         self.logger.info(f"Formatting document as {format_type}")
@@ -26,7 +26,7 @@ class LegalResearchAgent(BaseAgent):
     
     async def _build_graph(self) -> StateGraph:
         """Build the legal research workflow."""
-        workflow = StateGraph(AgentState)
+        workflow = self._create_workflow()
         
         # Add nodes
         workflow.add_node("analyze_query", self._analyze_query)
@@ -5,6 +5,7 @@ from typing import Dict, Any, List
 import re
 from datetime import datetime
 from src.core.logging import get_logger
+from src.core.metrics import track_tool
 
 logger = get_logger(__name__)
 
@@ -16,6 +17,7 @@ class ComplianceTool:
         self.jurisdiction = jurisdiction
         self.logger = logger
     
+    @track_tool("check_compliance")
     async def check_compliance(self, content: str, document_type: str) -> Dict[str, Any]:
         """Check document compliance with legal requirements."""
         self.logger.info(f"Checking compliance for {document_type} in {self.jurisdiction}")
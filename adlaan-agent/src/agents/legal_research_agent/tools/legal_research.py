@@ -5,6 +5,7 @@ from typing import Dict, Any, List
 import re
 from datetime import datetime
 from src.core.logging import get_logger
+from src.core.metrics import track_tool
 
 logger = get_logger(__name__)
 
@@ -16,6 +17,7 @@ class LegalResearchTool:
         self.jurisdiction = jurisdiction
         self.logger = logger
     
+    @track_tool("search_legal_precedents")
     async def search_legal_precedents(self, query: str, document_type: str) -> Dict[str, Any]:
         """Search for relevant legal precedents."""
         self.logger.info(f"Searching legal precedents for: {query}")
@@ -39,6 +41,7 @@ class LegalResearchTool:
             "search_timestamp": datetime.now().isoformat()
         }
     
+    @track_tool("get_legal_citations")
     async def get_legal_citations(self, document_content: str) -> List[Dict[str, Any]]:
         """Extract and validate legal citations from document."""
         self.logger.info("Extracting legal citations")
@@ -2,17 +2,20 @@
 FastAPI router for V2 API endpoints.
 """
 from typing import Dict, Any, Optional, List
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Header, Response, status
+from fastapi.responses import StreamingResponse, JSONResponse
 import json
 from datetime import datetime
 
 from src.core.dependencies import get_container
-from src.core.exceptions import create_http_exception, AdlaanAgentException
+from src.core.exceptions import create_http_exception, AdlaanAgentException, OverloadedError, ValidationError
 from src.schemas import (
     DocumentGenerationRequest,
     DocumentAnalysisRequest,
     TaskCreateRequest,
+    TaskBatchRequest,
+    TaskBatchItem,
+    TaskBatchResponse,
     TaskResponse,
     HealthResponse,
     ServiceInfoResponse,
@@ -21,6 +24,10 @@ from src.schemas import (
     TaskStatus
 )
 from src.services.task_manager import TaskManagerService
+from src.integrations.backend_service import AgentTask
+from src.services.event_channel import get_event_channel
+from src.services.progress import get_progress_tracker
+from src.services.health import get_health_monitor
 
 router = APIRouter(prefix="/api/v2", tags=["Agent API v2"])
 
@@ -31,6 +38,41 @@ def get_task_manager() -> TaskManagerService:
     return container.get(TaskManagerService)
 
 
+def task_progress(task: AgentTask) -> int:
+    """Progress percentage; node-level only for tasks running on this replica."""
+    if task.status == TaskStatus.COMPLETED:
+        return 100
+    running = get_progress_tracker().snapshot(str(task.id))
+    return running["progress_percentage"] if running else 0
+
+
+def task_response(task: AgentTask) -> TaskResponse:
+    """API representation of a task."""
+    return TaskResponse(
+        id=task.id,
+        agent_type=task.agent_type,
+        status=task.status,
+        input_data=task.input_data,
+        output_data=task.output_data,
+        error_message=task.error_message,
+        metadata=task.metadata,
+        case_id=task.case_id,
+        document_id=task.document_id,
+        created_by=task.created_by,
+        created_at=task.created_at,
+        updated_at=task.updated_at,
+        completed_at=task.completed_at,
+        progress=task_progress(task)
+    )
+
+
+def created_task_response(task: AgentTask, response: Response) -> TaskResponse:
+    """Response for a submission; a duplicate gets the earlier task's current state."""
+    if (task.metadata or {}).get("deduplicated"):
+        response.headers["Idempotent-Replayed"] = "true"
+    return task_response(task)
+
+
 @router.get("/", response_model=ServiceInfoResponse)
 async def get_service_info():
     """Get service information and available endpoints."""
@@ -43,11 +85,16 @@ async def get_service_info():
         environment=settings.environment.value,
         endpoints={
             "health": "/api/v2/health",
+            "liveness": "/api/v2/health/live",
+            "readiness": "/api/v2/health/ready",
+            "saturation": "/api/v2/health/saturation",
             "generate_document": "/api/v2/documents/generate",
             "analyze_document": "/api/v2/documents/analyze",
             "create_task": "/api/v2/tasks",
+            "create_tasks_batch": "/api/v2/tasks/batch",
             "get_tasks": "/api/v2/tasks/user/{user_id}",
             "task_status": "/api/v2/tasks/{task_id}",
+            "task_tokens": "/api/v2/tasks/{task_id}/tokens",
             "cancel_task": "/api/v2/tasks/{task_id}/cancel",
             "agent_status": "/api/v2/agents/{agent_type}/status"
         },
@@ -67,41 +114,51 @@ async def get_service_info():
 
 
 @router.get("/health", response_model=HealthResponse)
-async def health_check(task_manager: TaskManagerService = Depends(get_task_manager)):
-    """Check service health."""
-    try:
-        health_data = await task_manager.health_check()
-        
-        from src.core.config import get_settings
-        settings = get_settings()
-        
-        # Calculate uptime (simplified)
-        import time
-        uptime = time.time() - getattr(health_check, '_start_time', time.time())
-        if not hasattr(health_check, '_start_time'):
-            health_check._start_time = time.time()
-        
-        return HealthResponse(
-            status=health_data["status"],
-            timestamp=datetime.utcnow(),
-            services={
-                "task_manager": health_data["status"],
-                "backend": "connected" if health_data["backend_connected"] else "disconnected",
-                "agents": str(len(health_data["available_agents"]))
-            },
-            version=settings.app_version,
-            uptime_seconds=uptime
-        )
-        
-    except Exception as e:
-        raise HTTPException(
+async def health_check():
+    """Check service health from the last background refresh."""
+    from src.core.config import get_settings
+    settings = get_settings()
+    
+    monitor = get_health_monitor()
+    snapshot = monitor.snapshot()
+    
+    health = HealthResponse(
+        status=snapshot["status"],
+        timestamp=datetime.utcnow(),
+        services={name: component["status"] for name, component in snapshot["components"].items()},
+        version=settings.app_version,
+        uptime_seconds=monitor.uptime_seconds,
+        checked_at=snapshot["checked_at"],
+        components=snapshot["components"]
+    )
+    
+    if not monitor.readiness()["ready"]:
+        return JSONResponse(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail={
-                "message": "Health check failed",
-                "error": str(e),
-                "timestamp": datetime.utcnow().isoformat()
-            }
+            content=health.model_dump(mode="json")
         )
+    return health
+
+
+@router.get("/health/live")
+async def liveness_probe():
+    """Liveness probe; answers as long as the event loop is serving requests."""
+    return get_health_monitor().liveness()
+
+
+@router.get("/health/ready")
+async def readiness_probe():
+    """Readiness probe; 503 until critical components pass their background checks."""
+    readiness = get_health_monitor().readiness()
+    if not readiness["ready"]:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=readiness)
+    return readiness
+
+
+@router.get("/health/saturation")
+async def saturation(task_manager: TaskManagerService = Depends(get_task_manager)):
+    """Load signals for autoscalers; saturation 1 means new tasks of every priority are refused."""
+    return await task_manager.admission.get_status()
 
 
 @router.post("/documents/generate", response_model=TaskResponse)
@@ -109,6 +166,9 @@ async def generate_document(
     request: DocumentGenerationRequest,
     user_id: int,  # In practice, extract from JWT token
     background_tasks: BackgroundTasks,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    x_tenant_id: Optional[str] = Header(None),  # In practice, the organization from the JWT token
     task_manager: TaskManagerService = Depends(get_task_manager)
 ):
     """Generate a legal document."""
@@ -119,25 +179,20 @@ async def generate_document(
                 "document_type": request.document_type,
                 "title": request.title,
                 "parameters": request.parameters,
-                "jurisdiction": request.parameters.get("jurisdiction", "jordan")
+                "jurisdiction": request.parameters.get("jurisdiction", "jordan"),
+                "language": request.parameters.get("language", "en"),
+                "generation_mode": request.generation_mode.value if request.generation_mode else None,
+                "review": request.review.value if request.review else None
             },
             user_id=user_id,
             case_id=request.case_id,
-            priority=request.priority
+            priority=request.priority,
+            idempotency_key=idempotency_key,
+            deduplicate=request.deduplicate,
+            tenant=x_tenant_id
         )
         
-        return TaskResponse(
-            id=task.id,
-            agent_type=task.agent_type,
-            status=task.status,
-            input_data=task.input_data,
-            metadata=task.metadata,
-            case_id=task.case_id,
-            created_by=task.created_by,
-            created_at=task.created_at,
-            updated_at=task.updated_at,
-            progress=0
-        )
+        return created_task_response(task, response)
         
     except AdlaanAgentException as e:
         raise create_http_exception(e)
@@ -152,6 +207,9 @@ async def generate_document(
 async def analyze_document(
     request: DocumentAnalysisRequest,
     user_id: int,  # In practice, extract from JWT token
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    x_tenant_id: Optional[str] = Header(None),  # In practice, the organization from the JWT token
     task_manager: TaskManagerService = Depends(get_task_manager)
 ):
     """Analyze a legal document."""
@@ -164,21 +222,13 @@ async def analyze_document(
                 "parameters": request.parameters
             },
             user_id=user_id,
-            case_id=request.case_id
+            case_id=request.case_id,
+            idempotency_key=idempotency_key,
+            deduplicate=request.deduplicate,
+            tenant=x_tenant_id
         )
         
-        return TaskResponse(
-            id=task.id,
-            agent_type=task.agent_type,
-            status=task.status,
-            input_data=task.input_data,
-            metadata=task.metadata,
-            case_id=task.case_id,
-            created_by=task.created_by,
-            created_at=task.created_at,
-            updated_at=task.updated_at,
-            progress=0
-        )
+        return created_task_response(task, response)
         
     except AdlaanAgentException as e:
         raise create_http_exception(e)
@@ -193,6 +243,9 @@ async def analyze_document(
 async def create_task(
     request: TaskCreateRequest,
     user_id: int,  # In practice, extract from JWT token
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    x_tenant_id: Optional[str] = Header(None),  # In practice, the organization from the JWT token
     task_manager: TaskManagerService = Depends(get_task_manager)
 ):
     """Create a generic agent task."""
@@ -202,21 +255,13 @@ async def create_task(
             input_data=request.input_data,
             user_id=user_id,
             case_id=request.case_id,
-            priority=request.priority
+            priority=request.priority,
+            idempotency_key=idempotency_key,
+            deduplicate=request.deduplicate,
+            tenant=x_tenant_id
         )
         
-        return TaskResponse(
-            id=task.id,
-            agent_type=task.agent_type,
-            status=task.status,
-            input_data=task.input_data,
-            metadata=task.metadata,
-            case_id=task.case_id,
-            created_by=task.created_by,
-            created_at=task.created_at,
-            updated_at=task.updated_at,
-            progress=0
-        )
+        return created_task_response(task, response)
         
     except AdlaanAgentException as e:
         raise create_http_exception(e)
@@ -227,6 +272,73 @@ async def create_task(
         )
 
 
+@router.post("/tasks/batch", response_model=TaskBatchResponse)
+async def create_tasks_batch(
+    request: TaskBatchRequest,
+    user_id: int,  # In practice, extract from JWT token
+    response: Response,
+    x_tenant_id: Optional[str] = Header(None),  # In practice, the organization from the JWT token
+    task_manager: TaskManagerService = Depends(get_task_manager)
+):
+    """Create many agent tasks with batched backend writes; each entry succeeds or fails on its own."""
+    from src.core.config import get_settings
+    settings = get_settings()
+    
+    try:
+        if len(request.tasks) > settings.task_batch_max_size:
+            raise ValidationError(
+                f"A batch may hold at most {settings.task_batch_max_size} tasks",
+                {"submitted": len(request.tasks)}
+            )
+        
+        results = await task_manager.create_tasks([
+            {
+                "agent_type": spec.agent_type,
+                "input_data": spec.input_data,
+                "case_id": spec.case_id,
+                "priority": spec.priority,
+                "deduplicate": spec.deduplicate,
+                "tenant": x_tenant_id
+            }
+            for spec in request.tasks
+        ], user_id=user_id)
+        
+    except AdlaanAgentException as e:
+        raise create_http_exception(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={"message": "Batch task creation failed", "error": str(e)}
+        )
+    
+    items = []
+    retry_after = 0
+    for index, result in enumerate(results):
+        if isinstance(result, AgentTask):
+            items.append(TaskBatchItem(index=index, task=task_response(result)))
+            continue
+        if isinstance(result, OverloadedError):
+            retry_after = max(retry_after, result.retry_after)
+        items.append(TaskBatchItem(index=index, error={
+            "message": getattr(result, "message", str(result)),
+            "details": getattr(result, "details", {}),
+            "type": result.__class__.__name__
+        }))
+    
+    # Shed entries can be resubmitted together once the longest wait is over
+    if retry_after:
+        response.headers["Retry-After"] = str(retry_after)
+    
+    deduplicated = sum(1 for item in items if item.task and (item.task.metadata or {}).get("deduplicated"))
+    failed = sum(1 for item in items if item.error)
+    return TaskBatchResponse(
+        created=len(items) - deduplicated - failed,
+        deduplicated=deduplicated,
+        failed=failed,
+        results=items
+    )
+
+
 @router.get("/tasks/{task_id}", response_model=TaskResponse)
 async def get_task(
     task_id: int,
@@ -242,22 +354,7 @@ async def get_task(
                 detail={"message": f"Task {task_id} not found"}
             )
         
-        return TaskResponse(
-            id=task.id,
-            agent_type=task.agent_type,
-            status=task.status,
-            input_data=task.input_data,
-            output_data=task.output_data,
-            error_message=task.error_message,
-            metadata=task.metadata,
-            case_id=task.case_id,
-            document_id=task.document_id,
-            created_by=task.created_by,
-            created_at=task.created_at,
-            updated_at=task.updated_at,
-            completed_at=task.completed_at,
-            progress=100 if task.status == TaskStatus.COMPLETED else 0
-        )
+        return task_response(task)
         
     except HTTPException:
         raise
@@ -285,25 +382,7 @@ async def get_user_tasks(
             limit=limit
         )
         
-        return [
-            TaskResponse(
-                id=task.id,
-                agent_type=task.agent_type,
-                status=task.status,
-                input_data=task.input_data,
-                output_data=task.output_data,
-                error_message=task.error_message,
-                metadata=task.metadata,
-                case_id=task.case_id,
-                document_id=task.document_id,
-                created_by=task.created_by,
-                created_at=task.created_at,
-                updated_at=task.updated_at,
-                completed_at=task.completed_at,
-                progress=100 if task.status == TaskStatus.COMPLETED else 0
-            )
-            for task in tasks
-        ]
+        return [task_response(task) for task in tasks]
         
     except Exception as e:
         raise HTTPException(
@@ -423,4 +502,52 @@ async def stream_task_progress(
             "Connection": "keep-alive",
             "Content-Type": "text/event-stream"
         }
-    )
\ No newline at end of file
+    )
+
+
+@router.get("/tasks/{task_id}/tokens")
+async def stream_task_tokens(
+    task_id: int,
+    task_manager: TaskManagerService = Depends(get_task_manager)
+):
+    """Stream LLM token deltas and stage events for a task as server-sent events."""
+    from src.core.config import get_settings
+    settings = get_settings()
+    channel = get_event_channel()
+    channel_id = str(task_id)
+    
+    async def generate_token_stream():
+        """Generate server-sent events from the task's event channel."""
+        
+        if not channel.exists(channel_id):
+            # No live run on this worker; report the stored outcome instead
+            task = await task_manager.get_task(task_id)
+            if not task:
+                yield f"data: {json.dumps({'type': 'error', 'error': 'Task not found'})}\n\n"
+            elif task.status in (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED):
+                event = {
+                    "type": "complete" if task.status == TaskStatus.COMPLETED else "error",
+                    "status": task.status.value,
+                    "data": task.output_data,
+                    "error": task.error_message
+                }
+                yield f"data: {json.dumps(event, default=str)}\n\n"
+            else:
+                yield f"data: {json.dumps({'type': 'error', 'error': 'No live stream for task'})}\n\n"
+            return
+        
+        async for event in channel.subscribe(channel_id, heartbeat_seconds=settings.stream_heartbeat_seconds):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"data: {json.dumps(event, default=str)}\n\n"
+    
+    return StreamingResponse(
+        generate_token_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
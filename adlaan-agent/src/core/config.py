@@ -64,12 +64,31 @@ class Settings(BaseSettings):
     backend_url: str = Field(..., env="BACKEND_URL")
     backend_auth_token: str = Field(..., env="BACKEND_AUTH_TOKEN")
     graphql_endpoint: str = Field(default="/graphql", env="GRAPHQL_ENDPOINT")
+    backend_batch_size: int = Field(default=50, env="BACKEND_BATCH_SIZE")  # tasks created per batched mutation
     
     # AI/LLM Configuration
     openai_api_key: str = Field(..., env="OPENAI_API_KEY")
     openai_model: str = Field(default="gpt-4", env="OPENAI_MODEL")
     openai_temperature: float = Field(default=0.1, env="OPENAI_TEMPERATURE")
     openai_max_tokens: int = Field(default=4000, env="OPENAI_MAX_TOKENS")
+    openai_base_url: Optional[str] = Field(default=None, env="OPENAI_BASE_URL")  # e.g. the local mock LLM server
+    
+    # LLM Gateway (shared by all agents)
+    llm_requests_per_minute: int = Field(default=500, env="LLM_REQUESTS_PER_MINUTE")
+    llm_tokens_per_minute: int = Field(default=300000, env="LLM_TOKENS_PER_MINUTE")
+    llm_max_concurrency: int = Field(default=20, env="LLM_MAX_CONCURRENCY")
+    llm_agent_quotas: Dict[str, int] = Field(default={}, env="LLM_AGENT_QUOTAS")
+    llm_max_retries: int = Field(default=4, env="LLM_MAX_RETRIES")
+    llm_retry_base_delay: float = Field(default=1.0, env="LLM_RETRY_BASE_DELAY")
+    llm_retry_max_delay: float = Field(default=30.0, env="LLM_RETRY_MAX_DELAY")
+    llm_coalesce_requests: bool = Field(default=True, env="LLM_COALESCE_REQUESTS")
+    
+    # Prompt budgets (tokens)
+    llm_context_window: Optional[int] = Field(default=None, env="LLM_CONTEXT_WINDOW")
+    prompt_stage_budgets: Dict[str, Dict[str, int]] = Field(default={}, env="PROMPT_STAGE_BUDGETS")
+    
+    # Document generation
+    default_generation_mode: str = Field(default="auto", env="DEFAULT_GENERATION_MODE")
     
     # Database (for legacy features and caching)
     database_url: Optional[str] = Field(default=None, env="DATABASE_URL")
@@ -85,9 +104,61 @@ class Settings(BaseSettings):
     redis_port: int = Field(default=6379, env="REDIS_PORT")
     redis_password: Optional[str] = Field(default=None, env="REDIS_PASSWORD")
     
+    # Task queue shared by replicas
+    task_queue_backend: str = Field(default="memory", env="TASK_QUEUE_BACKEND")  # memory or redis
+    task_queue_prefix: str = Field(default="adlaan:tasks", env="TASK_QUEUE_PREFIX")
+    task_queue_group: str = Field(default="adlaan-agents", env="TASK_QUEUE_GROUP")
+    task_queue_visibility_timeout_seconds: float = Field(default=600.0, env="TASK_QUEUE_VISIBILITY_TIMEOUT_SECONDS")  # unacked tasks are redelivered after this
+    task_queue_max_deliveries: int = Field(default=3, env="TASK_QUEUE_MAX_DELIVERIES")  # then dead-lettered
+    task_journal_path: Optional[str] = Field(default=None, env="TASK_JOURNAL_PATH")  # makes the in-process queue survive restarts
+    task_journal_compact_records: int = Field(default=10000, env="TASK_JOURNAL_COMPACT_RECORDS")  # appends between rewrites
+    shutdown_grace_seconds: float = Field(default=30.0, env="SHUTDOWN_GRACE_SECONDS")  # running tasks get this long to finish on shutdown
+    
+    # Fair queuing across tenants (organizations, or users when none is given)
+    tenant_weights: Dict[str, float] = Field(default={}, env="TENANT_WEIGHTS")  # share of delivery relative to the default of 1
+    tenant_max_concurrent_tasks: int = Field(default=0, env="TENANT_MAX_CONCURRENT_TASKS")  # tasks in flight per tenant; 0 is unlimited
+    tenant_concurrency_overrides: Dict[str, int] = Field(default={}, env="TENANT_CONCURRENCY_OVERRIDES")
+    
+    # Duplicate submissions
+    task_dedup_window_seconds: int = Field(default=600, env="TASK_DEDUP_WINDOW_SECONDS")  # identical inputs reuse a task this long; 0 disables
+    idempotency_key_ttl_seconds: int = Field(default=86400, env="IDEMPOTENCY_KEY_TTL_SECONDS")
+    
+    # Admission control: the saturation (0-1) at which each priority is refused with 429
+    admission_shed_thresholds: Dict[str, float] = Field(
+        default={"low": 0.6, "normal": 0.8, "high": 0.95, "urgent": 1.0},
+        env="ADMISSION_SHED_THRESHOLDS"
+    )
+    admission_max_wait_seconds: float = Field(default=120.0, env="ADMISSION_MAX_WAIT_SECONDS")  # estimated queue wait that counts as fully saturated
+    admission_default_task_seconds: float = Field(default=30.0, env="ADMISSION_DEFAULT_TASK_SECONDS")  # service time assumed before any task finishes
+    admission_max_retry_after_seconds: int = Field(default=120, env="ADMISSION_MAX_RETRY_AFTER_SECONDS")
+    
     # Performance Settings
     max_concurrent_tasks: int = Field(default=10, env="MAX_CONCURRENT_TASKS")
     task_timeout_seconds: int = Field(default=300, env="TASK_TIMEOUT_SECONDS")
+    task_queue_max_size: int = Field(default=1000, env="TASK_QUEUE_MAX_SIZE")
+    task_priority_aging_seconds: float = Field(default=30.0, env="TASK_PRIORITY_AGING_SECONDS")  # wait that equals one priority level
+    task_batch_max_size: int = Field(default=500, env="TASK_BATCH_MAX_SIZE")  # tasks accepted by one batch submission
+    cpu_executor_default: str = Field(default="auto", env="CPU_EXECUTOR_DEFAULT")  # auto, inline, thread or process
+    cpu_executor_overrides: Dict[str, str] = Field(default={}, env="CPU_EXECUTOR_OVERRIDES")  # by agent, tool or agent.tool
+    cpu_inline_max_bytes: int = Field(default=16384, env="CPU_INLINE_MAX_BYTES")
+    cpu_process_min_bytes: int = Field(default=262144, env="CPU_PROCESS_MIN_BYTES")
+    cpu_process_workers: int = Field(default=2, env="CPU_PROCESS_WORKERS")  # 0 disables the process pool
+    lazy_agents: List[str] = Field(default=[], env="LAZY_AGENTS")  # agent types initialized on their first task
+    
+    # Workflow checkpoints
+    checkpoint_max_threads: int = Field(default=500, env="CHECKPOINT_MAX_THREADS")
+    checkpoint_max_memory_mb: int = Field(default=256, env="CHECKPOINT_MAX_MEMORY_MB")
+    checkpoint_history: int = Field(default=2, env="CHECKPOINT_HISTORY")  # checkpoints kept per thread
+    checkpoint_sqlite_path: Optional[str] = Field(default=None, env="CHECKPOINT_SQLITE_PATH")  # enables resume after restart
+    
+    # Streaming
+    stream_history_limit: int = Field(default=10000, env="STREAM_HISTORY_LIMIT")
+    stream_retention_seconds: int = Field(default=300, env="STREAM_RETENTION_SECONDS")
+    stream_heartbeat_seconds: int = Field(default=15, env="STREAM_HEARTBEAT_SECONDS")
+    
+    # Progress reporting
+    progress_update_interval_seconds: float = Field(default=2.0, env="PROGRESS_UPDATE_INTERVAL_SECONDS")  # backend progress writes per task are coalesced to one per interval
+    progress_node_weights: Dict[str, float] = Field(default={}, env="PROGRESS_NODE_WEIGHTS")  # by node or agent.node, overriding the graph's weights
     
     # Logging
     log_level: LogLevel = Field(default=LogLevel.INFO, env="LOG_LEVEL")
@@ -98,6 +169,9 @@ class Settings(BaseSettings):
     
     # Monitoring
     enable_metrics: bool = Field(default=True, env="ENABLE_METRICS")
+    health_check_interval_seconds: float = Field(default=15.0, env="HEALTH_CHECK_INTERVAL_SECONDS")
+    health_check_timeout_seconds: float = Field(default=5.0, env="HEALTH_CHECK_TIMEOUT_SECONDS")
+    health_llm_failure_threshold: int = Field(default=3, env="HEALTH_LLM_FAILURE_THRESHOLD")  # consecutive failed LLM calls
     metrics_port: int = Field(default=8006, env="METRICS_PORT")
     
     # External APIs (optional)
@@ -141,6 +215,14 @@ class Settings(BaseSettings):
         """Get the full GraphQL URL."""
         return f"{self.backend_url.rstrip('/')}{self.graphql_endpoint}"
     
+    @property
+    def redis_connection_url(self) -> str:
+        """Get the Redis URL, building it from components if not provided."""
+        if self.redis_url:
+            return self.redis_url
+        auth = f":{self.redis_password}@" if self.redis_password else ""
+        return f"redis://{auth}{self.redis_host}:{self.redis_port}/0"
+    
     @property
     def is_production(self) -> bool:
         """Check if running in production."""
@@ -12,6 +12,7 @@ from starlette.status import (
     HTTP_408_REQUEST_TIMEOUT,
     HTTP_409_CONFLICT,
     HTTP_422_UNPROCESSABLE_ENTITY,
+    HTTP_429_TOO_MANY_REQUESTS,
     HTTP_500_INTERNAL_SERVER_ERROR,
     HTTP_502_BAD_GATEWAY,
     HTTP_503_SERVICE_UNAVAILABLE,
@@ -30,6 +31,7 @@ class AdlaanAgentException(Exception):
         self.message = message
         self.status_code = status_code
         self.details = details or {}
+        self.headers: Dict[str, str] = {}
         super().__init__(self.message)
 
 
@@ -90,6 +92,15 @@ class ServiceUnavailableError(AdlaanAgentException):
         super().__init__(message, HTTP_503_SERVICE_UNAVAILABLE)
 
 
+class OverloadedError(ServiceUnavailableError):
+    """Task refused by admission control; clients should retry after retry_after seconds."""
+    
+    def __init__(self, message: str, retry_after: int, details: Optional[Dict[str, Any]] = None):
+        AdlaanAgentException.__init__(self, message, HTTP_429_TOO_MANY_REQUESTS, {**(details or {}), "retry_after": retry_after})
+        self.retry_after = retry_after
+        self.headers = {"Retry-After": str(retry_after)}
+
+
 class OpenAIError(AdlaanAgentException):
     """OpenAI API error."""
     
@@ -129,4 +140,5 @@ def create_http_exception(exc: AdlaanAgentException) -> HTTPException:
             "details": exc.details,
             "type": exc.__class__.__name__,
         },
+        headers=exc.headers or None,
     )
\ No newline at end of file
@@ -0,0 +1,322 @@
+"""
+In-process metrics with Prometheus text exposition.
+Counters, gauges and histograms labeled by agent, node, tool and operation.
+The registry is rendered by the /metrics endpoint. The node and agent
+currently executing are tracked in context variables so tool and LLM
+metrics can be attributed to the node that triggered them.
+"""
+import functools
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, List, Tuple, Iterator, Sequence
+
+# Latency buckets (seconds) spanning fast local steps to multi-minute LLM stages
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Agent and node currently executing in this task
+current_agent: ContextVar[str] = ContextVar("current_agent", default="none")
+current_node: ContextVar[str] = ContextVar("current_node", default="none")
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the exposition format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value for the exposition format."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Base class for labeled metrics."""
+    
+    kind = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[LabelValues, Any] = {}
+    
+    def labels(self, **labels: Any) -> Any:
+        """Get the child metric for a set of label values."""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+    
+    def _new_child(self) -> Any:
+        """Create the value holder for a new label set."""
+        raise NotImplementedError
+    
+    def _label_string(self, values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        """Render label pairs as {name="value",...}."""
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(f'{extra[0]}="{extra[1]}"')
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+    
+    def render(self) -> List[str]:
+        """Exposition lines for this metric."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+    
+    def _render_child(self, values: LabelValues, child: Any) -> List[str]:
+        """Exposition lines for one label set."""
+        return [f"{self.name}{self._label_string(values)} {_format_value(child.value)}"]
+
+
+class _Value:
+    """A single counter or gauge value."""
+    
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1) -> None:
+        """Increase the value."""
+        with self._lock:
+            self.value += amount
+    
+    def dec(self, amount: float = 1) -> None:
+        """Decrease the value."""
+        with self._lock:
+            self.value -= amount
+    
+    def set(self, value: float) -> None:
+        """Set the value."""
+        self.value = value
+    
+    @contextmanager
+    def track_in_progress(self) -> Iterator[None]:
+        """Increment for the duration of a block."""
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+    
+    kind = "counter"
+    
+    def _new_child(self) -> _Value:
+        """Create a value holder."""
+        return _Value()
+    
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        """Increase the counter for a label set."""
+        self.labels(**labels).inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+    
+    kind = "gauge"
+    
+    def _new_child(self) -> _Value:
+        """Create a value holder."""
+        return _Value()
+    
+    def set(self, value: float, **labels: Any) -> None:
+        """Set the gauge for a label set."""
+        self.labels(**labels).set(value)
+
+
+class _HistogramValue:
+    """Bucketed observations for one label set."""
+    
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float) -> None:
+        """Record an observation."""
+        with self._lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+    
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the duration of a block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+    
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def _new_child(self) -> _HistogramValue:
+        """Create a bucket set."""
+        return _HistogramValue(self.buckets)
+    
+    def observe(self, value: float, **labels: Any) -> None:
+        """Record an observation for a label set."""
+        self.labels(**labels).observe(value)
+    
+    def _render_child(self, values: LabelValues, child: _HistogramValue) -> List[str]:
+        """Cumulative bucket, sum and count lines for one label set."""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), child.counts):
+            cumulative += count
+            le = ("le", _format_value(bound))
+            lines.append(f"{self.name}_bucket{self._label_string(values, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{self._label_string(values)} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{self._label_string(values)} {child.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together."""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+    
+    def register(self, metric: _Metric) -> _Metric:
+        """Register a metric, returning the existing one if the name is taken."""
+        return self._metrics.setdefault(metric.name, metric)
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Register a counter."""
+        return self.register(Counter(name, documentation, labelnames))
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Register a gauge."""
+        return self.register(Gauge(name, documentation, labelnames))
+    
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Register a histogram."""
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+    
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Global registry
+registry = MetricsRegistry()
+
+# Graph nodes
+NODE_DURATION = registry.histogram("adlaan_node_duration_seconds", "Graph node execution time.", ["agent", "node"])
+NODE_IN_FLIGHT = registry.gauge("adlaan_node_in_flight", "Graph nodes currently executing.", ["agent", "node"])
+NODE_ERRORS = registry.counter("adlaan_node_errors_total", "Graph node executions that raised.", ["agent", "node"])
+
+# Agent tools
+TOOL_DURATION = registry.histogram("adlaan_tool_duration_seconds", "Agent tool call time.", ["agent", "node", "tool"])
+TOOL_ERRORS = registry.counter("adlaan_tool_errors_total", "Agent tool calls that raised.", ["agent", "tool"])
+
+# LLM calls
+LLM_DURATION = registry.histogram("adlaan_llm_request_duration_seconds", "LLM call time including retries.", ["agent", "node", "mode"])
+LLM_FIRST_TOKEN = registry.histogram("adlaan_llm_time_to_first_token_seconds", "Time to the first streamed chunk.", ["agent", "node"])
+LLM_IN_FLIGHT = registry.gauge("adlaan_llm_in_flight", "LLM calls currently executing upstream.", ["agent"])
+LLM_TOKENS = registry.counter("adlaan_llm_tokens_total", "LLM tokens used, from provider usage or estimates.", ["agent", "node", "kind"])
+LLM_ERRORS = registry.counter("adlaan_llm_errors_total", "LLM calls that failed after retries.", ["agent", "error"])
+LLM_RETRIES = registry.counter("adlaan_llm_retries_total", "LLM calls retried after a retryable error.", ["agent"])
+
+# Backend GraphQL
+GRAPHQL_DURATION = registry.histogram("adlaan_graphql_duration_seconds", "Backend GraphQL request time.", ["operation"])
+GRAPHQL_IN_FLIGHT = registry.gauge("adlaan_graphql_in_flight", "Backend GraphQL requests in flight.", ["operation"])
+GRAPHQL_ERRORS = registry.counter("adlaan_graphql_errors_total", "Backend GraphQL requests that failed.", ["operation"])
+
+# Tasks
+TASK_DURATION = registry.histogram("adlaan_task_duration_seconds", "End-to-end agent task time.", ["agent", "status"])
+TASKS_DEDUPLICATED = registry.counter("adlaan_tasks_deduplicated_total", "Submissions attached to an existing task instead of running again.", ["agent", "match"])
+
+# CPU-bound work
+CPU_TASK_DURATION = registry.histogram("adlaan_cpu_task_duration_seconds", "Offloaded CPU-bound work time by strategy.", ["agent", "workload", "strategy"])
+
+# Task queue
+QUEUE_DEPTH = registry.gauge("adlaan_task_queue_depth", "Tasks waiting in the task queue for delivery to a replica.", ["priority"])
+SCHEDULER_BUFFERED = registry.gauge("adlaan_task_scheduler_buffered", "Delivered tasks waiting in a replica's scheduler for a free worker.", ["priority"])
+QUEUE_WAIT = registry.histogram("adlaan_task_queue_wait_seconds", "Time tasks spent queued before a worker picked them up.", ["priority"])
+QUEUE_REJECTED = registry.counter("adlaan_task_queue_rejected_total", "Tasks rejected because the queue was full.", ["priority"])
+WORKERS_BUSY = registry.gauge("adlaan_task_workers_busy", "Workers currently running a task.")
+QUEUE_REDELIVERED = registry.counter("adlaan_task_queue_redelivered_total", "Unacknowledged tasks redelivered after the visibility timeout.", ["backend"])
+QUEUE_DEAD_LETTERED = registry.counter("adlaan_task_queue_dead_lettered_total", "Tasks moved to the dead-letter queue.", ["backend"])
+DRAINED_TASKS = registry.counter("adlaan_drained_tasks_total", "Tasks handled by a shutdown drain, by whether they finished or went back to the queue.", ["outcome"])
+
+# Admission control
+ADMISSION_REJECTED = registry.counter("adlaan_admission_rejected_total", "Tasks refused with 429 because the service was saturated.", ["priority", "reason"])
+SATURATION = registry.gauge("adlaan_saturation", "Load relative to capacity by signal; 1 means fully saturated.", ["signal"])
+ESTIMATED_WAIT = registry.gauge("adlaan_estimated_queue_wait_seconds", "Expected wait before a newly queued task starts.")
+
+# Startup
+STARTUP_DURATION = registry.gauge("adlaan_startup_phase_seconds", "Time spent in each startup phase.", ["phase"])
+
+# Health
+COMPONENT_HEALTHY = registry.gauge("adlaan_component_healthy", "Whether a component passed its last health check.", ["component"])
+HEALTH_CHECK_DURATION = registry.histogram("adlaan_health_check_duration_seconds", "Background health check time.", ["component"])
+
+
+@contextmanager
+def track_node(agent: str, node: str) -> Iterator[None]:
+    """Time a graph node and mark it as the current node for nested metrics."""
+    agent_token = current_agent.set(agent)
+    node_token = current_node.set(node)
+    try:
+        with NODE_IN_FLIGHT.labels(agent=agent, node=node).track_in_progress(), \
+                NODE_DURATION.labels(agent=agent, node=node).time():
+            try:
+                yield
+            except Exception:
+                NODE_ERRORS.inc(agent=agent, node=node)
+                raise
+    finally:
+        current_node.reset(node_token)
+        current_agent.reset(agent_token)
+
+
+def track_tool(tool: str):
+    """Decorator timing an async tool method under the current agent and node."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            agent = current_agent.get()
+            with TOOL_DURATION.labels(agent=agent, node=current_node.get(), tool=tool).time():
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    TOOL_ERRORS.inc(agent=agent, tool=tool)
+                    raise
+        return wrapper
+    return decorator
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Get the process-wide metrics registry."""
+    return registry
@@ -5,14 +5,22 @@ Handles all communication between the agent and the backend system.
 import aiohttp
 import asyncio
 import json
-from typing import Dict, Any, Optional, List
+import re
+from typing import Dict, Any, Optional, List, Union
 from datetime import datetime
 from dataclasses import dataclass
 
 from src.services.base import AsyncService
 from src.core.exceptions import BackendConnectionError, ValidationError
+from src.core.metrics import GRAPHQL_DURATION, GRAPHQL_IN_FLIGHT, GRAPHQL_ERRORS
 from src.schemas import AgentType, TaskStatus, TaskResponse
 
+# Operation name of a GraphQL document, used as a metrics label
+OPERATION_PATTERN = re.compile(r"\b(?:query|mutation)\s+(\w+)")
+
+# Fields selected for a newly created agent task
+CREATED_TASK_FIELDS = "id type status input caseId createdBy createdAt updatedAt metadata"
+
 
 @dataclass
 class AgentTask:
@@ -85,8 +93,19 @@ class BackendIntegrationService(AsyncService[Dict[str, Any]]):
             "User-Agent": f"Adlaan-Agent/{self.settings.app_version}"
         }
     
-    async def _graphql_request(self, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Make a GraphQL request to the backend."""
+    async def _graphql_request(
+        self,
+        query: str,
+        variables: Optional[Dict[str, Any]] = None,
+        errors: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Make a GraphQL request to the backend.
+        
+        GraphQL errors raise unless an ``errors`` list is given and the
+        response still carried data; they are then appended to it, so a
+        batched document can succeed for some of its fields.
+        """
         if not self.session:
             await self.initialize()
         
@@ -95,24 +114,36 @@ class BackendIntegrationService(AsyncService[Dict[str, Any]]):
             "variables": variables or {}
         }
         
-        try:
-            async with self.session.post(self.graphql_url, json=payload) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise BackendConnectionError(
-                        f"GraphQL request failed with status {response.status}: {error_text}"
-                    )
-                
-                result = await response.json()
-                
-                if "errors" in result:
-                    error_messages = [error.get("message", "Unknown error") for error in result["errors"]]
-                    raise BackendConnectionError(f"GraphQL errors: {', '.join(error_messages)}")
-                
-                return result.get("data", {})
+        match = OPERATION_PATTERN.search(query)
+        operation = match.group(1) if match else "anonymous"
         
-        except aiohttp.ClientError as e:
-            raise BackendConnectionError(f"HTTP request failed: {str(e)}")
+        with GRAPHQL_IN_FLIGHT.labels(operation=operation).track_in_progress(), \
+                GRAPHQL_DURATION.labels(operation=operation).time():
+            try:
+                async with self.session.post(self.graphql_url, json=payload) as response:
+                    if response.status != 200:
+                        error_text = await response.text()
+                        raise BackendConnectionError(
+                            f"GraphQL request failed with status {response.status}: {error_text}"
+                        )
+                    
+                    result = await response.json()
+                    
+                    if "errors" in result:
+                        if errors is None or not result.get("data"):
+                            error_messages = [error.get("message", "Unknown error") for error in result["errors"]]
+                            raise BackendConnectionError(f"GraphQL errors: {', '.join(error_messages)}")
+                        GRAPHQL_ERRORS.inc(operation=operation)
+                        errors.extend(result["errors"])
+                    
+                    return result.get("data", {})
+            
+            except aiohttp.ClientError as e:
+                GRAPHQL_ERRORS.inc(operation=operation)
+                raise BackendConnectionError(f"HTTP request failed: {str(e)}")
+            except BackendConnectionError:
+                GRAPHQL_ERRORS.inc(operation=operation)
+                raise
     
     async def process(self, input_data: Dict[str, Any]) -> Any:
         """Process a generic GraphQL request."""
@@ -124,6 +155,40 @@ class BackendIntegrationService(AsyncService[Dict[str, Any]]):
         
         return await self._graphql_request(query, variables)
     
+    @staticmethod
+    def _task_input(
+        agent_type: AgentType,
+        task_input: Dict[str, Any],
+        user_id: int,
+        case_id: Optional[int] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """CreateAgentTaskInput for one task."""
+        return {
+            'type': agent_type.value,
+            'input': json.dumps(task_input),
+            'caseId': case_id,
+            'createdBy': user_id,
+            'metadata': metadata or {}
+        }
+    
+    @staticmethod
+    def _parse_created_task(task_data: Dict[str, Any]) -> AgentTask:
+        """AgentTask from a createAgentTask result."""
+        created_at = datetime.fromisoformat(task_data['createdAt'].replace('Z', '+00:00'))
+        updated_at = task_data.get('updatedAt')
+        return AgentTask(
+            id=task_data.get('id'),
+            agent_type=AgentType(task_data.get('type')),
+            status=TaskStatus(task_data.get('status')),
+            input_data=json.loads(task_data.get('input') or '{}'),
+            metadata=task_data.get('metadata', {}),
+            case_id=task_data.get('caseId'),
+            created_by=task_data.get('createdBy'),
+            created_at=created_at,
+            updated_at=datetime.fromisoformat(updated_at.replace('Z', '+00:00')) if updated_at else created_at
+        )
+    
     async def create_agent_task(
         self,
         agent_type: AgentType,
@@ -133,50 +198,73 @@ class BackendIntegrationService(AsyncService[Dict[str, Any]]):
         metadata: Optional[Dict[str, Any]] = None
     ) -> AgentTask:
         """Create a new agent task in the backend."""
-        query = """
-        mutation CreateAgentTask($input: CreateAgentTaskInput!) {
-            createAgentTask(input: $input) {
-                id
-                type
-                status
-                input
-                caseId
-                createdBy
-                createdAt
-                metadata
-            }
-        }
+        query = f"""
+        mutation CreateAgentTask($input: CreateAgentTaskInput!) {{
+            createAgentTask(input: $input) {{ {CREATED_TASK_FIELDS} }}
+        }}
         """
         
         variables = {
-            'input': {
-                'type': agent_type.value,
-                'input': json.dumps(task_input),
-                'caseId': case_id,
-                'createdBy': user_id,
-                'metadata': metadata or {}
-            }
+            'input': self._task_input(agent_type, task_input, user_id, case_id, metadata)
         }
         
         try:
             result = await self._graphql_request(query, variables)
-            task_data = result.get('createAgentTask', {})
-            
-            return AgentTask(
-                id=task_data.get('id'),
-                agent_type=AgentType(task_data.get('type')),
-                status=TaskStatus(task_data.get('status')),
-                input_data=json.loads(task_data.get('input', '{}')),
-                metadata=task_data.get('metadata', {}),
-                case_id=task_data.get('caseId'),
-                created_by=task_data.get('createdBy'),
-                created_at=datetime.fromisoformat(task_data.get('createdAt', '').replace('Z', '+00:00')),
-                updated_at=datetime.fromisoformat(task_data.get('updatedAt', '').replace('Z', '+00:00'))
-            )
+            return self._parse_created_task(result.get('createAgentTask', {}))
         except Exception as e:
             self.logger.error(f"Failed to create agent task: {e}")
             raise BackendConnectionError(f"Failed to create agent task: {str(e)}")
     
+    async def create_agent_tasks(self, tasks: List[Dict[str, Any]]) -> List[Union[AgentTask, Exception]]:
+        """
+        Create many agent tasks with one aliased mutation per chunk.
+        
+        ``tasks`` holds create_agent_task keyword arguments. Chunks of
+        backend_batch_size are sent concurrently; results follow the input
+        order and hold the created task or the error for that entry.
+        """
+        chunk_size = max(1, self.settings.backend_batch_size)
+        chunks = [tasks[start:start + chunk_size] for start in range(0, len(tasks), chunk_size)]
+        results = await asyncio.gather(*(self._create_agent_task_chunk(chunk) for chunk in chunks))
+        return [result for chunk_results in results for result in chunk_results]
+    
+    async def _create_agent_task_chunk(self, tasks: List[Dict[str, Any]]) -> List[Union[AgentTask, Exception]]:
+        """Create up to one chunk of tasks in a single request."""
+        declarations = ", ".join(f"$input{index}: CreateAgentTaskInput!" for index in range(len(tasks)))
+        fields = "\n".join(
+            f"task{index}: createAgentTask(input: $input{index}) {{ {CREATED_TASK_FIELDS} }}"
+            for index in range(len(tasks))
+        )
+        query = f"mutation CreateAgentTasks({declarations}) {{\n{fields}\n}}"
+        variables = {f"input{index}": self._task_input(**task) for index, task in enumerate(tasks)}
+        
+        errors: List[Dict[str, Any]] = []
+        try:
+            result = await self._graphql_request(query, variables, errors=errors)
+        except Exception as e:
+            self.logger.error(f"Failed to create {len(tasks)} agent tasks: {e}")
+            error = e if isinstance(e, BackendConnectionError) else BackendConnectionError(f"Failed to create agent tasks: {str(e)}")
+            return [error] * len(tasks)
+        
+        # Errors carry the alias of the field they belong to as the first path element
+        messages = {}
+        for error in errors:
+            path = error.get("path") or [None]
+            messages.setdefault(path[0], error.get("message", "Unknown error"))
+        
+        created: List[Union[AgentTask, Exception]] = []
+        for index in range(len(tasks)):
+            alias = f"task{index}"
+            try:
+                if not result.get(alias):
+                    raise BackendConnectionError(f"Failed to create agent task: {messages.get(alias, 'no result returned')}")
+                created.append(self._parse_created_task(result[alias]))
+            except BackendConnectionError as e:
+                created.append(e)
+            except Exception as e:
+                created.append(BackendConnectionError(f"Failed to create agent task: {str(e)}"))
+        return created
+    
     async def update_task_status(
         self,
         task_id: int,
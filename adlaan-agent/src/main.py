@@ -7,7 +7,7 @@ from typing import Dict, Any
 
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
@@ -15,9 +15,12 @@ from src.core.config import get_settings
 from src.core.logging import setup_logging, get_logger
 from src.core.dependencies import get_container
 from src.core.exceptions import AdlaanAgentException, create_http_exception
+from src.core.metrics import get_metrics_registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
 from src.api import v2_router
 from src.services.task_manager import TaskManagerService
+from src.services.health import get_health_monitor
 from src.integrations.backend_service import BackendIntegrationService
+from src.utils.prompt_builder import preload_tokenizer
 
 # Set up logging
 setup_logging()
@@ -37,15 +40,20 @@ async def lifespan(app: FastAPI):
     
     # Initialize and register services
     task_manager = TaskManagerService()
-    backend_service = BackendIntegrationService()
+    health_monitor = get_health_monitor()
     
     try:
+        # Token counting is synchronous; load the tokenizer before the first LLM call needs it
+        await preload_tokenizer()
         await task_manager.initialize()
-        await backend_service.initialize()
         
-        # Register services in container
+        # Component health is refreshed in the background and probes read the cache
+        task_manager.register_health_checks(health_monitor)
+        await health_monitor.start()
+        
+        # Register services in container; the task manager owns the backend client
         container.register_singleton(TaskManagerService, task_manager)
-        container.register_singleton(BackendIntegrationService, backend_service)
+        container.register_singleton(BackendIntegrationService, task_manager.backend_service)
         
         logger.info("Services initialized successfully")
         
@@ -59,8 +67,8 @@ async def lifespan(app: FastAPI):
         # Cleanup services
         logger.info("Shutting down services")
         try:
+            await health_monitor.stop()
             await task_manager.cleanup()
-            await backend_service.cleanup()
         except Exception as e:
             logger.error(f"Error during cleanup: {e}")
 
@@ -104,7 +112,8 @@ def create_app() -> FastAPI:
                 "message": exc.message,
                 "details": exc.details,
                 "type": exc.__class__.__name__,
-            }
+            },
+            headers=exc.headers or None
         )
     
     @app.exception_handler(Exception)
@@ -131,6 +140,9 @@ def create_app() -> FastAPI:
             "environment": settings.environment.value,
             "endpoints": {
                 "health": "/api/v2/health",
+                "liveness": "/api/v2/health/live",
+                "readiness": "/api/v2/health/ready",
+                "metrics": "/metrics",
                 "docs": "/docs",
                 "redoc": "/redoc"
             },
@@ -143,11 +155,17 @@ def create_app() -> FastAPI:
             ]
         }
     
+    if settings.enable_metrics:
+        @app.get("/metrics", include_in_schema=False)
+        async def metrics():
+            """Prometheus metrics."""
+            return Response(get_metrics_registry().render(), media_type=METRICS_CONTENT_TYPE)
+    
     # Legacy endpoints for compatibility
     @app.get("/health")
     async def legacy_health():
         """Legacy health check endpoint."""
-        return {"status": "healthy", "message": "Use /api/v2/health for detailed health info"}
+        return {"status": "healthy", "message": "Use /api/v2/health/ready for readiness and /api/v2/health for details"}
     
     return app
 
@@ -33,6 +33,22 @@ class TaskPriority(str, Enum):
     URGENT = "urgent"
 
 
+class GenerationMode(str, Enum):
+    """Document generation strategies."""
+    STANDARD = "standard"  # Separate analysis, drafting and review calls
+    FAST = "fast"  # Analysis and drafting in one call
+    SECTIONED = "sectioned"  # Sections from the outline drafted concurrently
+    TEMPLATE = "template"  # Precompiled template, no LLM call
+    AUTO = "auto"  # Template when parameters fully specify the document, otherwise standard
+
+
+class ReviewPolicy(str, Enum):
+    """When to run the LLM review pass on a generated draft."""
+    ALWAYS = "always"
+    ON_VALIDATION_FAILURE = "on_validation_failure"
+    NEVER = "never"
+
+
 # Request Schemas
 class DocumentGenerationRequest(BaseModel):
     """Request schema for document generation."""
@@ -41,6 +57,9 @@ class DocumentGenerationRequest(BaseModel):
     parameters: Dict[str, Any] = Field(..., description="Document parameters")
     case_id: Optional[int] = Field(None, description="Related case ID")
     priority: TaskPriority = Field(TaskPriority.NORMAL, description="Task priority")
+    generation_mode: Optional[GenerationMode] = Field(None, description="Generation strategy (defaults to the service setting)")
+    review: Optional[ReviewPolicy] = Field(None, description="Review policy (defaults per generation mode)")
+    deduplicate: bool = Field(True, description="Reuse an identical recent task instead of running the agent again")
     
     class Config:
         schema_extra = {
@@ -55,7 +74,8 @@ class DocumentGenerationRequest(BaseModel):
                     "department": "Engineering"
                 },
                 "case_id": 123,
-                "priority": "normal"
+                "priority": "normal",
+                "generation_mode": "fast"
             }
         }
 
@@ -66,6 +86,7 @@ class DocumentAnalysisRequest(BaseModel):
     analysis_type: str = Field(..., description="Type of analysis to perform")
     parameters: Optional[Dict[str, Any]] = Field({}, description="Analysis parameters")
     case_id: Optional[int] = Field(None, description="Related case ID")
+    deduplicate: bool = Field(True, description="Reuse an identical recent task instead of running the agent again")
     
     class Config:
         schema_extra = {
@@ -88,6 +109,12 @@ class TaskCreateRequest(BaseModel):
     case_id: Optional[int] = Field(None, description="Related case ID")
     priority: TaskPriority = Field(TaskPriority.NORMAL, description="Task priority")
     metadata: Optional[Dict[str, Any]] = Field({}, description="Additional metadata")
+    deduplicate: bool = Field(True, description="Reuse an identical recent task instead of running the agent again")
+
+
+class TaskBatchRequest(BaseModel):
+    """Request schema for creating many tasks at once."""
+    tasks: List[TaskCreateRequest] = Field(..., min_length=1, description="Tasks to create")
 
 
 # Response Schemas
@@ -112,6 +139,21 @@ class TaskResponse(BaseModel):
         orm_mode = True
 
 
+class TaskBatchItem(BaseModel):
+    """Outcome of one task in a batch submission."""
+    index: int = Field(..., description="Position of the task in the request")
+    task: Optional[TaskResponse] = Field(None, description="Created or reused task")
+    error: Optional[Dict[str, Any]] = Field(None, description="Why this task was not created")
+
+
+class TaskBatchResponse(BaseModel):
+    """Response schema for a batch submission."""
+    created: int = Field(..., description="Tasks newly created")
+    deduplicated: int = Field(..., description="Entries attached to an existing task")
+    failed: int = Field(..., description="Entries refused or failed")
+    results: List[TaskBatchItem] = Field(..., description="One result per requested task, in request order")
+
+
 class DocumentResponse(BaseModel):
     """Response schema for generated documents."""
     id: int = Field(..., description="Document ID")
@@ -132,6 +174,8 @@ class HealthResponse(BaseModel):
     services: Dict[str, str] = Field(..., description="Service statuses")
     version: str = Field(..., description="Application version")
     uptime_seconds: float = Field(..., description="Uptime in seconds")
+    checked_at: Optional[datetime] = Field(None, description="When component checks last ran")
+    components: Dict[str, Any] = Field({}, description="Per-component check results")
 
 
 class ErrorResponse(BaseModel):
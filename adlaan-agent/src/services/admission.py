@@ -0,0 +1,223 @@
+"""
+Admission control for new tasks.
+Saturation is the worst of three load signals, each scaled so 1 means full:
+queue fill (queued tasks over task_queue_max_size), the estimated wait of a
+newly queued task (over admission_max_wait_seconds) and LLM gateway pressure
+(callers queued for a concurrency slot, or the rate-limit buckets running
+dry). Each priority is refused with 429 once saturation reaches its
+threshold, so LOW work is shed first and URGENT last, and the Retry-After is
+how long the backlog should take to drain back under that threshold. LLM
+pressure only delays calls, so URGENT work is never shed for it alone. A
+replica draining for shutdown refuses everything with 503.
+"""
+import dataclasses
+import math
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, TYPE_CHECKING
+
+from src.core.config import get_settings
+from src.core.exceptions import OverloadedError, ServiceUnavailableError
+from src.core.logging import get_logger
+from src.core.metrics import ADMISSION_REJECTED, ESTIMATED_WAIT, QUEUE_REJECTED, SATURATION
+from src.schemas import TaskPriority
+
+if TYPE_CHECKING:
+    from src.services.llm_gateway import LLMGateway
+    from src.services.scheduler import TaskScheduler
+    from src.services.task_queue import TaskQueue
+
+logger = get_logger(__name__)
+
+# Weight of the latest task in the running average of task duration
+SERVICE_TIME_ALPHA = 0.2
+
+
+@dataclass
+class Load:
+    """One measurement of the load signals."""
+    queue_depth: int
+    workers: int
+    busy: int
+    avg_task_seconds: float
+    estimated_wait_seconds: float
+    queue: float
+    wait: float
+    llm: float
+    
+    @property
+    def signals(self) -> Dict[str, float]:
+        """Each signal scaled so 1 means saturated."""
+        return {"queue": self.queue, "wait": self.wait, "llm": self.llm}
+    
+    @property
+    def saturation(self) -> float:
+        """The worst signal."""
+        return max(self.queue, self.wait, self.llm)
+    
+    @property
+    def reason(self) -> str:
+        """Name of the worst signal."""
+        signals = self.signals
+        return max(signals, key=signals.get)
+
+
+class AdmissionController:
+    """
+    Decides whether a new task is admitted.
+    
+    The queue depth is shared by every replica on the Redis backend while
+    workers are counted locally, so the wait estimate is conservative when
+    several replicas drain the same queue.
+    """
+    
+    def __init__(self, scheduler: "TaskScheduler", task_queue: "TaskQueue", gateway: Optional["LLMGateway"] = None):
+        self.settings = get_settings()
+        self.scheduler = scheduler
+        self.task_queue = task_queue
+        self._gateway = gateway
+        self.avg_task_seconds = self.settings.admission_default_task_seconds
+        self.draining = False
+    
+    @property
+    def gateway(self) -> "LLMGateway":
+        """The shared LLM gateway."""
+        if self._gateway is None:
+            from src.services.llm_gateway import get_llm_gateway
+            self._gateway = get_llm_gateway()
+        return self._gateway
+    
+    def threshold(self, priority: TaskPriority) -> float:
+        """Saturation at which tasks of a priority are refused."""
+        return float(self.settings.admission_shed_thresholds.get(priority.value, 1.0))
+    
+    def check_open(self) -> None:
+        """Raise ServiceUnavailableError once the replica has started draining."""
+        if self.draining:
+            raise ServiceUnavailableError("Service is shutting down; submit the task again to reach another instance")
+    
+    def record_task(self, seconds: float) -> None:
+        """Fold a finished task's duration into the service time estimate."""
+        self.avg_task_seconds += SERVICE_TIME_ALPHA * (seconds - self.avg_task_seconds)
+    
+    def _llm_pressure(self) -> float:
+        """How close the gateway is to making callers wait, from 0 to 1."""
+        gateway = self.gateway
+        queued = gateway.waiting / max(1, gateway.settings.llm_max_concurrency)
+        requests = 1 - gateway.request_bucket.available / gateway.request_bucket.capacity
+        # Unsettled reservations are mostly output allowance that is never used
+        tokens = 1 - gateway.tokens_unspent / gateway.token_bucket.capacity
+        return min(1.0, max(queued, requests, tokens))
+    
+    def _judged_load(self, load: Load, priority: TaskPriority) -> Load:
+        """The load a priority is shed by; URGENT work waits out LLM pressure instead."""
+        if priority == TaskPriority.URGENT:
+            return dataclasses.replace(load, llm=0.0)
+        return load
+    
+    def _with_backlog(self, load: Load, depth: int) -> Load:
+        """The load with the queue and wait signals recomputed for a backlog of depth tasks."""
+        estimated_wait = depth * load.avg_task_seconds / load.workers
+        max_queue_size = self.settings.task_queue_max_size
+        return dataclasses.replace(
+            load,
+            queue_depth=depth,
+            estimated_wait_seconds=estimated_wait,
+            queue=depth / max_queue_size if max_queue_size > 0 else 1.0,
+            wait=estimated_wait / self.settings.admission_max_wait_seconds
+        )
+    
+    async def measure(self) -> Load:
+        """Sample the load signals and publish them as metrics."""
+        load = self._with_backlog(Load(
+            queue_depth=0,
+            workers=max(1, self.scheduler.workers),
+            busy=self.scheduler.busy,
+            avg_task_seconds=max(self.avg_task_seconds, 0.001),
+            estimated_wait_seconds=0.0,
+            queue=0.0,
+            wait=0.0,
+            llm=self._llm_pressure()
+        ), await self.task_queue.depth() + self.scheduler.depth)
+        
+        for signal, value in load.signals.items():
+            SATURATION.set(value, signal=signal)
+        SATURATION.set(load.saturation, signal="overall")
+        ESTIMATED_WAIT.set(load.estimated_wait_seconds)
+        return load
+    
+    def _llm_recovery_seconds(self, load: Load, threshold: float) -> float:
+        """Time for the gateway's buckets to refill below a threshold."""
+        gateway = self.gateway
+        seconds = load.avg_task_seconds / load.workers if gateway.waiting else 0.0
+        buckets = [
+            (gateway.request_bucket, gateway.request_bucket.available),
+            (gateway.token_bucket, gateway.tokens_unspent)
+        ]
+        for bucket, available in buckets:
+            deficit = (1 - threshold) * bucket.capacity - available
+            if deficit > 0:
+                seconds = max(seconds, deficit / bucket.rate_per_second)
+        return seconds
+    
+    def retry_after(self, load: Load, threshold: float) -> int:
+        """Seconds until load should fall below a threshold, at current throughput."""
+        throughput = load.workers / load.avg_task_seconds
+        excess_tasks = max(
+            load.queue_depth - threshold * self.settings.task_queue_max_size,
+            (load.estimated_wait_seconds - threshold * self.settings.admission_max_wait_seconds) * throughput,
+            1
+        )
+        seconds = excess_tasks / throughput
+        if load.llm >= threshold:
+            seconds = max(seconds, self._llm_recovery_seconds(load, threshold))
+        return int(min(self.settings.admission_max_retry_after_seconds, max(1, math.ceil(seconds))))
+    
+    async def admit(self, priority: TaskPriority, count: int = 1) -> Load:
+        """Return the current load, or raise OverloadedError if count tasks of this priority would be shed."""
+        self.check_open()
+        load = await self.measure()
+        if count > 1:
+            # A batch is judged by the backlog it would leave behind
+            load = self._with_backlog(load, load.queue_depth + count - 1)
+        threshold = self.threshold(priority)
+        judged = self._judged_load(load, priority)
+        if judged.saturation < threshold:
+            return load
+        
+        load = judged
+        reason = load.reason
+        retry_after = self.retry_after(load, threshold)
+        ADMISSION_REJECTED.inc(priority=priority.value, reason=reason)
+        if load.queue >= 1:
+            QUEUE_REJECTED.inc(priority=priority.value)
+        logger.warning(f"Shedding {priority.value} task: saturation {load.saturation:.2f} ({reason}), retry after {retry_after}s")
+        raise OverloadedError(
+            f"Service is saturated, retry {priority.value} priority tasks later",
+            retry_after,
+            details={
+                "priority": priority.value,
+                "reason": reason,
+                "saturation": round(load.saturation, 3),
+                "estimated_wait_seconds": round(load.estimated_wait_seconds, 1)
+            }
+        )
+    
+    async def get_status(self) -> Dict[str, Any]:
+        """Saturation signals for autoscalers and dashboards."""
+        load = await self.measure()
+        return {
+            "saturation": round(load.saturation, 3),
+            "reason": load.reason,
+            "signals": {signal: round(value, 3) for signal, value in load.signals.items()},
+            "queue_depth": load.queue_depth,
+            "workers": load.workers,
+            "busy_workers": load.busy,
+            "avg_task_seconds": round(load.avg_task_seconds, 2),
+            "estimated_wait_seconds": round(load.estimated_wait_seconds, 1),
+            "llm_headroom": round(1 - load.llm, 3),
+            "draining": self.draining,
+            "shedding": [
+                priority.value for priority in TaskPriority
+                if self._judged_load(load, priority).saturation >= self.threshold(priority)
+            ]
+        }
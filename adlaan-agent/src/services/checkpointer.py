@@ -0,0 +1,578 @@
+"""
+Bounded workflow checkpointer shared by all agents.
+Keeps the latest checkpoints of recently used threads in memory (LRU by
+thread, capped by count and size), serializes them as zlib-compressed
+msgpack, and optionally writes them through to SQLite so an interrupted
+task can resume from its last completed node after a restart.
+"""
+import asyncio
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, List, Tuple, Iterator, AsyncIterator, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from src.core.config import get_settings
+from src.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Payloads at least this large are compressed
+COMPRESS_MIN_BYTES = 512
+
+COMPRESSED_SUFFIX = "+zlib"
+
+Typed = Tuple[str, bytes]
+
+
+class CompactSerializer(JsonPlusSerializer):
+    """msgpack serializer that zlib-compresses larger payloads."""
+    
+    def __init__(self, level: int = 3):
+        super().__init__()
+        self.level = level
+    
+    def dumps_typed(self, obj: Any) -> Typed:
+        """Serialize to msgpack, compressing large payloads."""
+        type_, data = super().dumps_typed(obj)
+        if len(data) >= COMPRESS_MIN_BYTES:
+            return type_ + COMPRESSED_SUFFIX, zlib.compress(data, self.level)
+        return type_, data
+    
+    def loads_typed(self, data: Typed) -> Any:
+        """Deserialize, decompressing when needed."""
+        type_, payload = data
+        if type_.endswith(COMPRESSED_SUFFIX):
+            return super().loads_typed((type_[:-len(COMPRESSED_SUFFIX)], zlib.decompress(payload)))
+        return super().loads_typed(data)
+
+
+@dataclass
+class _SavedCheckpoint:
+    """A serialized checkpoint and the pending writes recorded against it."""
+    checkpoint: Typed
+    metadata: Typed
+    parent_id: Optional[str]
+    writes: Dict[Tuple[str, int], Tuple[str, str, Typed, str]] = field(default_factory=dict)
+    
+    @property
+    def size(self) -> int:
+        """Approximate memory held by the serialized payloads."""
+        return (
+            len(self.checkpoint[1])
+            + len(self.metadata[1])
+            + sum(len(write[2][1]) for write in self.writes.values())
+        )
+
+
+class _ThreadCheckpoints:
+    """Retained checkpoints of one thread, oldest first per namespace."""
+    
+    def __init__(self):
+        self.namespaces: Dict[str, "OrderedDict[str, _SavedCheckpoint]"] = {}
+    
+    @property
+    def size(self) -> int:
+        """Approximate memory held by the thread's checkpoints."""
+        return sum(saved.size for saved in self.saved())
+    
+    def saved(self) -> Iterator[_SavedCheckpoint]:
+        """Every retained checkpoint."""
+        for checkpoints in self.namespaces.values():
+            yield from checkpoints.values()
+    
+    def get(self, checkpoint_ns: str, checkpoint_id: Optional[str]) -> Optional[Tuple[str, _SavedCheckpoint]]:
+        """A checkpoint by ID, or the latest one in the namespace."""
+        checkpoints = self.namespaces.get(checkpoint_ns)
+        if not checkpoints:
+            return None
+        if checkpoint_id is None:
+            checkpoint_id = max(checkpoints)
+        saved = checkpoints.get(checkpoint_id)
+        return (checkpoint_id, saved) if saved is not None else None
+    
+    def add(self, checkpoint_ns: str, checkpoint_id: str, saved: _SavedCheckpoint, history: int) -> None:
+        """Add a checkpoint, dropping the oldest beyond ``history``."""
+        checkpoints = self.namespaces.setdefault(checkpoint_ns, OrderedDict())
+        checkpoints[checkpoint_id] = saved
+        for stale_id in sorted(checkpoints)[:-history]:
+            del checkpoints[stale_id]
+
+
+class _SQLiteStore:
+    """Write-through SQLite copy of retained checkpoints."""
+    
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS checkpoints (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL,
+        checkpoint_id TEXT NOT NULL,
+        parent_id TEXT,
+        checkpoint_type TEXT NOT NULL,
+        checkpoint BLOB NOT NULL,
+        metadata_type TEXT NOT NULL,
+        metadata BLOB NOT NULL,
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+    );
+    CREATE TABLE IF NOT EXISTS writes (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL,
+        checkpoint_id TEXT NOT NULL,
+        task_id TEXT NOT NULL,
+        idx INTEGER NOT NULL,
+        channel TEXT NOT NULL,
+        value_type TEXT NOT NULL,
+        value BLOB NOT NULL,
+        task_path TEXT NOT NULL,
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+    );
+    """
+    
+    def __init__(self, path: str, history: int):
+        self.history = history
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+    
+    def save_checkpoint(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, saved: _SavedCheckpoint) -> None:
+        """Store a checkpoint and drop those beyond the retained history."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id, checkpoint_ns, checkpoint_id, saved.parent_id,
+                    saved.checkpoint[0], saved.checkpoint[1], saved.metadata[0], saved.metadata[1]
+                )
+            )
+            stale = self._conn.execute(
+                "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+                (thread_id, checkpoint_ns, self.history)
+            ).fetchall()
+            for (stale_id,) in stale:
+                for table in ("checkpoints", "writes"):
+                    self._conn.execute(
+                        f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                        (thread_id, checkpoint_ns, stale_id)
+                    )
+    
+    def save_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, rows: List[Tuple[Tuple[str, int], Tuple[str, str, Typed, str]]]) -> None:
+        """Store pending writes for a checkpoint."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, value[0], value[1], task_path)
+                    for (task_id, idx), (_, channel, value, task_path) in rows
+                ]
+            )
+    
+    def load_thread(self, thread_id: str) -> Optional[_ThreadCheckpoints]:
+        """Load every retained checkpoint of a thread."""
+        with self._lock:
+            checkpoints = self._conn.execute(
+                "SELECT checkpoint_ns, checkpoint_id, parent_id, checkpoint_type, checkpoint, metadata_type, metadata "
+                "FROM checkpoints WHERE thread_id = ? ORDER BY checkpoint_id",
+                (thread_id,)
+            ).fetchall()
+            writes = self._conn.execute(
+                "SELECT checkpoint_ns, checkpoint_id, task_id, idx, channel, value_type, value, task_path "
+                "FROM writes WHERE thread_id = ?",
+                (thread_id,)
+            ).fetchall()
+        
+        if not checkpoints:
+            return None
+        
+        thread = _ThreadCheckpoints()
+        for checkpoint_ns, checkpoint_id, parent_id, checkpoint_type, checkpoint, metadata_type, metadata in checkpoints:
+            thread.add(
+                checkpoint_ns,
+                checkpoint_id,
+                _SavedCheckpoint((checkpoint_type, checkpoint), (metadata_type, metadata), parent_id),
+                self.history
+            )
+        for checkpoint_ns, checkpoint_id, task_id, idx, channel, value_type, value, task_path in writes:
+            found = thread.get(checkpoint_ns, checkpoint_id)
+            if found:
+                found[1].writes[(task_id, idx)] = (task_id, channel, (value_type, value), task_path)
+        return thread
+    
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete a thread's checkpoints and writes."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            self._conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+    
+    def thread_ids(self) -> List[str]:
+        """IDs of stored threads."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT thread_id FROM checkpoints")]
+    
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class BoundedCheckpointer(BaseCheckpointSaver):
+    """
+    LangGraph checkpointer with bounded memory and optional SQLite persistence.
+    
+    Only the last ``history`` checkpoints of each thread are kept. Threads
+    are evicted least recently used first once ``max_threads`` or
+    ``max_memory_bytes`` is exceeded; with ``sqlite_path`` set, evicted
+    threads are reloaded from disk on demand and survive restarts.
+    """
+    
+    def __init__(
+        self,
+        max_threads: int = 500,
+        max_memory_bytes: int = 256 * 1024 * 1024,
+        history: int = 2,
+        sqlite_path: Optional[str] = None
+    ):
+        super().__init__(serde=CompactSerializer())
+        self.max_threads = max_threads
+        self.max_memory_bytes = max_memory_bytes
+        self.history = max(1, history)
+        self.store = _SQLiteStore(sqlite_path, self.history) if sqlite_path else None
+        self._threads: "OrderedDict[str, _ThreadCheckpoints]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self.memory_bytes = 0
+        self.stats = {"evictions": 0, "disk_loads": 0}
+    
+    def _cached(self, thread_id: str) -> Optional[_ThreadCheckpoints]:
+        """A thread from memory, marked as most recently used."""
+        thread = self._threads.get(thread_id)
+        if thread is not None:
+            self._threads.move_to_end(thread_id)
+        return thread
+    
+    def _cache(self, thread_id: str, thread: _ThreadCheckpoints) -> None:
+        """Insert or resize a thread and evict least recently used threads over the limits."""
+        self._threads[thread_id] = thread
+        self._threads.move_to_end(thread_id)
+        size = thread.size
+        self.memory_bytes += size - self._sizes.get(thread_id, 0)
+        self._sizes[thread_id] = size
+        
+        while len(self._threads) > 1 and (
+            len(self._threads) > self.max_threads or self.memory_bytes > self.max_memory_bytes
+        ):
+            evicted_id, _ = self._threads.popitem(last=False)
+            self.memory_bytes -= self._sizes.pop(evicted_id, 0)
+            self.stats["evictions"] += 1
+    
+    def _forget(self, thread_id: str) -> None:
+        """Drop a thread from memory."""
+        self._threads.pop(thread_id, None)
+        self.memory_bytes -= self._sizes.pop(thread_id, 0)
+    
+    def _load(self, thread_id: str) -> Optional[_ThreadCheckpoints]:
+        """A thread from memory, falling back to SQLite."""
+        thread = self._cached(thread_id)
+        if thread is None and self.store is not None:
+            thread = self.store.load_thread(thread_id)
+            if thread is not None:
+                self.stats["disk_loads"] += 1
+                self._cache(thread_id, thread)
+        return thread
+    
+    async def _aload(self, thread_id: str) -> Optional[_ThreadCheckpoints]:
+        """A thread from memory, falling back to SQLite off the event loop."""
+        thread = self._cached(thread_id)
+        if thread is None and self.store is not None:
+            thread = await asyncio.to_thread(self.store.load_thread, thread_id)
+            if thread is not None and thread_id not in self._threads:
+                self.stats["disk_loads"] += 1
+                self._cache(thread_id, thread)
+        return thread
+    
+    def thread_ids(self) -> List[str]:
+        """IDs of every thread with a retained checkpoint."""
+        stored = self.store.thread_ids() if self.store is not None else []
+        return self._merge_thread_ids(stored)
+    
+    async def athread_ids(self) -> List[str]:
+        """IDs of every thread with a retained checkpoint, scanning SQLite off the event loop."""
+        stored = await asyncio.to_thread(self.store.thread_ids) if self.store is not None else []
+        return self._merge_thread_ids(stored)
+    
+    def _merge_thread_ids(self, stored: List[str]) -> List[str]:
+        """Threads in memory followed by those only on disk."""
+        ids = list(self._threads)
+        ids.extend(thread_id for thread_id in stored if thread_id not in self._threads)
+        return ids
+    
+    def _tuple(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, saved: _SavedCheckpoint) -> CheckpointTuple:
+        """Deserialize a saved checkpoint into a tuple."""
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }},
+            checkpoint=self.serde.loads_typed(saved.checkpoint),
+            metadata=self.serde.loads_typed(saved.metadata),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed(value))
+                for task_id, channel, value, _ in saved.writes.values()
+            ],
+            parent_config=(
+                {"configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": saved.parent_id,
+                }}
+                if saved.parent_id else None
+            ),
+        )
+    
+    def _get_from(self, thread: Optional[_ThreadCheckpoints], config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Find the checkpoint a config refers to within a thread."""
+        if thread is None:
+            return None
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        found = thread.get(checkpoint_ns, get_checkpoint_id(config))
+        if found is None:
+            return None
+        return self._tuple(thread_id, checkpoint_ns, found[0], found[1])
+    
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Get a checkpoint by ID, or the thread's latest checkpoint."""
+        return self._get_from(self._load(config["configurable"]["thread_id"]), config)
+    
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Get a checkpoint by ID, or the thread's latest checkpoint."""
+        return self._get_from(await self._aload(config["configurable"]["thread_id"]), config)
+    
+    def _matching(
+        self,
+        thread_id: str,
+        thread: Optional[_ThreadCheckpoints],
+        config: Optional[RunnableConfig],
+        filter: Optional[Dict[str, Any]],
+        before: Optional[RunnableConfig]
+    ) -> Iterator[CheckpointTuple]:
+        """A thread's checkpoints that match the list arguments, newest first."""
+        if thread is None:
+            return
+        config_ns = config["configurable"].get("checkpoint_ns") if config else None
+        config_id = get_checkpoint_id(config) if config else None
+        before_id = get_checkpoint_id(before) if before else None
+        
+        for checkpoint_ns, checkpoints in thread.namespaces.items():
+            if config_ns is not None and checkpoint_ns != config_ns:
+                continue
+            for checkpoint_id in sorted(checkpoints, reverse=True):
+                if config_id and checkpoint_id != config_id:
+                    continue
+                if before_id and checkpoint_id >= before_id:
+                    continue
+                checkpoint = self._tuple(thread_id, checkpoint_ns, checkpoint_id, checkpoints[checkpoint_id])
+                if filter and not all(checkpoint.metadata.get(key) == value for key, value in filter.items()):
+                    continue
+                yield checkpoint
+    
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None
+    ) -> Iterator[CheckpointTuple]:
+        """List retained checkpoints, newest first."""
+        thread_ids = [config["configurable"]["thread_id"]] if config else self.thread_ids()
+        for thread_id in thread_ids:
+            for checkpoint in self._matching(thread_id, self._load(thread_id), config, filter, before):
+                if limit is not None:
+                    if limit <= 0:
+                        return
+                    limit -= 1
+                yield checkpoint
+    
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[CheckpointTuple]:
+        """List retained checkpoints, newest first, reading SQLite off the event loop."""
+        thread_ids = [config["configurable"]["thread_id"]] if config else await self.athread_ids()
+        for thread_id in thread_ids:
+            for checkpoint in self._matching(thread_id, await self._aload(thread_id), config, filter, before):
+                if limit is not None:
+                    if limit <= 0:
+                        return
+                    limit -= 1
+                yield checkpoint
+    
+    def _put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata
+    ) -> Tuple[RunnableConfig, str, str, _SavedCheckpoint]:
+        """Serialize a checkpoint into memory; returns what the store needs."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        saved = _SavedCheckpoint(
+            checkpoint=self.serde.dumps_typed(checkpoint),
+            metadata=self.serde.dumps_typed(get_checkpoint_metadata(config, metadata)),
+            parent_id=config["configurable"].get("checkpoint_id")
+        )
+        thread = self._cached(thread_id) or _ThreadCheckpoints()
+        thread.add(checkpoint_ns, checkpoint["id"], saved, self.history)
+        self._cache(thread_id, thread)
+        
+        next_config = {"configurable": {
+            "thread_id": thread_id,
+            "checkpoint_ns": checkpoint_ns,
+            "checkpoint_id": checkpoint["id"],
+        }}
+        return next_config, thread_id, checkpoint_ns, saved
+    
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions
+    ) -> RunnableConfig:
+        """Save a checkpoint."""
+        next_config, thread_id, checkpoint_ns, saved = self._put(config, checkpoint, metadata)
+        if self.store is not None:
+            self.store.save_checkpoint(thread_id, checkpoint_ns, checkpoint["id"], saved)
+        return next_config
+    
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions
+    ) -> RunnableConfig:
+        """Save a checkpoint."""
+        next_config, thread_id, checkpoint_ns, saved = self._put(config, checkpoint, metadata)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.save_checkpoint, thread_id, checkpoint_ns, checkpoint["id"], saved)
+        return next_config
+    
+    def _put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str
+    ) -> List[Tuple[Tuple[str, int], Tuple[str, str, Typed, str]]]:
+        """Record pending writes in memory; returns the new rows."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        thread = self._load(thread_id)
+        found = thread.get(checkpoint_ns, config["configurable"]["checkpoint_id"]) if thread else None
+        if found is None:
+            return []
+        
+        saved = found[1]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            key = (task_id, WRITES_IDX_MAP.get(channel, idx))
+            if key[1] >= 0 and key in saved.writes:
+                continue
+            saved.writes[key] = (task_id, channel, self.serde.dumps_typed(value), task_path)
+            rows.append((key, saved.writes[key]))
+        self._cache(thread_id, thread)
+        return rows
+    
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = ""
+    ) -> None:
+        """Save the writes a task produced against a checkpoint."""
+        rows = self._put_writes(config, writes, task_id, task_path)
+        if rows and self.store is not None:
+            configurable = config["configurable"]
+            self.store.save_writes(
+                configurable["thread_id"], configurable.get("checkpoint_ns", ""), configurable["checkpoint_id"], rows
+            )
+    
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = ""
+    ) -> None:
+        """Save the writes a task produced against a checkpoint."""
+        await self._aload(config["configurable"]["thread_id"])
+        rows = self._put_writes(config, writes, task_id, task_path)
+        if rows and self.store is not None:
+            configurable = config["configurable"]
+            await asyncio.to_thread(
+                self.store.save_writes,
+                configurable["thread_id"], configurable.get("checkpoint_ns", ""), configurable["checkpoint_id"], rows
+            )
+    
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete every checkpoint of a thread."""
+        self._forget(thread_id)
+        if self.store is not None:
+            self.store.delete_thread(thread_id)
+    
+    async def adelete_thread(self, thread_id: str) -> None:
+        """Delete every checkpoint of a thread."""
+        self._forget(thread_id)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.delete_thread, thread_id)
+    
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        """Monotonic channel versions, compatible with the in-memory saver."""
+        return InMemorySaver.get_next_version(self, current, channel)
+    
+    def close(self) -> None:
+        """Close the SQLite store, if any."""
+        if self.store is not None:
+            self.store.close()
+
+
+# Global checkpointer instance
+_checkpointer: Optional[BoundedCheckpointer] = None
+
+
+def get_checkpointer() -> BoundedCheckpointer:
+    """Get the process-wide checkpointer."""
+    global _checkpointer
+    if _checkpointer is None:
+        settings = get_settings()
+        _checkpointer = BoundedCheckpointer(
+            max_threads=settings.checkpoint_max_threads,
+            max_memory_bytes=settings.checkpoint_max_memory_mb * 1024 * 1024,
+            history=settings.checkpoint_history,
+            sqlite_path=settings.checkpoint_sqlite_path
+        )
+    return _checkpointer
@@ -0,0 +1,235 @@
+"""
+Duplicate task submission detection.
+Retried requests (an Idempotency-Key header) and identical submissions (the
+same agent, user, case and canonical input within a window) map to the task
+the first submission created, so a retry or double click attaches to that
+task instead of running the agent again. Keys are claimed before the task is
+created, so concurrent duplicates wait for the first one rather than racing.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Optional, List, Tuple
+
+from src.core.config import get_settings
+from src.core.exceptions import ServiceUnavailableError
+from src.core.logging import get_logger
+from src.schemas import AgentType
+
+logger = get_logger(__name__)
+
+try:
+    import redis.asyncio as redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# Value held by a key while its task is being created
+PENDING = "pending"
+
+# How long a duplicate waits for the first submission to create its task
+CLAIM_WAIT_SECONDS = 10.0
+CLAIM_POLL_SECONDS = 0.05
+
+# Entries kept by the in-process store before expired ones are purged
+IN_PROCESS_PURGE_SIZE = 10000
+
+IDEMPOTENCY_KEY = "idempotency_key"
+FINGERPRINT = "fingerprint"
+
+
+class KeyStore(ABC):
+    """Expiring key/value store with an atomic claim."""
+    
+    @abstractmethod
+    async def claim(self, key: str, value: str, ttl: int) -> Optional[str]:
+        """Set key if absent; returns None when claimed, else the current value."""
+    
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        """Current value, or None."""
+    
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        """Set key unconditionally."""
+    
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        """Remove keys."""
+    
+    async def close(self) -> None:
+        """Release any connections."""
+
+
+class InProcessKeyStore(KeyStore):
+    """Key store for a single instance."""
+    
+    def __init__(self):
+        self._values: Dict[str, Tuple[str, float]] = {}
+    
+    def _live(self, key: str) -> Optional[str]:
+        """Value of key unless it has expired."""
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._values[key]
+            return None
+        return entry[0]
+    
+    async def claim(self, key: str, value: str, ttl: int) -> Optional[str]:
+        """Set key if absent or expired."""
+        current = self._live(key)
+        if current is not None:
+            return current
+        if len(self._values) >= IN_PROCESS_PURGE_SIZE:
+            for stale in [k for k, (_, expires_at) in self._values.items() if expires_at <= time.monotonic()]:
+                del self._values[stale]
+        self._values[key] = (value, time.monotonic() + ttl)
+        return None
+    
+    async def get(self, key: str) -> Optional[str]:
+        """Value of key unless it has expired."""
+        return self._live(key)
+    
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        """Set key with a fresh expiry."""
+        self._values[key] = (value, time.monotonic() + ttl)
+    
+    async def delete(self, *keys: str) -> None:
+        """Remove keys."""
+        for key in keys:
+            self._values.pop(key, None)
+
+
+class RedisKeyStore(KeyStore):
+    """Key store shared by all replicas."""
+    
+    def __init__(self, url: Optional[str] = None, client: Optional[Any] = None):
+        if client is None and not REDIS_AVAILABLE:
+            raise ServiceUnavailableError("Shared duplicate detection requires the redis package")
+        self.client = client or redis.from_url(url or get_settings().redis_connection_url, decode_responses=True)
+    
+    async def claim(self, key: str, value: str, ttl: int) -> Optional[str]:
+        """SET NX, falling back to GET when the key exists."""
+        if await self.client.set(key, value, nx=True, ex=ttl):
+            return None
+        current = await self.client.get(key)
+        if current is None:
+            # Expired between the two calls
+            return await self.claim(key, value, ttl)
+        return current
+    
+    async def get(self, key: str) -> Optional[str]:
+        """GET key."""
+        return await self.client.get(key)
+    
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        """SET key with an expiry."""
+        await self.client.set(key, value, ex=ttl)
+    
+    async def delete(self, *keys: str) -> None:
+        """DEL keys."""
+        if keys:
+            await self.client.delete(*keys)
+    
+    async def close(self) -> None:
+        """Close the Redis connection pool."""
+        await self.client.aclose()
+
+
+def fingerprint(agent_type: AgentType, input_data: Dict[str, Any], user_id: int, case_id: Optional[int] = None) -> str:
+    """Hash of the agent, owner and canonical input; key order and whitespace between tokens do not matter."""
+    canonical = json.dumps(
+        {"agent_type": agent_type.value, "user_id": user_id, "case_id": case_id, "input_data": input_data},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class TaskDeduplicator:
+    """Maps idempotency keys and input fingerprints to the task they created."""
+    
+    def __init__(
+        self,
+        store: Optional[KeyStore] = None,
+        window_seconds: Optional[int] = None,
+        key_ttl_seconds: Optional[int] = None,
+        prefix: Optional[str] = None
+    ):
+        settings = get_settings()
+        self.store = store or create_key_store()
+        self.window_seconds = window_seconds if window_seconds is not None else settings.task_dedup_window_seconds
+        self.key_ttl_seconds = key_ttl_seconds or settings.idempotency_key_ttl_seconds
+        self.prefix = prefix or f"{settings.task_queue_prefix}:dedup"
+    
+    def keys_for(
+        self,
+        agent_type: AgentType,
+        input_data: Dict[str, Any],
+        user_id: int,
+        case_id: Optional[int] = None,
+        idempotency_key: Optional[str] = None,
+        deduplicate: bool = True
+    ) -> List[Tuple[str, str]]:
+        """The (kind, key) pairs a submission is tracked under."""
+        keys = []
+        if idempotency_key:
+            keys.append((IDEMPOTENCY_KEY, f"{self.prefix}:key:{user_id}:{idempotency_key}"))
+        if deduplicate and self.window_seconds > 0:
+            keys.append((FINGERPRINT, f"{self.prefix}:input:{fingerprint(agent_type, input_data, user_id, case_id)}"))
+        return keys
+    
+    def _ttl(self, kind: str) -> int:
+        """How long a key of this kind is remembered."""
+        return self.key_ttl_seconds if kind == IDEMPOTENCY_KEY else self.window_seconds
+    
+    async def acquire(self, keys: List[Tuple[str, str]]) -> Optional[Tuple[str, str]]:
+        """Claim the keys for a new task, or return (kind, task_id) of the task one already points to."""
+        claimed = []
+        for kind, key in keys:
+            deadline = time.monotonic() + CLAIM_WAIT_SECONDS
+            while True:
+                current = await self.store.claim(key, PENDING, self._ttl(kind))
+                if current is None:
+                    claimed.append((kind, key))
+                    break
+                if current != PENDING:
+                    # Remember the match under the keys claimed so far, too
+                    await self.complete(claimed, current)
+                    return kind, current
+                if time.monotonic() >= deadline:
+                    logger.warning(f"Gave up waiting for a duplicate submission to create its task ({kind})")
+                    break
+                await asyncio.sleep(CLAIM_POLL_SECONDS)
+        return None
+    
+    async def reset(self, keys: List[Tuple[str, str]]) -> None:
+        """Re-claim keys whose task can no longer be reused."""
+        for kind, key in keys:
+            await self.store.set(key, PENDING, self._ttl(kind))
+    
+    async def complete(self, keys: List[Tuple[str, str]], task_id: str) -> None:
+        """Point the keys at the created task."""
+        for kind, key in keys:
+            await self.store.set(key, str(task_id), self._ttl(kind))
+    
+    async def release(self, keys: List[Tuple[str, str]]) -> None:
+        """Forget keys after task creation failed."""
+        await self.store.delete(*(key for _, key in keys))
+    
+    async def close(self) -> None:
+        """Release the store."""
+        await self.store.close()
+
+
+def create_key_store() -> KeyStore:
+    """Share keys through Redis when the task queue does, else keep them in process."""
+    if get_settings().task_queue_backend == "redis":
+        return RedisKeyStore()
+    return InProcessKeyStore()
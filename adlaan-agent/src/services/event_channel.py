@@ -0,0 +1,137 @@
+"""
+In-process event channel for streaming task events to live subscribers.
+Agents publish token deltas and stage markers keyed by task ID; SSE endpoints
+subscribe and receive a replay of earlier events followed by live ones.
+"""
+import asyncio
+from collections import deque
+from typing import Dict, Any, Optional, List, AsyncGenerator
+from datetime import datetime
+
+from src.core.config import get_settings
+from src.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class _Channel:
+    """State for a single task channel."""
+    
+    def __init__(self, history_limit: int):
+        self.history: deque = deque(maxlen=history_limit)
+        self.subscribers: List[asyncio.Queue] = []
+        self.closed = False
+
+
+class TaskEventChannel:
+    """Publish/subscribe channel for per-task streaming events."""
+    
+    # Sentinel pushed to subscriber queues when a channel closes
+    _CLOSED = object()
+    
+    def __init__(self, history_limit: int = 10000, retention_seconds: float = 300):
+        self.history_limit = history_limit
+        self.retention_seconds = retention_seconds
+        self._channels: Dict[str, _Channel] = {}
+    
+    def open(self, channel_id: str) -> None:
+        """Open a channel so events can be published and subscribed to."""
+        if channel_id not in self._channels or self._channels[channel_id].closed:
+            self._channels[channel_id] = _Channel(self.history_limit)
+    
+    def exists(self, channel_id: str) -> bool:
+        """Check whether a channel is open or still retained after closing."""
+        return channel_id in self._channels
+    
+    def publish(self, channel_id: Optional[str], event: Dict[str, Any]) -> None:
+        """Publish an event. Events for unknown or closed channels are dropped."""
+        if not channel_id:
+            return
+        channel = self._channels.get(channel_id)
+        if channel is None or channel.closed:
+            return
+        
+        event.setdefault("timestamp", datetime.utcnow().isoformat())
+        channel.history.append(event)
+        for queue in channel.subscribers:
+            queue.put_nowait(event)
+    
+    def close(self, channel_id: str) -> None:
+        """Close a channel; history is retained for late subscribers."""
+        channel = self._channels.get(channel_id)
+        if channel is None or channel.closed:
+            return
+        
+        channel.closed = True
+        for queue in channel.subscribers:
+            queue.put_nowait(self._CLOSED)
+        channel.subscribers.clear()
+        
+        try:
+            loop = asyncio.get_running_loop()
+            loop.call_later(self.retention_seconds, self._discard, channel_id, channel)
+        except RuntimeError:
+            self._discard(channel_id, channel)
+    
+    def _discard(self, channel_id: str, channel: _Channel) -> None:
+        """Drop a closed channel unless it has been reopened since."""
+        if self._channels.get(channel_id) is channel:
+            self._channels.pop(channel_id, None)
+    
+    async def subscribe(
+        self,
+        channel_id: str,
+        heartbeat_seconds: Optional[float] = None
+    ) -> AsyncGenerator[Optional[Dict[str, Any]], None]:
+        """
+        Yield past and live events for a channel until it closes.
+        
+        When ``heartbeat_seconds`` is set, ``None`` is yielded after that many
+        idle seconds so callers can keep connections alive.
+        """
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            return
+        
+        # Snapshot history and register in the same step so no event is missed
+        backlog = list(channel.history)
+        if channel.closed:
+            for event in backlog:
+                yield event
+            return
+        
+        queue: asyncio.Queue = asyncio.Queue()
+        channel.subscribers.append(queue)
+        try:
+            for event in backlog:
+                yield event
+            
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                
+                if item is self._CLOSED:
+                    break
+                yield item
+        finally:
+            if queue in channel.subscribers:
+                channel.subscribers.remove(queue)
+
+
+# Global channel instance
+_event_channel: Optional[TaskEventChannel] = None
+
+
+def get_event_channel() -> TaskEventChannel:
+    """Get the process-wide task event channel."""
+    global _event_channel
+    if _event_channel is None:
+        settings = get_settings()
+        _event_channel = TaskEventChannel(
+            history_limit=settings.stream_history_limit,
+            retention_seconds=settings.stream_retention_seconds
+        )
+    return _event_channel
@@ -0,0 +1,162 @@
+"""
+Weighted fair queuing across tenants.
+Each tenant (an organization, or the submitting user when none is given)
+gets its own lane, oldest task first, and lanes are served by deficit round-robin: on its
+turn a lane earns its weight in credit and sends one task per whole credit,
+so over time tenants get execution slots in proportion to their weights no
+matter how deep their backlogs are. A tenant with 10k queued tasks and one
+with a single task alternate rather than queue behind each other.
+TenantTurns keeps just the turn order, for queues whose lanes live elsewhere.
+"""
+import heapq
+import itertools
+from collections import deque
+from typing import Dict, Any, Optional, List, Tuple, Callable, Deque, Iterator
+
+from src.core.config import get_settings
+
+# Tenant of tasks that name neither an organization nor a user
+DEFAULT_TENANT = "default"
+
+
+def tenant_weight(tenant: str) -> float:
+    """Configured share of a tenant, relative to the default of 1."""
+    return float(get_settings().tenant_weights.get(tenant, 1.0))
+
+
+def tenant_concurrency_limit(tenant: str) -> int:
+    """Tasks a tenant may have in flight at once; 0 means no limit."""
+    settings = get_settings()
+    return int(settings.tenant_concurrency_overrides.get(tenant, settings.tenant_max_concurrent_tasks))
+
+
+def has_capacity(tenant: str, in_flight: int) -> bool:
+    """Whether a tenant with in_flight tasks may be given another."""
+    limit = tenant_concurrency_limit(tenant)
+    return limit <= 0 or in_flight < limit
+
+
+def tenant_of(payload: Dict[str, Any]) -> str:
+    """Tenant a queued task's payload is filed under."""
+    return payload.get("tenant") or DEFAULT_TENANT
+
+
+class TenantTurns:
+    """Deficit round-robin turn order among tenants that have work waiting."""
+    
+    def __init__(self, weight: Callable[[str], float] = tenant_weight):
+        self.weight = weight
+        self._deficit: Dict[str, float] = {}
+        self._turns: Deque[str] = deque()  # current turn first
+    
+    def __contains__(self, tenant: str) -> bool:
+        return tenant in self._deficit
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._turns))
+    
+    def add(self, tenant: str) -> None:
+        """Give a tenant with newly waiting work a place at the back of the line."""
+        if tenant not in self._deficit:
+            self._deficit[tenant] = 0.0
+            self._turns.append(tenant)
+    
+    def remove(self, tenant: str) -> None:
+        """Drop a tenant with nothing left waiting; an idle tenant does not bank credit."""
+        if self._deficit.pop(tenant, None) is not None:
+            self._turns.remove(tenant)
+    
+    def next(self, eligible: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        """Tenant whose work goes next, charging it one item; None if no tenant is eligible."""
+        while True:
+            # A capped tenant keeps its place and credit for when it is eligible again
+            tenant = next((t for t in self._turns if eligible is None or eligible(t)), None)
+            if tenant is None:
+                return None
+            
+            if self._deficit[tenant] < 1:
+                self._deficit[tenant] += max(self.weight(tenant), 0.001)
+                if self._deficit[tenant] < 1:
+                    self._end_turn(tenant)
+                    continue
+            
+            self._deficit[tenant] -= 1
+            if self._deficit[tenant] < 1:
+                self._end_turn(tenant)
+            return tenant
+    
+    def _end_turn(self, tenant: str) -> None:
+        """Send a tenant that has used its credit to the back of the line."""
+        self._turns.remove(tenant)
+        self._turns.append(tenant)
+
+
+class DeficitRoundRobin:
+    """Per-tenant lanes, ordered by key within a lane, served in weighted round-robin order."""
+    
+    def __init__(self, weight: Callable[[str], float] = tenant_weight):
+        self.turns = TenantTurns(weight)
+        self._lanes: Dict[str, List[Tuple[float, int, Any]]] = {}
+        self._sequence = itertools.count()
+        self._size = 0
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def __iter__(self) -> Iterator[Any]:
+        """Every queued item, lane by lane."""
+        for lane in self._lanes.values():
+            for entry in sorted(lane):
+                yield entry[-1]
+    
+    @property
+    def tenants(self) -> Dict[str, int]:
+        """Queued items per tenant."""
+        return {tenant: len(lane) for tenant, lane in self._lanes.items()}
+    
+    def oldest_key(self, eligible: Optional[Callable[[str], bool]] = None) -> Optional[float]:
+        """Lowest key at the head of an eligible tenant's lane; None if there is none."""
+        return min(
+            (lane[0][0] for tenant, lane in self._lanes.items() if eligible is None or eligible(tenant)),
+            default=None
+        )
+    
+    def push(self, tenant: str, item: Any, key: float = 0.0) -> None:
+        """Add an item to its tenant's lane; lower keys leave the lane first."""
+        lane = self._lanes.setdefault(tenant, [])
+        self.turns.add(tenant)
+        heapq.heappush(lane, (key, next(self._sequence), item))
+        self._size += 1
+    
+    def pop(self, eligible: Optional[Callable[[str], bool]] = None) -> Optional[Any]:
+        """Take the next item in fair order, skipping tenants that are not eligible."""
+        tenant = self.turns.next(eligible)
+        if tenant is None:
+            return None
+        
+        lane = self._lanes[tenant]
+        item = heapq.heappop(lane)[-1]
+        self._size -= 1
+        if not lane:
+            self._remove(tenant)
+        return item
+    
+    def _remove(self, tenant: str) -> None:
+        """Forget an empty lane."""
+        del self._lanes[tenant]
+        self.turns.remove(tenant)
+    
+    def discard(self, predicate: Callable[[Any], bool]) -> int:
+        """Remove every queued item matching predicate; returns how many."""
+        removed = 0
+        for tenant in list(self._lanes):
+            lane = self._lanes[tenant]
+            kept = [entry for entry in lane if not predicate(entry[-1])]
+            removed += len(lane) - len(kept)
+            if kept:
+                heapq.heapify(kept)
+                self._lanes[tenant] = kept
+            else:
+                self._remove(tenant)
+        self._size -= removed
+        return removed
@@ -0,0 +1,183 @@
+"""
+Background health monitoring.
+Component checks run on a fixed interval in a background task and their
+results are kept as a snapshot, so health, liveness and readiness probes
+are answered from memory without touching the backend or the LLM.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, Awaitable
+
+from src.core.config import get_settings
+from src.core.logging import get_logger
+from src.core.metrics import COMPONENT_HEALTHY, HEALTH_CHECK_DURATION
+
+logger = get_logger(__name__)
+
+HealthCheck = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+@dataclass
+class _Component:
+    """A registered health check and its last result."""
+    name: str
+    check: HealthCheck
+    critical: bool
+    status: str = "unknown"
+    details: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    latency_ms: float = 0.0
+    checked_at: Optional[datetime] = None
+
+
+class HealthMonitor:
+    """
+    Runs component checks in the background and serves cached results.
+    
+    A check is an async callable returning details and raising when the
+    component is unhealthy. Critical components gate readiness; the others
+    only mark the service as degraded.
+    """
+    
+    def __init__(self, interval_seconds: Optional[float] = None, timeout_seconds: Optional[float] = None):
+        settings = get_settings()
+        self.interval_seconds = interval_seconds or settings.health_check_interval_seconds
+        self.timeout_seconds = timeout_seconds or settings.health_check_timeout_seconds
+        self.started_at = time.monotonic()
+        self._components: Dict[str, _Component] = {}
+        self._snapshot: Dict[str, Any] = {"status": "starting", "components": {}, "checked_at": None}
+        self._refreshed_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def register(self, name: str, check: HealthCheck, critical: bool = True) -> None:
+        """Register a component check."""
+        self._components[name] = _Component(name=name, check=check, critical=critical)
+    
+    async def start(self) -> None:
+        """Start refreshing in the background; the first refresh runs immediately."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Stop the background refresh."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self) -> None:
+        """Refresh on the configured interval until cancelled."""
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Health refresh failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+    
+    async def refresh(self) -> Dict[str, Any]:
+        """Run every check concurrently and publish a new snapshot."""
+        await asyncio.gather(*(self._check(component) for component in self._components.values()))
+        self._refreshed_at = time.monotonic()
+        self._snapshot = self._build_snapshot()
+        return self._snapshot
+    
+    async def _check(self, component: _Component) -> None:
+        """Run one check with a timeout and record its result."""
+        started_at = time.perf_counter()
+        try:
+            component.details = await asyncio.wait_for(component.check(), timeout=self.timeout_seconds) or {}
+            component.status = "healthy"
+            component.error = None
+        except asyncio.TimeoutError:
+            component.status = "unhealthy"
+            component.error = f"Check timed out after {self.timeout_seconds}s"
+        except Exception as e:
+            component.status = "unhealthy"
+            component.error = str(e)
+        
+        elapsed = time.perf_counter() - started_at
+        component.latency_ms = round(elapsed * 1000, 1)
+        component.checked_at = datetime.utcnow()
+        HEALTH_CHECK_DURATION.observe(elapsed, component=component.name)
+        COMPONENT_HEALTHY.set(1 if component.status == "healthy" else 0, component=component.name)
+        if component.error:
+            logger.warning(f"Health check for {component.name} failed: {component.error}")
+    
+    def _build_snapshot(self) -> Dict[str, Any]:
+        """Summarize component results into an overall status."""
+        components = self._components.values()
+        if any(c.critical and c.status != "healthy" for c in components):
+            status = "unhealthy"
+        elif any(c.status != "healthy" for c in components):
+            status = "degraded"
+        else:
+            status = "healthy"
+        
+        return {
+            "status": status,
+            "checked_at": datetime.utcnow(),
+            "components": {
+                c.name: {
+                    "status": c.status,
+                    "critical": c.critical,
+                    "latency_ms": c.latency_ms,
+                    "error": c.error,
+                    "details": c.details
+                }
+                for c in components
+            }
+        }
+    
+    @property
+    def is_stale(self) -> bool:
+        """Whether the background refresh has stopped keeping up."""
+        if self._refreshed_at is None:
+            return True
+        return time.monotonic() - self._refreshed_at > self.interval_seconds * 3 + self.timeout_seconds
+    
+    @property
+    def uptime_seconds(self) -> float:
+        """Seconds since the monitor was created."""
+        return time.monotonic() - self.started_at
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """The last published snapshot."""
+        if self._refreshed_at is not None and self.is_stale:
+            return {**self._snapshot, "status": "stale"}
+        return self._snapshot
+    
+    def liveness(self) -> Dict[str, Any]:
+        """Liveness: the process is up and its event loop is serving requests."""
+        return {"status": "alive", "uptime_seconds": round(self.uptime_seconds, 1)}
+    
+    def readiness(self) -> Dict[str, Any]:
+        """Readiness: every critical component passed its last, recent check."""
+        snapshot = self.snapshot()
+        failing = [
+            name for name, component in snapshot["components"].items()
+            if component["critical"] and component["status"] != "healthy"
+        ]
+        ready = snapshot["status"] in ("healthy", "degraded") and not failing
+        return {
+            "ready": ready,
+            "status": snapshot["status"],
+            "failing": failing,
+            "checked_at": snapshot["checked_at"].isoformat() if snapshot["checked_at"] else None
+        }
+
+
+# Global monitor instance
+_health_monitor: Optional[HealthMonitor] = None
+
+
+def get_health_monitor() -> HealthMonitor:
+    """Get the process-wide health monitor."""
+    global _health_monitor
+    if _health_monitor is None:
+        _health_monitor = HealthMonitor()
+    return _health_monitor
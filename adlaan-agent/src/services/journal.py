@@ -0,0 +1,156 @@
+"""
+Append-only JSON-lines journal.
+Each record is one line. Records are handed to a background writer that
+appends them in batches from a worker thread, so the event loop never waits
+on the disk; callers that need a record on disk await flush(), and
+concurrent callers share one write. flush() raises the OSError of a failed
+write, so a full or read-only disk is reported rather than hidden. Appends
+are handed to the OS but not fsynced: a flushed record survives a crash of
+this process, not of the host. Replay skips a torn last line. The owner
+periodically rewrites the file with just the records that still matter
+(written to a temporary file, synced and renamed over the old one), which
+keeps replay time proportional to live state rather than history.
+"""
+import asyncio
+import json
+import os
+from typing import Dict, Any, Optional, List, Tuple, TextIO
+
+from src.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class AppendOnlyJournal:
+    """A local file of JSON records, appended to and replayed in order."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.appended = 0  # records since the last rewrite
+        self._file: Optional[TextIO] = None
+        self._queued: List[Tuple[str, Any]] = []  # ("append", record) and ("rewrite", records), in order
+        self._writer: Optional[asyncio.Task] = None  # resolves to the error of a failed write, if any
+    
+    def append(self, record: Dict[str, Any]) -> None:
+        """Queue one record for the background writer."""
+        self._queued.append(("append", record))
+        self.appended += 1
+        self._wake()
+    
+    def rewrite(self, records: List[Dict[str, Any]]) -> None:
+        """Queue an atomic replacement of the journal with the given records."""
+        self._queued.append(("rewrite", records))
+        self.appended = 0
+        self._wake()
+    
+    async def flush(self) -> None:
+        """Wait until every queued record is written; raises OSError if a write failed meanwhile."""
+        while self._writer is not None and not self._writer.done():
+            error = await asyncio.shield(self._writer)
+            if error is not None:
+                raise error
+        if self._queued:
+            # Queued outside a running loop; write them here
+            self._wake()
+            await self.flush()
+    
+    async def close(self) -> None:
+        """Write what is queued, then sync and close the file."""
+        await self.flush()
+        await asyncio.to_thread(self._close)
+    
+    def replay(self) -> List[Dict[str, Any]]:
+        """Every readable record, oldest first; blocking, so call it from a thread."""
+        if not os.path.exists(self.path):
+            return []
+        
+        records = []
+        with open(self.path, encoding="utf-8") as journal:
+            for number, line in enumerate(journal, 1):
+                if not line.strip():
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping unreadable record {number} of journal {self.path}")
+        return records
+    
+    def _wake(self) -> None:
+        """Start the background writer unless it is already running."""
+        if self._writer is not None and not self._writer.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._writer = loop.create_task(self._write_queued())
+    
+    async def _write_queued(self) -> Optional[OSError]:
+        """Write queued batches in a worker thread until none are left; returns the error that stopped it, if any."""
+        while self._queued:
+            batch, self._queued = self._queued, []
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except OSError as e:
+                # Everything queued behind the failed write is reported to the same waiters
+                dropped = len(batch) + len(self._queued)
+                self._queued = []
+                logger.error(f"Could not write {dropped} operations to journal {self.path}: {e}")
+                return e
+        return None
+    
+    def _write_batch(self, batch: List[Tuple[str, Any]]) -> None:
+        """Apply appends and rewrites in order, appending consecutive records with one flush."""
+        lines = []
+        for op, value in batch:
+            if op == "append":
+                lines.append(self._line(value))
+                continue
+            self._append_lines(lines)
+            lines = []
+            self._replace(value)
+        self._append_lines(lines)
+    
+    @staticmethod
+    def _line(record: Dict[str, Any]) -> str:
+        """A record as one line of JSON."""
+        return json.dumps(record, default=str, separators=(",", ":")) + "\n"
+    
+    def _open(self) -> TextIO:
+        """The file, opened for appending."""
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        return self._file
+    
+    def _append_lines(self, lines: List[str]) -> None:
+        """Append lines and hand them to the OS."""
+        if not lines:
+            return
+        journal = self._open()
+        journal.write("".join(lines))
+        journal.flush()
+    
+    def _replace(self, records: List[Dict[str, Any]]) -> None:
+        """Write records to a temporary file, sync it and rename it over the journal."""
+        self._close()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as journal:
+            journal.write("".join(self._line(record) for record in records))
+            journal.flush()
+            os.fsync(journal.fileno())
+        os.replace(temporary, self.path)
+    
+    def _close(self) -> None:
+        """Sync and close the file."""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
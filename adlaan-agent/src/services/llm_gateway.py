@@ -0,0 +1,516 @@
+"""
+Process-wide LLM gateway shared by all agents.
+Applies request and token rate limits, a global concurrency cap, per-agent
+quotas and jittered exponential retry in front of a single chat model client.
+Concurrent identical requests are coalesced into one upstream call.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import time
+from typing import Dict, Any, Optional, List, AsyncGenerator, AsyncIterator, Callable
+
+from src.core.config import get_settings
+from src.core.logging import get_logger
+from src.core.metrics import (
+    current_node,
+    LLM_DURATION,
+    LLM_FIRST_TOKEN,
+    LLM_IN_FLIGHT,
+    LLM_TOKENS,
+    LLM_ERRORS,
+    LLM_RETRIES
+)
+from src.utils.prompt_builder import count_message_tokens, count_tokens
+
+logger = get_logger(__name__)
+
+try:
+    from openai import APIConnectionError
+    OPENAI_ERRORS_AVAILABLE = True
+except ImportError:
+    OPENAI_ERRORS_AVAILABLE = False
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a per-minute rate.
+    Waiters are served in arrival order so throughput stays smooth near the limit.
+    """
+    
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self) -> None:
+        """Add tokens accrued since the last update."""
+        now = time.monotonic()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate_per_second)
+    
+    @property
+    def available(self) -> float:
+        """Tokens currently available."""
+        self._refill()
+        return self._tokens
+    
+    async def acquire(self, amount: float = 1) -> None:
+        """Wait until ``amount`` tokens are available and take them."""
+        # A single request larger than the bucket may take the whole bucket
+        amount = min(amount, self.capacity)
+        
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                deficit = amount - self._tokens
+                await asyncio.sleep(deficit / self.rate_per_second)
+                self._refill()
+            self._tokens -= amount
+    
+    def refund(self, amount: float) -> None:
+        """Return tokens that were reserved but not used."""
+        if amount <= 0:
+            return
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Check whether an LLM error is a rate limit, server error or transient failure."""
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    
+    if status_code is not None:
+        return status_code == 429 or status_code >= 500
+    
+    if OPENAI_ERRORS_AVAILABLE and isinstance(error, APIConnectionError):
+        return True
+    
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError))
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read a Retry-After hint from a provider error, if present."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def request_key(messages: List[Any], kwargs: Dict[str, Any]) -> str:
+    """Hash a request's messages and call options to identify identical requests."""
+    payload = {
+        "messages": [
+            [getattr(message, "type", type(message).__name__), str(getattr(message, "content", message))]
+            for message in messages
+        ],
+        "options": kwargs
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class _Flight:
+    """An in-flight upstream call shared by every identical concurrent request."""
+    
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class _SharedStream:
+    """
+    An upstream stream consumed once and replayed to every subscriber.
+    Late subscribers first receive the chunks already produced.
+    """
+    
+    def __init__(self, source: AsyncIterator[Any]):
+        self.chunks: List[Any] = []
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.subscribers = 0
+        self._updated = asyncio.Event()
+        self.task = asyncio.create_task(self._pump(source))
+    
+    def _notify(self) -> None:
+        """Wake subscribers waiting for the next chunk."""
+        self._updated.set()
+        self._updated = asyncio.Event()
+    
+    async def _pump(self, source: AsyncIterator[Any]) -> None:
+        """Read the upstream stream into the shared buffer."""
+        try:
+            async for chunk in source:
+                self.chunks.append(chunk)
+                self._notify()
+        except asyncio.CancelledError:
+            self.error = asyncio.CancelledError()
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+    
+    async def subscribe(self) -> AsyncGenerator[Any, None]:
+        """Yield every chunk from the start of the stream."""
+        position = 0
+        while True:
+            if position < len(self.chunks):
+                yield self.chunks[position]
+                position += 1
+                continue
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._updated.wait()
+
+
+class GatewayChatModel:
+    """Chat model facade bound to one agent; every call goes through the gateway."""
+    
+    def __init__(self, gateway: "LLMGateway", agent_name: str):
+        self.gateway = gateway
+        self.agent_name = agent_name
+    
+    async def ainvoke(self, messages: List[Any], **kwargs) -> Any:
+        """Invoke the shared model."""
+        return await self.gateway.invoke(messages, agent_name=self.agent_name, **kwargs)
+    
+    async def astream(self, messages: List[Any], **kwargs) -> AsyncGenerator[Any, None]:
+        """Stream from the shared model."""
+        async for chunk in self.gateway.stream(messages, agent_name=self.agent_name, **kwargs):
+            yield chunk
+
+
+class LLMGateway:
+    """Shared, rate-limited access to the chat model."""
+    
+    def __init__(self, model: Any = None, model_factory: Optional[Callable[[], Any]] = None):
+        self.settings = get_settings()
+        self.logger = logger
+        self._model = model
+        self._model_factory = model_factory or self._build_default_model
+        
+        self.request_bucket = TokenBucket(self.settings.llm_requests_per_minute)
+        self.token_bucket = TokenBucket(self.settings.llm_tokens_per_minute)
+        self.concurrency = asyncio.Semaphore(self.settings.llm_max_concurrency)
+        self._agent_quotas: Dict[str, asyncio.Semaphore] = {
+            agent_name: asyncio.Semaphore(limit)
+            for agent_name, limit in self.settings.llm_agent_quotas.items()
+        }
+        
+        self.in_flight = 0
+        self.waiting = 0
+        self.tokens_outstanding = 0  # reserved by calls that have not settled yet
+        self.consecutive_failures = 0
+        self.last_success_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._flights: Dict[str, _Flight] = {}
+        self._streams: Dict[str, _SharedStream] = {}
+        self.stats: Dict[str, int] = {
+            "requests": 0,
+            "retries": 0,
+            "failures": 0,
+            "tokens_reserved": 0,
+            "coalesced": 0
+        }
+    
+    def _build_default_model(self) -> Any:
+        """Build the shared chat model client from settings."""
+        # Imported lazily: base_agent provides the mock fallback when LangChain is missing
+        from src.agents.base_agent.base_agent import ChatOpenAI
+        
+        return ChatOpenAI(
+            model=self.settings.openai_model,
+            temperature=self.settings.openai_temperature,
+            max_tokens=self.settings.openai_max_tokens,
+            api_key=self.settings.openai_api_key,
+            base_url=self.settings.openai_base_url,
+            max_retries=0  # Retries are handled by the gateway
+        )
+    
+    @property
+    def model(self) -> Any:
+        """The shared chat model, created on first use."""
+        if self._model is None:
+            self._model = self._model_factory()
+        return self._model
+    
+    def client_for(self, agent_name: str) -> GatewayChatModel:
+        """Get a chat model facade for an agent."""
+        return GatewayChatModel(self, agent_name)
+    
+    def _reservation(self, prompt_tokens: int, kwargs: Dict[str, Any]) -> int:
+        """Tokens to reserve for a call: prompt tokens plus the output allowance."""
+        max_output = kwargs.get("max_tokens") or self.settings.openai_max_tokens
+        return prompt_tokens + max_output
+    
+    async def _acquire(self, agent_name: str, reserved_tokens: int) -> List[asyncio.Semaphore]:
+        """Wait for quota, concurrency and rate capacity; return the held semaphores."""
+        held = []
+        self.waiting += 1
+        try:
+            quota = self._agent_quotas.get(agent_name)
+            if quota is not None:
+                await quota.acquire()
+                held.append(quota)
+            
+            await self.concurrency.acquire()
+            held.append(self.concurrency)
+            
+            await self.request_bucket.acquire(1)
+            await self.token_bucket.acquire(reserved_tokens)
+        except BaseException:
+            self._release(held)
+            raise
+        finally:
+            self.waiting -= 1
+        
+        self.in_flight += 1
+        self.tokens_outstanding += reserved_tokens
+        LLM_IN_FLIGHT.labels(agent=agent_name).inc()
+        self.stats["requests"] += 1
+        self.stats["tokens_reserved"] += reserved_tokens
+        return held
+    
+    def _release(self, held: List[asyncio.Semaphore]) -> None:
+        """Release held semaphores in reverse order."""
+        for semaphore in reversed(held):
+            semaphore.release()
+    
+    def _end_call(self, agent_name: str, held: List[asyncio.Semaphore], reserved_tokens: int) -> None:
+        """Mark an upstream call finished and release its capacity."""
+        self.in_flight -= 1
+        self.tokens_outstanding -= reserved_tokens
+        LLM_IN_FLIGHT.labels(agent=agent_name).dec()
+        self._release(held)
+    
+    def _record_usage(self, agent_name: str, node: str, prompt_tokens: int, content: Any, usage: Optional[Dict[str, Any]]) -> int:
+        """Count tokens from provider usage, falling back to local estimates; returns the total used."""
+        self.consecutive_failures = 0
+        self.last_success_at = time.time()
+        if usage:
+            prompt_tokens = usage.get("input_tokens", prompt_tokens)
+            completion_tokens = usage.get("output_tokens", 0)
+        else:
+            completion_tokens = count_tokens(content if isinstance(content, str) else str(content or ""))
+        LLM_TOKENS.inc(prompt_tokens, agent=agent_name, node=node, kind="prompt")
+        LLM_TOKENS.inc(completion_tokens, agent=agent_name, node=node, kind="completion")
+        return prompt_tokens + completion_tokens
+    
+    def _record_failure(self, agent_name: str, error: Exception) -> None:
+        """Count a call that failed for good; feeds passive LLM health."""
+        self.stats["failures"] += 1
+        self.consecutive_failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        LLM_ERRORS.inc(agent=agent_name, error=type(error).__name__)
+    
+    def _settle_tokens(self, reserved_tokens: int, used_tokens: int) -> None:
+        """Refund the unused part of a token reservation once usage is known."""
+        self.token_bucket.refund(reserved_tokens - used_tokens)
+    
+    def _backoff_delay(self, attempt: int, error: Exception) -> float:
+        """Jittered exponential backoff, honoring provider Retry-After hints."""
+        ceiling = min(
+            self.settings.llm_retry_max_delay,
+            self.settings.llm_retry_base_delay * (2 ** attempt)
+        )
+        delay = random.uniform(ceiling / 2, ceiling)
+        retry_after = _retry_after_seconds(error)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+    
+    async def invoke(self, messages: List[Any], agent_name: str = "default", **kwargs) -> Any:
+        """
+        Invoke the model, sharing one upstream call between identical concurrent requests.
+        
+        A cancelled caller stops waiting without cancelling the shared call;
+        the call is cancelled only once no callers are left.
+        """
+        if not self.settings.llm_coalesce_requests:
+            return await self._invoke(messages, agent_name, **kwargs)
+        
+        key = request_key(messages, kwargs)
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.create_task(self._invoke(messages, agent_name, **kwargs)))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task: self._end_flight(key, flight))
+        else:
+            self.stats["coalesced"] += 1
+        
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                self._end_flight(key, flight)
+                flight.task.cancel()
+    
+    def _end_flight(self, key: str, flight: _Flight) -> None:
+        """Stop routing new callers to a finished or abandoned flight."""
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if flight.task.done() and not flight.task.cancelled():
+            # Mark the exception retrieved when every caller has already left
+            flight.task.exception()
+    
+    async def _invoke(self, messages: List[Any], agent_name: str, **kwargs) -> Any:
+        """Invoke the model with rate limiting and retry."""
+        attempt = 0
+        node = current_node.get()
+        started_at = time.perf_counter()
+        prompt_tokens = count_message_tokens(messages)
+        while True:
+            reserved = self._reservation(prompt_tokens, kwargs)
+            held = await self._acquire(agent_name, reserved)
+            try:
+                response = await self.model.ainvoke(messages, **kwargs)
+                LLM_DURATION.observe(time.perf_counter() - started_at, agent=agent_name, node=node, mode="invoke")
+                used = self._record_usage(
+                    agent_name, node, prompt_tokens,
+                    getattr(response, "content", response), getattr(response, "usage_metadata", None)
+                )
+                self._settle_tokens(reserved, used)
+                return response
+            except Exception as e:
+                if attempt >= self.settings.llm_max_retries or not is_retryable_error(e):
+                    self._record_failure(agent_name, e)
+                    raise
+                delay = self._backoff_delay(attempt, e)
+            finally:
+                self._end_call(agent_name, held, reserved)
+            
+            attempt += 1
+            self.stats["retries"] += 1
+            LLM_RETRIES.inc(agent=agent_name)
+            self.logger.warning(
+                f"LLM call for {agent_name} failed with a retryable error; "
+                f"retry {attempt}/{self.settings.llm_max_retries} in {delay:.2f}s"
+            )
+            await asyncio.sleep(delay)
+    
+    async def stream(self, messages: List[Any], agent_name: str = "default", **kwargs) -> AsyncGenerator[Any, None]:
+        """
+        Stream from the model, sharing one upstream stream between identical concurrent requests.
+        
+        Subscribers that join late replay the chunks produced so far. The
+        upstream stream is cancelled only once every subscriber has left.
+        """
+        if not self.settings.llm_coalesce_requests:
+            async for chunk in self._stream(messages, agent_name, **kwargs):
+                yield chunk
+            return
+        
+        key = request_key(messages, kwargs)
+        shared = self._streams.get(key)
+        if shared is None:
+            shared = _SharedStream(self._stream(messages, agent_name, **kwargs))
+            self._streams[key] = shared
+            shared.task.add_done_callback(lambda task: self._end_stream(key, shared))
+        else:
+            self.stats["coalesced"] += 1
+        
+        shared.subscribers += 1
+        try:
+            async for chunk in shared.subscribe():
+                yield chunk
+        finally:
+            shared.subscribers -= 1
+            if shared.subscribers == 0 and not shared.task.done():
+                self._end_stream(key, shared)
+                shared.task.cancel()
+    
+    def _end_stream(self, key: str, shared: _SharedStream) -> None:
+        """Stop routing new subscribers to a finished or abandoned stream."""
+        if self._streams.get(key) is shared:
+            del self._streams[key]
+    
+    async def _stream(self, messages: List[Any], agent_name: str, **kwargs) -> AsyncGenerator[Any, None]:
+        """Stream from the model with rate limiting; retries only before the first chunk."""
+        attempt = 0
+        node = current_node.get()
+        started_at = time.perf_counter()
+        prompt_tokens = count_message_tokens(messages)
+        while True:
+            reserved = self._reservation(prompt_tokens, kwargs)
+            held = await self._acquire(agent_name, reserved)
+            started = False
+            parts = []
+            usage = None
+            try:
+                async for chunk in self.model.astream(messages, **kwargs):
+                    if not started:
+                        started = True
+                        LLM_FIRST_TOKEN.observe(time.perf_counter() - started_at, agent=agent_name, node=node)
+                    content = getattr(chunk, "content", None)
+                    if isinstance(content, str):
+                        parts.append(content)
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    yield chunk
+                return
+            except Exception as e:
+                if started or attempt >= self.settings.llm_max_retries or not is_retryable_error(e):
+                    self._record_failure(agent_name, e)
+                    raise
+                delay = self._backoff_delay(attempt, e)
+            finally:
+                self._end_call(agent_name, held, reserved)
+                if started:
+                    # Also covers streams the caller stopped early
+                    LLM_DURATION.observe(time.perf_counter() - started_at, agent=agent_name, node=node, mode="stream")
+                    used = self._record_usage(agent_name, node, prompt_tokens, "".join(parts), usage)
+                    self._settle_tokens(reserved, used)
+            
+            attempt += 1
+            self.stats["retries"] += 1
+            LLM_RETRIES.inc(agent=agent_name)
+            self.logger.warning(
+                f"LLM stream for {agent_name} failed before output; "
+                f"retry {attempt}/{self.settings.llm_max_retries} in {delay:.2f}s"
+            )
+            await asyncio.sleep(delay)
+    
+    @property
+    def tokens_unspent(self) -> float:
+        """Tokens in the bucket plus those held by unsettled calls, most of which come back when they settle."""
+        return min(self.token_bucket.capacity, self.token_bucket.available + self.tokens_outstanding)
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Current load and capacity figures."""
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_concurrency": self.settings.llm_max_concurrency,
+            "requests_available": round(self.request_bucket.available, 2),
+            "tokens_available": round(self.token_bucket.available, 2),
+            "consecutive_failures": self.consecutive_failures,
+            "last_success_at": self.last_success_at,
+            "last_error": self.last_error,
+            **self.stats
+        }
+
+
+# Global gateway instance
+_llm_gateway: Optional[LLMGateway] = None
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Get the process-wide LLM gateway."""
+    global _llm_gateway
+    if _llm_gateway is None:
+        _llm_gateway = LLMGateway()
+    return _llm_gateway
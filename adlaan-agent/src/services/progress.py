@@ -0,0 +1,199 @@
+"""
+Node-weighted task progress.
+Agents give each graph node a weight when registering it; nodes that are
+alternatives to one another (only one runs per task) share a progress group,
+which counts once at its heaviest weight. A running task's progress is the
+weight of its completed nodes over the agent's total. Every change is
+published on the task's event channel right away, while backend writes are
+coalesced to at most one per task per progress_update_interval_seconds.
+"""
+import asyncio
+import time
+from typing import Dict, Any, Optional, Set, Callable, Awaitable
+
+from src.core.config import get_settings
+from src.core.logging import get_logger
+from src.services.event_channel import get_event_channel
+
+logger = get_logger(__name__)
+
+# Reserved for the task manager's final status update
+RUNNING_MAX_PERCENTAGE = 99
+
+ProgressReporter = Callable[[str, int], Awaitable[Any]]
+
+
+class ProgressPlan:
+    """Weights of one agent's graph nodes."""
+    
+    def __init__(self, agent_name: str):
+        self.agent_name = agent_name
+        self.weights: Dict[str, float] = {}
+        self.groups: Dict[str, str] = {}
+    
+    def add(self, node: str, weight: float = 1.0, group: Optional[str] = None) -> None:
+        """Register a node; settings may override its weight."""
+        overrides = get_settings().progress_node_weights
+        weight = overrides.get(f"{self.agent_name}.{node}", overrides.get(node, weight))
+        self.weights[node] = float(weight)
+        if group:
+            self.groups[node] = group
+    
+    def _group_weights(self, nodes: Set[str]) -> Dict[str, float]:
+        """Weight of each progress group, or lone node, with a member in nodes."""
+        weights: Dict[str, float] = {}
+        for node in nodes:
+            if node not in self.weights:
+                continue
+            group = self.groups.get(node)
+            key = group or node
+            # A group always counts at its heaviest member, whichever one ran
+            weight = max(w for n, w in self.weights.items() if self.groups.get(n) == group) if group else self.weights[node]
+            weights[key] = weight
+        return weights
+    
+    @property
+    def total(self) -> float:
+        """Weight of a complete run."""
+        return sum(self._group_weights(set(self.weights)).values())
+    
+    def fraction(self, completed: Set[str]) -> float:
+        """Share of the run done once the given nodes have completed."""
+        total = self.total
+        if total <= 0:
+            return 0.0
+        return min(1.0, sum(self._group_weights(completed).values()) / total)
+
+
+class TaskProgress:
+    """Progress of one running task."""
+    
+    def __init__(self, task_id: str, plan: ProgressPlan, report: Optional[ProgressReporter]):
+        self.task_id = task_id
+        self.plan = plan
+        self.report = report
+        self.started_at = time.monotonic()
+        self.completed: Set[str] = set()
+        self.current_node: Optional[str] = None
+        self.percentage = 0
+        self.reported = 0
+        self.reported_at = 0.0
+        self.flush: Optional[asyncio.Task] = None
+        self.sending = False
+        self.finished = False
+
+
+class ProgressTracker:
+    """Tracks node progress of running tasks and pushes it to a reporter."""
+    
+    def __init__(self, update_interval: Optional[float] = None):
+        self.update_interval = update_interval if update_interval is not None else get_settings().progress_update_interval_seconds
+        self._plans: Dict[str, ProgressPlan] = {}
+        self._tasks: Dict[str, TaskProgress] = {}
+    
+    def plan(self, agent_name: str) -> ProgressPlan:
+        """The node weights registered for an agent."""
+        if agent_name not in self._plans:
+            self._plans[agent_name] = ProgressPlan(agent_name)
+        return self._plans[agent_name]
+    
+    def start(self, task_id: str, agent_name: str, report: Optional[ProgressReporter] = None) -> None:
+        """Begin tracking a task run by an agent."""
+        self._tasks[task_id] = TaskProgress(task_id, self.plan(agent_name), report)
+    
+    def is_tracking(self, task_id: str) -> bool:
+        """Whether a task is running here."""
+        return task_id in self._tasks
+    
+    def node_started(self, task_id: Optional[str], node: str) -> None:
+        """Record the node a task is in."""
+        entry = self._tasks.get(task_id) if task_id else None
+        if entry is not None:
+            entry.current_node = node
+    
+    def node_completed(self, task_id: Optional[str], node: str) -> None:
+        """Count a finished node and report the new progress."""
+        entry = self._tasks.get(task_id) if task_id else None
+        if entry is None or entry.finished:
+            return
+        
+        entry.completed.add(node)
+        percentage = min(RUNNING_MAX_PERCENTAGE, int(entry.plan.fraction(entry.completed) * 100))
+        if percentage <= entry.percentage:
+            return
+        
+        entry.percentage = percentage
+        get_event_channel().publish(task_id, {"type": "progress", "progress": percentage, "node": node})
+        if entry.report is not None:
+            self._schedule(entry)
+    
+    def _schedule(self, entry: TaskProgress) -> None:
+        """Send the latest progress once the task's update interval has passed."""
+        if entry.flush is not None and not entry.flush.done():
+            return
+        delay = max(0.0, entry.reported_at + self.update_interval - time.monotonic())
+        entry.flush = asyncio.create_task(self._flush(entry, delay))
+    
+    async def _flush(self, entry: TaskProgress, delay: float) -> None:
+        """Write the task's latest progress to the reporter."""
+        if delay > 0:
+            await asyncio.sleep(delay)
+        
+        percentage = entry.percentage
+        entry.sending = True
+        try:
+            await entry.report(entry.task_id, percentage)
+            entry.reported = percentage
+        except Exception as e:
+            logger.warning(f"Could not report progress of task {entry.task_id}: {e}")
+        finally:
+            entry.sending = False
+            entry.reported_at = time.monotonic()
+            entry.flush = None
+        
+        # Nodes that finished during the write go out with the next one
+        if entry.percentage > entry.reported and not entry.finished:
+            self._schedule(entry)
+    
+    async def finish(self, task_id: str) -> None:
+        """Stop tracking a task, letting a write already on the wire land first."""
+        entry = self._tasks.pop(task_id, None)
+        if entry is None:
+            return
+        
+        entry.finished = True
+        flush = entry.flush
+        if flush is None or flush.done():
+            return
+        if entry.sending:
+            await asyncio.wait([flush])
+        else:
+            flush.cancel()
+    
+    def snapshot(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Progress of a running task with a naive time-remaining estimate."""
+        entry = self._tasks.get(task_id)
+        if entry is None:
+            return None
+        
+        elapsed = time.monotonic() - entry.started_at
+        fraction = entry.plan.fraction(entry.completed)
+        return {
+            "progress_percentage": entry.percentage,
+            "current_node": entry.current_node,
+            "completed_nodes": sorted(entry.completed),
+            "elapsed_seconds": round(elapsed, 1),
+            "estimated_remaining_seconds": round(elapsed * (1 - fraction) / fraction, 1) if fraction > 0 else None
+        }
+
+
+# Global tracker instance
+_progress_tracker: Optional[ProgressTracker] = None
+
+
+def get_progress_tracker() -> ProgressTracker:
+    """Get the process-wide progress tracker."""
+    global _progress_tracker
+    if _progress_tracker is None:
+        _progress_tracker = ProgressTracker()
+    return _progress_tracker
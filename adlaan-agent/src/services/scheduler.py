@@ -0,0 +1,196 @@
+"""
+Priority task scheduler.
+Tasks wait in a bounded priority queue and a fixed pool of workers runs
+them, so concurrency is capped at max_concurrent_tasks and bursts queue
+instead of piling up as unbounded asyncio tasks. Higher priorities go
+first; waiting tasks age so low-priority work is never starved.
+"""
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, List, Callable, Awaitable
+
+from src.core.config import get_settings
+from src.core.exceptions import ServiceUnavailableError
+from src.core.logging import get_logger
+from src.core.metrics import SCHEDULER_BUFFERED, QUEUE_WAIT, QUEUE_REJECTED, WORKERS_BUSY
+from src.schemas import TaskPriority
+
+logger = get_logger(__name__)
+
+# Lower rank runs first
+PRIORITY_RANK = {
+    TaskPriority.URGENT: 0,
+    TaskPriority.HIGH: 1,
+    TaskPriority.NORMAL: 2,
+    TaskPriority.LOW: 3
+}
+
+
+def aging_key(priority: TaskPriority, enqueued_at: float, aging_seconds: float) -> float:
+    """Order in which waiting work runs: each priority level is worth aging_seconds of waiting."""
+    return enqueued_at + PRIORITY_RANK[priority] * aging_seconds
+
+
+@dataclass
+class ScheduledJob:
+    """A task waiting for, or running on, a worker."""
+    task_id: str
+    priority: TaskPriority
+    run: Callable[[], Awaitable[Any]]
+    enqueued_at: float = field(default_factory=time.monotonic)
+    cancelled: bool = False
+
+
+class TaskScheduler:
+    """
+    Bounded priority queue drained by a fixed worker pool.
+    
+    Aging: each priority level is worth aging_seconds of waiting, so a job
+    is ordered by enqueued_at + rank * aging_seconds. Every queued job ages
+    at the same rate, so this key never needs updating: a LOW job queued
+    3 * aging_seconds before an URGENT one runs first.
+    """
+    
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_queue_size: Optional[int] = None,
+        aging_seconds: Optional[float] = None
+    ):
+        settings = get_settings()
+        self.workers = workers or settings.max_concurrent_tasks
+        self.max_queue_size = max_queue_size or settings.task_queue_max_size
+        self.aging_seconds = aging_seconds if aging_seconds is not None else settings.task_priority_aging_seconds
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue(maxsize=self.max_queue_size)
+        self._sequence = itertools.count()
+        self._queued: Dict[str, ScheduledJob] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._workers: List[asyncio.Task] = []
+        self._stopping = False
+    
+    async def start(self) -> None:
+        """Start the worker pool."""
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+            logger.info(f"Task scheduler started with {self.workers} workers, queue limit {self.max_queue_size}")
+    
+    async def stop(self) -> None:
+        """Cancel the workers and any running jobs."""
+        self._stopping = True
+        for task in [*self._workers, *self._running.values()]:
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._running.values(), return_exceptions=True)
+        self._workers = []
+    
+    @property
+    def depth(self) -> int:
+        """Jobs waiting for a worker."""
+        return len(self._queued)
+    
+    @property
+    def busy(self) -> int:
+        """Workers currently running a job."""
+        return len(self._running)
+    
+    @property
+    def free_slots(self) -> int:
+        """Workers that would be idle if every queued job started now."""
+        return max(0, self.workers - self.busy - self.depth)
+    
+    @property
+    def is_full(self) -> bool:
+        """Whether a submit would be rejected."""
+        return self._queue.full()
+    
+    def submit(
+        self,
+        task_id: str,
+        priority: TaskPriority,
+        run: Callable[[], Awaitable[Any]],
+        waited_seconds: float = 0.0
+    ) -> ScheduledJob:
+        """Queue a job, counting time spent in an upstream queue towards aging; raises ServiceUnavailableError when full."""
+        job = ScheduledJob(task_id=task_id, priority=priority, run=run, enqueued_at=time.monotonic() - waited_seconds)
+        key = aging_key(priority, job.enqueued_at, self.aging_seconds)
+        try:
+            self._queue.put_nowait((key, next(self._sequence), job))
+        except asyncio.QueueFull:
+            QUEUE_REJECTED.inc(priority=priority.value)
+            raise ServiceUnavailableError(f"Task queue is full ({self.max_queue_size} waiting)")
+        
+        self._queued[task_id] = job
+        SCHEDULER_BUFFERED.labels(priority=priority.value).inc()
+        return job
+    
+    def cancel(self, task_id: str) -> bool:
+        """Cancel a queued or running job."""
+        job = self._queued.pop(task_id, None)
+        if job is not None:
+            job.cancelled = True
+            SCHEDULER_BUFFERED.labels(priority=job.priority.value).dec()
+            return True
+        
+        task = self._running.get(task_id)
+        if task is not None:
+            task.cancel()
+            return True
+        return False
+    
+    def is_queued(self, task_id: str) -> bool:
+        """Whether a job is waiting for a worker."""
+        return task_id in self._queued
+    
+    def is_running(self, task_id: str) -> bool:
+        """Whether a job is currently on a worker."""
+        return task_id in self._running
+    
+    async def wait_running(self, timeout: Optional[float]) -> List[str]:
+        """Wait up to timeout for the running jobs to end; returns those still running."""
+        running = [task for task in self._running.values() if not task.done()]
+        if running:
+            await asyncio.wait(running, timeout=timeout)
+        return [task_id for task_id, task in self._running.items() if not task.done()]
+    
+    async def _worker(self, index: int) -> None:
+        """Run queued jobs one at a time until cancelled."""
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                if job.cancelled:
+                    continue
+                
+                self._queued.pop(job.task_id, None)
+                SCHEDULER_BUFFERED.labels(priority=job.priority.value).dec()
+                QUEUE_WAIT.observe(time.monotonic() - job.enqueued_at, priority=job.priority.value)
+                
+                task = asyncio.create_task(job.run())
+                self._running[job.task_id] = task
+                WORKERS_BUSY.labels().inc()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    # A cancelled job frees its worker; only stop() ends the worker
+                    if self._stopping:
+                        raise
+                except Exception as e:
+                    logger.error(f"Scheduled task {job.task_id} failed: {e}")
+                finally:
+                    self._running.pop(job.task_id, None)
+                    WORKERS_BUSY.labels().dec()
+            finally:
+                self._queue.task_done()
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Queue depth and worker utilization."""
+        depth_by_priority = {priority.value: 0 for priority in PRIORITY_RANK}
+        for job in self._queued.values():
+            depth_by_priority[job.priority.value] += 1
+        return {
+            "workers": self.workers,
+            "busy_workers": self.busy,
+            "queue_depth": self.depth,
+            "queue_limit": self.max_queue_size,
+            "queued_by_priority": depth_by_priority
+        }
@@ -2,18 +2,33 @@
 Task management service for handling agent tasks.
 """
 import asyncio
-from typing import Dict, Any, Optional, List, TYPE_CHECKING
+import dataclasses
+import time
+from typing import Dict, Any, Optional, List, Set, Tuple, Union, Awaitable, TYPE_CHECKING
 from datetime import datetime, timedelta
 import uuid
 
 from src.services.base import AsyncService
+from src.services.event_channel import get_event_channel
+from src.services.scheduler import TaskScheduler
+from src.services.task_queue import QueueMessage, create_task_queue
+from src.services.deduplication import TaskDeduplicator
+from src.services.admission import AdmissionController
+from src.services.progress import get_progress_tracker
+from src.services.fair_queue import DEFAULT_TENANT
+from src.core.metrics import TASK_DURATION, STARTUP_DURATION, TASKS_DEDUPLICATED, DRAINED_TASKS
+from src.utils.executors import start_process_pool, shutdown_executors
 from src.integrations.backend_service import BackendIntegrationService, AgentTask
-from src.core.exceptions import TaskNotFoundError, AgentError, TaskTimeoutError
+from src.core.exceptions import TaskNotFoundError, AgentError, TaskTimeoutError, OpenAIError, ServiceUnavailableError, OverloadedError
 from src.schemas import AgentType, TaskStatus, TaskPriority
 
 if TYPE_CHECKING:
+    from src.services.health import HealthMonitor
     from src.agents.base import BaseAgent, LegalDocumentGeneratorAgent, DocumentAnalyzerAgent
 
+# Longest a queue consumer blocks before checking for expired deliveries
+QUEUE_POLL_SECONDS = 1.0
+
 
 class TaskManagerService(AsyncService[Dict[str, Any]]):
     """Service for managing agent tasks."""
@@ -22,27 +37,138 @@ class TaskManagerService(AsyncService[Dict[str, Any]]):
         super().__init__()
         self.backend_service: Optional[BackendIntegrationService] = None
         self.agents: Dict[AgentType, BaseAgent] = {}
+        self.deferred_agents: Set[AgentType] = set()
         self.active_tasks: Dict[str, asyncio.Task] = {}
         self.task_metadata: Dict[str, Dict[str, Any]] = {}
+        self.startup_timings: Dict[str, float] = {}
+        self._agent_lock = asyncio.Lock()
+        self._cleanup_task: Optional[asyncio.Task] = None
+        self.scheduler = TaskScheduler()
+        self.task_queue = create_task_queue()
+        self.deduplicator = TaskDeduplicator()
+        self.admission = AdmissionController(self.scheduler, self.task_queue)
+        self._consumer_task: Optional[asyncio.Task] = None
+        self._delivered: Dict[str, QueueMessage] = {}
+        self._capacity = asyncio.Event()
+        self._shutting_down = False
+        self._interrupted: Set[str] = set()
+        self._drained: Optional[Dict[str, int]] = None
     
     async def initialize(self) -> None:
         """Initialize the task manager."""
         await super().initialize()
+        started_at = time.perf_counter()
         
-        # Initialize backend service
+        # Backend connection setup and agent loading are independent
         self.backend_service = BackendIntegrationService()
-        await self.backend_service.initialize()
+        await asyncio.gather(
+            self._timed("backend", self.backend_service.initialize()),
+            self._timed("agents", self._initialize_agents()),
+            self._timed("process_pool", start_process_pool()),
+            self._timed("queue", self.task_queue.start())
+        )
+        
+        # Workers run tasks taken from the queue, at most max_concurrent_tasks at a time
+        await self.scheduler.start()
+        self._consumer_task = asyncio.create_task(self._consume_queue())
         
-        # Initialize agents
-        await self._initialize_agents()
+        # Pick up tasks interrupted by a restart from their last checkpoint; a
+        # durable queue redelivers them itself once their visibility timeout passes
+        if not self.task_queue.durable:
+            await self._timed("resume", self._resume_interrupted_tasks())
+        
+        self._record_timing("total", time.perf_counter() - started_at)
+        phases = ", ".join(f"{phase}={ms:.0f}ms" for phase, ms in self.startup_timings.items())
+        self.logger.info(f"Task manager started: {phases}")
         
         # Start background task cleanup
-        asyncio.create_task(self._cleanup_completed_tasks())
+        self._cleanup_task = asyncio.create_task(self._cleanup_completed_tasks())
+    
+    async def _timed(self, phase: str, awaitable: Awaitable[Any]) -> Any:
+        """Await a startup phase and record how long it took."""
+        started_at = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self._record_timing(phase, time.perf_counter() - started_at)
+    
+    def _record_timing(self, phase: str, seconds: float) -> None:
+        """Record a startup phase duration."""
+        self.startup_timings[phase] = round(seconds * 1000, 1)
+        STARTUP_DURATION.set(seconds, phase=phase)
+    
+    async def drain(self, grace_seconds: Optional[float] = None) -> Dict[str, int]:
+        """
+        Stop taking work and give running tasks a grace period to finish.
+        
+        Tasks delivered here but not yet started go straight back to the
+        queue. Tasks still running when the grace period ends are cancelled,
+        handed back to the queue and reset to pending in the backend; the
+        graph nodes they completed are kept if checkpoints persist to SQLite.
+        A queue that does not survive the restart cannot take tasks back, so
+        those tasks, and any still waiting in it, are marked failed instead.
+        """
+        if self._drained is not None:
+            return self._drained
+        
+        grace_seconds = self.settings.shutdown_grace_seconds if grace_seconds is None else grace_seconds
+        self.admission.draining = True
+        if self._consumer_task:
+            self._consumer_task.cancel()
+            await asyncio.gather(self._consumer_task, return_exceptions=True)
+        
+        requeued = 0
+        abandoned = await self.task_queue.abandon_waiting()
+        for task_id, message in list(self._delivered.items()):
+            if self.scheduler.is_queued(task_id):
+                self.scheduler.cancel(task_id)
+                self._delivered.pop(task_id, None)
+                if self.task_queue.durable:
+                    await self.task_queue.release(message)
+                    requeued += 1
+                else:
+                    await self.task_queue.ack(message)
+                    abandoned.append(message)
+        for message in abandoned:
+            await self._fail_abandoned(message.task_id)
+        
+        running = self.scheduler.busy
+        if running:
+            self.logger.info(f"Draining: waiting up to {grace_seconds}s for {running} running tasks")
+        unfinished = await self.scheduler.wait_running(grace_seconds)
+        for task_id in unfinished:
+            self._interrupted.add(task_id)
+            self.scheduler.cancel(task_id)
+        await self.scheduler.wait_running(None)
+        
+        self._drained = {
+            "finished": running - len(unfinished),
+            "requeued": requeued,
+            "interrupted": len(unfinished),
+            "abandoned": len(abandoned)
+        }
+        for outcome, count in self._drained.items():
+            if count:
+                DRAINED_TASKS.inc(count, outcome=outcome)
+        self.logger.info(
+            f"Drained: {self._drained['finished']} tasks finished, {requeued} returned to the queue, "
+            f"{len(unfinished)} interrupted, {len(abandoned)} failed because the queue is not durable"
+        )
+        return self._drained
     
     async def cleanup(self) -> None:
-        """Cleanup the task manager."""
+        """Drain, then cleanup the task manager."""
+        if self._cleanup_task:
+            self._cleanup_task.cancel()
+        
+        await self.drain()
+        
+        # Anything still running stays unacknowledged so another replica picks it up
+        self._shutting_down = True
+        await self.scheduler.stop()
+        
         # Cancel all active tasks
-        for task_id, task in self.active_tasks.items():
+        for task_id, task in list(self.active_tasks.items()):
             if not task.done():
                 task.cancel()
                 try:
@@ -58,49 +184,161 @@ class TaskManagerService(AsyncService[Dict[str, Any]]):
         if self.backend_service:
             await self.backend_service.cleanup()
         
+        await self.task_queue.close()
+        await self.deduplicator.close()
+        shutdown_executors()
         await super().cleanup()
     
     async def _initialize_agents(self) -> None:
-        """Initialize all available agents."""
-        # Import here to avoid circular dependency
-        from src.agents import (
-            LegalDocumentGeneratorAgent, 
-            DocumentAnalyzerAgent,
-            DocumentClassifierAgent,
-            LegalResearchAgent,
-            ContractReviewerAgent
-        )
+        """Load every agent not deferred by settings, initializing them concurrently."""
+        deferred = set()
+        for value in self.settings.lazy_agents:
+            try:
+                deferred.add(AgentType(value))
+            except ValueError:
+                self.logger.warning(f"Ignoring unknown lazy agent type: {value}")
+        self.deferred_agents = deferred
         
-        agent_classes = {
-            AgentType.LEGAL_DOCUMENT_GENERATOR: LegalDocumentGeneratorAgent,
-            AgentType.DOCUMENT_ANALYZER: DocumentAnalyzerAgent,
-            AgentType.DOCUMENT_CLASSIFIER: DocumentClassifierAgent,
-            AgentType.LEGAL_RESEARCH: LegalResearchAgent,
-            AgentType.CONTRACT_REVIEWER: ContractReviewerAgent,
-        }
+        eager = [agent_type for agent_type in AgentType if agent_type not in deferred]
+        agent_classes = await asyncio.to_thread(self._import_agent_classes, eager)
+        await asyncio.gather(*(
+            self._start_agent(agent_type, agent_class)
+            for agent_type, agent_class in agent_classes.items()
+        ))
         
-        for agent_type, agent_class in agent_classes.items():
-            try:
-                agent = agent_class()
-                await agent.initialize()
-                self.agents[agent_type] = agent
-                self.logger.info(f"Initialized {agent_type.value} agent")
-            except Exception as e:
-                self.logger.error(f"Failed to initialize {agent_type.value} agent: {e}")
+        if deferred:
+            self.logger.info(f"Deferred agents until first task: {sorted(t.value for t in deferred)}")
     
-    async def _perform_health_check(self) -> None:
-        """Check task manager health."""
-        if self.backend_service:
-            await self.backend_service.health_check()
+    def _import_agent_classes(self, agent_types: List[AgentType]) -> Dict[AgentType, type]:
+        """Import agent packages; runs in a worker thread to keep the event loop free."""
+        from src.agents import load_agent_class
         
-        for agent_type, agent in self.agents.items():
+        agent_classes = {}
+        for agent_type in agent_types:
+            started_at = time.perf_counter()
             try:
-                await agent.health_check()
+                agent_classes[agent_type] = load_agent_class(agent_type.value)
             except Exception as e:
-                self.logger.warning(f"Agent {agent_type.value} health check failed: {e}")
+                self.logger.error(f"Failed to import {agent_type.value} agent: {e}")
+            self._record_timing(f"import:{agent_type.value}", time.perf_counter() - started_at)
+        return agent_classes
     
-    async def _get_health_details(self) -> Dict[str, Any]:
-        """Get task manager health details."""
+    async def _start_agent(self, agent_type: AgentType, agent_class: type) -> Optional["BaseAgent"]:
+        """Construct and initialize one agent."""
+        started_at = time.perf_counter()
+        try:
+            agent = agent_class()
+            await agent.initialize()
+            self.agents[agent_type] = agent
+            self.logger.info(f"Initialized {agent_type.value} agent")
+            return agent
+        except Exception as e:
+            self.logger.error(f"Failed to initialize {agent_type.value} agent: {e}")
+            return None
+        finally:
+            self._record_timing(f"init:{agent_type.value}", time.perf_counter() - started_at)
+    
+    def is_agent_available(self, agent_type: AgentType) -> bool:
+        """Whether an agent is initialized or can be initialized on demand."""
+        return agent_type in self.agents or agent_type in self.deferred_agents
+    
+    async def get_agent(self, agent_type: AgentType) -> "BaseAgent":
+        """Get an initialized agent, initializing a deferred one on first use."""
+        agent = self.agents.get(agent_type)
+        if agent is not None:
+            return agent
+        
+        if agent_type not in self.deferred_agents:
+            raise AgentError(f"Agent type {agent_type.value} not available")
+        
+        async with self._agent_lock:
+            if agent_type not in self.agents:
+                agent_classes = await asyncio.to_thread(self._import_agent_classes, [agent_type])
+                if agent_type not in agent_classes or await self._start_agent(agent_type, agent_classes[agent_type]) is None:
+                    raise AgentError(f"Agent type {agent_type.value} failed to initialize")
+                self.deferred_agents.discard(agent_type)
+        
+        return self.agents[agent_type]
+    
+    async def _resume_interrupted_tasks(self) -> None:
+        """Re-run tasks that still have checkpoints and were processing when the worker stopped."""
+        from src.services.checkpointer import get_checkpointer
+        
+        checkpointer = get_checkpointer()
+        if checkpointer.store is None:
+            return
+        
+        thread_ids = await checkpointer.athread_ids()
+        task_ids = [thread_id for thread_id in thread_ids if thread_id.isdigit()]
+        lookups = await asyncio.gather(
+            *(self.backend_service.get_agent_task(int(task_id)) for task_id in task_ids),
+            return_exceptions=True
+        )
+        tasks = dict(zip(task_ids, lookups))
+        
+        for thread_id in thread_ids:
+            task = tasks.get(thread_id)
+            if isinstance(task, Exception):
+                self.logger.warning(f"Could not look up interrupted task {thread_id}: {task}")
+                continue
+            
+            if task is None or task.status not in (TaskStatus.PENDING, TaskStatus.PROCESSING) or not self.is_agent_available(task.agent_type):
+                await checkpointer.adelete_thread(thread_id)
+                continue
+            
+            self.logger.info(f"Resuming interrupted task {thread_id}")
+            get_event_channel().open(thread_id)
+            await self._enqueue(task, self._task_priority(task))
+    
+    def register_health_checks(self, monitor: "HealthMonitor") -> None:
+        """Register the task manager's components with the background health monitor."""
+        monitor.register("backend", self._check_backend)
+        monitor.register("agents", self._check_agents)
+        monitor.register("queue", self._check_queue)
+        # Every replica shares the provider, so an LLM outage degrades rather than unreadies
+        monitor.register("llm", self._check_llm, critical=False)
+        # Saturation sheds new work but should not take the replica out of rotation
+        monitor.register("admission", self._check_admission, critical=False)
+    
+    async def _check_backend(self) -> Dict[str, Any]:
+        """Backend GraphQL reachability."""
+        if not self.backend_service:
+            raise AgentError("Backend service not initialized")
+        health = await self.backend_service.health_check()
+        return health["details"]
+    
+    async def _check_agents(self) -> Dict[str, Any]:
+        """Agent initialization state; fails only when no agent can take tasks."""
+        agent_statuses = await self._agent_statuses()
+        if not any(status == "healthy" for status in agent_statuses.values()) and not self.deferred_agents:
+            raise AgentError("No agents available")
+        return {
+            "agent_statuses": agent_statuses,
+            "deferred_agents": sorted(agent_type.value for agent_type in self.deferred_agents)
+        }
+    
+    async def _check_queue(self) -> Dict[str, Any]:
+        """Task queue reachability and backlog."""
+        return await self.task_queue.get_status()
+    
+    async def _check_llm(self) -> Dict[str, Any]:
+        """Provider health from recent gateway calls; never calls the LLM itself."""
+        from src.services.llm_gateway import get_llm_gateway
+        
+        status = get_llm_gateway().get_status()
+        if status["consecutive_failures"] >= self.settings.health_llm_failure_threshold:
+            raise OpenAIError(f"{status['consecutive_failures']} consecutive LLM calls failed: {status['last_error']}")
+        return status
+    
+    async def _check_admission(self) -> Dict[str, Any]:
+        """Saturation signals; refreshing them keeps the gauges current between submissions."""
+        status = await self.admission.get_status()
+        if status["shedding"]:
+            raise ServiceUnavailableError(f"Shedding {', '.join(status['shedding'])} priority tasks at saturation {status['saturation']}")
+        return status
+    
+    async def _agent_statuses(self) -> Dict[str, str]:
+        """Health status of each initialized agent."""
         agent_statuses = {}
         for agent_type, agent in self.agents.items():
             try:
@@ -108,11 +346,24 @@ class TaskManagerService(AsyncService[Dict[str, Any]]):
                 agent_statuses[agent_type.value] = health["status"]
             except Exception:
                 agent_statuses[agent_type.value] = "unhealthy"
-        
+        return agent_statuses
+    
+    async def _perform_health_check(self) -> None:
+        """Check task manager health."""
+        if self.backend_service:
+            await self.backend_service.health_check()
+    
+    async def _get_health_details(self) -> Dict[str, Any]:
+        """Get task manager health details."""
         return {
             "active_tasks": len(self.active_tasks),
+            "scheduler": self.scheduler.get_status(),
+            "queue": await self.task_queue.get_status(),
+            "admission": await self.admission.get_status(),
             "available_agents": list(self.agents.keys()),
-            "agent_statuses": agent_statuses,
+            "deferred_agents": sorted(agent_type.value for agent_type in self.deferred_agents),
+            "agent_statuses": await self._agent_statuses(),
+            "startup_timings_ms": self.startup_timings,
             "backend_connected": self.backend_service is not None
         }
     
@@ -123,7 +374,10 @@ class TaskManagerService(AsyncService[Dict[str, Any]]):
             input_data=input_data["input_data"],
             user_id=input_data["user_id"],
             case_id=input_data.get("case_id"),
-            priority=input_data.get("priority", TaskPriority.NORMAL)
+            priority=input_data.get("priority", TaskPriority.NORMAL),
+            idempotency_key=input_data.get("idempotency_key"),
+            deduplicate=input_data.get("deduplicate", True),
+            tenant=input_data.get("tenant")
         )
     
     async def create_task(
@@ -132,34 +386,326 @@ class TaskManagerService(AsyncService[Dict[str, Any]]):
         input_data: Dict[str, Any],
         user_id: int,
         case_id: Optional[int] = None,
-        priority: TaskPriority = TaskPriority.NORMAL
+        priority: TaskPriority = TaskPriority.NORMAL,
+        idempotency_key: Optional[str] = None,
+        deduplicate: bool = True,
+        tenant: Optional[str] = None
     ) -> AgentTask:
-        """Create and execute a new agent task."""
+        """
+        Create and execute a new agent task, or return the task a duplicate submission created.
+        
+        Tasks are queued fairly across tenants; ``tenant`` names the
+        organization a task belongs to and defaults to the submitting user.
+        """
+        self.admission.check_open()
         
         # Validate agent type
-        if agent_type not in self.agents:
+        if not self.is_agent_available(agent_type):
             raise AgentError(f"Agent type {agent_type.value} not available")
         
-        # Create task in backend
-        task = await self.backend_service.create_agent_task(
-            agent_type=agent_type,
-            task_input=input_data,
-            user_id=user_id,
-            case_id=case_id,
-            metadata={
-                "priority": priority.value,
-                "created_by_service": "task_manager"
-            }
-        )
+        # Retries and identical submissions attach to the first task
+        keys = self.deduplicator.keys_for(agent_type, input_data, user_id, case_id, idempotency_key, deduplicate)
+        existing = await self._attach_duplicate(agent_type, keys)
+        if existing is not None:
+            return existing
         
-        # Execute task asynchronously
-        asyncio.create_task(self._execute_task(task))
+        try:
+            # Shed work before creating a backend record it would only time out on
+            await self.admission.admit(priority)
+            
+            # Create task in backend
+            task = await self.backend_service.create_agent_task(
+                agent_type=agent_type,
+                task_input=input_data,
+                user_id=user_id,
+                case_id=case_id,
+                metadata={
+                    "priority": priority.value,
+                    "tenant": tenant or self._user_tenant(user_id),
+                    "created_by_service": "task_manager"
+                }
+            )
+        except Exception:
+            await self.deduplicator.release(keys)
+            raise
+        await self.deduplicator.complete(keys, str(task.id))
+        
+        # Open the event channel before returning so streaming clients can attach
+        get_event_channel().open(str(task.id))
+        
+        # Queue for the next free worker on any replica
+        try:
+            await self._enqueue(task, priority)
+        except ServiceUnavailableError as e:
+            await self._fail_unqueued(task, e)
+            raise
         
         return task
     
+    async def create_tasks(self, specs: List[Dict[str, Any]], user_id: int) -> List[Union[AgentTask, Exception]]:
+        """
+        Create many tasks with batched backend and queue writes.
+        
+        ``specs`` hold create_task keyword arguments other than user_id. Each
+        result is the created or reused task, or the error that refused that
+        entry; one entry failing does not fail the rest.
+        """
+        self.admission.check_open()
+        results: List[Any] = [None] * len(specs)
+        keys: Dict[int, List[Tuple[str, str]]] = {}
+        copies: Dict[int, Tuple[int, str]] = {}
+        first_with_key: Dict[str, int] = {}
+        
+        for index, spec in enumerate(specs):
+            agent_type = spec["agent_type"]
+            if not self.is_agent_available(agent_type):
+                results[index] = AgentError(f"Agent type {agent_type.value} not available")
+                continue
+            
+            spec_keys = self.deduplicator.keys_for(
+                agent_type, spec["input_data"], user_id, spec.get("case_id"),
+                spec.get("idempotency_key"), spec.get("deduplicate", True)
+            )
+            # A repeat within the batch would otherwise wait on a claim only this batch completes
+            earlier = next(((first_with_key[key], kind) for kind, key in spec_keys if key in first_with_key), None)
+            if earlier is not None:
+                copies[index] = earlier
+                continue
+            for _, key in spec_keys:
+                first_with_key[key] = index
+            keys[index] = spec_keys
+        
+        async def claim(index: int) -> None:
+            results[index] = await self._attach_duplicate(specs[index]["agent_type"], keys[index])
+        
+        await asyncio.gather(*(claim(index) for index in keys))
+        pending = [index for index in keys if results[index] is None]
+        
+        # Shed by priority, judging each group by the backlog it would add
+        by_priority: Dict[TaskPriority, List[int]] = {}
+        for index in pending:
+            by_priority.setdefault(specs[index].get("priority", TaskPriority.NORMAL), []).append(index)
+        for priority, indexes in by_priority.items():
+            try:
+                await self.admission.admit(priority, count=len(indexes))
+            except OverloadedError as e:
+                for index in indexes:
+                    results[index] = e
+        
+        admitted = [index for index in pending if results[index] is None]
+        if admitted:
+            created = await self.backend_service.create_agent_tasks([
+                {
+                    "agent_type": specs[index]["agent_type"],
+                    "task_input": specs[index]["input_data"],
+                    "user_id": user_id,
+                    "case_id": specs[index].get("case_id"),
+                    "metadata": {
+                        "priority": specs[index].get("priority", TaskPriority.NORMAL).value,
+                        "tenant": specs[index].get("tenant") or self._user_tenant(user_id),
+                        "created_by_service": "task_manager"
+                    }
+                }
+                for index in admitted
+            ])
+            for index, result in zip(admitted, created):
+                results[index] = result
+        
+        await asyncio.gather(*(
+            self.deduplicator.complete(keys[index], str(results[index].id))
+            if isinstance(results[index], AgentTask) else self.deduplicator.release(keys[index])
+            for index in pending
+        ))
+        
+        # Open event channels before returning, then queue everything in one write
+        queued = [index for index in admitted if isinstance(results[index], AgentTask)]
+        for index in queued:
+            get_event_channel().open(str(results[index].id))
+        if queued:
+            try:
+                await self.task_queue.enqueue_many([
+                    (str(results[index].id), specs[index].get("priority", TaskPriority.NORMAL), self._queue_payload(results[index]))
+                    for index in queued
+                ])
+            except ServiceUnavailableError as e:
+                for index in queued:
+                    await self._fail_unqueued(results[index], e)
+                    results[index] = e
+        
+        for index, (earlier, kind) in copies.items():
+            result = results[earlier]
+            if isinstance(result, AgentTask):
+                TASKS_DEDUPLICATED.inc(agent=result.agent_type.value, match=kind)
+                result = dataclasses.replace(result, metadata={**(result.metadata or {}), "deduplicated": True})
+            results[index] = result
+        
+        return results
+    
+    async def _attach_duplicate(self, agent_type: AgentType, keys: List[Tuple[str, str]]) -> Optional[AgentTask]:
+        """Claim a submission's keys, or return the still-usable task they already point to."""
+        match = await self.deduplicator.acquire(keys)
+        if match is None:
+            return None
+        
+        kind, task_id = match
+        existing = await self._reusable_task(task_id)
+        if existing is not None:
+            TASKS_DEDUPLICATED.inc(agent=agent_type.value, match=kind)
+            self.logger.info(f"Duplicate submission attached to task {task_id} by {kind}")
+            return existing
+        await self.deduplicator.reset(keys)
+        return None
+    
+    async def _reusable_task(self, task_id: str) -> Optional[AgentTask]:
+        """The earlier task if it is still running or succeeded, marked as a replay."""
+        try:
+            task = await self.backend_service.get_agent_task(int(task_id))
+        except Exception as e:
+            self.logger.warning(f"Could not look up earlier task {task_id}: {e}")
+            return None
+        
+        if task is None or task.status not in (TaskStatus.PENDING, TaskStatus.PROCESSING, TaskStatus.COMPLETED):
+            return None
+        return dataclasses.replace(task, metadata={**(task.metadata or {}), "deduplicated": True})
+    
+    @staticmethod
+    def _user_tenant(user_id: Optional[int]) -> str:
+        """Tenant of a user submitting without an organization."""
+        return f"user:{user_id}" if user_id is not None else DEFAULT_TENANT
+    
+    @classmethod
+    def _queue_payload(cls, task: AgentTask) -> Dict[str, Any]:
+        """What a worker needs to run a task, and the tenant it is queued under."""
+        return {
+            "id": task.id,
+            "agent_type": task.agent_type.value,
+            "input_data": task.input_data,
+            "metadata": task.metadata,
+            "case_id": task.case_id,
+            "created_by": task.created_by,
+            "tenant": (task.metadata or {}).get("tenant") or cls._user_tenant(task.created_by)
+        }
+    
+    async def _enqueue(self, task: AgentTask, priority: TaskPriority) -> None:
+        """Add a task to the shared queue."""
+        await self.task_queue.enqueue(str(task.id), priority, self._queue_payload(task))
+    
+    async def _consume_queue(self) -> None:
+        """Take tasks from the queue whenever a local worker is free."""
+        while True:
+            try:
+                free_slots = self.scheduler.free_slots
+                if free_slots == 0:
+                    self._capacity.clear()
+                    await self._capacity.wait()
+                    continue
+                
+                for message in await self.task_queue.receive(free_slots, timeout=QUEUE_POLL_SECONDS):
+                    await self._dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Task queue consumer failed: {e}")
+                await asyncio.sleep(QUEUE_POLL_SECONDS)
+    
+    async def _dispatch(self, message: QueueMessage) -> None:
+        """Hand a delivered task to the local scheduler, or dead-letter it."""
+        payload = message.payload
+        task = AgentTask(
+            id=payload["id"],
+            agent_type=AgentType(payload["agent_type"]),
+            status=TaskStatus.PENDING,
+            input_data=payload.get("input_data"),
+            metadata=payload.get("metadata"),
+            case_id=payload.get("case_id"),
+            created_by=payload.get("created_by", 0)
+        )
+        
+        if message.deliveries > self.settings.task_queue_max_deliveries:
+            reason = f"Abandoned after {message.deliveries - 1} deliveries without completing"
+            await self.task_queue.dead_letter(message, reason)
+            await self.backend_service.update_task_status(task.id, TaskStatus.FAILED, error_message=reason)
+            return
+        
+        get_event_channel().open(message.task_id)
+        self._delivered[message.task_id] = message
+        self.scheduler.submit(
+            message.task_id,
+            message.priority,
+            lambda: self._run_delivered(task, message),
+            waited_seconds=max(0.0, time.time() - message.enqueued_at)
+        )
+    
+    async def _run_delivered(self, task: AgentTask, message: QueueMessage) -> None:
+        """Execute a delivered task, keeping it invisible to other replicas until it is acked."""
+        heartbeat = asyncio.create_task(self._heartbeat(message))
+        try:
+            await self._execute_task(task)
+        finally:
+            heartbeat.cancel()
+            self._delivered.pop(message.task_id, None)
+            if message.task_id in self._interrupted:
+                await self._requeue_interrupted(task, message)
+            elif not self._shutting_down:
+                await self.task_queue.ack(message)
+            self._capacity.set()
+    
+    async def _requeue_interrupted(self, task: AgentTask, message: QueueMessage) -> None:
+        """Hand a task cut off by a drain back to the queue and show it as pending again."""
+        self._interrupted.discard(message.task_id)
+        if not self.task_queue.durable:
+            await self.task_queue.ack(message)
+            await self._fail_abandoned(message.task_id)
+            return
+        try:
+            await self.task_queue.release(message)
+            await self.backend_service.update_task_status(task.id, TaskStatus.PENDING)
+        except Exception as e:
+            # Left unacked, it is still redelivered after the visibility timeout
+            self.logger.warning(f"Could not requeue interrupted task {message.task_id}: {e}")
+    
+    async def _fail_abandoned(
+        self,
+        task_id: str,
+        error_message: str = "Interrupted by a service restart before it could finish; submit it again"
+    ) -> None:
+        """Fail a task that will not run, so it does not stay pending forever."""
+        try:
+            await self.backend_service.update_task_status(int(task_id), TaskStatus.FAILED, error_message=error_message)
+        except Exception as e:
+            self.logger.warning(f"Could not mark task {task_id} failed: {e}")
+    
+    async def _fail_unqueued(self, task: AgentTask, error: ServiceUnavailableError) -> None:
+        """Fail a created task the queue refused, so a retry does not attach to a task that never runs."""
+        get_event_channel().close(str(task.id))
+        await self._fail_abandoned(str(task.id), f"Could not be queued: {error.message}; submit it again")
+    
+    async def _heartbeat(self, message: QueueMessage) -> None:
+        """Extend a running task's visibility timeout until it finishes."""
+        while True:
+            await asyncio.sleep(self.task_queue.visibility_timeout / 3)
+            try:
+                await self.task_queue.touch(message)
+            except Exception as e:
+                self.logger.warning(f"Could not extend visibility of task {message.task_id}: {e}")
+    
+    @staticmethod
+    def _task_priority(task: AgentTask) -> TaskPriority:
+        """Priority recorded in a task's metadata."""
+        try:
+            return TaskPriority((task.metadata or {}).get("priority", TaskPriority.NORMAL.value))
+        except ValueError:
+            return TaskPriority.NORMAL
+    
     async def _execute_task(self, task: AgentTask) -> None:
         """Execute an agent task."""
         task_id = str(task.id)
+        channel = get_event_channel()
+        started_at = time.perf_counter()
+        status = TaskStatus.FAILED
+        
+        # Registered so cancel_task and cleanup can stop the run
+        self.active_tasks[task_id] = asyncio.current_task()
         
         try:
             # Update status to processing
@@ -168,7 +714,7 @@ class TaskManagerService(AsyncService[Dict[str, Any]]):
             )
             
             # Get the appropriate agent
-            agent = self.agents[task.agent_type]
+            agent = await self.get_agent(task.agent_type)
             
             # Store task metadata
             self.task_metadata[task_id] = {
@@ -178,10 +724,7 @@ class TaskManagerService(AsyncService[Dict[str, Any]]):
             }
             
             # Execute with timeout
-            result = await asyncio.wait_for(
-                agent.process(task.input_data),
-                timeout=self.settings.task_timeout_seconds
-            )
+            result = await self._run_agent(agent, task)
             
             # Update task with results
             await self.backend_service.update_task_status(
@@ -190,7 +733,13 @@ class TaskManagerService(AsyncService[Dict[str, Any]]):
                 output_data=result,
                 progress=100
             )
+            status = TaskStatus.COMPLETED
             
+            channel.publish(task_id, {
+                "type": "complete",
+                "status": TaskStatus.COMPLETED.value,
+                "data": result
+            })
             self.logger.info(f"Task {task_id} completed successfully")
             
         except asyncio.TimeoutError:
@@ -200,6 +749,11 @@ class TaskManagerService(AsyncService[Dict[str, Any]]):
                 TaskStatus.FAILED,
                 error_message=error_msg
             )
+            channel.publish(task_id, {
+                "type": "error",
+                "status": TaskStatus.FAILED.value,
+                "error": error_msg
+            })
             self.logger.error(f"Task {task_id} timed out")
             
         except Exception as e:
@@ -209,11 +763,48 @@ class TaskManagerService(AsyncService[Dict[str, Any]]):
                 TaskStatus.FAILED,
                 error_message=error_msg
             )
+            channel.publish(task_id, {
+                "type": "error",
+                "status": TaskStatus.FAILED.value,
+                "error": error_msg
+            })
             self.logger.error(f"Task {task_id} failed: {e}")
             
+        except asyncio.CancelledError:
+            status = TaskStatus.CANCELLED
+            raise
+            
         finally:
-            # Clean up task metadata
+            self.active_tasks.pop(task_id, None)
+            elapsed = time.perf_counter() - started_at
+            self.admission.record_task(elapsed)
+            TASK_DURATION.observe(
+                elapsed,
+                agent=task.agent_type.value,
+                status=status.value
+            )
+            
+            # Clean up task metadata and end any live streams
             self.task_metadata.pop(task_id, None)
+            channel.close(task_id)
+    
+    async def _run_agent(self, agent: "BaseAgent", task: AgentTask) -> Dict[str, Any]:
+        """Run the agent under the task timeout, tracking node progress until it returns."""
+        task_id = str(task.id)
+        tracker = get_progress_tracker()
+        tracker.start(task_id, task.agent_type.value, report=self._report_progress)
+        try:
+            return await asyncio.wait_for(
+                agent.process(task.input_data, task_id=task_id),
+                timeout=self.settings.task_timeout_seconds
+            )
+        finally:
+            # Lets a progress write already sent land before the final status
+            await tracker.finish(task_id)
+    
+    async def _report_progress(self, task_id: str, progress: int) -> None:
+        """Write a running task's progress to the backend."""
+        await self.backend_service.update_task_status(int(task_id), TaskStatus.PROCESSING, progress=progress)
     
     async def get_task(self, task_id: int) -> Optional[AgentTask]:
         """Get a task by ID."""
@@ -238,11 +829,29 @@ class TaskManagerService(AsyncService[Dict[str, Any]]):
         """Cancel a running task."""
         task_id_str = str(task_id)
         
-        # Cancel the asyncio task if it's running
+        # Drop it from the queue, or stop it if a worker is running it
+        was_queued = self.scheduler.is_queued(task_id_str)
+        if was_queued:
+            # Delivered but never started, so nothing else will ack it
+            await self.task_queue.ack(self._delivered.pop(task_id_str))
+        elif not self.scheduler.is_running(task_id_str):
+            was_queued = await self.task_queue.cancel(task_id_str)
+        self.scheduler.cancel(task_id_str)
+        self._capacity.set()
         if task_id_str in self.active_tasks:
             self.active_tasks[task_id_str].cancel()
             self.active_tasks.pop(task_id_str, None)
         
+        channel = get_event_channel()
+        channel.publish(task_id_str, {
+            "type": "cancelled",
+            "status": TaskStatus.CANCELLED.value
+        })
+        
+        # A queued task never reaches _execute_task, which closes running streams
+        if was_queued:
+            channel.close(task_id_str)
+        
         # Update status in backend
         return await self.backend_service.update_task_status(
             task_id, TaskStatus.CANCELLED
@@ -266,17 +875,13 @@ class TaskManagerService(AsyncService[Dict[str, Any]]):
             "updated_at": task.updated_at.isoformat() if task.updated_at else None,
         }
         
-        if metadata:
-            started_at = metadata.get("started_at")
-            if started_at:
-                elapsed = (datetime.utcnow() - started_at).total_seconds()
-                timeout = metadata.get("timeout", self.settings.task_timeout_seconds)
-                
-                progress_info.update({
-                    "elapsed_seconds": elapsed,
-                    "timeout_seconds": timeout,
-                    "progress_percentage": min(100, (elapsed / timeout) * 100)
-                })
+        # Completed graph nodes, weighted, for tasks running on this replica
+        running = get_progress_tracker().snapshot(task_id_str)
+        if running is not None:
+            progress_info.update(running)
+            progress_info["timeout_seconds"] = metadata.get("timeout", self.settings.task_timeout_seconds)
+        else:
+            progress_info["progress_percentage"] = 100 if task.status == TaskStatus.COMPLETED else 0
         
         return progress_info
     
@@ -312,6 +917,9 @@ class TaskManagerService(AsyncService[Dict[str, Any]]):
     
     def get_agent_status(self, agent_type: AgentType) -> Dict[str, Any]:
         """Get status of a specific agent."""
+        if agent_type in self.deferred_agents:
+            return {"status": "deferred", "agent_type": agent_type.value, "initialized": False}
+        
         if agent_type not in self.agents:
             return {"status": "not_available"}
         
@@ -0,0 +1,870 @@
+"""
+Task queue backends.
+Accepted tasks wait in a TaskQueue until a replica has a free worker. The
+in-process queue keeps single-instance deployments dependency-free, and with
+a journal its contents survive restarts; the Redis Streams queue is shared
+by every replica through a consumer group, so any of them can take the next
+task. Both deliver at least once: a task that is not acknowledged within the
+visibility timeout (its worker died or hung) is delivered again, and one
+that keeps coming back is dead-lettered. Both age waiting tasks the way the
+scheduler does, so a steady stream of higher-priority work cannot starve
+lower priorities.
+"""
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List, Tuple, Set
+
+from src.core.config import get_settings
+from src.core.exceptions import ServiceUnavailableError
+from src.core.logging import get_logger
+from src.core.metrics import QUEUE_DEPTH, QUEUE_REDELIVERED, QUEUE_DEAD_LETTERED
+from src.schemas import TaskPriority
+from src.services.fair_queue import DEFAULT_TENANT, DeficitRoundRobin, TenantTurns, has_capacity, tenant_of
+from src.services.journal import AppendOnlyJournal
+from src.services.scheduler import PRIORITY_RANK, aging_key
+
+logger = get_logger(__name__)
+
+try:
+    import redis.asyncio as redis
+    from redis.exceptions import ResponseError
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# Cancellations of tasks that were never delivered are forgotten after a day
+CANCELLED_TTL_SECONDS = 86400
+
+# Dead-lettered tasks kept by the in-process queue
+DEAD_LETTER_LIMIT = 1000
+
+
+@dataclass
+class QueueMessage:
+    """A delivered task; ack it once the task has finished."""
+    message_id: str
+    task_id: str
+    priority: TaskPriority
+    payload: Dict[str, Any]
+    enqueued_at: float  # wall clock, so it is comparable across replicas
+    deliveries: int = 1
+    tenant: str = DEFAULT_TENANT  # whose fair share and concurrency limit it counts against
+
+
+class TaskQueue(ABC):
+    """
+    Backlog of tasks with at-least-once delivery.
+    
+    The next task comes from the priority whose longest-waiting task has
+    the lowest aging_key, as in TaskScheduler: a LOW task that has waited
+    3 * aging_seconds longer than an URGENT one is delivered first.
+    """
+    
+    backend = "base"
+    durable = False  # whether waiting tasks survive a restart
+    
+    def __init__(self, visibility_timeout: Optional[float] = None, aging_seconds: Optional[float] = None):
+        settings = get_settings()
+        self.visibility_timeout = visibility_timeout or settings.task_queue_visibility_timeout_seconds
+        self.aging_seconds = aging_seconds if aging_seconds is not None else settings.task_priority_aging_seconds
+    
+    async def start(self) -> None:
+        """Prepare the queue for use."""
+    
+    async def close(self) -> None:
+        """Release any connections."""
+    
+    async def abandon_waiting(self) -> List[QueueMessage]:
+        """Remove and return the waiting tasks of a queue that will not survive a restart."""
+        return []
+    
+    @abstractmethod
+    async def enqueue(self, task_id: str, priority: TaskPriority, payload: Dict[str, Any]) -> str:
+        """Add a task; returns its message id."""
+    
+    async def enqueue_many(self, tasks: List[Tuple[str, TaskPriority, Dict[str, Any]]]) -> List[str]:
+        """Add several (task_id, priority, payload) tasks; returns their message ids."""
+        return [await self.enqueue(task_id, priority, payload) for task_id, priority, payload in tasks]
+    
+    @abstractmethod
+    async def receive(self, count: int, timeout: float) -> List[QueueMessage]:
+        """Take up to count tasks, redeliveries first, waiting up to timeout for one."""
+    
+    @abstractmethod
+    async def ack(self, message: QueueMessage) -> None:
+        """Remove a finished task for good."""
+    
+    @abstractmethod
+    async def touch(self, message: QueueMessage) -> None:
+        """Restart a delivered task's visibility timeout."""
+    
+    @abstractmethod
+    async def release(self, message: QueueMessage) -> None:
+        """Hand a delivered task back for immediate redelivery, without counting it as a failed delivery."""
+    
+    @abstractmethod
+    async def dead_letter(self, message: QueueMessage, reason: str) -> None:
+        """Move a task that cannot be processed out of the queue."""
+    
+    @abstractmethod
+    async def cancel(self, task_id: str) -> bool:
+        """Make sure a waiting task is never delivered; returns whether it may have been waiting."""
+    
+    @abstractmethod
+    async def depth_by_priority(self) -> Dict[TaskPriority, int]:
+        """Tasks waiting for delivery at each priority."""
+    
+    async def depth(self) -> int:
+        """Tasks waiting for delivery, published as the queue depth gauge."""
+        depths = await self.depth_by_priority()
+        self._publish_depth(depths)
+        return sum(depths.values())
+    
+    @staticmethod
+    def _publish_depth(depths: Dict[TaskPriority, int]) -> None:
+        """Set the queue depth gauge."""
+        for priority, waiting in depths.items():
+            QUEUE_DEPTH.set(waiting, priority=priority.value)
+    
+    @abstractmethod
+    async def get_status(self) -> Dict[str, Any]:
+        """Queue statistics."""
+
+
+class InProcessTaskQueue(TaskQueue):
+    """
+    Task queue held in this process.
+    
+    Each delivery takes from the priority holding the message with the
+    lowest aging key among tenants under their limit. Within a priority, tenants
+    share delivery by weighted deficit round-robin, and a tenant at its
+    concurrency limit is passed over until one of its tasks is acked, so
+    one tenant's bulk import cannot hold every worker.
+    
+    Without a journal it is lost on restart. With one, every enqueue,
+    delivery, release and ack is appended to it, and start() rebuilds the
+    queue from it: tasks that were delivered but never acked come back as
+    redeliveries, so a task that keeps killing the process is still
+    dead-lettered. Journal writes happen in the background. An enqueued
+    task becomes visible only once its record is written, and the enqueue
+    fails if it cannot be; a lost delivery or ack record only means a
+    redelivery.
+    """
+    
+    backend = "memory"
+    
+    def __init__(
+        self,
+        visibility_timeout: Optional[float] = None,
+        journal: Optional[AppendOnlyJournal] = None,
+        aging_seconds: Optional[float] = None
+    ):
+        super().__init__(visibility_timeout, aging_seconds)
+        self.journal = journal
+        self.durable = journal is not None
+        self.compact_records = get_settings().task_journal_compact_records
+        self._waiting: Dict[TaskPriority, DeficitRoundRobin] = {
+            priority: DeficitRoundRobin() for priority in sorted(PRIORITY_RANK, key=PRIORITY_RANK.get)
+        }
+        self._delivered: Dict[str, Tuple[QueueMessage, float]] = {}
+        self._in_flight: Counter = Counter()
+        self._dead: deque = deque(maxlen=DEAD_LETTER_LIMIT)
+        self._available = asyncio.Event()
+        self._unwritten: Dict[str, QueueMessage] = {}  # enqueued, waiting for their journal record
+    
+    async def start(self) -> None:
+        """Rebuild the queue from the journal, if any."""
+        if self.journal is None:
+            return
+        
+        restored: Dict[str, Tuple[QueueMessage, bool]] = {}
+        for record in await asyncio.to_thread(self.journal.replay):
+            message_id = record.get("id")
+            op = record.get("op")
+            if op == "enqueue":
+                restored[message_id] = (self._decode(record), record.get("delivered", False))
+            elif message_id not in restored:
+                continue
+            elif op == "deliver":
+                message = restored[message_id][0]
+                message.deliveries = record["deliveries"]
+                restored[message_id] = (message, True)
+            elif op == "release":
+                restored[message_id] = (restored[message_id][0], False)
+            elif op == "ack":
+                del restored[message_id]
+        
+        redelivered = 0
+        for message, delivered in restored.values():
+            if delivered:
+                # Its worker went down with the process
+                message.deliveries += 1
+                redelivered += 1
+                QUEUE_REDELIVERED.inc(backend=self.backend)
+            self._push(message)
+        self._compact()
+        await self.journal.flush()
+        if restored:
+            logger.info(f"Restored {len(restored)} queued tasks from {self.journal.path}, {redelivered} of them interrupted")
+    
+    async def close(self) -> None:
+        """Leave a compact journal behind."""
+        if self.journal is not None:
+            self._compact()
+            await self.journal.close()
+    
+    @staticmethod
+    def _encode(message: QueueMessage, delivered: bool = False) -> Dict[str, Any]:
+        """Journal record that recreates a message."""
+        return {
+            "op": "enqueue",
+            "id": message.message_id,
+            "task_id": message.task_id,
+            "priority": message.priority.value,
+            "payload": message.payload,
+            "enqueued_at": message.enqueued_at,
+            "deliveries": message.deliveries,
+            "delivered": delivered
+        }
+    
+    @staticmethod
+    def _decode(record: Dict[str, Any]) -> QueueMessage:
+        """Message recreated from a journal record."""
+        return QueueMessage(
+            message_id=record["id"],
+            task_id=record["task_id"],
+            priority=TaskPriority(record["priority"]),
+            payload=record["payload"],
+            enqueued_at=record["enqueued_at"],
+            deliveries=record.get("deliveries", 1),
+            tenant=tenant_of(record["payload"])
+        )
+    
+    def _record(self, record: Dict[str, Any]) -> None:
+        """Append to the journal, rewriting it once enough history has built up."""
+        if self.journal is None:
+            return
+        self.journal.append(record)
+        if self.journal.appended >= self.compact_records:
+            self._compact()
+    
+    def _compact(self) -> None:
+        """Rewrite the journal as one record per message not yet acked."""
+        if self.journal is None:
+            return
+        records = [self._encode(message) for lanes in self._waiting.values() for message in lanes]
+        records.extend(self._encode(message) for message in self._unwritten.values())
+        records.extend(self._encode(message, delivered=True) for message, _ in self._delivered.values())
+        self.journal.rewrite(records)
+    
+    async def enqueue(self, task_id: str, priority: TaskPriority, payload: Dict[str, Any]) -> str:
+        """Add a task to its lane."""
+        return (await self.enqueue_many([(task_id, priority, payload)]))[0]
+    
+    async def enqueue_many(self, tasks: List[Tuple[str, TaskPriority, Dict[str, Any]]]) -> List[str]:
+        """Add several tasks, waiting for one journal write that covers them all."""
+        messages = [
+            QueueMessage(
+                message_id=uuid.uuid4().hex,
+                task_id=task_id,
+                priority=priority,
+                payload=payload,
+                enqueued_at=time.time(),
+                tenant=tenant_of(payload)
+            )
+            for task_id, priority, payload in tasks
+        ]
+        if self.journal is not None:
+            # Accepted tasks must survive a crash, so none is delivered before
+            # its record is written; concurrent enqueues share the write
+            for message in messages:
+                self._unwritten[message.message_id] = message
+                self._record(self._encode(message))
+            try:
+                await self.journal.flush()
+            except OSError as e:
+                raise ServiceUnavailableError(f"Task journal {self.journal.path} is not writable: {e}")
+            finally:
+                for message in messages:
+                    self._unwritten.pop(message.message_id, None)
+        for message in messages:
+            self._push(message)
+        return [message.message_id for message in messages]
+    
+    def _push(self, message: QueueMessage) -> None:
+        """Queue a message in its tenant's lane, oldest first, and wake a receiver."""
+        self._waiting[message.priority].push(message.tenant, message, message.enqueued_at)
+        self._available.set()
+    
+    def _deliver(self, message: QueueMessage) -> None:
+        """Hand a message out until its visibility timeout."""
+        self._delivered[message.message_id] = (message, time.monotonic() + self.visibility_timeout)
+        self._in_flight[message.tenant] += 1
+        self._record({"op": "deliver", "id": message.message_id, "deliveries": message.deliveries})
+    
+    def _forget(self, message: QueueMessage) -> bool:
+        """Drop a delivered message; returns whether it was delivered."""
+        if self._delivered.pop(message.message_id, None) is None:
+            return False
+        self._in_flight[message.tenant] -= 1
+        if self._in_flight[message.tenant] <= 0:
+            del self._in_flight[message.tenant]
+        # Its tenant may have dropped below its concurrency limit
+        self._available.set()
+        return True
+    
+    def _has_capacity(self, tenant: str) -> bool:
+        """Whether a tenant is under its concurrency limit."""
+        return has_capacity(tenant, self._in_flight[tenant])
+    
+    def _reclaim_expired(self) -> None:
+        """Put delivered messages whose visibility timeout passed back in the queue."""
+        now = time.monotonic()
+        for message_id, (message, deadline) in list(self._delivered.items()):
+            if deadline <= now:
+                self._forget(message)
+                message.deliveries += 1
+                QUEUE_REDELIVERED.inc(backend=self.backend)
+                self._push(message)
+    
+    def _next_lanes(self) -> Optional[DeficitRoundRobin]:
+        """Lanes of the priority that goes next by aging key; None if no tenant may take a message."""
+        chosen, chosen_key = None, None
+        for priority, lanes in self._waiting.items():
+            oldest = lanes.oldest_key(self._has_capacity)
+            if oldest is None:
+                continue
+            key = aging_key(priority, oldest, self.aging_seconds)
+            if chosen_key is None or key < chosen_key:
+                chosen, chosen_key = lanes, key
+        return chosen
+    
+    async def receive(self, count: int, timeout: float) -> List[QueueMessage]:
+        """Pop up to count messages, waiting for an enqueue or an expiry."""
+        deadline = time.monotonic() + timeout
+        while True:
+            self._reclaim_expired()
+            messages = []
+            while len(messages) < count:
+                lanes = self._next_lanes()
+                if lanes is None:
+                    break
+                message = lanes.pop(self._has_capacity)
+                self._deliver(message)
+                messages.append(message)
+            self._publish_depth(await self.depth_by_priority())
+            if messages:
+                return messages
+            
+            now = time.monotonic()
+            if now >= deadline:
+                return []
+            wait = deadline - now
+            if self._delivered:
+                wait = min(wait, max(0.0, min(expiry for _, expiry in self._delivered.values()) - now))
+            self._available.clear()
+            try:
+                await asyncio.wait_for(self._available.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def ack(self, message: QueueMessage) -> None:
+        """Forget a delivered message."""
+        self._forget(message)
+        self._record({"op": "ack", "id": message.message_id})
+    
+    async def touch(self, message: QueueMessage) -> None:
+        """Push back a delivered message's expiry."""
+        if message.message_id in self._delivered:
+            self._delivered[message.message_id] = (message, time.monotonic() + self.visibility_timeout)
+    
+    async def release(self, message: QueueMessage) -> None:
+        """Put a delivered message back in the heap as it was."""
+        if self._forget(message):
+            self._push(message)
+            self._record({"op": "release", "id": message.message_id})
+    
+    async def dead_letter(self, message: QueueMessage, reason: str) -> None:
+        """Keep the message in the bounded dead-letter list."""
+        self._forget(message)
+        self._record({"op": "ack", "id": message.message_id})
+        self._dead.append({"task_id": message.task_id, "reason": reason, "deliveries": message.deliveries, "payload": message.payload})
+        QUEUE_DEAD_LETTERED.inc(backend=self.backend)
+        logger.warning(f"Dead-lettered task {message.task_id}: {reason}")
+    
+    async def cancel(self, task_id: str) -> bool:
+        """Remove the task if it is waiting."""
+        cancelled = [message for lanes in self._waiting.values() for message in lanes if message.task_id == task_id]
+        if not cancelled:
+            return False
+        for lanes in self._waiting.values():
+            lanes.discard(lambda message: message.task_id == task_id)
+        for message in cancelled:
+            self._record({"op": "ack", "id": message.message_id})
+        return True
+    
+    async def depth_by_priority(self) -> Dict[TaskPriority, int]:
+        """Waiting messages per priority."""
+        return {priority: len(lanes) for priority, lanes in self._waiting.items()}
+    
+    async def abandon_waiting(self) -> List[QueueMessage]:
+        """Empty the queue unless a journal keeps it across the restart."""
+        if self.durable:
+            return []
+        waiting = [message for lanes in self._waiting.values() for message in lanes]
+        for lanes in self._waiting.values():
+            lanes.discard(lambda message: True)
+        return waiting
+    
+    @property
+    def dead_letters(self) -> List[Dict[str, Any]]:
+        """Dead-lettered tasks, oldest first."""
+        return list(self._dead)
+    
+    async def get_status(self) -> Dict[str, Any]:
+        """Waiting, delivered and dead-lettered counts."""
+        return {
+            "backend": self.backend,
+            "durable": self.durable,
+            "waiting": await self.depth(),
+            "delivered": len(self._delivered),
+            "dead_lettered": len(self._dead),
+            "waiting_tenants": len({tenant for lanes in self._waiting.values() for tenant in lanes.tenants}),
+            "in_flight_by_tenant": dict(self._in_flight)
+        }
+
+
+@dataclass
+class _Lane:
+    """One tenant's stream at one priority, with its entry counts."""
+    priority: TaskPriority
+    tenant: str
+    stream: str
+    length: int
+    pending: int  # delivered and not yet acked
+    last_pending: Optional[str] = None  # id of the newest pending entry
+    
+    @property
+    def waiting(self) -> int:
+        """Entries not yet delivered to any consumer."""
+        return self.length - self.pending
+
+
+class RedisStreamsTaskQueue(TaskQueue):
+    """
+    Task queue on Redis Streams, shared by all replicas.
+    
+    One stream per priority and tenant, read through a consumer group.
+    Priorities are read in order of the aging key of their longest-waiting
+    entry, from its enqueued_at field; within a priority each replica
+    takes the tenants' turns by weighted deficit round-robin, so the fleet
+    as a whole shares workers fairly. Tasks without a tenant, and any queued
+    before tenants had streams of their own, use the priority's base stream.
+    A set per priority lists the tenants that have a stream. A tenant's
+    in-flight count is its entries pending in the group, so concurrency
+    limits hold across replicas, give or take tasks that two replicas read
+    at the same moment.
+    
+    Delivered entries stay in the group's pending list until acked;
+    entries idle longer than the visibility timeout are claimed by whichever
+    consumer asks next, and the pending list's delivery counter drives
+    dead-lettering. Acked entries are deleted so stream length is the backlog.
+    """
+    
+    backend = "redis"
+    durable = True
+    
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        prefix: Optional[str] = None,
+        group: Optional[str] = None,
+        consumer: Optional[str] = None,
+        visibility_timeout: Optional[float] = None,
+        client: Optional[Any] = None,
+        aging_seconds: Optional[float] = None
+    ):
+        super().__init__(visibility_timeout, aging_seconds)
+        settings = get_settings()
+        if client is None and not REDIS_AVAILABLE:
+            raise ServiceUnavailableError("TASK_QUEUE_BACKEND=redis requires the redis package")
+        self.client = client or redis.from_url(url or settings.redis_connection_url, decode_responses=True)
+        self.prefix = prefix or settings.task_queue_prefix
+        self.group = group or settings.task_queue_group
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.streams = {
+            priority: f"{self.prefix}:{priority.value}"
+            for priority in sorted(PRIORITY_RANK, key=PRIORITY_RANK.get)
+        }
+        self._priorities = {stream: priority for priority, stream in self.streams.items()}
+        self._turns: Dict[TaskPriority, TenantTurns] = {priority: TenantTurns() for priority in self.streams}
+        self._grouped: Set[str] = set()
+        self.dead_stream = f"{self.prefix}:dead"
+        self.cancelled_key = f"{self.prefix}:cancelled"
+    
+    async def start(self) -> None:
+        """Create the base streams and their consumer group if they do not exist yet."""
+        for stream in self.streams.values():
+            await self._create_group(stream)
+        logger.info(f"Redis task queue ready: group {self.group}, consumer {self.consumer}")
+    
+    async def close(self) -> None:
+        """Close the Redis connection pool."""
+        await self.client.aclose()
+    
+    async def _create_group(self, stream: str) -> None:
+        """Create a stream's consumer group, and the stream with it, unless this process already has."""
+        if stream in self._grouped:
+            return
+        try:
+            await self.client.xgroup_create(stream, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._grouped.add(stream)
+    
+    def _stream(self, priority: TaskPriority, tenant: str) -> str:
+        """Stream holding a tenant's tasks of one priority."""
+        if tenant == DEFAULT_TENANT:
+            return self.streams[priority]
+        return f"{self.streams[priority]}:tenant:{tenant}"
+    
+    def _tenants_key(self, priority: TaskPriority) -> str:
+        """Set of tenants with a stream at a priority."""
+        return f"{self.streams[priority]}:tenants"
+    
+    def _lane_of(self, stream: str) -> Tuple[TaskPriority, str]:
+        """Priority and tenant a stream belongs to."""
+        for base, priority in self._priorities.items():
+            if stream == base:
+                return priority, DEFAULT_TENANT
+            if stream.startswith(f"{base}:tenant:"):
+                return priority, stream[len(base) + len(":tenant:"):]
+        raise ValueError(f"{stream} is not a task stream")
+    
+    @staticmethod
+    def _fields(task_id: str, payload: Dict[str, Any], enqueued_at: Optional[float] = None) -> Dict[str, str]:
+        """Stream entry for a task."""
+        return {
+            "task_id": task_id,
+            "payload": json.dumps(payload, default=str),
+            "enqueued_at": repr(enqueued_at if enqueued_at is not None else time.time())
+        }
+    
+    def _add(self, pipeline: Any, priority: TaskPriority, tenant: str, fields: Dict[str, str]) -> None:
+        """Queue an entry on a pipeline, registering its tenant after the entry is in the stream."""
+        pipeline.xadd(self._stream(priority, tenant), fields)
+        if tenant != DEFAULT_TENANT:
+            pipeline.sadd(self._tenants_key(priority), tenant)
+    
+    async def enqueue(self, task_id: str, priority: TaskPriority, payload: Dict[str, Any]) -> str:
+        """Append the task to its tenant's stream."""
+        return (await self.enqueue_many([(task_id, priority, payload)]))[0]
+    
+    async def enqueue_many(self, tasks: List[Tuple[str, TaskPriority, Dict[str, Any]]]) -> List[str]:
+        """Append several tasks in one pipelined round trip."""
+        for _, priority, payload in tasks:
+            await self._create_group(self._stream(priority, tenant_of(payload)))
+        
+        pipeline = self.client.pipeline(transaction=False)
+        positions = []
+        for task_id, priority, payload in tasks:
+            positions.append(len(pipeline))
+            self._add(pipeline, priority, tenant_of(payload), self._fields(task_id, payload))
+        replies = await pipeline.execute()
+        return [replies[position] for position in positions]
+    
+    def _message(self, stream: str, message_id: str, fields: Dict[str, str], deliveries: int = 1) -> QueueMessage:
+        """Decode a stream entry."""
+        priority, tenant = self._lane_of(stream)
+        return QueueMessage(
+            message_id=message_id,
+            task_id=fields["task_id"],
+            priority=priority,
+            payload=json.loads(fields["payload"]),
+            enqueued_at=float(fields["enqueued_at"]),
+            deliveries=deliveries,
+            tenant=tenant
+        )
+    
+    def _read_response(self, response: List[Any]) -> List[QueueMessage]:
+        """Decode an XREADGROUP reply."""
+        return [
+            self._message(stream, message_id, fields)
+            for stream, entries in response or []
+            for message_id, fields in entries
+        ]
+    
+    async def _lanes(self) -> List[_Lane]:
+        """Every registered stream with its entry counts, highest priority first."""
+        pipeline = self.client.pipeline(transaction=False)
+        for priority in self.streams:
+            pipeline.smembers(self._tenants_key(priority))
+        registered = await pipeline.execute()
+        
+        lanes = [
+            (priority, tenant, self._stream(priority, tenant))
+            for priority, tenants in zip(self.streams, registered)
+            for tenant in [DEFAULT_TENANT, *sorted(tenants)]
+        ]
+        for _, _, stream in lanes:
+            pipeline.xlen(stream)
+            pipeline.xpending(stream, self.group)
+        counts = await pipeline.execute()
+        return [
+            _Lane(
+                priority,
+                tenant,
+                stream,
+                length=counts[2 * index],
+                pending=counts[2 * index + 1]["pending"],
+                last_pending=counts[2 * index + 1]["max"]
+            )
+            for index, (priority, tenant, stream) in enumerate(lanes)
+        ]
+    
+    def _waiting_by_priority(self, lanes: List[_Lane]) -> Dict[TaskPriority, int]:
+        """Undelivered entries per priority."""
+        depths = {priority: 0 for priority in self.streams}
+        for lane in lanes:
+            depths[lane.priority] += lane.waiting
+        return depths
+    
+    async def _oldest_waiting(self, lanes: List[_Lane]) -> Dict[str, float]:
+        """Enqueue time of the longest-waiting entry of each lane with entries waiting, by stream."""
+        waiting = [lane for lane in lanes if lane.waiting > 0]
+        if not waiting:
+            return {}
+        
+        # New entries are read in id order and acked ones deleted, so the
+        # undelivered entries are exactly those after the newest pending one
+        pipeline = self.client.pipeline(transaction=False)
+        for lane in waiting:
+            start = "-"
+            if lane.last_pending:
+                ms, _, seq = lane.last_pending.partition("-")
+                start = f"{ms}-{int(seq) + 1}"
+            pipeline.xrange(lane.stream, min=start, count=1)
+        return {
+            lane.stream: float(entries[0][1]["enqueued_at"])
+            for lane, entries in zip(waiting, await pipeline.execute())
+            if entries
+        }
+    
+    async def _unregister_empty(self, lanes: List[_Lane]) -> None:
+        """Take tenants whose streams have emptied out of the tenant sets."""
+        empty = [lane for lane in lanes if lane.length == 0 and lane.tenant != DEFAULT_TENANT]
+        if not empty:
+            return
+        
+        # Remove, then look again: an enqueue adds its entry before registering,
+        # so it is either seen by the second look or registers itself afterwards
+        pipeline = self.client.pipeline(transaction=False)
+        for lane in empty:
+            pipeline.srem(self._tenants_key(lane.priority), lane.tenant)
+            pipeline.xlen(lane.stream)
+        replies = await pipeline.execute()
+        for lane, length in zip(empty, replies[1::2]):
+            if length:
+                await self.client.sadd(self._tenants_key(lane.priority), lane.tenant)
+    
+    async def receive(self, count: int, timeout: float) -> List[QueueMessage]:
+        """Claim expired deliveries, then read new entries in aging order, sharing each priority fairly."""
+        lanes = await self._lanes()
+        depths = self._waiting_by_priority(lanes)
+        await self._unregister_empty(lanes)
+        in_flight: Counter = Counter()
+        for lane in lanes:
+            in_flight[lane.tenant] += lane.pending
+        
+        messages = await self._reclaim([lane for lane in lanes if lane.pending], count)
+        oldest = await self._oldest_waiting([lane for lane in lanes if has_capacity(lane.tenant, in_flight[lane.tenant])])
+        keys: Dict[TaskPriority, float] = {}
+        for lane in lanes:
+            if lane.stream in oldest:
+                key = aging_key(lane.priority, oldest[lane.stream], self.aging_seconds)
+                keys[lane.priority] = min(keys.get(lane.priority, key), key)
+        # Ties go to the higher priority: lanes come highest priority first and sorting is stable
+        for priority in sorted(keys, key=keys.get):
+            if len(messages) >= count:
+                break
+            read = await self._read_fairly(
+                priority, [lane for lane in lanes if lane.priority == priority], in_flight, count - len(messages)
+            )
+            in_flight.update(message.tenant for message in read)
+            depths[priority] -= len(read)
+            messages.extend(read)
+        self._publish_depth(depths)
+        
+        if not messages and timeout > 0:
+            streams = [lane.stream for lane in lanes if has_capacity(lane.tenant, in_flight[lane.tenant])]
+            if not streams:
+                # Every tenant is at its limit until a task is acked
+                await asyncio.sleep(timeout)
+                return []
+            response = await self.client.xreadgroup(
+                self.group,
+                self.consumer,
+                {stream: ">" for stream in streams},
+                count=1,
+                block=max(1, int(timeout * 1000))
+            )
+            messages = self._read_response(response)
+        
+        return await self._drop_cancelled(messages)
+    
+    async def _read_fairly(self, priority: TaskPriority, lanes: List[_Lane], in_flight: Counter, count: int) -> List[QueueMessage]:
+        """Read up to count new entries of one priority, tenants taking turns within their limits."""
+        turns = self._turns[priority]
+        waiting = {lane.tenant: lane.waiting for lane in lanes}
+        for tenant in turns:
+            if waiting.get(tenant, 0) <= 0:
+                turns.remove(tenant)
+        for tenant, entries in waiting.items():
+            if entries > 0:
+                turns.add(tenant)
+        
+        planned: Counter = Counter()
+        order = []
+        
+        def eligible(tenant: str) -> bool:
+            return planned[tenant] < waiting[tenant] and has_capacity(tenant, in_flight[tenant] + planned[tenant])
+        
+        while len(order) < count:
+            tenant = turns.next(eligible)
+            if tenant is None:
+                break
+            planned[tenant] += 1
+            order.append(tenant)
+        if not order:
+            return []
+        
+        pipeline = self.client.pipeline(transaction=False)
+        for tenant, entries in planned.items():
+            pipeline.xreadgroup(self.group, self.consumer, {self._stream(priority, tenant): ">"}, count=entries)
+        read = {
+            tenant: self._read_response(response)
+            for tenant, response in zip(planned, await pipeline.execute())
+        }
+        # Deliver in turn order; another replica may have read some of the planned entries first
+        return [read[tenant].pop(0) for tenant in order if read[tenant]]
+    
+    async def _reclaim(self, lanes: List[_Lane], count: int) -> List[QueueMessage]:
+        """Take over entries another consumer left unacked past the visibility timeout."""
+        messages = []
+        min_idle_ms = int(self.visibility_timeout * 1000)
+        for lane in lanes:
+            if len(messages) >= count:
+                break
+            stream = lane.stream
+            reply = await self.client.xautoclaim(
+                stream, self.group, self.consumer, min_idle_ms, start_id="0-0", count=count - len(messages)
+            )
+            claimed = [(message_id, fields) for message_id, fields in reply[1] if fields]
+            if not claimed:
+                continue
+            
+            pending = await self.client.xpending_range(
+                stream, self.group, min=claimed[0][0], max=claimed[-1][0], count=len(claimed), consumername=self.consumer
+            )
+            deliveries = {entry["message_id"]: entry["times_delivered"] for entry in pending}
+            for message_id, fields in claimed:
+                QUEUE_REDELIVERED.inc(backend=self.backend)
+                messages.append(self._message(stream, message_id, fields, deliveries.get(message_id, 2)))
+        
+        if messages:
+            logger.warning(f"Reclaimed {len(messages)} tasks past their visibility timeout")
+        return messages
+    
+    async def _drop_cancelled(self, messages: List[QueueMessage]) -> List[QueueMessage]:
+        """Ack delivered messages for tasks cancelled while they waited."""
+        if not messages:
+            return messages
+        
+        flags = await self.client.smismember(self.cancelled_key, [message.task_id for message in messages])
+        kept = []
+        for message, cancelled in zip(messages, flags):
+            if cancelled:
+                await self.ack(message)
+                await self.client.srem(self.cancelled_key, message.task_id)
+            else:
+                kept.append(message)
+        return kept
+    
+    async def ack(self, message: QueueMessage) -> None:
+        """Acknowledge and delete the entry."""
+        stream = self._stream(message.priority, message.tenant)
+        await self.client.xack(stream, self.group, message.message_id)
+        await self.client.xdel(stream, message.message_id)
+    
+    async def touch(self, message: QueueMessage) -> None:
+        """Re-claim the entry for this consumer, resetting its idle time."""
+        await self.client.xclaim(
+            self._stream(message.priority, message.tenant), self.group, self.consumer, 0, [message.message_id], justid=True
+        )
+    
+    async def release(self, message: QueueMessage) -> None:
+        """Re-add the entry, keeping its original age, and ack the delivered copy."""
+        pipeline = self.client.pipeline(transaction=False)
+        self._add(pipeline, message.priority, message.tenant, self._fields(message.task_id, message.payload, message.enqueued_at))
+        await pipeline.execute()
+        await self.ack(message)
+    
+    async def dead_letter(self, message: QueueMessage, reason: str) -> None:
+        """Copy the entry to the dead-letter stream and ack it."""
+        await self.client.xadd(self.dead_stream, {
+            "task_id": message.task_id,
+            "priority": message.priority.value,
+            "payload": json.dumps(message.payload, default=str),
+            "reason": reason,
+            "deliveries": str(message.deliveries)
+        })
+        await self.ack(message)
+        QUEUE_DEAD_LETTERED.inc(backend=self.backend)
+        logger.warning(f"Dead-lettered task {message.task_id}: {reason}")
+    
+    async def cancel(self, task_id: str) -> bool:
+        """Mark the task cancelled; whichever consumer receives it drops it."""
+        await self.client.sadd(self.cancelled_key, task_id)
+        await self.client.expire(self.cancelled_key, CANCELLED_TTL_SECONDS)
+        return True
+    
+    async def depth_by_priority(self) -> Dict[TaskPriority, int]:
+        """Entries not yet delivered to any consumer, per priority."""
+        return self._waiting_by_priority(await self._lanes())
+    
+    async def get_status(self) -> Dict[str, Any]:
+        """Waiting, pending and dead-lettered counts across all replicas."""
+        lanes = await self._lanes()
+        in_flight: Counter = Counter()
+        for lane in lanes:
+            in_flight[lane.tenant] += lane.pending
+        return {
+            "backend": self.backend,
+            "durable": self.durable,
+            "consumer": self.consumer,
+            "waiting": sum(lane.waiting for lane in lanes),
+            "delivered": sum(lane.pending for lane in lanes),
+            "dead_lettered": await self.client.xlen(self.dead_stream),
+            "waiting_tenants": len({lane.tenant for lane in lanes if lane.waiting > 0}),
+            "in_flight_by_tenant": {tenant: count for tenant, count in in_flight.items() if count}
+        }
+
+
+def create_task_queue() -> TaskQueue:
+    """Create the queue backend selected by settings."""
+    settings = get_settings()
+    backend = settings.task_queue_backend
+    if backend == RedisStreamsTaskQueue.backend:
+        return RedisStreamsTaskQueue()
+    if backend != InProcessTaskQueue.backend:
+        logger.warning(f"Unknown task queue backend {backend}, using the in-process queue")
+    journal = AppendOnlyJournal(settings.task_journal_path) if settings.task_journal_path else None
+    return InProcessTaskQueue(journal=journal)
@@ -11,6 +11,17 @@ from .agent_helpers import (
     truncate_content,
     analyze_document_complexity
 )
+from .executors import run_cpu_bound
+from .json_stream import JSONStreamExtractor, extract_json
+from .prompt_builder import (
+    PromptBuilder,
+    PromptBudgetExceeded,
+    StageBudget,
+    count_tokens,
+    count_message_tokens,
+    compact_json,
+    truncate_to_tokens
+)
 
 __all__ = [
     "safe_json_parse",
@@ -20,5 +31,15 @@ __all__ = [
     "create_task_metadata",
     "format_legal_prompt",
     "truncate_content",
-    "analyze_document_complexity"
+    "analyze_document_complexity",
+    "run_cpu_bound",
+    "JSONStreamExtractor",
+    "extract_json",
+    "PromptBuilder",
+    "PromptBudgetExceeded",
+    "StageBudget",
+    "count_tokens",
+    "count_message_tokens",
+    "compact_json",
+    "truncate_to_tokens"
 ]
\ No newline at end of file
@@ -6,6 +6,8 @@ import re
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 
+from .json_stream import extract_json
+
 
 def safe_json_parse(text: str, fallback: Dict[str, Any] = None) -> Dict[str, Any]:
     """Safely parse JSON text with fallback."""
@@ -15,38 +17,15 @@ def safe_json_parse(text: str, fallback: Dict[str, Any] = None) -> Dict[str, Any
     try:
         # Try to parse as-is
         return json.loads(text)
-    except json.JSONDecodeError:
-        # Try to extract JSON from text
-        json_match = re.search(r'\{.*\}', text, re.DOTALL)
-        if json_match:
-            try:
-                return json.loads(json_match.group())
-            except json.JSONDecodeError:
-                pass
-        
-        # Return fallback
-        return fallback
+    except (json.JSONDecodeError, TypeError):
+        # Try to extract the first balanced JSON object from the text
+        extracted = extract_json(text)
+        return extracted if extracted is not None else fallback
 
 
 def extract_json_from_response(response: str) -> Optional[Dict[str, Any]]:
-    """Extract JSON from LLM response text."""
-    # Common patterns for JSON in responses
-    patterns = [
-        r'```json\s*(\{.*?\})\s*```',  # Code block
-        r'```\s*(\{.*?\})\s*```',      # Code block without json
-        r'(\{[^{}]*\{[^{}]*\}[^{}]*\})',  # Nested JSON
-        r'(\{[^{}]*\})',               # Simple JSON
-    ]
-    
-    for pattern in patterns:
-        matches = re.findall(pattern, response, re.DOTALL | re.IGNORECASE)
-        for match in matches:
-            try:
-                return json.loads(match)
-            except json.JSONDecodeError:
-                continue
-    
-    return None
+    """Extract JSON from LLM response text, including fenced code blocks."""
+    return extract_json(response)
 
 
 def clean_document_content(content: str) -> str:
@@ -139,7 +118,7 @@ def format_legal_prompt(
     
     for key, value in context.items():
         if isinstance(value, (dict, list)):
-            value = json.dumps(value, indent=2)
+            value = json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
         prompt_parts.append(f"- {key}: {value}")
     
     prompt_parts.extend([
@@ -0,0 +1,159 @@
+"""
+Offloading of blocking work from the event loop.
+CPU-bound analysis (regex scans over whole contracts, rule evaluation) runs
+inline, in a worker thread, or in a pre-warmed process pool. The strategy
+is chosen per workload from settings, or by input size: small inputs run
+inline where a hand-off would cost more than the work, large documents go
+to separate processes so they neither block the loop nor hold the GIL.
+"""
+import asyncio
+import functools
+import multiprocessing
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from src.core.config import get_settings
+from src.core.logging import get_logger
+from src.core.metrics import CPU_TASK_DURATION, current_agent
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Imported by each pool worker at start so the first task does not pay for it
+WORKER_MODULES = [
+    "src.agents.contract_reviewer.tools",
+    "src.agents.document_analyzer.tools",
+    "src.agents.document_classifier.tools"
+]
+
+
+class ExecutionStrategy(str, Enum):
+    """Where CPU-bound work runs."""
+    AUTO = "auto"
+    INLINE = "inline"
+    THREAD = "thread"
+    PROCESS = "process"
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_picklable: Dict[str, bool] = {}
+
+
+def _init_worker(modules: list) -> None:
+    """Process pool initializer: import the modules tasks will need."""
+    import importlib
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            logger.warning(f"Worker {os.getpid()} could not preload {module}: {e}")
+
+
+def _warm() -> int:
+    """No-op task used to start pool workers ahead of traffic."""
+    return os.getpid()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Get the shared process pool, creating it on first use."""
+    global _process_pool
+    if _process_pool is None:
+        settings = get_settings()
+        # spawn, not fork: forking a process running an event loop and threads is unsafe
+        _process_pool = ProcessPoolExecutor(
+            max_workers=settings.cpu_process_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(WORKER_MODULES,)
+        )
+    return _process_pool
+
+
+async def start_process_pool() -> None:
+    """Start every pool worker now so the first large document does not wait for spawns."""
+    workers = get_settings().cpu_process_workers
+    if workers <= 0:
+        return
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    pids = await asyncio.gather(*(loop.run_in_executor(pool, _warm) for _ in range(workers)))
+    logger.info(f"Process pool ready with {len(set(pids))} workers")
+
+
+def shutdown_executors() -> None:
+    """Shut down the process pool."""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def _payload_size(args: tuple, kwargs: Dict[str, Any]) -> int:
+    """Total length of the text arguments, used for size-based routing."""
+    return sum(len(value) for value in (*args, *kwargs.values()) if isinstance(value, (str, bytes)))
+
+
+def choose_strategy(workload: str, size: int, agent: Optional[str] = None) -> ExecutionStrategy:
+    """Pick a strategy: an override for agent.workload, workload or agent, else by size."""
+    settings = get_settings()
+    overrides = settings.cpu_executor_overrides
+    for key in (f"{agent}.{workload}", workload, agent):
+        if key and key in overrides:
+            strategy = ExecutionStrategy(overrides[key])
+            break
+    else:
+        strategy = ExecutionStrategy(settings.cpu_executor_default)
+    
+    if strategy == ExecutionStrategy.AUTO:
+        if size >= settings.cpu_process_min_bytes:
+            strategy = ExecutionStrategy.PROCESS
+        elif size < settings.cpu_inline_max_bytes:
+            strategy = ExecutionStrategy.INLINE
+        else:
+            strategy = ExecutionStrategy.THREAD
+    
+    if strategy == ExecutionStrategy.PROCESS and settings.cpu_process_workers <= 0:
+        strategy = ExecutionStrategy.THREAD
+    return strategy
+
+
+def _can_pickle(func: Callable[..., Any]) -> bool:
+    """Whether a callable can be sent to a pool worker; cached per function."""
+    key = getattr(func, "__qualname__", repr(func))
+    if key not in _picklable:
+        try:
+            pickle.dumps(func)
+            _picklable[key] = True
+        except Exception:
+            logger.debug(f"{key} cannot be pickled; running it in a thread instead of a process")
+            _picklable[key] = False
+    return _picklable[key]
+
+
+async def run_cpu_bound(func: Callable[..., T], *args: Any, workload: Optional[str] = None, **kwargs: Any) -> T:
+    """Run a blocking function with the strategy chosen for its workload and input size."""
+    workload = workload or getattr(func, "__name__", "task").lstrip("_")
+    agent = current_agent.get()
+    strategy = choose_strategy(workload, _payload_size(args, kwargs), agent)
+    if strategy == ExecutionStrategy.PROCESS and not _can_pickle(func):
+        strategy = ExecutionStrategy.THREAD
+
+    started_at = time.perf_counter()
+    try:
+        if strategy == ExecutionStrategy.INLINE:
+            return func(*args, **kwargs)
+        if strategy == ExecutionStrategy.THREAD:
+            # to_thread carries context variables, including metrics labels, into the worker
+            return await asyncio.to_thread(func, *args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_process_pool(), functools.partial(func, *args, **kwargs))
+    finally:
+        CPU_TASK_DURATION.observe(
+            time.perf_counter() - started_at,
+            agent=agent, workload=workload, strategy=strategy.value
+        )
@@ -0,0 +1,109 @@
+"""
+Incremental JSON extraction for LLM output.
+Scans streamed token deltas for the first brace-balanced JSON object so a
+structured response can be parsed, and the stream stopped, as soon as the
+object closes. Each character is inspected once, so cost is linear in the
+length of the response.
+"""
+import json
+import re
+from typing import Dict, Any, List, Optional
+
+# Characters that change scanner state outside and inside strings
+STRUCTURAL_PATTERN = re.compile(r'[{}\[\]"]')
+STRING_PATTERN = re.compile(r'["\\]')
+
+
+class JSONStreamExtractor:
+    """
+    Brace-balanced extractor for the first JSON object in a text stream.
+    
+    Text before the object (prose, code fences) is skipped. Braces inside
+    JSON strings are ignored. A balanced candidate that fails to parse is
+    discarded and scanning resumes after it, so no character is scanned twice.
+    """
+    
+    def __init__(self):
+        self.value: Optional[Dict[str, Any]] = None
+        self.characters = 0
+        self._parts: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+    
+    @property
+    def done(self) -> bool:
+        """Whether a complete object has been parsed."""
+        return self.value is not None
+    
+    def feed(self, delta: str) -> Optional[Dict[str, Any]]:
+        """Consume a token delta; return the object once its top-level brace closes."""
+        if self.done or not delta:
+            return self.value
+        self.characters += len(delta)
+        
+        position = 0
+        segment_start = 0
+        length = len(delta)
+        while position < length:
+            if self._depth == 0:
+                position = delta.find("{", position)
+                if position < 0:
+                    return None
+                segment_start = position
+                self._depth = 1
+                position += 1
+                continue
+            
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                    position += 1
+                    continue
+                match = STRING_PATTERN.search(delta, position)
+                if match is None:
+                    break
+                position = match.end()
+                if match.group() == "\\":
+                    self._escaped = True
+                else:
+                    self._in_string = False
+                continue
+            
+            match = STRUCTURAL_PATTERN.search(delta, position)
+            if match is None:
+                break
+            position = match.end()
+            char = match.group()
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(delta[segment_start:position])
+                    if self._close():
+                        return self.value
+        
+        if self._depth > 0:
+            self._parts.append(delta[segment_start:])
+        return None
+    
+    def _close(self) -> bool:
+        """Parse the balanced candidate; reset for the next one if it is not JSON."""
+        candidate = "".join(self._parts)
+        self._parts = []
+        self._in_string = False
+        self._escaped = False
+        try:
+            value = json.loads(candidate)
+        except json.JSONDecodeError:
+            return False
+        self.value = value
+        return True
+
+
+def extract_json(text: str) -> Optional[Dict[str, Any]]:
+    """Extract the first JSON object embedded in text."""
+    return JSONStreamExtractor().feed(text or "")
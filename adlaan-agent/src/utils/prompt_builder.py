@@ -0,0 +1,276 @@
+"""
+Token-budgeted prompt construction for LLM calls.
+Counts tokens locally, serializes structured context compactly and shrinks
+low-priority sections so each stage's prompt fits its input budget.
+"""
+import asyncio
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Any, Optional, List
+
+from src.core.config import get_settings
+from src.core.logging import get_logger
+from src.utils.agent_helpers import truncate_content
+
+logger = get_logger(__name__)
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+
+# Context window sizes by model name prefix (longest prefix wins)
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4.1": 1047576,
+    "gpt-3.5-turbo": 16385,
+}
+
+# Tokens added per chat message for role and framing
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@dataclass
+class StageBudget:
+    """Input and output token budgets for one LLM stage."""
+    input_tokens: int
+    output_tokens: int
+
+
+# Default budgets per stage; None output means settings.openai_max_tokens
+DEFAULT_STAGE_BUDGETS: Dict[str, Dict[str, Optional[int]]] = {
+    "analyze_requirements": {"input_tokens": 2000, "output_tokens": 800},
+    "analyze_outline": {"input_tokens": 2000, "output_tokens": 2000},
+    "generate_draft": {"input_tokens": 3000, "output_tokens": None},
+    "generate_single_pass": {"input_tokens": 3000, "output_tokens": None},
+    "draft_section": {"input_tokens": 2500, "output_tokens": 1200},
+    "review_section": {"input_tokens": 4000, "output_tokens": 1500},
+    "review_and_refine": {"input_tokens": 6000, "output_tokens": None},
+}
+
+
+class PromptBudgetExceeded(Exception):
+    """Raised when a prompt's fixed sections alone exceed the input budget."""
+    
+    def __init__(self, stage: str, required_tokens: int, budget_tokens: int):
+        self.stage = stage
+        self.required_tokens = required_tokens
+        self.budget_tokens = budget_tokens
+        super().__init__(
+            f"Prompt for {stage} needs {required_tokens} tokens but the budget is {budget_tokens}"
+        )
+
+
+@lru_cache(maxsize=16)
+def _get_encoding(model: str):
+    """Load the tokenizer for a model once; None if unavailable (e.g. offline)."""
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        try:
+            return tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning(f"Tokenizer unavailable, using estimates: {e}")
+            return None
+    except Exception as e:
+        logger.warning(f"Tokenizer unavailable for {model}, using estimates: {e}")
+        return None
+
+
+async def preload_tokenizer(model: Optional[str] = None) -> bool:
+    """
+    Load the model's tokenizer in a worker thread; returns whether one is available.
+    
+    The first load may download the encoding, which would otherwise block
+    the event loop inside the first LLM call.
+    """
+    return await asyncio.to_thread(_get_encoding, model or get_settings().openai_model) is not None
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Count tokens in text with the model's tokenizer, or estimate without one."""
+    if not text:
+        return 0
+    encoding = _get_encoding(model or get_settings().openai_model)
+    if encoding is None:
+        # ~4 characters per token for English legal text
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: List[Any], model: Optional[str] = None) -> int:
+    """Count prompt tokens for a list of chat messages."""
+    total = 0
+    for message in messages:
+        content = getattr(message, "content", message)
+        total += count_tokens(str(content), model) + MESSAGE_OVERHEAD_TOKENS
+    return total + 2
+
+
+def get_context_window(model: Optional[str] = None) -> int:
+    """Get the context window for a model, honoring the settings override."""
+    settings = get_settings()
+    if settings.llm_context_window:
+        return settings.llm_context_window
+    
+    model = model or settings.openai_model
+    matches = [prefix for prefix in MODEL_CONTEXT_WINDOWS if model.startswith(prefix)]
+    if not matches:
+        return MODEL_CONTEXT_WINDOWS["gpt-4"]
+    return MODEL_CONTEXT_WINDOWS[max(matches, key=len)]
+
+
+def get_stage_budget(stage: str, model: Optional[str] = None) -> StageBudget:
+    """Resolve a stage's budgets from defaults, settings overrides and the context window."""
+    settings = get_settings()
+    budget = dict(DEFAULT_STAGE_BUDGETS.get(stage, {"input_tokens": 3000, "output_tokens": None}))
+    budget.update(settings.prompt_stage_budgets.get(stage, {}))
+    
+    output_tokens = budget["output_tokens"] or settings.openai_max_tokens
+    context_window = get_context_window(model)
+    
+    # Output gets its allowance first; input takes what is left of the window
+    output_tokens = min(output_tokens, context_window // 2)
+    input_tokens = min(budget["input_tokens"], context_window - output_tokens)
+    
+    return StageBudget(input_tokens=input_tokens, output_tokens=output_tokens)
+
+
+def compact_json(value: Any) -> str:
+    """Serialize a value as compact JSON."""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def prune_structure(value: Any, max_items: int, max_string: int) -> Any:
+    """Shorten lists and long strings inside a JSON-like structure."""
+    if isinstance(value, dict):
+        return {key: prune_structure(item, max_items, max_string) for key, item in value.items()}
+    if isinstance(value, list):
+        pruned = [prune_structure(item, max_items, max_string) for item in value[:max_items]]
+        if len(value) > max_items:
+            pruned.append(f"... {len(value) - max_items} more")
+        return pruned
+    if isinstance(value, str) and len(value) > max_string:
+        return value[:max_string] + "..."
+    return value
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """Truncate text at a sentence boundary so it fits in max_tokens."""
+    tokens = count_tokens(text, model)
+    if tokens <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+    
+    max_length = int(len(text) * max_tokens / tokens * 0.95)
+    truncated = truncate_content(text, max_length)
+    while max_length > 0 and count_tokens(truncated, model) > max_tokens:
+        max_length = int(max_length * 0.9)
+        truncated = truncate_content(text, max_length)
+    return truncated
+
+
+@dataclass
+class _Section:
+    """One labelled part of a prompt."""
+    name: str
+    text: str
+    value: Any = None
+    priority: int = 0
+    truncatable: bool = True
+    min_tokens: int = 0
+
+
+class PromptBuilder:
+    """
+    Assemble a prompt from labelled sections under a token budget.
+    
+    Sections with truncatable=False are always kept whole. When the prompt is
+    over budget, truncatable sections are shrunk starting with the highest
+    priority number (least important); structured sections are pruned before
+    their text is cut.
+    """
+    
+    def __init__(self, stage: str, model: Optional[str] = None):
+        self.stage = stage
+        self.model = model or get_settings().openai_model
+        self.budget = get_stage_budget(stage, self.model)
+        self._sections: List[_Section] = []
+        self._reserved_tokens = 0
+    
+    def reserve(self, tokens: int) -> "PromptBuilder":
+        """Reserve input tokens for content sent outside this prompt (e.g. the system message)."""
+        self._reserved_tokens += tokens
+        return self
+    
+    def add_text(
+        self,
+        name: str,
+        text: str,
+        priority: int = 0,
+        truncatable: bool = True,
+        min_tokens: int = 0
+    ) -> "PromptBuilder":
+        """Add a plain-text section."""
+        self._sections.append(_Section(name, text or "", None, priority, truncatable, min_tokens))
+        return self
+    
+    def add_json(self, name: str, value: Any, priority: int = 0, min_tokens: int = 0) -> "PromptBuilder":
+        """Add a structured section serialized as compact JSON."""
+        self._sections.append(_Section(name, compact_json(value), value, priority, True, min_tokens))
+        return self
+    
+    def _shrink(self, section: _Section, target_tokens: int) -> None:
+        """Shrink a section towards target_tokens."""
+        target_tokens = max(target_tokens, section.min_tokens)
+        if section.value is not None:
+            for max_items, max_string in ((10, 400), (5, 200), (3, 80), (1, 40)):
+                section.text = compact_json(prune_structure(section.value, max_items, max_string))
+                if count_tokens(section.text, self.model) <= target_tokens:
+                    return
+        section.text = truncate_to_tokens(section.text, target_tokens, self.model)
+    
+    def build(self) -> str:
+        """Render the prompt within the stage's input budget."""
+        available = self.budget.input_tokens - self._reserved_tokens
+        sizes = {id(section): count_tokens(section.text, self.model) for section in self._sections}
+        
+        fixed = sum(sizes[id(section)] for section in self._sections if not section.truncatable)
+        if fixed > available:
+            raise PromptBudgetExceeded(self.stage, fixed + self._reserved_tokens, self.budget.input_tokens)
+        
+        overflow = sum(sizes.values()) - available
+        if overflow > 0:
+            flexible = sorted(
+                (section for section in self._sections if section.truncatable),
+                key=lambda section: section.priority,
+                reverse=True
+            )
+            for section in flexible:
+                if overflow <= 0:
+                    break
+                before = sizes[id(section)]
+                self._shrink(section, before - overflow)
+                sizes[id(section)] = count_tokens(section.text, self.model)
+                overflow -= before - sizes[id(section)]
+            
+            if overflow > 0:
+                raise PromptBudgetExceeded(self.stage, available + overflow + self._reserved_tokens, self.budget.input_tokens)
+            
+            logger.info(f"Prompt for {self.stage} compacted to fit {self.budget.input_tokens} input tokens")
+        
+        return "\n\n".join(section.text for section in self._sections if section.text)
+    
+    @property
+    def max_output_tokens(self) -> int:
+        """Output token allowance for this stage."""
+        return self.budget.output_tokens
@@ -2,18 +2,25 @@
 Test configuration and fixtures.
 """
 import pytest
+import pytest_asyncio
 import asyncio
+from datetime import datetime
 from typing import AsyncGenerator
 from unittest.mock import Mock, AsyncMock
 
 from fastapi.testclient import TestClient
 from httpx import AsyncClient
 
+from mock_redis_server import create_server
 from src.main import create_app
 from src.core.config import get_settings
 from src.core.dependencies import get_container
+from src.schemas import TaskStatus
+from src.services import health as health_module
+from src.services.health import HealthMonitor
 from src.services.task_manager import TaskManagerService
-from src.integrations.backend_service import BackendIntegrationService
+from src.services.task_queue import InProcessTaskQueue, RedisStreamsTaskQueue
+from src.integrations.backend_service import AgentTask, BackendIntegrationService
 
 
 @pytest.fixture(scope="session")
@@ -66,6 +73,78 @@ def mock_task_manager(mock_backend_service):
     return manager
 
 
+class FakeBackend:
+    """Backend that keeps created tasks, serves them back and records status writes."""
+    
+    def __init__(self):
+        self.tasks = {}
+        self.batches = []
+        self.updates = []
+    
+    def _create(self, agent_type, task_input, user_id, case_id=None, metadata=None) -> AgentTask:
+        task = AgentTask(
+            id=len(self.tasks) + 1,
+            agent_type=agent_type,
+            status=TaskStatus.PENDING,
+            input_data=task_input,
+            metadata=metadata,
+            case_id=case_id,
+            created_by=user_id,
+            created_at=datetime.utcnow(),
+            updated_at=datetime.utcnow()
+        )
+        self.tasks[task.id] = task
+        return task
+    
+    async def create_agent_task(self, agent_type, task_input, user_id, case_id=None, metadata=None):
+        # Yield like a real request, so concurrent submissions interleave
+        await asyncio.sleep(0.01)
+        return self._create(agent_type, task_input, user_id, case_id, metadata)
+    
+    async def create_agent_tasks(self, tasks):
+        self.batches.append(tasks)
+        return [self._create(**spec) for spec in tasks]
+    
+    async def get_agent_task(self, task_id):
+        return self.tasks.get(task_id)
+    
+    async def update_task_status(self, task_id, status, **kwargs):
+        self.updates.append((task_id, status))
+        return True
+    
+    async def cleanup(self):
+        pass
+
+
+@pytest.fixture
+def task_manager_settings(monkeypatch):
+    """Settings the task_manager fixture is created with; override to change them."""
+    settings = get_settings()
+    monkeypatch.setattr(settings, "cpu_process_workers", 0)
+    return settings
+
+
+@pytest_asyncio.fixture
+async def task_manager(task_manager_settings):
+    """Task manager on a FakeBackend, with its queue consumer stopped so queued tasks stay queued."""
+    service = TaskManagerService()
+    await service.initialize()
+    service._consumer_task.cancel()
+    backend_service = service.backend_service
+    service.backend_service = FakeBackend()
+    yield service
+    service.backend_service = backend_service
+    await service.cleanup()
+
+
+@pytest.fixture
+def health_monitor(monkeypatch):
+    """Fresh health monitor in place of the process-wide one; nothing is registered or refreshed."""
+    monitor = HealthMonitor(interval_seconds=60, timeout_seconds=1)
+    monkeypatch.setattr(health_module, "_health_monitor", monitor)
+    return monitor
+
+
 @pytest.fixture
 def app_with_mocks(mock_task_manager, mock_backend_service):
     """Create app with mocked dependencies."""
@@ -89,4 +168,43 @@ def client(app_with_mocks):
 async def async_client(app_with_mocks) -> AsyncGenerator[AsyncClient, None]:
     """Async test client."""
     async with AsyncClient(app=app_with_mocks, base_url="http://test") as ac:
-        yield ac
\ No newline at end of file
+        yield ac
+
+
+class QueueFactory:
+    """Creates consumers sharing one queue."""
+    
+    def __init__(self, backend: str, url: str = None):
+        self.backend = backend
+        self.url = url
+        self.queues = []
+        self._memory = None
+    
+    async def consumer(self, name: str, visibility_timeout: float = 30.0):
+        """A started queue handle for the named consumer."""
+        if self.backend == "memory":
+            if self._memory is None:
+                self._memory = InProcessTaskQueue(visibility_timeout=visibility_timeout)
+            return self._memory
+        
+        queue = RedisStreamsTaskQueue(url=self.url, consumer=name, visibility_timeout=visibility_timeout)
+        await queue.start()
+        self.queues.append(queue)
+        return queue
+
+
+@pytest_asyncio.fixture(params=["memory", "redis"])
+async def queues(request):
+    """Queue factory for each backend; Redis runs against a fresh mock server."""
+    if request.param == "memory":
+        yield QueueFactory("memory")
+        return
+    
+    server = await create_server()
+    port = server.sockets[0].getsockname()[1]
+    factory = QueueFactory("redis", f"redis://127.0.0.1:{port}/0")
+    yield factory
+    for queue in factory.queues:
+        await queue.close()
+    server.close()
+    await server.wait_closed()
@@ -11,24 +11,44 @@ from src.schemas import AgentType, TaskStatus
 class TestHealthEndpoints:
     """Test health check endpoints."""
     
-    async def test_health_check_success(self, async_client: AsyncClient, mock_task_manager):
+    async def test_health_check_success(self, async_client: AsyncClient, health_monitor, mock_backend_service):
         """Test successful health check."""
-        mock_task_manager.health_check.return_value = {
-            "status": "healthy",
-            "backend_connected": True,
-            "available_agents": [AgentType.LEGAL_DOCUMENT_GENERATOR],
-            "agent_statuses": {"legal_document_generator": "healthy"}
-        }
+        mock_backend_service.health_check.return_value = {"status": "healthy", "details": {"connected": True}}
+        health_monitor.register("backend", mock_backend_service.health_check)
+        await health_monitor.refresh()
         
         response = await async_client.get("/api/v2/health")
         
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "healthy"
-        assert "services" in data
+        assert data["services"] == {"backend": "healthy"}
         assert "version" in data
         assert "uptime_seconds" in data
     
+    async def test_liveness_probe(self, async_client: AsyncClient, health_monitor):
+        """Test that liveness answers before any health check has run."""
+        response = await async_client.get("/api/v2/health/live")
+        
+        assert response.status_code == 200
+        assert response.json()["status"] == "alive"
+    
+    async def test_readiness_probe(self, async_client: AsyncClient, health_monitor, mock_backend_service):
+        """Test that readiness waits for the first refresh and fails while a critical check fails."""
+        health_monitor.register("backend", mock_backend_service.health_check)
+        assert (await async_client.get("/api/v2/health/ready")).status_code == 503
+        
+        await health_monitor.refresh()
+        response = await async_client.get("/api/v2/health/ready")
+        assert response.status_code == 200
+        assert response.json()["ready"] is True
+        
+        mock_backend_service.health_check.side_effect = ConnectionError("backend down")
+        await health_monitor.refresh()
+        response = await async_client.get("/api/v2/health/ready")
+        assert response.status_code == 503
+        assert response.json()["failing"] == ["backend"]
+    
     async def test_legacy_health_endpoint(self, async_client: AsyncClient):
         """Test legacy health endpoint."""
         response = await async_client.get("/health")
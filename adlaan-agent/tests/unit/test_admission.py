@@ -0,0 +1,179 @@
+"""
+Unit tests for admission control and load shedding.
+"""
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.api import v2_router
+from src.api.v2.routes import get_task_manager
+from src.core.config import get_settings
+from src.core.exceptions import OverloadedError, create_http_exception
+from src.schemas import AgentType, TaskPriority
+from src.services.admission import AdmissionController
+from src.services.llm_gateway import LLMGateway
+
+
+class FakeScheduler:
+    """Scheduler exposing fixed load figures."""
+    
+    def __init__(self, workers: int = 2, busy: int = 2, depth: int = 0):
+        self.workers = workers
+        self.busy = busy
+        self.depth = depth
+
+
+class FakeQueue:
+    """Queue with a settable depth."""
+    
+    def __init__(self, depth: int = 0):
+        self.queued = depth
+    
+    async def depth(self) -> int:
+        return self.queued
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    """Small, round limits so saturation is easy to reason about."""
+    settings = get_settings()
+    monkeypatch.setattr(settings, "task_queue_max_size", 100)
+    monkeypatch.setattr(settings, "admission_max_wait_seconds", 1000.0)
+    monkeypatch.setattr(settings, "admission_default_task_seconds", 10.0)
+    monkeypatch.setattr(settings, "admission_max_retry_after_seconds", 600)
+    monkeypatch.setattr(settings, "admission_shed_thresholds", {"low": 0.6, "normal": 0.8, "high": 0.95, "urgent": 1.0})
+    return settings
+
+
+def controller(depth: int = 0, workers: int = 2) -> AdmissionController:
+    """Admission controller over fake load and an idle gateway."""
+    return AdmissionController(FakeScheduler(workers=workers), FakeQueue(depth), gateway=LLMGateway(model=object()))
+
+
+class TestAdmissionController:
+    """Test saturation signals and shedding order."""
+    
+    @pytest.mark.asyncio
+    async def test_sheds_low_priority_first(self, limits):
+        """Test that LOW is refused at a load that still admits NORMAL and above."""
+        admission = controller(depth=70)
+        
+        with pytest.raises(OverloadedError) as refused:
+            await admission.admit(TaskPriority.LOW)
+        load = await admission.admit(TaskPriority.NORMAL)
+        
+        assert load.reason == "queue"
+        assert refused.value.status_code == 429
+        assert refused.value.details["reason"] == "queue"
+        # 10 tasks over the LOW threshold, draining at 2 workers / 10 s
+        assert refused.value.retry_after == 50
+        assert refused.value.headers == {"Retry-After": "50"}
+    
+    @pytest.mark.asyncio
+    async def test_full_queue_refuses_every_priority(self, limits):
+        """Test that URGENT is only refused once the queue is full."""
+        assert (await controller(depth=99).admit(TaskPriority.URGENT)).saturation < 1
+        
+        with pytest.raises(OverloadedError):
+            await controller(depth=100).admit(TaskPriority.URGENT)
+    
+    @pytest.mark.asyncio
+    async def test_estimated_wait_tracks_task_duration(self, limits):
+        """Test that slow tasks raise the wait estimate until it dominates."""
+        admission = controller(depth=20, workers=1)
+        assert (await admission.measure()).estimated_wait_seconds == pytest.approx(200)
+        
+        for _ in range(50):
+            admission.record_task(60.0)
+        load = await admission.measure()
+        
+        assert load.estimated_wait_seconds == pytest.approx(1200, rel=0.01)
+        assert load.reason == "wait"
+        with pytest.raises(OverloadedError):
+            await admission.admit(TaskPriority.HIGH)
+    
+    @pytest.mark.asyncio
+    async def test_llm_pressure_sheds_and_waits_for_refill(self, limits):
+        """Test that a drained rate-limit bucket sheds work until it refills."""
+        admission = controller()
+        bucket = admission.gateway.request_bucket
+        await bucket.acquire(bucket.capacity * 0.7)
+        
+        await admission.admit(TaskPriority.NORMAL)
+        with pytest.raises(OverloadedError) as refused:
+            await admission.admit(TaskPriority.LOW)
+        
+        assert refused.value.details["reason"] == "llm"
+        # 30% of a minute's requests must refill before the bucket is under 40% used
+        assert refused.value.retry_after in (6, 7)
+    
+    @pytest.mark.asyncio
+    async def test_urgent_is_not_shed_for_llm_pressure(self, limits):
+        """Test that an empty rate-limit bucket sheds HIGH but still admits URGENT."""
+        admission = controller()
+        bucket = admission.gateway.request_bucket
+        await bucket.acquire(bucket.capacity)
+        
+        with pytest.raises(OverloadedError):
+            await admission.admit(TaskPriority.HIGH)
+        await admission.admit(TaskPriority.URGENT)
+        assert (await admission.get_status())["shedding"] == ["low", "normal", "high"]
+    
+    @pytest.mark.asyncio
+    async def test_unsettled_token_reservations_are_not_pressure(self, limits):
+        """Test that token pressure counts settled usage, not the allowance reserved by in-flight calls."""
+        gateway = controller().gateway
+        await gateway._acquire("default", int(gateway.token_bucket.capacity * 0.9))
+        admission = AdmissionController(FakeScheduler(), FakeQueue(), gateway=gateway)
+        
+        assert (await admission.measure()).llm < 0.1
+    
+    @pytest.mark.asyncio
+    async def test_status_lists_shed_priorities(self, limits):
+        """Test the autoscaler view of the load."""
+        status = await controller(depth=85).get_status()
+        
+        assert status["saturation"] == 0.85
+        assert status["shedding"] == ["low", "normal"]
+        assert status["llm_headroom"] == pytest.approx(1.0, abs=0.01)
+    
+    def test_http_exception_carries_retry_after(self):
+        """Test that routes return the Retry-After header."""
+        http_exception = create_http_exception(OverloadedError("busy", 12))
+        
+        assert http_exception.status_code == 429
+        assert http_exception.headers == {"Retry-After": "12"}
+        assert http_exception.detail["details"]["retry_after"] == 12
+
+
+class TestAdmissionRoutes:
+    """Test shedding through the API."""
+    
+    @pytest.mark.asyncio
+    async def test_saturated_service_returns_429(self, limits):
+        """Test that a shed submission gets 429 and the saturation endpoint reports it."""
+        
+        class Manager:
+            admission = controller(depth=90)
+            
+            def is_agent_available(self, agent_type):
+                return True
+            
+            async def create_task(self, agent_type, input_data, user_id, case_id=None, priority=TaskPriority.NORMAL, **kwargs):
+                await self.admission.admit(priority)
+                raise AssertionError("Task should have been shed")
+        
+        app = FastAPI()
+        app.include_router(v2_router)
+        app.dependency_overrides[get_task_manager] = lambda: Manager()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+        
+        response = await client.post(
+            "/api/v2/tasks?user_id=1",
+            json={"agent_type": AgentType.DOCUMENT_ANALYZER.value, "input_data": {}, "priority": "normal"}
+        )
+        saturation = await client.get("/api/v2/health/saturation")
+        
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+        assert saturation.json()["shedding"] == ["low", "normal"]
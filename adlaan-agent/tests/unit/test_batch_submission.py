@@ -0,0 +1,162 @@
+"""
+Unit tests for batch task submission.
+"""
+import json
+
+import httpx
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from fastapi import FastAPI
+
+from src.api import v2_router
+from src.api.v2.routes import get_task_manager
+from src.core.exceptions import BackendConnectionError, OverloadedError
+from src.integrations.backend_service import AgentTask, BackendIntegrationService
+from src.schemas import AgentType, TaskPriority
+
+
+class GraphQLBackend:
+    """Backend answering aliased createAgentTask mutations; inputs containing "fail" are rejected."""
+    
+    def __init__(self):
+        self.requests = []
+        self.next_id = 1
+    
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.requests.append(body)
+        data, errors = {}, []
+        for name, task_input in body["variables"].items():
+            alias = name.replace("input", "task")
+            if "fail" in task_input["input"]:
+                data[alias] = None
+                errors.append({"message": "invalid input", "path": [alias]})
+                continue
+            data[alias] = {
+                "id": self.next_id,
+                "type": task_input["type"],
+                "status": "pending",
+                "input": task_input["input"],
+                "caseId": task_input["caseId"],
+                "createdBy": task_input["createdBy"],
+                "createdAt": "2024-01-01T00:00:00Z",
+                "metadata": task_input["metadata"]
+            }
+            self.next_id += 1
+        result = {"data": data}
+        if errors:
+            result["errors"] = errors
+        return web.json_response(result)
+
+
+@pytest_asyncio.fixture
+async def backend(monkeypatch):
+    """Backend service pointed at a local GraphQL stand-in, two tasks per mutation."""
+    graphql = GraphQLBackend()
+    app = web.Application()
+    app.router.add_post("/graphql", graphql.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    
+    service = BackendIntegrationService()
+    service.graphql_url = f"http://127.0.0.1:{port}/graphql"
+    monkeypatch.setattr(service.settings, "backend_batch_size", 2)
+    await service.initialize()
+    yield service, graphql
+    await service.cleanup()
+    await runner.cleanup()
+
+
+def spec(content: str, priority: TaskPriority = TaskPriority.NORMAL, deduplicate: bool = True):
+    """create_task keyword arguments for a document analysis."""
+    return {
+        "agent_type": AgentType.DOCUMENT_ANALYZER,
+        "input_data": {"document_content": content},
+        "priority": priority,
+        "deduplicate": deduplicate
+    }
+
+
+class TestBatchedMutation:
+    """Test the aliased createAgentTask mutation."""
+    
+    @pytest.mark.asyncio
+    async def test_chunks_keep_order_and_isolate_failures(self, backend):
+        """Test that tasks are created two per request and a rejected entry fails alone."""
+        service, graphql = backend
+        tasks = [
+            {"agent_type": AgentType.DOCUMENT_ANALYZER, "task_input": {"text": text}, "user_id": 1}
+            for text in ["a", "fail", "c"]
+        ]
+        
+        results = await service.create_agent_tasks(tasks)
+        
+        assert len(graphql.requests) == 2
+        assert "task1: createAgentTask(input: $input1)" in graphql.requests[0]["query"]
+        assert [result.input_data for result in results if isinstance(result, AgentTask)] == [{"text": "a"}, {"text": "c"}]
+        assert isinstance(results[1], BackendConnectionError)
+        assert "invalid input" in results[1].message
+
+
+class TestCreateTasks:
+    """Test batch creation in the task task_manager."""
+    
+    @pytest.mark.asyncio
+    async def test_one_backend_write_for_the_batch(self, task_manager):
+        """Test that a batch is created and queued together, with repeats sharing a task."""
+        results = await task_manager.create_tasks([spec("a"), spec("b"), spec("a"), spec("c")], user_id=1)
+        
+        assert len(task_manager.backend_service.batches) == 1
+        assert len(task_manager.backend_service.batches[0]) == 3
+        assert [task.id for task in results] == [1, 2, 1, 3]
+        assert results[2].metadata["deduplicated"] is True
+        assert await task_manager.task_queue.depth() == 3
+        
+        again = await task_manager.create_tasks([spec("b")], user_id=1)
+        assert again[0].id == 2
+        assert len(task_manager.backend_service.batches) == 1
+    
+    @pytest.mark.asyncio
+    async def test_entries_fail_independently(self, task_manager, monkeypatch):
+        """Test that shed and unavailable entries fail while the rest are created."""
+        monkeypatch.setattr(task_manager.settings, "task_queue_max_size", 10)
+        monkeypatch.setattr(task_manager.settings, "admission_shed_thresholds", {"low": 0.2, "normal": 0.8})
+        task_manager.agents.pop(AgentType.CONTRACT_REVIEWER)
+        unavailable = {**spec("x"), "agent_type": AgentType.CONTRACT_REVIEWER}
+        low = [spec(f"low {n}", TaskPriority.LOW) for n in range(3)]
+        
+        results = await task_manager.create_tasks([spec("normal"), unavailable, *low], user_id=1)
+        
+        assert isinstance(results[0], AgentTask)
+        assert "not available" in results[1].message
+        assert all(isinstance(result, OverloadedError) for result in results[2:])
+        assert await task_manager.task_queue.depth() == 1
+
+
+class TestBatchRoute:
+    """Test POST /api/v2/tasks/batch."""
+    
+    @pytest.mark.asyncio
+    async def test_batch_endpoint(self, task_manager, monkeypatch):
+        """Test per-entry results, counts and the size limit."""
+        app = FastAPI()
+        app.include_router(v2_router)
+        app.dependency_overrides[get_task_manager] = lambda: task_manager
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+        entry = {"agent_type": "document_analyzer", "input_data": {"document_content": "x"}}
+        
+        response = await client.post("/api/v2/tasks/batch?user_id=1", json={"tasks": [entry, entry]})
+        body = response.json()
+        
+        assert response.status_code == 200
+        assert (body["created"], body["deduplicated"], body["failed"]) == (1, 1, 0)
+        assert [item["task"]["id"] for item in body["results"]] == [1, 1]
+        
+        monkeypatch.setattr(task_manager.settings, "task_batch_max_size", 1)
+        too_many = await client.post("/api/v2/tasks/batch?user_id=1", json={"tasks": [entry, entry]})
+        assert too_many.status_code == 422
+        assert json.loads(too_many.text)["detail"]["details"] == {"submitted": 2}
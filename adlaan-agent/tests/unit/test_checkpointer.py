@@ -0,0 +1,226 @@
+"""
+Unit tests for the bounded workflow checkpointer.
+"""
+import asyncio
+import threading
+
+import pytest
+
+from langchain_core.messages import AIMessageChunk
+from langgraph.checkpoint.base import empty_checkpoint
+
+from src.agents import LegalDocumentGeneratorAgent
+from src.schemas import AgentType
+from src.services import checkpointer as checkpointer_module
+from src.services.checkpointer import BoundedCheckpointer, CompactSerializer
+
+
+VALID_DOCUMENT = (
+    "NON-DISCLOSURE AGREEMENT. This Agreement is made between the parties. "
+    "Each party shall keep the other party's information confidential under "
+    "the terms and conditions set out below."
+)
+
+
+def save(checkpointer: BoundedCheckpointer, thread_id: str, content: str = "") -> dict:
+    """Save a checkpoint holding ``content`` for a thread."""
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"content": content}
+    return checkpointer.put(
+        {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}},
+        checkpoint,
+        {"source": "loop", "step": 0},
+        {}
+    )
+
+
+class WorkerCrash(BaseException):
+    """Stands in for the worker process dying mid-task."""
+
+
+class StageModel:
+    """Model that records the stage of each call and can crash on one of them."""
+    
+    def __init__(self, crash_on=None):
+        self.crash_on = crash_on
+        self.calls = []
+    
+    async def astream(self, messages, **kwargs):
+        prompt = messages[-1].content
+        stage = "analysis" if "Analyze the requirements" in prompt else (
+            "review" if "Review and refine" in prompt else "draft"
+        )
+        self.calls.append(stage)
+        if stage == self.crash_on:
+            raise WorkerCrash()
+        yield AIMessageChunk(content='{"requirements": ["Confidentiality"]}' if stage == "analysis" else VALID_DOCUMENT)
+
+
+async def generator_with(checkpointer: BoundedCheckpointer, model: StageModel) -> LegalDocumentGeneratorAgent:
+    """Initialized generator using the given checkpointer and model."""
+    agent = LegalDocumentGeneratorAgent()
+    agent.checkpointer = checkpointer
+    await agent.initialize()
+    agent.llm = model
+    return agent
+
+
+class TestBoundedCheckpointer:
+    """Test the BoundedCheckpointer class."""
+    
+    def test_least_recently_used_threads_are_evicted(self):
+        """Test that the thread count limit evicts the least recently used thread."""
+        checkpointer = BoundedCheckpointer(max_threads=2)
+        save(checkpointer, "a")
+        save(checkpointer, "b")
+        checkpointer.get_tuple({"configurable": {"thread_id": "a"}})
+        save(checkpointer, "c")
+        
+        assert checkpointer.thread_ids() == ["a", "c"]
+        assert checkpointer.stats["evictions"] == 1
+    
+    def test_memory_limit_and_history(self):
+        """Test that only recent checkpoints are kept and memory stays under the cap."""
+        checkpointer = BoundedCheckpointer(max_memory_bytes=4000, history=2)
+        for thread in range(20):
+            for step in range(5):
+                save(checkpointer, str(thread), f"contract text {thread}/{step} " * 200)
+        
+        assert checkpointer.memory_bytes <= 4000
+        latest = checkpointer.get_tuple({"configurable": {"thread_id": "19"}})
+        assert latest.checkpoint["channel_values"]["content"].startswith("contract text 19/4")
+        assert len(list(checkpointer.list({"configurable": {"thread_id": "19"}}))) == 2
+    
+    def test_large_payloads_are_compressed(self):
+        """Test that the serializer compresses large values and round-trips them."""
+        serde = CompactSerializer()
+        value = {"content": "The Receiving Party shall keep all information confidential. " * 100}
+        
+        type_, data = serde.dumps_typed(value)
+        
+        assert type_ == "msgpack+zlib"
+        assert len(data) < len(value["content"]) / 10
+        assert serde.loads_typed((type_, data)) == value
+    
+    def test_evicted_threads_reload_from_sqlite(self, tmp_path):
+        """Test that SQLite keeps evicted threads and survives a new instance."""
+        path = str(tmp_path / "checkpoints.db")
+        checkpointer = BoundedCheckpointer(max_threads=1, sqlite_path=path)
+        save(checkpointer, "a", "first")
+        save(checkpointer, "b", "second")
+        
+        restarted = BoundedCheckpointer(sqlite_path=path)
+        
+        assert sorted(restarted.thread_ids()) == ["a", "b"]
+        assert restarted.get_tuple({"configurable": {"thread_id": "a"}}).checkpoint["channel_values"] == {"content": "first"}
+        assert restarted.stats["disk_loads"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_alist_reads_sqlite_off_the_event_loop(self, tmp_path):
+        """Test that listing every thread asynchronously keeps SQLite reads off the loop thread."""
+        path = str(tmp_path / "checkpoints.db")
+        checkpointer = BoundedCheckpointer(max_threads=1, sqlite_path=path)
+        save(checkpointer, "a", "first")
+        save(checkpointer, "b", "second")
+        restarted = BoundedCheckpointer(max_threads=1, sqlite_path=path)
+        
+        loop_thread = threading.get_ident()
+        reads = []
+        for name in ("thread_ids", "load_thread"):
+            method = getattr(restarted.store, name)
+            
+            def record(*args, _method=method, _name=name):
+                reads.append((_name, threading.get_ident() == loop_thread))
+                return _method(*args)
+            setattr(restarted.store, name, record)
+        
+        checkpoints = [checkpoint async for checkpoint in restarted.alist(None)]
+        
+        assert sorted(checkpoint.config["configurable"]["thread_id"] for checkpoint in checkpoints) == ["a", "b"]
+        assert {name for name, _ in reads} == {"thread_ids", "load_thread"}
+        assert not any(on_loop for _, on_loop in reads)
+
+
+class TestResumeAfterCrash:
+    """Test resuming an interrupted workflow from its last completed node."""
+    
+    @pytest.mark.asyncio
+    async def test_resume_skips_completed_llm_stages(self, tmp_path):
+        """Test that a restarted worker does not repeat stages finished before the crash."""
+        path = str(tmp_path / "checkpoints.db")
+        request = {"document_type": "nda", "title": "NDA", "parameters": {}, "generation_mode": "standard"}
+        
+        crashing = await generator_with(BoundedCheckpointer(sqlite_path=path), StageModel(crash_on="draft"))
+        with pytest.raises(WorkerCrash):
+            await crashing.process(request, task_id="42")
+        assert crashing.llm.calls == ["analysis", "draft"]
+        
+        model = StageModel()
+        restarted = await generator_with(BoundedCheckpointer(sqlite_path=path), model)
+        result = await restarted.process(request, task_id="42")
+        
+        assert model.calls == ["draft", "review"]
+        assert result["analysis"]["requirements"] == ["Confidentiality"]
+        assert result["document"]["content"] == VALID_DOCUMENT
+        assert restarted.checkpointer.thread_ids() == []
+    
+    @pytest.mark.asyncio
+    async def test_failed_stream_is_not_resumed(self, tmp_path, monkeypatch):
+        """Test that a streamed run that failed leaves no checkpoint for the next run of the task to resume."""
+        request = {"document_type": "nda", "title": "NDA", "parameters": {}, "generation_mode": "standard"}
+        finalize = LegalDocumentGeneratorAgent._finalize_document
+        failures = [RuntimeError("finalize failed")]
+        
+        async def finalize_once(agent, state):
+            if failures:
+                raise failures.pop()
+            return await finalize(agent, state)
+        monkeypatch.setattr(LegalDocumentGeneratorAgent, "_finalize_document", finalize_once)
+        model = StageModel()
+        agent = await generator_with(BoundedCheckpointer(sqlite_path=str(tmp_path / "checkpoints.db")), model)
+        
+        events = [event async for event in agent.stream_process(request, task_id="42")]
+        assert events[-1]["type"] == "error"
+        assert agent.checkpointer.thread_ids() == []
+        
+        model.calls.clear()
+        result = await agent.process({**request, "title": "Second NDA"}, task_id="42")
+        
+        assert model.calls == ["analysis", "draft", "review"]
+        assert result["document"]["content"] == VALID_DOCUMENT
+    
+    @pytest.mark.asyncio
+    async def test_startup_looks_up_interrupted_tasks_together(self, task_manager, monkeypatch, tmp_path):
+        """Test that resuming scans SQLite off the loop and looks every thread's task up concurrently."""
+        checkpointer = BoundedCheckpointer(sqlite_path=str(tmp_path / "checkpoints.db"))
+        for thread_id in ["1", "2", "draft"]:
+            save(checkpointer, thread_id)
+        monkeypatch.setattr(checkpointer_module, "_checkpointer", checkpointer)
+        backend = task_manager.backend_service
+        await backend.create_agent_task(AgentType.DOCUMENT_ANALYZER, {}, user_id=1)
+        
+        loop_thread = threading.get_ident()
+        scanned_on = []
+        thread_ids = checkpointer.store.thread_ids
+        
+        def scan():
+            scanned_on.append(threading.get_ident())
+            return thread_ids()
+        monkeypatch.setattr(checkpointer.store, "thread_ids", scan)
+        
+        in_flight, overlaps = set(), []
+        
+        async def get_agent_task(task_id):
+            in_flight.add(task_id)
+            await asyncio.sleep(0.05)
+            overlaps.append(len(in_flight))
+            in_flight.discard(task_id)
+            return backend.tasks.get(task_id)
+        monkeypatch.setattr(backend, "get_agent_task", get_agent_task)
+        
+        await task_manager._resume_interrupted_tasks()
+        
+        assert scanned_on and loop_thread not in scanned_on
+        assert max(overlaps) == 2
+        assert checkpointer.thread_ids() == ["1"]
+        assert await task_manager.task_queue.depth() == 1
@@ -0,0 +1,151 @@
+"""
+Unit tests for idempotent task submission and duplicate detection.
+"""
+import asyncio
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+
+from mock_redis_server import create_server
+from src.api import v2_router
+from src.api.v2.routes import get_task_manager
+from src.schemas import AgentType, TaskStatus
+from src.services.deduplication import (
+    FINGERPRINT,
+    IDEMPOTENCY_KEY,
+    InProcessKeyStore,
+    RedisKeyStore,
+    TaskDeduplicator,
+    fingerprint
+)
+
+
+@pytest_asyncio.fixture(params=["memory", "redis"])
+async def store(request):
+    """Key store for each backend; Redis runs against a fresh mock server."""
+    if request.param == "memory":
+        yield InProcessKeyStore()
+        return
+    
+    server = await create_server()
+    port = server.sockets[0].getsockname()[1]
+    redis_store = RedisKeyStore(url=f"redis://127.0.0.1:{port}/0")
+    yield redis_store
+    await redis_store.close()
+    server.close()
+    await server.wait_closed()
+
+
+class TestFingerprint:
+    """Test input fingerprinting."""
+    
+    def test_canonical_input(self):
+        """Test that key order does not matter but owner and content do."""
+        first = fingerprint(AgentType.DOCUMENT_ANALYZER, {"a": 1, "b": {"x": [1, 2], "y": "z"}}, user_id=1)
+        reordered = fingerprint(AgentType.DOCUMENT_ANALYZER, {"b": {"y": "z", "x": [1, 2]}, "a": 1}, user_id=1)
+        
+        assert first == reordered
+        assert first != fingerprint(AgentType.DOCUMENT_ANALYZER, {"a": 1, "b": {"x": [1, 2], "y": "z"}}, user_id=2)
+        assert first != fingerprint(AgentType.DOCUMENT_ANALYZER, {"a": 2, "b": {"x": [1, 2], "y": "z"}}, user_id=1)
+
+
+class TestTaskDeduplicator:
+    """Test key claims against each store."""
+    
+    @pytest.mark.asyncio
+    async def test_claim_complete_and_match(self, store):
+        """Test that a completed claim is returned to later submissions."""
+        deduplicator = TaskDeduplicator(store=store, window_seconds=60, key_ttl_seconds=60, prefix="test")
+        keys = deduplicator.keys_for(AgentType.DOCUMENT_ANALYZER, {"text": "x"}, user_id=1, idempotency_key="abc")
+        assert [kind for kind, _ in keys] == [IDEMPOTENCY_KEY, FINGERPRINT]
+        
+        assert await deduplicator.acquire(keys) is None
+        await deduplicator.complete(keys, "42")
+        
+        assert await deduplicator.acquire(keys) == (IDEMPOTENCY_KEY, "42")
+        fingerprint_only = deduplicator.keys_for(AgentType.DOCUMENT_ANALYZER, {"text": "x"}, user_id=1)
+        assert await deduplicator.acquire(fingerprint_only) == (FINGERPRINT, "42")
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicate_waits_for_first(self, store):
+        """Test that a duplicate arriving mid-creation gets the first task's id."""
+        deduplicator = TaskDeduplicator(store=store, window_seconds=60, prefix="test")
+        keys = deduplicator.keys_for(AgentType.DOCUMENT_ANALYZER, {"text": "x"}, user_id=1)
+        assert await deduplicator.acquire(keys) is None
+        
+        duplicate = asyncio.create_task(deduplicator.acquire(keys))
+        await asyncio.sleep(0.1)
+        assert not duplicate.done()
+        await deduplicator.complete(keys, "7")
+        
+        assert await asyncio.wait_for(duplicate, timeout=1) == (FINGERPRINT, "7")
+    
+    @pytest.mark.asyncio
+    async def test_release_and_window(self, store):
+        """Test that released keys can be claimed again and a zero window disables fingerprints."""
+        deduplicator = TaskDeduplicator(store=store, window_seconds=60, prefix="test")
+        keys = deduplicator.keys_for(AgentType.DOCUMENT_ANALYZER, {"text": "x"}, user_id=1)
+        assert await deduplicator.acquire(keys) is None
+        await deduplicator.release(keys)
+        assert await deduplicator.acquire(keys) is None
+        
+        disabled = TaskDeduplicator(store=store, window_seconds=0, prefix="test")
+        assert disabled.keys_for(AgentType.DOCUMENT_ANALYZER, {"text": "x"}, user_id=1) == []
+
+
+class TestDuplicateSubmissions:
+    """Test that the task task_manager reuses earlier tasks."""
+    
+    @pytest.mark.asyncio
+    async def test_double_submit_creates_one_task(self, task_manager):
+        """Test that concurrent identical submissions share one backend task."""
+        tasks = await asyncio.gather(*(
+            task_manager.create_task(AgentType.DOCUMENT_ANALYZER, {"document_content": "x"}, user_id=1)
+            for _ in range(3)
+        ))
+        
+        assert {task.id for task in tasks} == {1}
+        assert len(task_manager.backend_service.tasks) == 1
+        assert sum(bool(task.metadata.get("deduplicated")) for task in tasks) == 2
+        assert await task_manager.task_queue.depth() == 1
+    
+    @pytest.mark.asyncio
+    async def test_idempotency_key_and_opt_out(self, task_manager):
+        """Test that a retried key returns the first task and opting out always creates one."""
+        first = await task_manager.create_task(AgentType.DOCUMENT_ANALYZER, {"document_content": "x"}, user_id=1, idempotency_key="k1")
+        retry = await task_manager.create_task(AgentType.DOCUMENT_ANALYZER, {"document_content": "edited"}, user_id=1, idempotency_key="k1")
+        fresh = await task_manager.create_task(AgentType.DOCUMENT_ANALYZER, {"document_content": "x"}, user_id=1, deduplicate=False)
+        
+        assert retry.id == first.id
+        assert fresh.id != first.id
+    
+    @pytest.mark.asyncio
+    async def test_failed_task_is_not_reused(self, task_manager):
+        """Test that resubmitting after a failure runs the agent again."""
+        first = await task_manager.create_task(AgentType.DOCUMENT_ANALYZER, {"document_content": "x"}, user_id=1)
+        task_manager.backend_service.tasks[first.id].status = TaskStatus.FAILED
+        
+        second = await task_manager.create_task(AgentType.DOCUMENT_ANALYZER, {"document_content": "x"}, user_id=1)
+        third = await task_manager.create_task(AgentType.DOCUMENT_ANALYZER, {"document_content": "x"}, user_id=1)
+        
+        assert second.id != first.id
+        assert third.id == second.id
+    
+    @pytest.mark.asyncio
+    async def test_replayed_response_header(self, task_manager):
+        """Test that a duplicate submission is flagged in the response."""
+        app = FastAPI()
+        app.include_router(v2_router)
+        app.dependency_overrides[get_task_manager] = lambda: task_manager
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+        body = {"agent_type": "document_analyzer", "input_data": {"document_content": "x"}}
+        
+        first = await client.post("/api/v2/tasks?user_id=1", json=body, headers={"Idempotency-Key": "k"})
+        retry = await client.post("/api/v2/tasks?user_id=1", json=body, headers={"Idempotency-Key": "k"})
+        
+        assert first.status_code == retry.status_code == 200
+        assert "Idempotent-Replayed" not in first.headers
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert retry.json()["id"] == first.json()["id"]
@@ -0,0 +1,334 @@
+"""
+Unit tests for the legal document generator's generation modes and templates.
+"""
+import asyncio
+import json
+import re
+import time
+
+import pytest
+import pytest_asyncio
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from src.agents import LegalDocumentGeneratorAgent
+from src.agents.legal_document_generator.template_engine import get_template_engine
+from src.core.exceptions import ValidationError
+
+
+VALID_DOCUMENT = (
+    "NON-DISCLOSURE AGREEMENT. This Agreement is made between the parties. "
+    "Each party shall keep the other party's information confidential under "
+    "the terms and conditions set out below."
+)
+
+
+@pytest_asyncio.fixture
+async def generator():
+    """Initialized generator agent."""
+    agent = LegalDocumentGeneratorAgent()
+    await agent.initialize()
+    return agent
+
+
+def fake_llm(*responses: str) -> FakeListChatModel:
+    """Fake model returning responses in order."""
+    return FakeListChatModel(responses=list(responses))
+
+
+class TestFastGeneration:
+    """Test the single-pass generation mode."""
+    
+    @pytest.mark.asyncio
+    async def test_valid_draft_finishes_in_one_call(self, generator):
+        """Test that a draft passing local validation skips review."""
+        generator.llm = fake_llm(
+            f'{{"requirements": ["Confidentiality"]}}\n=== DOCUMENT ===\n{VALID_DOCUMENT}',
+            "UNEXPECTED SECOND CALL"
+        )
+        
+        result = await generator.process({
+            "document_type": "nda",
+            "title": "NDA",
+            "parameters": {},
+            "generation_mode": "fast"
+        })
+        
+        assert generator.llm.i == 1
+        assert result["document"]["content"] == VALID_DOCUMENT
+        assert result["analysis"]["requirements"] == ["Confidentiality"]
+        assert result["document"]["metadata"]["reviewed"] is False
+    
+    @pytest.mark.asyncio
+    async def test_invalid_draft_is_reviewed(self, generator):
+        """Test that a draft failing local validation goes through review."""
+        generator.llm = fake_llm("too short", VALID_DOCUMENT)
+        
+        result = await generator.process({
+            "document_type": "notice",
+            "title": "Notice",
+            "parameters": {},
+            "generation_mode": "fast"
+        })
+        
+        assert result["document"]["content"] == VALID_DOCUMENT
+        assert result["document"]["metadata"]["reviewed"] is True
+    
+    @pytest.mark.asyncio
+    async def test_review_never_skips_review_in_standard_mode(self, generator):
+        """Test that the review policy also applies to standard generation."""
+        generator.llm = fake_llm('{"requirements": []}', "Short draft.", "UNEXPECTED REVIEW")
+        
+        result = await generator.process({
+            "document_type": "memo",
+            "title": "Memo",
+            "parameters": {},
+            "review": "never"
+        })
+        
+        assert result["document"]["content"] == "Short draft."
+    
+    @pytest.mark.asyncio
+    async def test_unknown_mode_is_rejected(self, generator):
+        """Test that invalid generation options raise a validation error."""
+        with pytest.raises(ValidationError):
+            await generator._prepare_input({"document_type": "nda", "generation_mode": "turbo"})
+
+
+EMPLOYMENT_PARAMETERS = {
+    "employer_name": "Adlaan LLC",
+    "employee_name": "John Doe",
+    "position": "Software Developer",
+    "salary": 1500,
+    "start_date": "2025-01-01"
+}
+
+
+class TestTemplateGeneration:
+    """Test template routing in the document generator."""
+    
+    def test_engine_falls_back_to_default_jurisdiction(self):
+        """Test lookup by alias and fallback to the default jurisdiction."""
+        engine = get_template_engine()
+        
+        assert engine.find("employment_contract", "jordan").key == ("employment_contract", "jordan", "en")
+        assert engine.find("employment_agreement", "uae").key == ("employment_contract", "default", "en")
+        assert engine.find("nda", "jordan", "fr") is None
+    
+    def test_match_requires_every_parameter(self):
+        """Test that only fully specified requests match a template."""
+        engine = get_template_engine()
+        
+        assert engine.match("employment_contract", "jordan", "en", EMPLOYMENT_PARAMETERS).key[0] == "employment_contract"
+        assert engine.match("employment_contract", "jordan", "en", {"employee_name": "John Doe"}) is None
+    
+    def test_parameters_cannot_override_request_fields(self):
+        """Test that user parameters named like engine context do not replace it."""
+        engine = get_template_engine()
+        template = engine.find("employment_contract", "jordan")
+        parameters = {**EMPLOYMENT_PARAMETERS, "title": "Injected", "jurisdiction": "nowhere"}
+        
+        content = engine.render(template, parameters, title="Employment Agreement", jurisdiction="jordan")
+        
+        assert content.startswith("EMPLOYMENT AGREEMENT")
+        assert "INJECTED" not in content
+    
+    @pytest.mark.asyncio
+    async def test_fully_specified_document_skips_llm(self, generator):
+        """Test that complete parameters render from a template with no LLM call."""
+        generator.llm = fake_llm("UNEXPECTED LLM CALL")
+        
+        result = await generator.process({
+            "document_type": "employment_contract",
+            "title": "Employment Agreement - John Doe",
+            "parameters": EMPLOYMENT_PARAMETERS,
+            "jurisdiction": "jordan"
+        })
+        
+        document = result["document"]
+        assert generator.llm.i == 0
+        assert document["content"].startswith("EMPLOYMENT AGREEMENT - JOHN DOE")
+        assert "1500 JOD" in document["content"]
+        assert document["metadata"]["generation_mode"] == "template"
+        assert document["metadata"]["template"] == "employment_contract/jordan/en"
+    
+    @pytest.mark.asyncio
+    async def test_incomplete_parameters_use_llm(self, generator):
+        """Test that free-form requests still go through the LLM."""
+        generator.llm = fake_llm('{"requirements": []}', VALID_DOCUMENT, VALID_DOCUMENT)
+        
+        result = await generator.process({
+            "document_type": "employment_contract",
+            "title": "Employment Agreement",
+            "parameters": {"employee_name": "John Doe"}
+        })
+        
+        assert result["document"]["metadata"]["generation_mode"] == "standard"
+        assert result["document"]["content"] == VALID_DOCUMENT
+    
+    @pytest.mark.asyncio
+    async def test_template_mode_reports_missing_parameters(self, generator):
+        """Test that forcing template mode without full parameters is rejected."""
+        with pytest.raises(ValidationError) as error:
+            await generator._prepare_input({
+                "document_type": "nda",
+                "parameters": {"disclosing_party": "Adlaan LLC"},
+                "generation_mode": "template"
+            })
+        
+        assert error.value.details["missing_parameters"] == ["receiving_party", "purpose"]
+
+
+OUTLINE_ANALYSIS = json.dumps({
+    "requirements": ["Confidentiality"],
+    "outline": [{"heading": f"Clause {number}", "summary": f"Terms of clause {number}"} for number in range(1, 5)],
+    "definitions": {"Confidential Information": "non-public information disclosed by either party"}
+})
+
+
+class SectionModel:
+    """Fake model that answers the analysis call and drafts or reviews sections with a delay."""
+    
+    def __init__(self, delay: float = 0.1, delays=None):
+        self.delay = delay
+        self.delays = delays or {}
+        self.prompts = []
+        self.log = []
+        self.active = 0
+        self.peak = 0
+    
+    async def ainvoke(self, messages, **kwargs):
+        return AIMessage(content=OUTLINE_ANALYSIS)
+    
+    async def astream(self, messages, **kwargs):
+        prompt = messages[-1].content
+        if "Analyze the requirements" in prompt:
+            yield AIMessageChunk(content=OUTLINE_ANALYSIS)
+            return
+        kind = "review" if "Review and refine" in prompt else "draft"
+        number = int(re.search(r"section (\d+)", prompt).group(1))
+        self.prompts.append(prompt)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        self.log.append(("start", kind, number))
+        try:
+            await asyncio.sleep(self.delays.get((kind, number), self.delay))
+            if kind == "review":
+                yield AIMessageChunk(content=f"Reviewed terms of clause {number}.")
+            else:
+                yield AIMessageChunk(content=f"The parties agree to the terms of clause {number}.")
+        finally:
+            self.active -= 1
+            self.log.append(("end", kind, number))
+
+
+class TestSectionedGeneration:
+    """Test section-parallel drafting."""
+    
+    @pytest.mark.asyncio
+    async def test_sections_drafted_concurrently_and_stitched_in_order(self, generator):
+        """Test that sections overlap in time and come back in outline order."""
+        generator.llm = SectionModel(delay=0.1)
+        
+        started = time.perf_counter()
+        result = await generator.process({
+            "document_type": "nda",
+            "title": "NDA",
+            "parameters": {},
+            "generation_mode": "sectioned",
+            "review": "never"
+        })
+        elapsed = time.perf_counter() - started
+        
+        content = result["document"]["content"]
+        positions = [content.index(f"{number}. CLAUSE {number}") for number in range(1, 5)]
+        
+        assert generator.llm.peak == 4
+        assert elapsed < 0.3
+        assert positions == sorted(positions)
+        assert "terms of clause 3." in content
+        assert all('"Confidential Information"' in prompt for prompt in generator.llm.prompts)
+    
+    @pytest.mark.asyncio
+    async def test_section_review_overlaps_drafting(self, generator):
+        """Test that early sections are reviewed while later ones are still drafting."""
+        generator.llm = SectionModel(delay=0.02, delays={("draft", 4): 0.2})
+        
+        started = time.perf_counter()
+        result = await generator.process({
+            "document_type": "nda",
+            "title": "NDA",
+            "parameters": {},
+            "generation_mode": "sectioned",
+            "review": "always"
+        })
+        elapsed = time.perf_counter() - started
+        
+        log = generator.llm.log
+        content = result["document"]["content"]
+        
+        assert log.index(("start", "review", 1)) < log.index(("end", "draft", 4))
+        assert elapsed < 0.35
+        assert "Reviewed terms of clause 4." in content
+        assert "The parties agree" not in content
+        assert result["document"]["metadata"]["reviewed"] is True
+
+
+class TestStructuredStreaming:
+    """Test early stopping of structured JSON completions."""
+    
+    @pytest.mark.asyncio
+    async def test_analysis_stream_stops_when_object_closes(self, generator):
+        """Test that trailing tokens after the analysis object are never consumed."""
+        consumed = []
+        
+        class TrailingModel:
+            async def astream(self, messages, **kwargs):
+                for delta in ['Here you go: {"requirements": ', '["Confidentiality"], "analysis": {"note": "a } b"}}', " trailing"] + ["x"] * 50:
+                    consumed.append(delta)
+                    yield AIMessageChunk(content=delta)
+        
+        generator.llm = TrailingModel()
+        state = await generator._analyze_requirements({
+            "task_id": "analysis-task",
+            "document_type": "nda",
+            "title": "NDA",
+            "parameters": {},
+            "jurisdiction": "jordan",
+            "generation_mode": "standard"
+        })
+        
+        assert state["requirements"] == ["Confidentiality"]
+        assert state["analysis"] == {"note": "a } b"}
+        assert len(consumed) == 2
+
+
+class TestStreamProcess:
+    """Test single-execution streaming."""
+    
+    @pytest.mark.asyncio
+    async def test_stream_runs_workflow_once(self, generator):
+        """Test that streaming makes the same LLM calls as a plain run and reports each node."""
+        generator.llm = fake_llm(
+            f'{{"requirements": ["Confidentiality"]}}\n=== DOCUMENT ===\n{VALID_DOCUMENT}',
+            "UNEXPECTED SECOND CALL"
+        )
+        
+        events = [event async for event in generator.stream_process({
+            "document_type": "nda",
+            "title": "NDA",
+            "parameters": {},
+            "generation_mode": "fast"
+        })]
+        
+        assert generator.llm.i == 1
+        completed = [event for event in events if event["type"] == "node_completed"]
+        assert [event["node"] for event in completed] == [
+            "research_legal_context", "generate_single_pass", "finalize_document"
+        ]
+        assert all(event["duration_ms"] >= 0 for event in completed)
+        assert completed[1]["output"]["draft_content"] == VALID_DOCUMENT
+        assert "document_type" not in completed[1]["output"]
+        assert events[-1]["type"] == "complete"
+        assert events[-1]["data"]["document"]["content"] == VALID_DOCUMENT
@@ -0,0 +1,189 @@
+"""
+Unit tests for graceful drain and the task queue journal.
+"""
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from src.core.exceptions import ServiceUnavailableError
+from src.integrations.backend_service import AgentTask
+from src.schemas import AgentType, TaskPriority, TaskStatus
+from src.services.journal import AppendOnlyJournal
+from src.services.task_manager import TaskManagerService
+from src.services.task_queue import InProcessTaskQueue
+
+
+def journaled_queue(path) -> InProcessTaskQueue:
+    """In-process queue journaled to path."""
+    return InProcessTaskQueue(visibility_timeout=60, journal=AppendOnlyJournal(str(path)))
+
+
+class TestJournaledQueue:
+    """Test that the in-process queue survives a restart through its journal."""
+    
+    @pytest.mark.asyncio
+    async def test_unacked_tasks_are_restored(self, tmp_path):
+        """Test that waiting and in-flight tasks come back, and finished ones do not."""
+        path = tmp_path / "journal.jsonl"
+        queue = journaled_queue(path)
+        await queue.start()
+        for task_id in ["1", "2", "3", "4"]:
+            await queue.enqueue(task_id, TaskPriority.NORMAL, {"id": int(task_id)})
+        first, second = await queue.receive(2, timeout=0)
+        await queue.ack(first)
+        await queue.cancel("4")
+        # A crash mid-append leaves a torn last line
+        await queue.journal.close()
+        with open(path, "a") as journal:
+            journal.write('{"op": "ack", "id"')
+        
+        restored = journaled_queue(path)
+        await restored.start()
+        assert len(path.read_text().splitlines()) == 2
+        messages = await restored.receive(10, timeout=0)
+        
+        assert restored.durable
+        assert [(message.task_id, message.deliveries) for message in messages] == [("2", 2), ("3", 1)]
+        assert messages[1].payload == {"id": 3}
+    
+    @pytest.mark.asyncio
+    async def test_release_is_not_a_failed_delivery(self, tmp_path):
+        """Test that a released task keeps its delivery count and its place in line."""
+        path = tmp_path / "journal.jsonl"
+        queue = journaled_queue(path)
+        await queue.enqueue("1", TaskPriority.LOW, {})
+        await queue.enqueue("2", TaskPriority.LOW, {})
+        message = (await queue.receive(1, timeout=0))[0]
+        await queue.release(message)
+        await queue.close()
+        
+        restored = journaled_queue(path)
+        await restored.start()
+        messages = await restored.receive(10, timeout=0)
+        
+        assert [(message.task_id, message.deliveries) for message in messages] == [("1", 1), ("2", 1)]
+    
+    @pytest.mark.asyncio
+    async def test_journal_is_compacted(self, tmp_path):
+        """Test that history is rewritten away once enough records build up."""
+        path = tmp_path / "journal.jsonl"
+        queue = journaled_queue(path)
+        queue.compact_records = 10
+        for task_id in range(20):
+            await queue.enqueue(str(task_id), TaskPriority.NORMAL, {})
+            for message in await queue.receive(1, timeout=0):
+                await queue.ack(message)
+        await queue.enqueue("last", TaskPriority.NORMAL, {})
+        await queue.journal.flush()
+        
+        assert len(path.read_text().splitlines()) < 10
+        restored = journaled_queue(path)
+        await restored.start()
+        assert await restored.depth() == 1
+    
+    @pytest.mark.asyncio
+    async def test_unwritable_journal_refuses_the_task(self, tmp_path):
+        """Test that an enqueue whose record cannot be written fails and leaves nothing queued."""
+        # A directory cannot be appended to
+        queue = journaled_queue(tmp_path)
+        
+        with pytest.raises(ServiceUnavailableError):
+            await queue.enqueue("1", TaskPriority.NORMAL, {})
+        assert await queue.depth() == 0
+
+
+class TimedAgent:
+    """Agent that runs for input_data["seconds"]."""
+    
+    def __init__(self):
+        self.started = []
+    
+    async def process(self, input_data, task_id=None):
+        self.started.append(task_id)
+        await asyncio.sleep(input_data["seconds"])
+        return {"slept": input_data["seconds"]}
+    
+    async def cleanup(self):
+        pass
+
+
+@pytest.fixture(params=["journaled"])
+def task_manager_settings(request, task_manager_settings, monkeypatch, tmp_path):
+    """Two workers and an in-process queue, journaled unless asked otherwise."""
+    monkeypatch.setattr(task_manager_settings, "max_concurrent_tasks", 2)
+    journal_path = str(tmp_path / "journal.jsonl") if request.param == "journaled" else None
+    monkeypatch.setattr(task_manager_settings, "task_journal_path", journal_path)
+    return task_manager_settings
+
+
+@pytest_asyncio.fixture
+async def manager(task_manager):
+    """Shared task manager running TimedAgent analyses, with its queue consumer restarted."""
+    task_manager.agent = TimedAgent()
+    task_manager.agents[AgentType.DOCUMENT_ANALYZER] = task_manager.agent
+    task_manager._consumer_task = asyncio.create_task(task_manager._consume_queue())
+    return task_manager
+
+
+def task(task_id: int, seconds: float) -> AgentTask:
+    """Document analysis running for the given time."""
+    return AgentTask(id=task_id, agent_type=AgentType.DOCUMENT_ANALYZER, status=TaskStatus.PENDING, input_data={"seconds": seconds})
+
+
+class TestDrain:
+    """Test shutdown draining."""
+    
+    @pytest.mark.asyncio
+    async def test_drain_finishes_short_tasks_and_requeues_the_rest(self, manager):
+        """Test that a drain lets quick tasks finish and journals interrupted and waiting ones."""
+        for task_id, seconds in [(1, 0.05), (2, 30), (3, 30)]:
+            await manager._enqueue(task(task_id, seconds), TaskPriority.NORMAL)
+        for _ in range(100):
+            if len(manager.agent.started) == 2:
+                break
+            await asyncio.sleep(0.01)
+        
+        summary = await manager.drain(grace_seconds=0.3)
+        
+        assert summary == {"finished": 1, "requeued": 0, "interrupted": 1, "abandoned": 0}
+        assert (1, TaskStatus.COMPLETED) in manager.backend_service.updates
+        assert manager.backend_service.updates[-1] == (2, TaskStatus.PENDING)
+        with pytest.raises(ServiceUnavailableError):
+            await manager.create_task(AgentType.DOCUMENT_ANALYZER, {"seconds": 1}, user_id=1)
+        
+        await manager.cleanup()
+        restarted = TaskManagerService()
+        await restarted.task_queue.start()
+        messages = await restarted.task_queue.receive(10, timeout=0)
+        assert sorted((message.task_id, message.deliveries) for message in messages) == [("2", 1), ("3", 1)]
+    
+    @pytest.mark.asyncio
+    async def test_task_the_journal_cannot_keep_is_failed(self, manager, monkeypatch, tmp_path):
+        """Test that create_task reports an unwritable journal and fails the task it created."""
+        with monkeypatch.context() as patch:
+            patch.setattr(manager.task_queue.journal, "path", str(tmp_path))
+            with pytest.raises(ServiceUnavailableError):
+                await manager.create_task(AgentType.DOCUMENT_ANALYZER, {"seconds": 1}, user_id=1)
+        
+        assert manager.backend_service.updates == [(1, TaskStatus.FAILED)]
+        assert await manager.task_queue.depth() == 0
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("task_manager_settings", ["memory"], indirect=True)
+    async def test_drain_without_journal_fails_tasks_it_cannot_keep(self, manager):
+        """Test that tasks the restart would lose are marked failed rather than left pending."""
+        for task_id, seconds in [(1, 30), (2, 30), (3, 30), (4, 30)]:
+            await manager._enqueue(task(task_id, seconds), TaskPriority.NORMAL)
+        for _ in range(100):
+            if len(manager.agent.started) == 2:
+                break
+            await asyncio.sleep(0.01)
+        
+        summary = await manager.drain(grace_seconds=0.05)
+        
+        assert summary["interrupted"] == 2
+        assert summary["requeued"] == 0
+        assert summary["abandoned"] == 2
+        assert sorted(task_id for task_id, status in manager.backend_service.updates if status == TaskStatus.FAILED) == [1, 2, 3, 4]
+        assert not any(status == TaskStatus.PENDING for _, status in manager.backend_service.updates)
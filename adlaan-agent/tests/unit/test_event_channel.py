@@ -0,0 +1,88 @@
+"""
+Unit tests for the task event channel and token streaming.
+"""
+import asyncio
+import pytest
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from src.services.event_channel import TaskEventChannel, get_event_channel
+
+
+class TestTaskEventChannel:
+    """Test the TaskEventChannel class."""
+    
+    @pytest.mark.asyncio
+    async def test_late_subscriber_receives_history(self):
+        """Test that subscribers joining late get earlier events replayed."""
+        channel = TaskEventChannel()
+        channel.open("1")
+        channel.publish("1", {"type": "token", "delta": "Hello"})
+        
+        received = []
+        
+        async def consume():
+            async for event in channel.subscribe("1"):
+                received.append(event)
+        
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0)
+        channel.publish("1", {"type": "token", "delta": " world"})
+        channel.close("1")
+        await asyncio.wait_for(consumer, timeout=1)
+        
+        assert [event["delta"] for event in received] == ["Hello", " world"]
+    
+    @pytest.mark.asyncio
+    async def test_publish_to_unknown_channel_is_dropped(self):
+        """Test that publishing without an open channel is a no-op."""
+        channel = TaskEventChannel()
+        channel.publish("missing", {"type": "token", "delta": "x"})
+        
+        assert not channel.exists("missing")
+        assert [event async for event in channel.subscribe("missing")] == []
+    
+    @pytest.mark.asyncio
+    async def test_heartbeat_on_idle_channel(self):
+        """Test that idle subscribers receive heartbeat markers."""
+        channel = TaskEventChannel()
+        channel.open("1")
+        
+        stream = channel.subscribe("1", heartbeat_seconds=0.01)
+        assert await stream.__anext__() is None
+        await stream.aclose()
+
+
+class TestGeneratorStreaming:
+    """Test token streaming from the legal document generator."""
+    
+    @pytest.mark.asyncio
+    async def test_draft_tokens_published_and_result_assembled(self):
+        """Test that draft tokens stream out while the final result is still built."""
+        from src.agents import LegalDocumentGeneratorAgent
+        
+        agent = LegalDocumentGeneratorAgent()
+        await agent.initialize()
+        agent.llm = FakeListChatModel(responses=[
+            '{"requirements": ["Confidentiality"], "analysis": {}}',
+            "Draft agreement between the parties.",
+            "Final agreement between the parties on these terms and conditions."
+        ])
+        
+        channel = get_event_channel()
+        channel.open("stream-test")
+        result = await agent.process(
+            {"document_type": "nda", "title": "NDA", "parameters": {}},
+            task_id="stream-test"
+        )
+        channel.close("stream-test")
+        
+        events = [event async for event in channel.subscribe("stream-test")]
+        draft = "".join(
+            event["delta"] for event in events
+            if event["type"] == "token" and event["stage"] == "generate_draft"
+        )
+        
+        assert draft == "Draft agreement between the parties."
+        assert result["task_id"] == "stream-test"
+        assert result["document"]["content"].startswith("Final agreement")
@@ -0,0 +1,123 @@
+"""
+Unit tests for CPU-bound work offloading.
+"""
+import os
+import threading
+
+import pytest
+import pytest_asyncio
+
+from src.agents.document_analyzer.tools import DocumentValidationTool, RiskAssessmentTool
+from src.core.config import get_settings
+from src.utils import executors
+from src.utils.executors import ExecutionStrategy, choose_strategy, run_cpu_bound
+
+
+CONTRACT = (
+    "This agreement is made between the parties. The Provider shall indemnify the Client. "
+    "Payment is due within 30 days. Disputes go to arbitration. Signed and dated. "
+)
+
+
+def current_thread() -> int:
+    """Ident of the thread this runs on."""
+    return threading.get_ident()
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    """Settings with small routing thresholds and a one-worker process pool."""
+    settings = get_settings()
+    monkeypatch.setattr(settings, "cpu_executor_default", "auto")
+    monkeypatch.setattr(settings, "cpu_executor_overrides", {})
+    monkeypatch.setattr(settings, "cpu_inline_max_bytes", 100)
+    monkeypatch.setattr(settings, "cpu_process_min_bytes", 1000)
+    monkeypatch.setattr(settings, "cpu_process_workers", 1)
+    return settings
+
+
+@pytest_asyncio.fixture
+async def process_pool(settings):
+    """Warm process pool, shut down after the test."""
+    await executors.start_process_pool()
+    yield executors.get_process_pool()
+    executors.shutdown_executors()
+
+
+class TestChooseStrategy:
+    """Test strategy selection."""
+    
+    def test_auto_routes_by_size(self, settings):
+        """Test that small inputs run inline, medium in a thread and large in a process."""
+        assert choose_strategy("scan", 10) == ExecutionStrategy.INLINE
+        assert choose_strategy("scan", 500) == ExecutionStrategy.THREAD
+        assert choose_strategy("scan", 5000) == ExecutionStrategy.PROCESS
+    
+    def test_overrides_take_precedence(self, settings):
+        """Test that agent.workload beats workload, which beats agent."""
+        settings.cpu_executor_overrides = {
+            "contract_reviewer": "thread",
+            "assess_legal_risks": "process",
+            "contract_reviewer.check_compliance": "inline"
+        }
+        
+        assert choose_strategy("check_compliance", 5000, "contract_reviewer") == ExecutionStrategy.INLINE
+        assert choose_strategy("assess_legal_risks", 10, "contract_reviewer") == ExecutionStrategy.PROCESS
+        assert choose_strategy("analyze_terms", 10, "contract_reviewer") == ExecutionStrategy.THREAD
+        assert choose_strategy("analyze_terms", 10, "document_analyzer") == ExecutionStrategy.INLINE
+    
+    def test_process_falls_back_to_thread_without_workers(self, settings):
+        """Test that a disabled process pool routes large inputs to threads."""
+        settings.cpu_process_workers = 0
+        
+        assert choose_strategy("scan", 5000) == ExecutionStrategy.THREAD
+
+
+class TestRunCpuBound:
+    """Test execution under each strategy."""
+    
+    @pytest.mark.asyncio
+    async def test_inline_and_thread_placement(self, settings):
+        """Test that inline work stays on the loop thread and threaded work leaves it."""
+        loop_thread = threading.get_ident()
+        
+        assert await run_cpu_bound(current_thread) == loop_thread
+        settings.cpu_executor_default = "thread"
+        assert await run_cpu_bound(current_thread) != loop_thread
+    
+    @pytest.mark.asyncio
+    async def test_process_runs_in_another_process(self, settings, process_pool):
+        """Test that process work runs in a pre-warmed pool worker."""
+        settings.cpu_executor_overrides = {"getpid": "process"}
+        
+        pid = await run_cpu_bound(os.getpid, workload="getpid")
+        
+        assert pid != os.getpid()
+    
+    @pytest.mark.asyncio
+    async def test_unpicklable_callable_falls_back_to_thread(self, settings):
+        """Test that closures routed to a process run in a thread instead."""
+        settings.cpu_executor_default = "process"
+        loop_thread = threading.get_ident()
+        
+        ident = await run_cpu_bound(lambda: threading.get_ident(), workload="closure")
+        
+        assert ident != loop_thread
+        assert executors._process_pool is None
+    
+    @pytest.mark.asyncio
+    async def test_tool_results_match_across_strategies(self, settings, process_pool):
+        """Test that analysis tools give the same answer wherever they run."""
+        validator = DocumentValidationTool()
+        risks = RiskAssessmentTool()
+        results = []
+        for strategy in ["inline", "thread", "process"]:
+            settings.cpu_executor_default = strategy
+            validation = await validator.validate_legal_structure(CONTRACT * 20, "contract")
+            assessment = await risks.assess_legal_risks(CONTRACT * 20, {})
+            assessment.pop("assessment_timestamp")
+            # Missing sections come from a set, whose order varies with each process's hash seed
+            validation["issues"].sort()
+            results.append((validation, assessment))
+        
+        assert results[0] == results[1] == results[2]
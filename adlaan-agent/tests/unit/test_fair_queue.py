@@ -0,0 +1,130 @@
+"""
+Unit tests for weighted fair queuing across tenants.
+"""
+import pytest
+
+from src.core.config import get_settings
+from src.integrations.backend_service import AgentTask
+from src.schemas import AgentType, TaskPriority, TaskStatus
+from src.services.fair_queue import DeficitRoundRobin
+from src.services.task_manager import TaskManagerService
+
+
+def lanes(weights=None, **backlog) -> DeficitRoundRobin:
+    """Round-robin over tenants with the given number of queued items each."""
+    weights = weights or {}
+    fair = DeficitRoundRobin(weight=lambda tenant: weights.get(tenant, 1.0))
+    for tenant, count in backlog.items():
+        for n in range(count):
+            fair.push(tenant, f"{tenant}{n}", key=n)
+    return fair
+
+
+def drain(fair: DeficitRoundRobin, count: int, eligible=None) -> str:
+    """Tenants of the next count items, as one string."""
+    return "".join((fair.pop(eligible) or " ")[0] for _ in range(count))
+
+
+class TestDeficitRoundRobin:
+    """Test the order tenants are served in."""
+    
+    def test_deep_backlog_does_not_starve_others(self):
+        """Test that a tenant with one task is served between a bulk tenant's tasks."""
+        fair = lanes(a=100, b=2, c=1)
+        
+        assert drain(fair, 7) == "abcabaa"
+        assert len(fair) == 96
+    
+    def test_weights_set_the_share(self):
+        """Test that service is proportional to weight, fractional weights included."""
+        assert drain(lanes({"a": 3}, a=20, b=20), 8) == "aaabaaab"
+        assert drain(lanes({"b": 0.5}, a=20, b=20), 6) == "aabaab"
+    
+    def test_lanes_keep_key_order(self):
+        """Test that a requeued item goes back to its place in its lane."""
+        fair = lanes(a=3)
+        first = fair.pop()
+        fair.push("a", first, key=0)
+        
+        assert [fair.pop() for _ in range(3)] == ["a0", "a1", "a2"]
+    
+    def test_ineligible_tenants_are_skipped(self):
+        """Test that a capped tenant is passed over until it is eligible again."""
+        fair = lanes(a=5, b=1)
+        
+        assert drain(fair, 2, eligible=lambda tenant: tenant == "a") == "aa"
+        assert drain(fair, 1, eligible=lambda tenant: tenant == "c") == " "
+        assert drain(fair, 2) == "ba"
+    
+    def test_discard(self):
+        """Test removing queued items."""
+        fair = lanes(a=2, b=1)
+        
+        assert fair.discard(lambda item: item.startswith("b")) == 1
+        assert fair.tenants == {"a": 2}
+        assert drain(fair, 3) == "aa "
+
+
+class TestFairTaskQueue:
+    """Test tenant fairness and concurrency limits in every queue backend."""
+    
+    @pytest.mark.asyncio
+    async def test_interactive_task_overtakes_bulk_backlog(self, queues, monkeypatch):
+        """Test that a single task is delivered next despite another tenant's backlog."""
+        monkeypatch.setattr(get_settings(), "tenant_max_concurrent_tasks", 0)
+        queue = await queues.consumer("a", visibility_timeout=60)
+        await queue.enqueue_many([(f"bulk-{n}", TaskPriority.NORMAL, {"tenant": "org:bulk"}) for n in range(50)])
+        await queue.enqueue("interactive", TaskPriority.NORMAL, {"tenant": "user:7"})
+        
+        first = await queue.receive(1, timeout=0)
+        second = await queue.receive(1, timeout=0)
+        
+        assert [message.task_id for message in first + second] == ["bulk-0", "interactive"]
+        assert second[0].tenant == "user:7"
+    
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self, queues, monkeypatch):
+        """Test that a tenant at its limit gets no more tasks, from any consumer, until one is acked."""
+        settings = get_settings()
+        monkeypatch.setattr(settings, "tenant_max_concurrent_tasks", 2)
+        monkeypatch.setattr(settings, "tenant_concurrency_overrides", {"org:big": 3})
+        queue = await queues.consumer("a", visibility_timeout=60)
+        other = await queues.consumer("b", visibility_timeout=60)
+        for tenant in ["org:small", "org:big"]:
+            for n in range(5):
+                await queue.enqueue(f"{tenant}-{n}", TaskPriority.NORMAL, {"tenant": tenant})
+        
+        delivered = await queue.receive(10, timeout=0)
+        assert sorted(message.tenant for message in delivered) == ["org:big"] * 3 + ["org:small"] * 2
+        assert await other.receive(10, timeout=0) == []
+        
+        await queue.ack(delivered[0])
+        refill = await other.receive(10, timeout=0)
+        assert [message.tenant for message in refill] == [delivered[0].tenant]
+        assert (await other.get_status())["in_flight_by_tenant"] == {"org:small": 2, "org:big": 3}
+    
+    @pytest.mark.asyncio
+    async def test_release_returns_task_to_its_tenant(self, queues):
+        """Test that a released task is delivered again under the same tenant."""
+        queue = await queues.consumer("a", visibility_timeout=60)
+        await queue.enqueue("1", TaskPriority.HIGH, {"tenant": "org:a"})
+        message = (await queue.receive(1, timeout=0))[0]
+        
+        await queue.release(message)
+        again = await queue.receive(1, timeout=0)
+        
+        assert [(m.task_id, m.tenant, m.deliveries) for m in again] == [("1", "org:a", 1)]
+        await queue.ack(again[0])
+        assert (await queue.get_status())["waiting_tenants"] == 0
+
+
+class TestTaskTenant:
+    """Test the tenant tasks are queued under."""
+    
+    def test_organization_or_user(self):
+        """Test that a task's organization is used, falling back to its user."""
+        task = AgentTask(id=1, agent_type=AgentType.DOCUMENT_ANALYZER, status=TaskStatus.PENDING, input_data={}, created_by=7)
+        
+        assert TaskManagerService._queue_payload(task)["tenant"] == "user:7"
+        task.metadata = {"tenant": "acme"}
+        assert TaskManagerService._queue_payload(task)["tenant"] == "acme"
@@ -0,0 +1,147 @@
+"""
+Unit tests for background health monitoring and the probe endpoints.
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.agents import LegalDocumentGeneratorAgent
+from src.api import v2_router
+from src.services import health as health_module
+from src.services.health import HealthMonitor
+
+
+class CountingCheck:
+    """Health check that counts calls and can be made to fail."""
+    
+    def __init__(self, error: Exception = None, delay: float = 0.0):
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+    
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return {"calls": self.calls}
+
+
+class FailingLLM:
+    """Model that fails every call."""
+    
+    async def ainvoke(self, messages, **kwargs):
+        raise AssertionError("health checks must not call the LLM")
+
+
+class TestHealthMonitor:
+    """Test component checks and cached snapshots."""
+    
+    @pytest.mark.asyncio
+    async def test_probes_read_cache_without_running_checks(self):
+        """Test that snapshots and probes never run the checks themselves."""
+        check = CountingCheck()
+        monitor = HealthMonitor(interval_seconds=60, timeout_seconds=1)
+        monitor.register("backend", check)
+        
+        assert monitor.readiness()["ready"] is False
+        assert monitor.snapshot()["status"] == "starting"
+        
+        await monitor.refresh()
+        for _ in range(100):
+            monitor.snapshot()
+            monitor.readiness()
+        
+        assert check.calls == 1
+        assert monitor.readiness()["ready"] is True
+        assert monitor.snapshot()["components"]["backend"]["details"] == {"calls": 1}
+    
+    @pytest.mark.asyncio
+    async def test_only_critical_components_gate_readiness(self):
+        """Test that a failing optional component degrades but stays ready."""
+        monitor = HealthMonitor(interval_seconds=60, timeout_seconds=1)
+        monitor.register("backend", CountingCheck())
+        monitor.register("llm", CountingCheck(error=RuntimeError("rate limited")), critical=False)
+        
+        snapshot = await monitor.refresh()
+        assert snapshot["status"] == "degraded"
+        assert snapshot["components"]["llm"]["error"] == "rate limited"
+        assert monitor.readiness()["ready"] is True
+        
+        monitor.register("backend", CountingCheck(error=ConnectionError("down")))
+        await monitor.refresh()
+        readiness = monitor.readiness()
+        assert readiness["ready"] is False
+        assert readiness["status"] == "unhealthy"
+        assert readiness["failing"] == ["backend"]
+    
+    @pytest.mark.asyncio
+    async def test_slow_check_times_out(self):
+        """Test that a hanging check is reported unhealthy after the timeout."""
+        monitor = HealthMonitor(interval_seconds=60, timeout_seconds=0.05)
+        monitor.register("backend", CountingCheck(delay=1))
+        
+        snapshot = await monitor.refresh()
+        
+        assert snapshot["components"]["backend"]["status"] == "unhealthy"
+        assert "timed out" in snapshot["components"]["backend"]["error"]
+    
+    @pytest.mark.asyncio
+    async def test_background_refresh_and_staleness(self):
+        """Test that the background task refreshes, and a stopped one goes stale."""
+        check = CountingCheck()
+        monitor = HealthMonitor(interval_seconds=0.01, timeout_seconds=0.01)
+        monitor.register("backend", check)
+        
+        await monitor.start()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+        assert check.calls >= 2
+        
+        await asyncio.sleep(0.06)
+        assert monitor.snapshot()["status"] == "stale"
+        assert monitor.readiness()["ready"] is False
+    
+    @pytest.mark.asyncio
+    async def test_agent_health_check_does_not_call_llm(self):
+        """Test that agent health reflects initialization only."""
+        agent = LegalDocumentGeneratorAgent()
+        await agent.initialize()
+        agent.llm = FailingLLM()
+        
+        health = await agent.health_check()
+        
+        assert health["status"] == "healthy"
+
+
+class TestHealthEndpoints:
+    """Test the liveness, readiness and health routes."""
+    
+    @pytest.mark.asyncio
+    async def test_probe_status_codes(self, monkeypatch):
+        """Test that readiness returns 503 until the backend check passes."""
+        monitor = HealthMonitor(interval_seconds=60, timeout_seconds=1)
+        backend = CountingCheck(error=ConnectionError("down"))
+        monitor.register("backend", backend)
+        monkeypatch.setattr(health_module, "_health_monitor", monitor)
+        
+        app = FastAPI()
+        app.include_router(v2_router)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+        
+        await monitor.refresh()
+        assert (await client.get("/api/v2/health/live")).status_code == 200
+        assert (await client.get("/api/v2/health/ready")).status_code == 503
+        unhealthy = await client.get("/api/v2/health")
+        assert unhealthy.status_code == 503
+        assert unhealthy.json()["services"] == {"backend": "unhealthy"}
+        
+        backend.error = None
+        await monitor.refresh()
+        assert (await client.get("/api/v2/health/ready")).json()["ready"] is True
+        healthy = await client.get("/api/v2/health")
+        assert healthy.status_code == 200
+        assert healthy.json()["components"]["backend"]["details"] == {"calls": 2}
+        assert backend.calls == 2
@@ -0,0 +1,65 @@
+"""
+Unit tests for incremental JSON extraction.
+"""
+import json
+import time
+
+from src.utils import JSONStreamExtractor, extract_json, extract_json_from_response, safe_json_parse
+
+
+class TestJSONStreamExtractor:
+    """Test the JSONStreamExtractor class."""
+    
+    def test_emits_object_when_top_level_brace_closes(self):
+        """Test that the object is returned on the delta that closes it."""
+        extractor = JSONStreamExtractor()
+        deltas = ['Sure! ```json\n{"a": ', '{"b": [1, 2]}', ', "c": "x"', '}\n```', " and more"]
+        
+        results = [extractor.feed(delta) for delta in deltas[:3]]
+        closed = extractor.feed(deltas[3])
+        
+        assert results == [None, None, None]
+        assert closed == {"a": {"b": [1, 2]}, "c": "x"}
+        assert extractor.done
+    
+    def test_braces_and_escapes_inside_strings_are_ignored(self):
+        """Test that braces and escaped quotes in strings do not affect depth."""
+        text = '{"text": "a } \\" { b", "n": 1}'
+        extractor = JSONStreamExtractor()
+        
+        value = None
+        for char in text:
+            value = extractor.feed(char) or value
+        
+        assert value == {"text": 'a } " { b', "n": 1}
+    
+    def test_skips_balanced_non_json_candidates(self):
+        """Test that prose in braces is skipped in favour of the next real object."""
+        assert extract_json('Fill in {party name} then {"ok": true} {"second": 1}') == {"ok": True}
+        assert extract_json("no json here") is None
+    
+    def test_large_unbalanced_input_is_linear(self):
+        """Test that pathological input is scanned in linear time."""
+        text = "{" * 100000 + '"' + "x" * 100000
+        
+        started = time.perf_counter()
+        assert extract_json(text) is None
+        
+        assert time.perf_counter() - started < 1.0
+
+
+class TestJSONHelpers:
+    """Test the JSON helpers built on the extractor."""
+    
+    def test_safe_json_parse_does_not_span_objects(self):
+        """Test that text between two objects is not swallowed by a greedy match."""
+        text = 'Analysis: {"requirements": ["a"]} Note: {"other": 1}'
+        
+        assert safe_json_parse(text) == {"requirements": ["a"]}
+        assert safe_json_parse("not json", {"fallback": True}) == {"fallback": True}
+    
+    def test_extract_json_from_code_block(self):
+        """Test extraction from a fenced code block with nested objects."""
+        payload = {"outer": {"inner": {"deep": [1, {"x": 2}]}}}
+        
+        assert extract_json_from_response(f"```json\n{json.dumps(payload)}\n```") == payload
@@ -0,0 +1,249 @@
+"""
+Unit tests for the shared LLM gateway.
+"""
+import asyncio
+import time
+import pytest
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessageChunk
+
+from src.services.llm_gateway import LLMGateway, TokenBucket, is_retryable_error
+
+
+class ProviderError(Exception):
+    """Provider error carrying an HTTP status code."""
+    
+    def __init__(self, status_code: int):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+class FlakyModel:
+    """Model that fails with the given errors before succeeding."""
+    
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+    
+    async def ainvoke(self, messages, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+class SlowModel:
+    """Model that records peak concurrency."""
+    
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+    
+    async def ainvoke(self, messages, **kwargs):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return "ok"
+
+
+@pytest.fixture
+def fast_retry_settings(monkeypatch):
+    """Settings with near-zero retry delays."""
+    from src.core.config import get_settings
+    settings = get_settings()
+    monkeypatch.setattr(settings, "llm_retry_base_delay", 0.001)
+    monkeypatch.setattr(settings, "llm_retry_max_delay", 0.002)
+    monkeypatch.setattr(settings, "llm_max_retries", 3)
+    return settings
+
+
+class TestTokenBucket:
+    """Test the TokenBucket class."""
+    
+    @pytest.mark.asyncio
+    async def test_acquire_waits_for_refill(self):
+        """Test that acquiring beyond capacity waits for tokens to refill."""
+        bucket = TokenBucket(rate_per_minute=600, capacity=1)  # 10 tokens per second
+        await bucket.acquire(1)
+        
+        started = time.monotonic()
+        await bucket.acquire(1)
+        
+        assert time.monotonic() - started >= 0.08
+    
+    def test_refund_is_capped_at_capacity(self):
+        """Test that refunds never exceed bucket capacity."""
+        bucket = TokenBucket(rate_per_minute=60, capacity=5)
+        bucket.refund(100)
+        
+        assert bucket.available <= 5
+
+
+class TestLLMGateway:
+    """Test the LLMGateway class."""
+    
+    def test_retryable_errors(self):
+        """Test classification of rate limit and server errors."""
+        assert is_retryable_error(ProviderError(429))
+        assert is_retryable_error(ProviderError(503))
+        assert not is_retryable_error(ProviderError(400))
+        assert not is_retryable_error(ValueError("bad input"))
+    
+    @pytest.mark.asyncio
+    async def test_retries_rate_limited_calls(self, fast_retry_settings):
+        """Test that 429 and 5xx responses are retried until success."""
+        model = FlakyModel([ProviderError(429), ProviderError(502)])
+        gateway = LLMGateway(model=model)
+        
+        assert await gateway.invoke(["hello"]) == "ok"
+        assert model.calls == 3
+        assert gateway.stats["retries"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_non_retryable_error_is_raised(self, fast_retry_settings):
+        """Test that client errors surface immediately."""
+        model = FlakyModel([ProviderError(400)])
+        gateway = LLMGateway(model=model)
+        
+        with pytest.raises(ProviderError):
+            await gateway.invoke(["hello"])
+        assert model.calls == 1
+    
+    @pytest.mark.asyncio
+    async def test_consecutive_failures_reset_on_success(self, fast_retry_settings):
+        """Test that passive health tracking counts failures until a call succeeds."""
+        model = FlakyModel([ProviderError(400), ProviderError(401)])
+        gateway = LLMGateway(model=model)
+        
+        for prompt in ["first", "second"]:
+            with pytest.raises(ProviderError):
+                await gateway.invoke([prompt])
+        assert gateway.get_status()["consecutive_failures"] == 2
+        assert "ProviderError" in gateway.last_error
+        
+        await gateway.invoke(["third"])
+        assert gateway.get_status()["consecutive_failures"] == 0
+        assert gateway.last_success_at is not None
+    
+    @pytest.mark.asyncio
+    async def test_agent_quota_limits_concurrency(self, monkeypatch):
+        """Test that per-agent quotas cap in-flight calls for that agent."""
+        from src.core.config import get_settings
+        monkeypatch.setattr(get_settings(), "llm_agent_quotas", {"legal_research": 2})
+        model = SlowModel()
+        gateway = LLMGateway(model=model)
+        client = gateway.client_for("legal_research")
+        
+        await asyncio.gather(*(client.ainvoke([f"hi {i}"]) for i in range(6)))
+        
+        assert model.peak == 2
+    
+    @pytest.mark.asyncio
+    async def test_stream_through_gateway(self):
+        """Test that streaming calls pass chunks through."""
+        gateway = LLMGateway(model=FakeListChatModel(responses=["abc"]))
+        client = gateway.client_for("legal_document_generator")
+        
+        chunks = [chunk.content async for chunk in client.astream(["hi"])]
+        
+        assert "".join(chunks) == "abc"
+        assert gateway.in_flight == 0
+    
+    @pytest.mark.asyncio
+    async def test_unused_token_allowance_is_refunded(self):
+        """Test that invoked and streamed calls are charged what they used, not their reservation."""
+        gateway = LLMGateway(model=FakeListChatModel(responses=["abc", "abc"]))
+        capacity = gateway.token_bucket.capacity
+        
+        await gateway.invoke(["hi"])
+        assert capacity - gateway.token_bucket.available < 50
+        
+        chunks = [chunk async for chunk in gateway.stream(["hello"])]
+        assert chunks
+        assert capacity - gateway.token_bucket.available < 50
+
+
+class CountingModel:
+    """Slow model that counts upstream calls and cancellations."""
+    
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.calls = 0
+        self.cancelled = 0
+    
+    async def ainvoke(self, messages, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return f"answer {self.calls}"
+    
+    async def astream(self, messages, **kwargs):
+        self.calls += 1
+        for token in ["a", "b", "c"]:
+            await asyncio.sleep(self.delay / 3)
+            yield AIMessageChunk(content=token)
+
+
+class TestRequestCoalescing:
+    """Test singleflight coalescing of identical in-flight requests."""
+    
+    @pytest.mark.asyncio
+    async def test_identical_requests_share_one_call(self):
+        """Test that concurrent identical prompts make a single upstream call."""
+        model = CountingModel()
+        gateway = LLMGateway(model=model)
+        
+        results = await asyncio.gather(*(gateway.invoke(["same prompt"]) for _ in range(10)))
+        await gateway.invoke(["other prompt"])
+        
+        assert results == ["answer 1"] * 10
+        assert model.calls == 2
+        assert gateway.stats["coalesced"] == 9
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_shared_call(self):
+        """Test that remaining waiters still get the result when one is cancelled."""
+        model = CountingModel()
+        gateway = LLMGateway(model=model)
+        
+        first = asyncio.create_task(gateway.invoke(["same prompt"]))
+        second = asyncio.create_task(gateway.invoke(["same prompt"]))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        
+        assert await second == "answer 1"
+        assert first.cancelled()
+        assert model.cancelled == 0
+    
+    @pytest.mark.asyncio
+    async def test_last_waiter_leaving_cancels_call(self):
+        """Test that the upstream call is cancelled once nobody is waiting."""
+        model = CountingModel()
+        gateway = LLMGateway(model=model)
+        
+        waiter = asyncio.create_task(gateway.invoke(["same prompt"]))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.sleep(0.01)
+        
+        assert model.cancelled == 1
+        assert gateway.in_flight == 0
+    
+    @pytest.mark.asyncio
+    async def test_identical_streams_share_one_call(self):
+        """Test that concurrent identical streams replay one upstream stream."""
+        model = CountingModel()
+        gateway = LLMGateway(model=model)
+        
+        async def collect():
+            return "".join([chunk.content async for chunk in gateway.stream(["same prompt"])])
+        
+        results = await asyncio.gather(*(collect() for _ in range(5)))
+        
+        assert results == ["abc"] * 5
+        assert model.calls == 1
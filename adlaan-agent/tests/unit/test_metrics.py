@@ -0,0 +1,92 @@
+"""
+Unit tests for metrics collection and exposition.
+"""
+import pytest
+import pytest_asyncio
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from src.agents import LegalDocumentGeneratorAgent
+from src.core.metrics import MetricsRegistry, NODE_DURATION, TOOL_DURATION, LLM_TOKENS, track_node, track_tool
+from src.services.llm_gateway import LLMGateway
+
+
+class TestMetricsRegistry:
+    """Test the MetricsRegistry class."""
+    
+    def test_render_prometheus_text(self):
+        """Test the exposition format for counters, gauges and histograms."""
+        registry = MetricsRegistry()
+        requests = registry.counter("requests_total", "Requests.", ["route"])
+        in_flight = registry.gauge("in_flight", "In flight.")
+        latency = registry.histogram("latency_seconds", "Latency.", ["route"], buckets=(0.1, 1))
+        
+        requests.inc(route='/a"b')
+        in_flight.set(3)
+        latency.observe(0.05, route="/a")
+        latency.observe(0.5, route="/a")
+        latency.observe(5, route="/a")
+        
+        text = registry.render()
+        
+        assert "# TYPE requests_total counter" in text
+        assert 'requests_total{route="/a\\"b"} 1' in text
+        assert "in_flight 3" in text
+        assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{route="/a",le="1"} 2' in text
+        assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+        assert 'latency_seconds_count{route="/a"} 3' in text
+        assert 'latency_seconds_sum{route="/a"} 5.55' in text
+    
+    @pytest.mark.asyncio
+    async def test_tool_calls_are_attributed_to_current_node(self):
+        """Test that tool metrics carry the agent and node executing them."""
+        @track_tool("lookup")
+        async def lookup():
+            return "found"
+        
+        with track_node("test_agent", "search"):
+            assert await lookup() == "found"
+        
+        assert TOOL_DURATION.labels(agent="test_agent", node="search", tool="lookup").count == 1
+
+
+@pytest_asyncio.fixture
+async def generator():
+    """Initialized generator agent."""
+    agent = LegalDocumentGeneratorAgent()
+    await agent.initialize()
+    return agent
+
+
+class TestAgentInstrumentation:
+    """Test that agent runs record node and LLM metrics."""
+    
+    @pytest.mark.asyncio
+    async def test_nodes_and_llm_calls_are_recorded(self, generator):
+        """Test node latency and token counters for a single-pass run."""
+        model = FakeListChatModel(responses=['{"requirements": []}\n=== DOCUMENT ===\n' + "The parties agree. " * 20])
+        generator.llm = LLMGateway(model=model).client_for("legal_document_generator")
+        node = NODE_DURATION.labels(agent="legal_document_generator", node="generate_single_pass")
+        tokens = LLM_TOKENS.labels(agent="legal_document_generator", node="generate_single_pass", kind="completion")
+        calls_before, tokens_before = node.count, tokens.value
+        
+        await generator.process({"document_type": "nda", "title": "NDA", "parameters": {}, "generation_mode": "fast"})
+        
+        assert node.count == calls_before + 1
+        assert tokens.value > tokens_before
+
+
+class TestMetricsEndpoint:
+    """Test the /metrics endpoint."""
+    
+    def test_metrics_endpoint_serves_text_format(self):
+        """Test that /metrics returns the Prometheus text format."""
+        from fastapi.testclient import TestClient
+        from src.main import create_app
+        
+        response = TestClient(create_app()).get("/metrics")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "# TYPE adlaan_node_duration_seconds histogram" in response.text
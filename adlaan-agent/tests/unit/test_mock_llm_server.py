@@ -0,0 +1,82 @@
+"""
+Unit tests for the mock OpenAI-compatible LLM server.
+"""
+import time
+
+import httpx
+import pytest
+from langchain_core.messages import HumanMessage
+from langchain_openai import ChatOpenAI
+
+from mock_llm_server import MockLLMConfig, create_app, prompt_hash
+from src.services.llm_gateway import is_retryable_error
+
+
+def chat_model(app, **kwargs) -> ChatOpenAI:
+    """ChatOpenAI client talking to a mock app in-process."""
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://mock-llm")
+    return ChatOpenAI(
+        model="gpt-4",
+        api_key="test",
+        base_url="http://mock-llm/v1",
+        http_async_client=client,
+        max_retries=0,
+        **kwargs
+    )
+
+
+class TestMockLLMServer:
+    """Test the mock LLM server."""
+    
+    @pytest.mark.asyncio
+    async def test_stream_respects_time_to_first_token(self):
+        """Test that streaming waits for the TTFT and then paces tokens."""
+        config = MockLLMConfig.from_profile("instant", ttft_seconds=0.05, ttft_jitter=0.0, tokens_per_second=1000)
+        model = chat_model(create_app(config))
+        
+        started = time.perf_counter()
+        first_token_at = None
+        parts = []
+        async for chunk in model.astream([HumanMessage(content="Draft an NDA.")]):
+            if chunk.content and first_token_at is None:
+                first_token_at = time.perf_counter() - started
+            parts.append(chunk.content)
+        
+        assert first_token_at >= 0.05
+        assert "".join(parts).startswith("AGREEMENT")
+    
+    @pytest.mark.asyncio
+    async def test_error_profile_returns_retryable_errors(self):
+        """Test that injected errors look like provider rate limits."""
+        config = MockLLMConfig.from_profile("instant", error_rate=1.0, error_statuses=[429])
+        model = chat_model(create_app(config))
+        
+        with pytest.raises(Exception) as error:
+            await model.ainvoke([HumanMessage(content="Draft an NDA.")])
+        
+        assert error.value.status_code == 429
+        assert is_retryable_error(error.value)
+    
+    @pytest.mark.asyncio
+    async def test_record_then_replay_without_upstream(self, tmp_path):
+        """Test that recorded responses replay by prompt hash."""
+        upstream_app = create_app(MockLLMConfig.from_profile("instant", response_tokens=50))
+        upstream = httpx.AsyncClient(transport=httpx.ASGITransport(app=upstream_app), base_url="http://upstream")
+        recorder = create_app(
+            MockLLMConfig.from_profile("instant", mode="record", cassette_dir=str(tmp_path), upstream_url="http://upstream/v1"),
+            upstream_client=upstream
+        )
+        messages = [HumanMessage(content="Draft a short memo.")]
+        
+        recorded = await chat_model(recorder).ainvoke(messages)
+        
+        key = prompt_hash([{"role": "user", "content": "Draft a short memo."}])
+        assert (tmp_path / f"{key}.json").exists()
+        
+        replayer = create_app(MockLLMConfig.from_profile(
+            "instant", mode="replay", cassette_dir=str(tmp_path), replay_strict=True
+        ))
+        replayed = await chat_model(replayer).ainvoke(messages)
+        
+        assert replayed.content == recorded.content
+        assert replayer.state.server.stats["replay_hits"] == 1
@@ -0,0 +1,177 @@
+"""
+Unit tests for node-weighted task progress and running task tracking.
+"""
+import asyncio
+
+import pytest
+
+from src.agents.base_agent.base_agent import AgentGraphState, InstrumentedStateGraph, END
+from src.integrations.backend_service import AgentTask
+from src.schemas import AgentType, TaskStatus
+from src.services.progress import ProgressPlan, ProgressTracker, get_progress_tracker
+
+
+class Recorder:
+    """Progress reporter that records writes, optionally slowly."""
+    
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.writes = []
+    
+    async def __call__(self, task_id, progress):
+        await asyncio.sleep(self.delay)
+        self.writes.append((task_id, progress))
+
+
+def plan(*nodes) -> ProgressTracker:
+    """Tracker whose "agent" plan has the given (node, weight, group) entries."""
+    tracker = ProgressTracker(update_interval=0.1)
+    for node, weight, group in nodes:
+        tracker.plan("agent").add(node, weight, group)
+    return tracker
+
+
+class TestProgressPlan:
+    """Test weighted completion."""
+    
+    def test_weights_and_alternative_groups(self):
+        """Test that alternatives count once, at the heaviest member's weight."""
+        weighted = ProgressPlan("agent")
+        weighted.add("prepare", 2)
+        weighted.add("draft", 6, "generate")
+        weighted.add("template", 1, "generate")
+        weighted.add("finalize", 2)
+        
+        assert weighted.total == 10
+        assert weighted.fraction({"prepare"}) == 0.2
+        assert weighted.fraction({"template"}) == 0.6
+        assert weighted.fraction({"prepare", "draft", "finalize"}) == 1.0
+    
+    def test_settings_override_weight(self, monkeypatch):
+        """Test that configured weights replace the graph's."""
+        from src.core.config import get_settings
+        monkeypatch.setattr(get_settings(), "progress_node_weights", {"agent.draft": 8, "finalize": 0})
+        weighted = ProgressPlan("agent")
+        weighted.add("draft", 6)
+        weighted.add("finalize", 2)
+        weighted.add("prepare", 2)
+        
+        assert weighted.total == 10
+        assert weighted.fraction({"draft"}) == 0.8
+
+
+class TestProgressTracker:
+    """Test progress events and coalesced reporting."""
+    
+    @pytest.mark.asyncio
+    async def test_updates_are_coalesced(self):
+        """Test that quick node completions produce one write per interval with the latest value."""
+        tracker = plan(("a", 1, None), ("b", 1, None), ("c", 1, None), ("d", 1, None))
+        report = Recorder()
+        tracker.start("1", "agent", report=report)
+        
+        for node in ["a", "b", "c"]:
+            tracker.node_completed("1", node)
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.05)
+        assert report.writes == [("1", 25)]
+        
+        await asyncio.sleep(0.1)
+        assert report.writes == [("1", 25), ("1", 75)]
+        assert tracker.snapshot("1")["completed_nodes"] == ["a", "b", "c"]
+    
+    @pytest.mark.asyncio
+    async def test_running_progress_stops_short_of_complete(self):
+        """Test that 100% is left for the final status update."""
+        tracker = plan(("a", 1, None))
+        tracker.start("1", "agent")
+        tracker.node_completed("1", "a")
+        
+        snapshot = tracker.snapshot("1")
+        assert snapshot["progress_percentage"] == 99
+        assert snapshot["estimated_remaining_seconds"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_finish_drops_pending_and_waits_for_sent_writes(self):
+        """Test that no progress write lands after the task finishes."""
+        tracker = plan(("a", 1, None), ("b", 1, None))
+        slow = Recorder(delay=0.05)
+        tracker.start("1", "agent", report=slow)
+        tracker.node_completed("1", "a")
+        await asyncio.sleep(0.01)
+        tracker.node_completed("1", "b")
+        
+        await tracker.finish("1")
+        assert slow.writes == [("1", 50)]
+        await asyncio.sleep(0.2)
+        assert slow.writes == [("1", 50)]
+        assert tracker.snapshot("1") is None
+    
+    @pytest.mark.asyncio
+    async def test_graph_nodes_report_progress(self):
+        """Test that instrumented nodes count towards the task running them."""
+        workflow = InstrumentedStateGraph(AgentGraphState, "progress_test_agent")
+        workflow.add_node("first", lambda state: {"x": 1}, weight=1)
+        workflow.add_node("second", lambda state: {"y": 2}, weight=3)
+        workflow.set_entry_point("first")
+        workflow.add_edge("first", "second")
+        workflow.add_edge("second", END)
+        graph = workflow.compile()
+        
+        tracker = get_progress_tracker()
+        tracker.start("graph-task", "progress_test_agent")
+        seen = []
+        original = tracker.node_completed
+        
+        def node_completed(task_id, node):
+            original(task_id, node)
+            seen.append(tracker.snapshot(task_id)["progress_percentage"])
+        
+        tracker.node_completed = node_completed
+        try:
+            await graph.ainvoke({"task_id": "graph-task"})
+        finally:
+            del tracker.node_completed
+            await tracker.finish("graph-task")
+        
+        assert seen == [25, 99]
+
+
+class SlowAgent:
+    """Agent whose run can be observed and cancelled."""
+    
+    def __init__(self):
+        self.started = asyncio.Event()
+    
+    async def process(self, input_data, task_id=None):
+        self.started.set()
+        await asyncio.sleep(10)
+        return {}
+    
+    async def cleanup(self):
+        pass
+
+
+class TestActiveTasks:
+    """Test that running tasks are registered and can be cancelled."""
+    
+    @pytest.mark.asyncio
+    async def test_running_task_is_tracked_and_cancellable(self, task_manager):
+        """Test that cancel_task stops a running agent and the count drops back."""
+        agent = SlowAgent()
+        task_manager.agents[AgentType.DOCUMENT_ANALYZER] = agent
+        task = AgentTask(id=5, agent_type=AgentType.DOCUMENT_ANALYZER, status=TaskStatus.PENDING, input_data={})
+        
+        running = asyncio.create_task(task_manager._execute_task(task))
+        await asyncio.wait_for(agent.started.wait(), timeout=1)
+        assert task_manager.get_active_task_count() == 1
+        assert get_progress_tracker().is_tracking("5")
+        
+        await task_manager.cancel_task(5)
+        with pytest.raises(asyncio.CancelledError):
+            await running
+        
+        assert task_manager.get_active_task_count() == 0
+        assert not get_progress_tracker().is_tracking("5")
+        assert task_manager.backend_service.updates[-1] == (5, TaskStatus.CANCELLED)
+        assert (5, TaskStatus.FAILED) not in task_manager.backend_service.updates
@@ -0,0 +1,149 @@
+"""
+Unit tests for token-budgeted prompt construction.
+"""
+import threading
+
+import pytest
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from src.core.config import get_settings
+from src.utils import prompt_builder
+from src.utils.prompt_builder import (
+    PromptBuilder,
+    PromptBudgetExceeded,
+    compact_json,
+    count_tokens,
+    get_stage_budget,
+    preload_tokenizer,
+    truncate_to_tokens
+)
+
+
+@pytest.fixture
+def stage_budgets(monkeypatch):
+    """Override per-stage budgets for a test."""
+    settings = get_settings()
+    
+    def apply(budgets):
+        monkeypatch.setattr(settings, "prompt_stage_budgets", budgets)
+    
+    return apply
+
+
+class TestPromptHelpers:
+    """Test token counting and serialization helpers."""
+    
+    def test_compact_json_has_no_whitespace(self):
+        """Test that compact JSON drops indentation and separator spaces."""
+        assert compact_json({"a": [1, 2], "b": "نص"}) == '{"a":[1,2],"b":"نص"}'
+    
+    def test_truncate_to_tokens_fits_budget(self):
+        """Test that truncated text fits the token limit."""
+        text = "This clause binds the parties. " * 200
+        truncated = truncate_to_tokens(text, 50)
+        
+        assert count_tokens(truncated) <= 50
+        assert truncate_to_tokens("Short text.", 50) == "Short text."
+    
+    def test_stage_budget_respects_context_window(self, monkeypatch, stage_budgets):
+        """Test that input and output budgets never exceed the context window."""
+        monkeypatch.setattr(get_settings(), "llm_context_window", 4000)
+        stage_budgets({"generate_draft": {"input_tokens": 10000}})
+        
+        budget = get_stage_budget("generate_draft")
+        
+        assert budget.output_tokens == 2000
+        assert budget.input_tokens + budget.output_tokens <= 4000
+    
+    @pytest.mark.asyncio
+    async def test_tokenizer_preloads_off_the_event_loop(self, monkeypatch):
+        """Test that the tokenizer is loaded in a worker thread and cached for later counts."""
+        loaded_in = []
+        
+        class WordEncoding:
+            def encode(self, text, disallowed_special=()):
+                return text.split()
+        
+        def encoding_for_model(model):
+            loaded_in.append(threading.get_ident())
+            return WordEncoding()
+        
+        monkeypatch.setattr(prompt_builder.tiktoken, "encoding_for_model", encoding_for_model)
+        prompt_builder._get_encoding.cache_clear()
+        try:
+            assert await preload_tokenizer("preload-test-model")
+            assert count_tokens("two words", "preload-test-model") == 2
+        finally:
+            prompt_builder._get_encoding.cache_clear()
+        
+        assert len(loaded_in) == 1
+        assert loaded_in[0] != threading.get_ident()
+
+
+class TestPromptBuilder:
+    """Test the PromptBuilder class."""
+    
+    def test_prompt_within_budget_is_unchanged(self):
+        """Test that sections are joined as-is when they fit."""
+        prompt = (
+            PromptBuilder("generate_draft")
+            .add_text("task", "Draft an NDA.", truncatable=False)
+            .add_json("context", {"jurisdiction": "jordan"})
+            .build()
+        )
+        
+        assert prompt == 'Draft an NDA.\n\n{"jurisdiction":"jordan"}'
+    
+    def test_lowest_priority_section_shrinks_first(self, stage_budgets):
+        """Test that over-budget prompts prune the least important sections."""
+        stage_budgets({"generate_draft": {"input_tokens": 300}})
+        requirements = {"requirements": ["Confidentiality obligations"] * 5}
+        context = {"precedents": [f"Case {i} " + "x" * 200 for i in range(50)]}
+        
+        prompt = (
+            PromptBuilder("generate_draft")
+            .add_text("task", "Draft an NDA.", truncatable=False)
+            .add_json("requirements", requirements, priority=1)
+            .add_json("legal_context", context, priority=2)
+            .build()
+        )
+        
+        assert count_tokens(prompt) <= 300
+        assert compact_json(requirements) in prompt
+        assert "more" in prompt
+    
+    def test_fixed_sections_over_budget_raise(self, stage_budgets):
+        """Test that untruncatable sections larger than the budget are rejected."""
+        stage_budgets({"review_and_refine": {"input_tokens": 100}})
+        builder = PromptBuilder("review_and_refine").add_text(
+            "draft", "The parties agree. " * 200, truncatable=False
+        )
+        
+        with pytest.raises(PromptBudgetExceeded):
+            builder.build()
+
+
+class TestGeneratorBudgets:
+    """Test budget handling in the legal document generator."""
+    
+    @pytest.mark.asyncio
+    async def test_oversized_draft_skips_review(self, stage_budgets):
+        """Test that a draft too large to review is kept instead of failing."""
+        from src.agents import LegalDocumentGeneratorAgent
+        
+        stage_budgets({"review_and_refine": {"input_tokens": 200}})
+        draft = "This agreement binds the parties to these terms and conditions. " * 100
+        
+        agent = LegalDocumentGeneratorAgent()
+        await agent.initialize()
+        agent.llm = FakeListChatModel(responses=[
+            '{"requirements": ["Confidentiality"], "analysis": {}}',
+            draft,
+            "This review response must not be requested."
+        ])
+        
+        result = await agent.process({"document_type": "nda", "title": "NDA", "parameters": {}})
+        
+        assert result["document"]["content"].startswith("This agreement")
+        assert "review response" not in result["document"]["content"]
@@ -0,0 +1,137 @@
+"""
+Unit tests for the priority task scheduler.
+"""
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from src.core.exceptions import ServiceUnavailableError
+from src.schemas import TaskPriority
+from src.services.scheduler import TaskScheduler
+
+
+class Recorder:
+    """Job factory recording start order and peak concurrency."""
+    
+    def __init__(self):
+        self.started = []
+        self.active = 0
+        self.peak = 0
+        self.gate = asyncio.Event()
+    
+    def job(self, name: str, hold: bool = False, delay: float = 0.0):
+        """Job that records itself, optionally waiting for the gate."""
+        async def run():
+            self.started.append(name)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            try:
+                if hold:
+                    await self.gate.wait()
+                await asyncio.sleep(delay)
+            finally:
+                self.active -= 1
+        return run
+
+
+@pytest_asyncio.fixture
+async def recorder():
+    """Job recorder."""
+    return Recorder()
+
+
+async def drain(scheduler: TaskScheduler) -> None:
+    """Wait until every queued job has run."""
+    await asyncio.wait_for(scheduler._queue.join(), timeout=5)
+
+
+class TestTaskScheduler:
+    """Test the TaskScheduler class."""
+    
+    @pytest.mark.asyncio
+    async def test_concurrency_is_capped_at_worker_count(self, recorder):
+        """Test that no more than the configured workers run at once."""
+        scheduler = TaskScheduler(workers=3, max_queue_size=100, aging_seconds=30)
+        await scheduler.start()
+        
+        for i in range(20):
+            scheduler.submit(str(i), TaskPriority.NORMAL, recorder.job(str(i), delay=0.005))
+        await drain(scheduler)
+        await scheduler.stop()
+        
+        assert recorder.peak == 3
+        assert len(recorder.started) == 20
+    
+    @pytest.mark.asyncio
+    async def test_urgent_task_jumps_a_bulk_backlog(self, recorder):
+        """Test that an urgent task runs next even behind 500 bulk tasks."""
+        scheduler = TaskScheduler(workers=1, max_queue_size=1000, aging_seconds=30)
+        await scheduler.start()
+        scheduler.submit("blocker", TaskPriority.NORMAL, recorder.job("blocker", hold=True))
+        await asyncio.sleep(0.01)
+        
+        for i in range(500):
+            scheduler.submit(f"bulk-{i}", TaskPriority.LOW, recorder.job(f"bulk-{i}"))
+        scheduler.submit("high", TaskPriority.HIGH, recorder.job("high"))
+        scheduler.submit("urgent", TaskPriority.URGENT, recorder.job("urgent"))
+        assert scheduler.get_status()["queued_by_priority"]["low"] == 500
+        
+        recorder.gate.set()
+        await drain(scheduler)
+        await scheduler.stop()
+        
+        assert recorder.started[:4] == ["blocker", "urgent", "high", "bulk-0"]
+        assert len(recorder.started) == 503
+    
+    @pytest.mark.asyncio
+    async def test_aging_prevents_starvation(self, recorder):
+        """Test that a low task that has waited long enough beats a new urgent one."""
+        scheduler = TaskScheduler(workers=1, max_queue_size=10, aging_seconds=0.01)
+        await scheduler.start()
+        scheduler.submit("blocker", TaskPriority.NORMAL, recorder.job("blocker", hold=True))
+        await asyncio.sleep(0.01)
+        
+        scheduler.submit("old-low", TaskPriority.LOW, recorder.job("old-low"))
+        await asyncio.sleep(0.05)
+        scheduler.submit("new-urgent", TaskPriority.URGENT, recorder.job("new-urgent"))
+        
+        recorder.gate.set()
+        await drain(scheduler)
+        await scheduler.stop()
+        
+        assert recorder.started == ["blocker", "old-low", "new-urgent"]
+    
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects(self, recorder):
+        """Test that submits beyond the queue limit are refused."""
+        scheduler = TaskScheduler(workers=1, max_queue_size=2, aging_seconds=30)
+        
+        scheduler.submit("a", TaskPriority.LOW, recorder.job("a"))
+        scheduler.submit("b", TaskPriority.LOW, recorder.job("b"))
+        
+        assert scheduler.is_full
+        with pytest.raises(ServiceUnavailableError):
+            scheduler.submit("c", TaskPriority.URGENT, recorder.job("c"))
+        assert scheduler.depth == 2
+    
+    @pytest.mark.asyncio
+    async def test_cancel_queued_and_running_jobs(self, recorder):
+        """Test that a cancelled queued job never runs and a cancelled running job frees its worker."""
+        scheduler = TaskScheduler(workers=1, max_queue_size=10, aging_seconds=30)
+        await scheduler.start()
+        scheduler.submit("running", TaskPriority.NORMAL, recorder.job("running", hold=True))
+        await asyncio.sleep(0.01)
+        scheduler.submit("queued", TaskPriority.NORMAL, recorder.job("queued"))
+        scheduler.submit("after", TaskPriority.NORMAL, recorder.job("after"))
+        
+        assert scheduler.is_queued("queued")
+        assert scheduler.cancel("queued")
+        assert scheduler.is_running("running")
+        assert scheduler.cancel("running")
+        
+        await drain(scheduler)
+        await scheduler.stop()
+        
+        assert recorder.started == ["running", "after"]
+        assert scheduler.get_status()["busy_workers"] == 0
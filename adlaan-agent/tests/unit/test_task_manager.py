@@ -0,0 +1,132 @@
+"""
+Unit tests for task manager startup and agent loading.
+"""
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from src.core.exceptions import AgentError, ServiceUnavailableError
+from src.core.metrics import get_metrics_registry
+from src.integrations.backend_service import AgentTask
+from src.schemas import AgentType, TaskPriority, TaskStatus
+from src.services.task_manager import TaskManagerService
+
+
+@pytest_asyncio.fixture
+async def manager(monkeypatch):
+    """Task manager with the legal research agent deferred."""
+    service = TaskManagerService()
+    monkeypatch.setattr(service.settings, "lazy_agents", [AgentType.LEGAL_RESEARCH.value, "unknown_agent"])
+    monkeypatch.setattr(service.settings, "cpu_process_workers", 0)
+    await service.initialize()
+    yield service
+    await service.cleanup()
+
+
+class TestAgentStartup:
+    """Test parallel and deferred agent initialization."""
+    
+    @pytest.mark.asyncio
+    async def test_startup_reports_phase_timings(self, manager):
+        """Test that eager agents are loaded and every phase is timed."""
+        assert AgentType.LEGAL_RESEARCH not in manager.agents
+        assert set(manager.agents) == set(AgentType) - {AgentType.LEGAL_RESEARCH}
+        
+        for phase in ["backend", "agents", "resume", "total", "init:contract_reviewer", "import:contract_reviewer"]:
+            assert phase in manager.startup_timings
+        assert manager.startup_timings["total"] >= manager.startup_timings["agents"]
+        assert 'adlaan_startup_phase_seconds{phase="total"}' in get_metrics_registry().render()
+    
+    @pytest.mark.asyncio
+    async def test_deferred_agent_initializes_once_on_first_use(self, manager):
+        """Test that concurrent first requests share one initialization."""
+        assert manager.is_agent_available(AgentType.LEGAL_RESEARCH)
+        assert manager.get_agent_status(AgentType.LEGAL_RESEARCH)["status"] == "deferred"
+        
+        first, second = await asyncio.gather(
+            manager.get_agent(AgentType.LEGAL_RESEARCH),
+            manager.get_agent(AgentType.LEGAL_RESEARCH)
+        )
+        
+        assert first is second
+        assert manager.agents[AgentType.LEGAL_RESEARCH] is first
+        assert AgentType.LEGAL_RESEARCH not in manager.deferred_agents
+        assert manager.get_agent_status(AgentType.LEGAL_RESEARCH)["initialized"] is True
+    
+    @pytest.mark.asyncio
+    async def test_unavailable_agent_raises(self, manager):
+        """Test that an agent that failed to load is reported unavailable."""
+        manager.agents.pop(AgentType.DOCUMENT_ANALYZER)
+        
+        assert not manager.is_agent_available(AgentType.DOCUMENT_ANALYZER)
+        with pytest.raises(AgentError):
+            await manager.get_agent(AgentType.DOCUMENT_ANALYZER)
+
+
+class TestTaskScheduling:
+    """Test that tasks go through the bounded scheduler."""
+    
+    @pytest.mark.asyncio
+    async def test_full_queue_refuses_before_creating_backend_task(self, manager, monkeypatch):
+        """Test that a full queue rejects without creating an orphaned backend task."""
+        created = []
+        
+        async def create_agent_task(**kwargs):
+            created.append(kwargs)
+        
+        monkeypatch.setattr(manager.backend_service, "create_agent_task", create_agent_task)
+        monkeypatch.setattr(manager.settings, "task_queue_max_size", 0)
+        
+        with pytest.raises(ServiceUnavailableError):
+            await manager.create_task(AgentType.CONTRACT_REVIEWER, {"contract_content": "x"}, user_id=1)
+        assert created == []
+        assert manager.scheduler.workers == manager.settings.max_concurrent_tasks
+    
+    @pytest.mark.asyncio
+    async def test_tasks_run_from_queue_and_are_acked(self, manager, monkeypatch):
+        """Test that created tasks are taken from the queue, executed and acknowledged."""
+        executed = []
+        
+        async def create_agent_task(agent_type, task_input, user_id, case_id, metadata):
+            return AgentTask(id=len(executed) + 7, agent_type=agent_type, status=TaskStatus.PENDING, input_data=task_input, metadata=metadata)
+        
+        async def execute_task(task):
+            executed.append((task.id, task.input_data))
+        
+        monkeypatch.setattr(manager.backend_service, "create_agent_task", create_agent_task)
+        monkeypatch.setattr(manager, "_execute_task", execute_task)
+        
+        await manager.create_task(AgentType.CONTRACT_REVIEWER, {"contract_content": "x"}, user_id=1, priority=TaskPriority.HIGH)
+        for _ in range(100):
+            if executed:
+                break
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.01)
+        
+        assert executed == [(7, {"contract_content": "x"})]
+        status = await manager.task_queue.get_status()
+        assert status["waiting"] == 0
+        assert status["delivered"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_task_redelivered_too_often_is_dead_lettered(self, manager, monkeypatch):
+        """Test that a task past the delivery limit is failed instead of run again."""
+        updates = []
+        
+        async def update_task_status(task_id, status, **kwargs):
+            updates.append((task_id, status))
+            return True
+        
+        monkeypatch.setattr(manager.backend_service, "update_task_status", update_task_status)
+        # Stop the consumer so the test receives the message itself
+        manager._consumer_task.cancel()
+        await manager.task_queue.enqueue("9", TaskPriority.NORMAL, {"id": 9, "agent_type": AgentType.CONTRACT_REVIEWER.value})
+        message = (await manager.task_queue.receive(1, timeout=0.1))[0]
+        message.deliveries = manager.settings.task_queue_max_deliveries + 1
+        
+        await manager._dispatch(message)
+        
+        assert updates == [(9, TaskStatus.FAILED)]
+        assert not manager.scheduler.is_queued("9")
+        assert (await manager.task_queue.get_status())["dead_lettered"] == 1
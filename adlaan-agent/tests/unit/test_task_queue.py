@@ -0,0 +1,120 @@
+"""
+Unit tests for the task queue backends, with Redis Streams run against the mock Redis server.
+"""
+import asyncio
+
+import pytest
+
+from src.core.config import get_settings
+from src.core.metrics import QUEUE_DEPTH
+from src.schemas import TaskPriority
+
+
+class TestTaskQueue:
+    """Test delivery semantics shared by every backend."""
+    
+    @pytest.mark.asyncio
+    async def test_delivers_by_priority_and_acks(self, queues):
+        """Test that higher priorities are delivered first and acked tasks are gone."""
+        queue = await queues.consumer("a")
+        await queue.enqueue("low", TaskPriority.LOW, {"n": 1})
+        await queue.enqueue("normal", TaskPriority.NORMAL, {"n": 2})
+        await queue.enqueue("urgent", TaskPriority.URGENT, {"n": 3})
+        assert await queue.depth() == 3
+        
+        messages = await queue.receive(3, timeout=0.1)
+        assert [message.task_id for message in messages] == ["urgent", "normal", "low"]
+        assert messages[0].payload == {"n": 3}
+        assert await queue.depth() == 0
+        
+        for message in messages:
+            await queue.ack(message)
+        status = await queue.get_status()
+        assert status["waiting"] == 0
+        assert status["delivered"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_aged_low_priority_task_is_not_starved(self, queues, monkeypatch):
+        """Test that a task that has waited out its priority gap goes before newer higher-priority tasks."""
+        monkeypatch.setattr(get_settings(), "task_priority_aging_seconds", 0.05)
+        queue = await queues.consumer("a")
+        await queue.enqueue("low", TaskPriority.LOW, {})
+        await asyncio.sleep(0.2)
+        await queue.enqueue_many([(f"n{n}", TaskPriority.NORMAL, {}) for n in range(5)])
+        
+        first = await queue.receive(1, timeout=0)
+        rest = await queue.receive(5, timeout=0)
+        
+        assert [message.task_id for message in first + rest] == ["low", "n0", "n1", "n2", "n3", "n4"]
+    
+    @pytest.mark.asyncio
+    async def test_depth_gauge_tracks_the_backlog(self, queues):
+        """Test that the queue depth gauge reports tasks waiting in the queue."""
+        queue = await queues.consumer("a")
+        await queue.enqueue_many([(str(n), TaskPriority.LOW, {}) for n in range(3)])
+        
+        assert await queue.depth() == 3
+        assert QUEUE_DEPTH.labels(priority="low").value == 3
+        
+        await queue.receive(2, timeout=0)
+        assert QUEUE_DEPTH.labels(priority="low").value == 1
+    
+    @pytest.mark.asyncio
+    async def test_unacked_task_is_redelivered_to_another_consumer(self, queues):
+        """Test that a task whose consumer died comes back after the visibility timeout."""
+        crashed = await queues.consumer("a", visibility_timeout=0.05)
+        survivor = await queues.consumer("b", visibility_timeout=0.05)
+        await crashed.enqueue("1", TaskPriority.NORMAL, {})
+        
+        first = await crashed.receive(1, timeout=0.1)
+        assert first[0].deliveries == 1
+        assert await survivor.receive(1, timeout=0) == []
+        await asyncio.sleep(0.1)
+        
+        redelivered = await survivor.receive(1, timeout=0.1)
+        assert [message.task_id for message in redelivered] == ["1"]
+        assert redelivered[0].deliveries == 2
+    
+    @pytest.mark.asyncio
+    async def test_touch_keeps_running_task_invisible(self, queues):
+        """Test that extending the visibility timeout prevents redelivery."""
+        worker = await queues.consumer("a", visibility_timeout=0.1)
+        other = await queues.consumer("b", visibility_timeout=0.1)
+        await worker.enqueue("1", TaskPriority.NORMAL, {})
+        message = (await worker.receive(1, timeout=0.1))[0]
+        
+        for _ in range(4):
+            await asyncio.sleep(0.04)
+            await worker.touch(message)
+        
+        assert await other.receive(1, timeout=0) == []
+    
+    @pytest.mark.asyncio
+    async def test_blocking_receive_wakes_on_enqueue(self, queues):
+        """Test that a waiting consumer gets a task as soon as it is queued."""
+        queue = await queues.consumer("a")
+        receiver = asyncio.create_task(queue.receive(1, timeout=2))
+        await asyncio.sleep(0.02)
+        
+        await queue.enqueue("1", TaskPriority.HIGH, {})
+        messages = await asyncio.wait_for(receiver, timeout=1)
+        
+        assert [message.task_id for message in messages] == ["1"]
+    
+    @pytest.mark.asyncio
+    async def test_dead_letter_and_cancel(self, queues):
+        """Test that dead-lettered tasks leave the queue and cancelled ones are never delivered."""
+        queue = await queues.consumer("a")
+        await queue.enqueue("poison", TaskPriority.NORMAL, {})
+        message = (await queue.receive(1, timeout=0.1))[0]
+        await queue.dead_letter(message, "kept crashing")
+        
+        await queue.enqueue("cancelled", TaskPriority.NORMAL, {})
+        await queue.enqueue("kept", TaskPriority.NORMAL, {})
+        assert await queue.cancel("cancelled")
+        
+        messages = await queue.receive(5, timeout=0.1)
+        assert [message.task_id for message in messages] == ["kept"]
+        status = await queue.get_status()
+        assert status["dead_lettered"] == 1
+        assert status["waiting"] == 0